@@ -0,0 +1,78 @@
+"""
+Menir Core V5.2 - Embedding Backfill CLI
+Preenche embeddings faltantes por tenant/label com checkpoint retomável.
+
+Uso:
+  python scripts/backfill_embeddings.py --tenant BECO --dry-run
+  python scripts/backfill_embeddings.py --tenant BECO [--labels Lead Chunk] [--page-size 500]
+  python scripts/backfill_embeddings.py --tenant BECO --restart   # ignora checkpoints
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+# Adjust module path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+from src.v3.core.embedding_backfill import DEFAULT_CHECKPOINT_DIR, EmbeddingBackfillWorker
+from src.v3.core.quantization import QUANTIZABLE_LABELS
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+logger = logging.getLogger("EmbeddingBackfillCLI")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Menir embedding backfill")
+    parser.add_argument("--tenant", required=True, help="Tenant label (ex: BECO)")
+    parser.add_argument("--labels", nargs="+", default=list(QUANTIZABLE_LABELS))
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--embed-batch-size", type=int, default=100)
+    parser.add_argument("--key", choices=["elementId", "uid"], default="elementId")
+    parser.add_argument("--checkpoint-dir", type=Path, default=DEFAULT_CHECKPOINT_DIR)
+    parser.add_argument("--max-pages", type=int, default=None, help="Para após N páginas (retomável)")
+    parser.add_argument("--restart", action="store_true", help="Ignora checkpoints existentes")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas estimativa de custo")
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    worker = EmbeddingBackfillWorker(
+        tenant=args.tenant,
+        page_size=args.page_size,
+        embed_batch_size=args.embed_batch_size,
+        key=args.key,
+        checkpoint_dir=args.checkpoint_dir,
+    )
+
+    if args.dry_run:
+        totals = {"nodes": 0, "tokens": 0, "requests": 0, "minutes": 0.0, "cost_usd": 0.0}
+        for label in args.labels:
+            est = await worker.estimate(label)
+            print(
+                f"{label:<14} nós={est.nodes:>7} tokens≈{est.tokens:>9} "
+                f"req={est.requests:>5} ≈{est.minutes:>7.1f} min  US$ {est.cost_usd:.4f}"
+            )
+            for k in totals:
+                totals[k] += getattr(est, k)
+        print(
+            f"TOTAL          nós={totals['nodes']:>7} tokens≈{totals['tokens']:>9} "
+            f"req={totals['requests']:>5} ≈{totals['minutes']:>7.1f} min  US$ {totals['cost_usd']:.4f}"
+        )
+        return
+
+    for label in args.labels:
+        ckpt = await worker.run(label, restart=args.restart, max_pages=args.max_pages)
+        state = "concluído" if ckpt.done else "pausado"
+        logger.info(
+            f"✅ {label}@{args.tenant} {state}: {ckpt.embedded} embeddings, "
+            f"{ckpt.failed} falhos (retentados no próximo run), {ckpt.skipped} sem texto"
+            + (f", {ckpt.unkeyed} sem uid (fora da paginação por uid)." if ckpt.unkeyed else ".")
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
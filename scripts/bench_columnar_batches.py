@@ -0,0 +1,173 @@
+"""
+Menir Core V5.2 - Columnar Batch Benchmark
+Mede memória (tracemalloc) e tempo das listas de dicts contra os lotes
+colunares (src/v3/core/columnar.py) nos três caminhos que os usam:
+
+  load    -> registros do grafo viram OpenItems (reconciliação): lista de
+             dicts inteira vs InvoiceBatch/TransactionBatch.from_stream
+  access  -> agregações típicas (soma por moeda, filtro por janela de datas)
+             varrendo dicts vs colunas NumPy
+  export  -> formatação Crésus: linha a linha vs CresusExporter._format_batch
+
+Sem Neo4j: os registros são sintéticos, no formato devolvido pelo driver.
+
+Uso:
+  python scripts/bench_columnar_batches.py [--rows 100000] [--chunk 10000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.v3.core.columnar import InvoiceBatch, StringDictionary, TransactionBatch
+from src.v3.core.cresus_exporter import EXPORT_KEYS, CresusExporter
+from src.v3.core.reconciliation_sweep import OpenItems
+
+LOAD_KEYS = {"booking_date": "day", "payment_reference": "reference", "counterparty_iban": "iban", "counterparty_name": "party"}
+
+
+def synthetic_rows(n: int, seed: int = 11) -> list[dict]:
+    """Transações abertas como o _load_open_items recebe do driver (200 contrapartes, 3 moedas)."""
+    rng = np.random.default_rng(seed)
+    amount = np.round(rng.uniform(-5000, 5000, n), 2).tolist()
+    day = rng.integers(19_000, 19_730, n).tolist()
+    party = rng.integers(0, 200, n).tolist()
+    currency = rng.choice(["CHF", "EUR", "USD"], n, p=[0.8, 0.15, 0.05]).tolist()
+    return [
+        {
+            "id": f"4:3f1c2a9e-7b55-4d2c-9a0e-5c1b7f0d2e6a:{k}", "amount": amount[k], "day": day[k],
+            "currency": currency[k], "reference": None,
+            "iban": f"CH93007620116238{party[k]:05d}", "party": f"Fornecedor {party[k]} SA",
+        }
+        for k in range(n)
+    ]
+
+
+def measure(label: str, fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<44} {elapsed:9.1f} ms   pico {peak / 2**20:8.1f} MB")
+    return result
+
+
+async def _stream(rows_factory, n: int, chunk: int):
+    # Simula graph.stream(): o driver entrega um dict por vez
+    for start in range(0, n, chunk):
+        for row in rows_factory(start, min(chunk, n - start)):
+            yield row
+
+
+def bench_load(n: int, chunk: int) -> None:
+    print(f"load ({n} transações -> OpenItems)")
+
+    def _rows(start, size):
+        return synthetic_rows(size, seed=start)
+
+    def _dicts():
+        rows = [row for start in range(0, n, chunk) for row in _rows(start, min(chunk, n - start))]
+        return OpenItems.from_rows(rows, {})
+
+    def _columnar():
+        async def _run():
+            batch = await TransactionBatch.from_stream(
+                _stream(_rows, n, chunk), {"currency": StringDictionary()}, keys=LOAD_KEYS, chunk_size=chunk
+            )
+            return OpenItems.from_batch(batch)
+        return asyncio.run(_run())
+
+    legacy = measure("lista de dicts + OpenItems.from_rows", _dicts)
+    columnar = measure("from_stream em lotes + OpenItems.from_batch", _columnar)
+    same = np.array_equal(legacy.amount, columnar.amount) and legacy.iban == columnar.iban
+    print(f"  paridade OpenItems: {'OK' if same else 'MISMATCH'}")
+
+
+def bench_access(rows: list[dict], batch: TransactionBatch) -> None:
+    print(f"access ({len(rows)} linhas: soma por moeda na janela de 90 dias)")
+    lo, hi = 19_200, 19_290
+
+    def _dicts():
+        totals: dict[str, float] = {}
+        for r in rows:
+            if lo <= r["day"] < hi:
+                totals[r["currency"]] = totals.get(r["currency"], 0.0) + r["amount"]
+        return totals
+
+    def _columnar():
+        days = batch.days("booking_date")
+        window = (days >= lo) & (days < hi)
+        codes = batch.data["currency"][window]
+        cents = np.bincount(codes, weights=batch.data["amount"][window], minlength=len(batch.dictionaries["currency"]))
+        return {value: cents[code] / 100 for code, value in enumerate(batch.dictionaries["currency"].values)}
+
+    legacy = measure("dicts", _dicts)
+    columnar = measure("colunas", _columnar)
+    same = all(abs(legacy[c] - columnar[c]) < 0.005 for c in legacy)
+    print(f"  paridade: {'OK' if same else 'MISMATCH'}")
+
+
+def bench_export(n: int) -> None:
+    print(f"export ({n} faturas reconciliadas -> TSV Crésus)")
+    rng = np.random.default_rng(2)
+    vendor = rng.integers(0, 300, n).tolist()
+    day = rng.integers(1, 28, n).tolist()
+    rows = [
+        {"issue_date": f"2026-01-{day[k]:02d}", "total_amount": round(10 + k % 997 * 1.37, 2), "line_items_json": None,
+         "vendor_name": f"Fornecedor {vendor[k]} SA", "cresus_account_id": str(4000 + vendor[k] % 7), "edge_id": f"e{k}"}
+        for k in range(n)
+    ]
+    exporter = CresusExporter(None)
+
+    def _per_row():
+        # Caminho anterior: strptime/strftime e formatação por registro
+        out = []
+        for r in rows:
+            swiss_date = exporter._format_swiss_date(r["issue_date"])
+            out.append(exporter._invoice_lines(
+                swiss_date, "1020", r["cresus_account_id"], r["vendor_name"],
+                round(r["total_amount"] * 100), r["line_items_json"],
+            ))
+        return "".join(out)
+
+    def _batched():
+        dictionaries = InvoiceBatch.new_dictionaries()
+        parts = []
+        for start in range(0, n, exporter.batch_size):
+            batch = InvoiceBatch.from_rows(rows[start:start + exporter.batch_size], dictionaries, keys=EXPORT_KEYS)
+            parts.append(exporter._format_batch("BECO", batch))
+        return "".join(parts)
+
+    legacy = measure("linha a linha", _per_row)
+    columnar = measure(f"InvoiceBatch de {exporter.batch_size}", _batched)
+    print(f"  paridade: {'OK' if legacy == columnar else 'MISMATCH'}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Listas de dicts x lotes colunares")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--chunk", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    batch = TransactionBatch.from_rows(rows, keys=LOAD_KEYS)
+    dict_bytes = sum(sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r.values()) for r in rows)
+    print(f"{args.rows} transações: dicts ~{dict_bytes / 2**20:.1f} MB  |  lote colunar {batch.nbytes / 2**20:.1f} MB "
+          f"+ ids/texto livre compartilhados")
+
+    bench_load(args.rows, args.chunk)
+    bench_access(rows, batch)
+    bench_export(args.rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Menir Core V5.2 - persist vs persist_many Benchmark
+Mede nós/segundo do NodePersistenceOrchestrator nó-a-nó (persist) contra o
+caminho em lote (persist_many) para 1, 100 e 10k nós.
+
+Modo padrão: transação simulada com latência fixa por tx.run (--rtt-ms),
+isolando o custo de round trips. Com --live, usa Neo4j real (NEO4J_* do .env)
+numa transação que sofre rollback ao final.
+
+Uso:
+  python scripts/bench_persist_many.py [--sizes 1 100 10000] [--rtt-ms 0.5]
+  python scripts/bench_persist_many.py --live [--batch-size 1000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+from src.v3.core.persistence import NodePersistenceOrchestrator
+from src.v3.core.schemas.base import Document
+from src.v3.core.schemas.identity import locked_tenant_context
+from src.v3.core.schemas.operational import ClientNode
+
+# Tenant real (locked_tenant_context só aceita tenants do Kernel); live faz rollback
+BENCH_TENANT = "BECO"
+
+
+class SimulatedTx:
+    """tx.run com latência de rede fixa; .single() sempre encontra a origem."""
+
+    def __init__(self, rtt_ms: float):
+        self.rtt = rtt_ms / 1000
+        self.calls = 0
+
+    def run(self, query, **params):
+        self.calls += 1
+        time.sleep(self.rtt)
+        return self
+
+    def single(self):
+        return {"missing": [], "d": True}
+
+
+def make_nodes(n: int, run_id: str) -> list:
+    doc = Document(uid=f"bench-doc-{run_id}", project=BENCH_TENANT, sha256=run_id.ljust(64, "0"), name="bench.pdf")
+    clients = [
+        ClientNode(
+            uid=f"bench-{run_id}-{i}",
+            project=BENCH_TENANT,
+            source_document_uid=doc.uid,
+            client_type="PJ",
+            name=f"Client {i}",
+        )
+        for i in range(max(n - 1, 0))
+    ]
+    return [doc, *clients][:n]
+
+
+async def run_mode(orchestrator, nodes, tx, batched: bool) -> float:
+    started = time.perf_counter()
+    if batched:
+        await orchestrator.persist_many(nodes, tx)
+    else:
+        for node in nodes:
+            await orchestrator.persist(node, tx)
+    return time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="persist vs persist_many")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 100, 10_000])
+    parser.add_argument("--rtt-ms", type=float, default=0.5)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--live", action="store_true", help="Neo4j real (rollback ao final)")
+    args = parser.parse_args()
+
+    orchestrator = NodePersistenceOrchestrator(batch_size=args.batch_size)
+    driver = None
+    if args.live:
+        load_dotenv(override=True)
+        from neo4j import GraphDatabase
+        driver = GraphDatabase.driver(
+            os.getenv("NEO4J_URI", "bolt://localhost:7687"),
+            auth=(os.getenv("NEO4J_USER", "neo4j"), os.getenv("NEO4J_PASSWORD", "")),
+        )
+
+    mode = "live Neo4j" if args.live else f"simulado, RTT {args.rtt_ms} ms"
+    print(f"Modo: {mode}  |  batch_size={args.batch_size}")
+    print(f"{'nós':>7} | {'persist (nós/s)':>16} | {'persist_many (nós/s)':>21} | {'round trips':>17} | speedup")
+
+    with locked_tenant_context(BENCH_TENANT):
+        for size in args.sizes:
+            results = {}
+            trips = {}
+            for batched in (False, True):
+                nodes = make_nodes(size, f"{size}-{int(batched)}-{time.time_ns()}")
+                if args.live:
+                    session = driver.session()
+                    tx = session.begin_transaction()
+                    # Document precisa existir antes do caminho nó-a-nó
+                    if not batched:
+                        await orchestrator.persist(nodes[0], tx)
+                        nodes = nodes[1:] or nodes
+                    elapsed = await run_mode(orchestrator, nodes, tx, batched)
+                    tx.rollback()
+                    session.close()
+                    trips[batched] = "-"
+                else:
+                    tx = SimulatedTx(args.rtt_ms)
+                    elapsed = await run_mode(orchestrator, nodes, tx, batched)
+                    trips[batched] = tx.calls
+                results[batched] = len(nodes) / elapsed if elapsed else float("inf")
+
+            print(
+                f"{size:>7} | {results[False]:>16.0f} | {results[True]:>21.0f} | "
+                f"{str(trips[False]) + ' vs ' + str(trips[True]):>17} | x{results[True] / results[False]:.1f}"
+            )
+
+    if driver:
+        driver.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
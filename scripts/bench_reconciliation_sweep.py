@@ -0,0 +1,156 @@
+"""
+Menir Core V5.2 - Sort-and-Sweep Reconciliation Benchmark
+Compares the in-memory sweep (src/v3/core/reconciliation_sweep.py) plus the
+per-component assignment (reconciliation_assignment.py) against a
+brute-force evaluation of the old Cypher tier predicates (every open invoice
+x every open transaction) on a synthetic tenant. No Neo4j required.
+
+Parity: at n*m <= --full-parity-limit every invoice is checked against the
+brute force; above it a random sample of invoices is checked. Each tier's
+candidate join is compared with the brute force over the nodes the previous
+tiers' assignment left open; the assignment itself must be 1:1 and inside
+the candidates.
+
+--reference-share: fração das faturas com referência QR (tier 0). Rodar com
+0 mostra quantos candidatos o join por referência tira da faixa de valor.
+
+Uso:
+  python scripts/bench_reconciliation_sweep.py [--sizes 10000 100000] [--sample 2000] [--reference-share 0.7]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.v3.core.reconciliation_sweep import TIERS, MatchTier, OpenItems, match_tiers, reference_join, sweep
+
+CURRENCIES = np.array([0, 1, 2])  # CHF, EUR, USD
+CURRENCY_WEIGHTS = [0.8, 0.15, 0.05]
+
+
+def synthetic_tenant(n: int, m: int, reference_share: float = 0.7, seed: int = 3) -> tuple[OpenItems, OpenItems]:
+    """
+    Faturas e extratos: ~60% das transações pagam uma fatura (exato, câmbio ou atraso).
+    reference_share das faturas têm referência QR; 85% dos pagamentos delas a repetem no camt.
+    """
+    rng = np.random.default_rng(seed)
+    inv_amount = np.round(np.exp(rng.uniform(np.log(10), np.log(20_000), n)), 2)
+    inv_day = rng.integers(19_000, 19_730, n)
+    inv_currency = rng.choice(CURRENCIES, n, p=CURRENCY_WEIGHTS).astype(np.int32)
+    # ~2% sem moeda (nunca casam, como null no Cypher)
+    inv_currency[rng.random(n) < 0.02] = -1
+
+    paid = rng.random(m) < 0.6
+    source = rng.integers(0, n, m)
+    kind = rng.random(m)
+    noise = np.where(kind < 0.5, rng.uniform(-0.05, 0.05, m), inv_amount[source] * rng.uniform(-0.04, 0.04, m))
+    tx_amount = np.where(paid, inv_amount[source] + noise, np.round(np.exp(rng.uniform(np.log(10), np.log(20_000), m)), 2))
+    tx_amount = np.round(tx_amount, 2) * np.where(rng.random(m) < 0.5, -1, 1)  # débitos com sinal
+    tx_day = np.where(paid, inv_day[source] + rng.integers(-5, 50, m), rng.integers(19_000, 19_760, m))
+    tx_currency = np.where(paid, inv_currency[source], rng.choice(CURRENCIES, m, p=CURRENCY_WEIGHTS)).astype(np.int32)
+
+    inv_reference = [f"{k:027d}" if has else None for k, has in enumerate(rng.random(n) < reference_share)]
+    echoed = paid & (rng.random(m) < 0.85)
+    tx_reference = [inv_reference[s] if e else None for s, e in zip(source.tolist(), echoed.tolist())]
+
+    invoices = OpenItems([f"i{k}" for k in range(n)], inv_amount, inv_day.astype(np.int64), inv_currency, inv_reference)
+    transactions = OpenItems([f"t{k}" for k in range(m)], tx_amount, tx_day.astype(np.int64), tx_currency, tx_reference)
+    return invoices, transactions
+
+
+def brute_force_pairs(
+    invoices: OpenItems,
+    transactions: OpenItems,
+    tier: MatchTier,
+    rows: np.ndarray,
+    transaction_open: np.ndarray,
+) -> set[tuple[int, int]]:
+    """Predicado dos tiers Cypher avaliado contra TODAS as transações abertas (O(n·m))."""
+    tx_abs = np.abs(transactions.amount)
+    tx_reference = np.array(transactions.reference, dtype=object)
+    pairs = set()
+    for i in rows.tolist():
+        amount = invoices.amount[i]
+        delta = np.abs(amount - tx_abs)
+        days = transactions.day - invoices.day[i]
+        if tier.by_reference:
+            reference = invoices.reference[i]
+            same_reference = tx_reference == reference if reference else np.zeros(len(transactions), dtype=bool)
+        else:
+            same_reference = True
+        keep = (
+            transaction_open
+            & same_reference
+            & (delta <= tier.abs_tolerance + tier.rel_tolerance * amount)
+            & (days >= tier.min_days)
+            & (days <= tier.max_days)
+            & (transactions.currency == invoices.currency[i])
+            & (invoices.currency[i] >= 0)
+        )
+        pairs.update((i, int(t)) for t in np.flatnonzero(keep))
+    return pairs
+
+
+def check_parity(invoices, transactions, results, rows: np.ndarray) -> bool:
+    invoice_open = np.ones(len(invoices), dtype=bool)
+    transaction_open = np.ones(len(transactions), dtype=bool)
+    selected = np.zeros(len(invoices), dtype=bool)
+    selected[rows] = True
+    ok = True
+    for tier, matches in zip(TIERS, results):
+        expected = brute_force_pairs(invoices, transactions, tier, rows[invoice_open[rows]], transaction_open)
+        join = reference_join if tier.by_reference else sweep
+        candidates = join(invoices, transactions, tier, invoice_open, transaction_open)
+        mask = selected[candidates.invoice]
+        got = set(zip(candidates.invoice[mask].tolist(), candidates.transaction[mask].tolist()))
+        assigned = set(zip(matches.invoice.tolist(), matches.transaction.tolist()))
+        one_to_one = len(set(matches.invoice.tolist())) == len(set(matches.transaction.tolist())) == len(matches)
+        inside = {(i, t) for i, t in assigned if selected[i]} <= got
+        status = "OK" if got == expected and one_to_one and inside else "MISMATCH"
+        ok &= status == "OK"
+        print(
+            f"  parity [{tier.name}] {status}: join {len(got)} pares / brute force {len(expected)} pares, "
+            f"assignment 1:1 {one_to_one}, dentro dos candidatos {inside}"
+        )
+        invoice_open[matches.invoice] = False
+        transaction_open[matches.transaction] = False
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Sweep x tiers Cypher cartesianos")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--sample", type=int, default=2000, help="Faturas verificadas acima do limite de paridade total")
+    parser.add_argument("--full-parity-limit", type=float, default=1e8)
+    parser.add_argument("--reference-share", type=float, default=0.7, help="Fração das faturas com referência QR")
+    args = parser.parse_args()
+
+    ok = True
+    for size in args.sizes:
+        invoices, transactions = synthetic_tenant(size, size, args.reference_share)
+        started = time.perf_counter()
+        results = match_tiers(invoices, transactions)
+        elapsed = (time.perf_counter() - started) * 1000
+        candidates = sum(r.candidates for r in results)
+        print(f"{size} x {size}: sweep + assignment {elapsed:.1f} ms  |  {candidates} candidatos na faixa vs {size * size:.2e} pares no produto cartesiano")
+        for r in results:
+            print(f"  {r.tier.name} ({r.tier.rel_type}): {len(r)} arestas 1:1, {r.candidates} candidatos, {r.clusters} clusters ambíguos")
+
+        if size * size <= args.full_parity_limit:
+            rows = np.arange(size)
+        else:
+            rows = np.sort(np.random.default_rng(5).choice(size, min(args.sample, size), replace=False))
+        started = time.perf_counter()
+        ok &= check_parity(invoices, transactions, results, rows)
+        brute_ms = (time.perf_counter() - started) * 1000
+        scaled = brute_ms * size / len(rows)
+        print(f"  brute force: {brute_ms:.0f} ms para {len(rows)} faturas (~{scaled:.0f} ms para o tenant inteiro)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Menir Core V5.2 - Tenant Lock Benchmark
+Vazão de mutações concorrentes do mesmo tenant distribuídas entre processos
+(workers), com a seção crítica simulada por um sleep (a escrita no Neo4j):
+
+  o_excl  -> caminho anterior: arquivo O_EXCL fail-fast; quem colide falha
+             (fail) ou repete com backoff até conseguir (spin)
+  lease   -> TenantLockManager: fila FIFO em SQLite, ninguém falha
+
+Uso:
+  python scripts/bench_tenant_lock.py [--mutators 20] [--processes 4] [--hold-ms 5]
+"""
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.v3.core.tenant_lock import TenantLockManager
+
+TENANT = "BENCH"
+
+
+class _Collision(Exception):
+    pass
+
+
+async def _o_excl_once(lock_path: Path, hold: float) -> None:
+    # Mesma lógica do InterProcessTenantLock anterior (sem a heurística de 15s, que não dispara aqui)
+    try:
+        fd = os.open(str(lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        os.close(fd)
+    except FileExistsError:
+        raise _Collision()
+    try:
+        await asyncio.sleep(hold)
+    finally:
+        os.unlink(lock_path)
+
+
+async def _worker_o_excl(lock_path: Path, count: int, hold: float, spin: bool) -> list:
+    async def mutator():
+        started = time.perf_counter()
+        while True:
+            try:
+                await _o_excl_once(lock_path, hold)
+                return time.perf_counter() - started, True
+            except _Collision:
+                if not spin:
+                    return time.perf_counter() - started, False
+                await asyncio.sleep(0.005)
+
+    return await asyncio.gather(*(mutator() for _ in range(count)))
+
+
+async def _worker_lease(db_path: Path, count: int, hold: float) -> list:
+    manager = TenantLockManager(db_path, ttl=15, wait_timeout=120)
+
+    async def mutator():
+        started = time.perf_counter()
+        async with await manager.acquire(TENANT):
+            await asyncio.sleep(hold)
+        return time.perf_counter() - started, True
+
+    return await asyncio.gather(*(mutator() for _ in range(count)))
+
+
+def _run_worker(mode: str, path: str, count: int, hold: float, start_at: float) -> list:
+    # Todos os processos largam juntos
+    time.sleep(max(0.0, start_at - time.time()))
+    if mode == "lease":
+        return asyncio.run(_worker_lease(Path(path), count, hold))
+    return asyncio.run(_worker_o_excl(Path(path), count, hold, spin=(mode == "o_excl spin")))
+
+
+def bench(mode: str, path: Path, mutators: int, processes: int, hold: float) -> None:
+    shares = [mutators // processes + (1 if k < mutators % processes else 0) for k in range(processes)]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(processes, mp_context=context) as pool:
+        start_at = time.time() + 1.0
+        futures = [pool.submit(_run_worker, mode, str(path), n, hold, start_at) for n in shares if n]
+        results = [r for f in futures for r in f.result()]
+        elapsed = time.time() - start_at
+
+    done = [latency for latency, ok in results if ok]
+    failed = len(results) - len(done)
+    p50 = statistics.median(done) * 1000 if done else 0.0
+    p95 = sorted(done)[math.ceil(len(done) * 0.95) - 1] * 1000 if done else 0.0
+    print(
+        f"  {mode:<12} {len(done):3d} ok {failed:3d} falhas  {elapsed * 1000:8.1f} ms  "
+        f"{len(done) / elapsed:7.1f} mutações/s   espera p50 {p50:7.1f} ms  p95 {p95:7.1f} ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="O_EXCL fail-fast x lease FIFO")
+    parser.add_argument("--mutators", type=int, default=20)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--hold-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    hold = args.hold_ms / 1000
+    print(f"{args.mutators} mutadores do mesmo tenant em {args.processes} processos, seção crítica {args.hold_ms} ms")
+    with tempfile.TemporaryDirectory() as tmp:
+        lock_path = Path(tmp) / f"tenant_{TENANT}.lock"
+        bench("o_excl fail", lock_path, args.mutators, args.processes, hold)
+        bench("o_excl spin", lock_path, args.mutators, args.processes, hold)
+        bench("lease", Path(tmp) / "leases.sqlite3", args.mutators, args.processes, hold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""
+Menir Core V5.2 - CI Gate: MERGE keys sem índice
+Falha (exit 1) quando algum MERGE (n:Label {chave: ...}) do código não tem
+constraint/índice declarado em src/v3/core/schema_migrations.py.
+Correção: adicionar o índice numa nova Migration (nunca editar versão aplicada).
+"""
+import sys
+
+from src.v3.core.schema_migrations import uncovered_merge_keys
+
+
+def main() -> int:
+    uncovered = uncovered_merge_keys()
+    if not uncovered:
+        print("✅ Todas as chaves de MERGE têm constraint/índice declarado.")
+        return 0
+
+    print("❌ Chaves de MERGE sem índice (label scan garantido em produção):")
+    for (label, keys), where in sorted(uncovered.items()):
+        print(f"   - {label}({', '.join(keys)})  <- {', '.join(sorted(set(where)))}")
+    print("   Declare o índice numa nova Migration em src/v3/core/schema_migrations.py.")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
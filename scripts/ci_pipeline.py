@@ -22,13 +22,16 @@ def main():
     print("=========================================================")
 
     # 1. Ruff Check
-    run_command([sys.executable, "-m", "ruff", "check", "src/v3/", "tests/"], "[1/3] Strict Linter (Ruff)")
+    run_command([sys.executable, "-m", "ruff", "check", "src/v3/", "tests/"], "[1/4] Strict Linter (Ruff)")
 
     # 2. MyPy Check
-    run_command([sys.executable, "-m", "mypy", "-p", "src.v3"], "[2/3] Static Type Checker (MyPy)")
+    run_command([sys.executable, "-m", "mypy", "-p", "src.v3"], "[2/4] Static Type Checker (MyPy)")
 
-    # 3. PyTest
-    run_command([sys.executable, "-m", "pytest", "tests/v3/", "-v"], "[3/3] Test Suite Validation (PyTest)")
+    # 3. Schema Gate: toda chave de MERGE precisa de índice declarado
+    run_command([sys.executable, "-m", "scripts.check_merge_indexes"], "[3/4] MERGE Index Coverage")
+
+    # 4. PyTest
+    run_command([sys.executable, "-m", "pytest", "tests/v3/", "-v"], "[4/4] Test Suite Validation (PyTest)")
 
     print("\n=========================================================")
     print(f"[{current_date}] CI PIPELINE COMPLETED SUCCESSFULLY (EXIT 0)")
@@ -10,16 +10,20 @@ echo "========================================================="
 echo "[$CURRENT_DATE] INITIATING MENIR CI PIPELINE"
 echo "========================================================="
 
-echo "\n=> [1/3] Running Strict Linter (Ruff) on src/v3/ and tests/"
+echo "\n=> [1/4] Running Strict Linter (Ruff) on src/v3/ and tests/"
 # Check for syntactical/complexity constraints
 ruff check src/v3/ tests/
 echo "   ✅ Ruff Check PASSED."
 
-echo "\n=> [2/3] Running Static Type Checker (MyPy) on src/v3/"
+echo "\n=> [2/4] Running Static Type Checker (MyPy) on src/v3/"
 mypy
 echo "   ✅ MyPy Check PASSED."
 
-echo "\n=> [3/3] Running Test Suite Validation (PyTest isolated context)"
+echo "\n=> [3/4] Checking MERGE keys against declared schema indexes"
+python -m scripts.check_merge_indexes
+echo "   ✅ MERGE Index Coverage PASSED."
+
+echo "\n=> [4/4] Running Test Suite Validation (PyTest isolated context)"
 # Ensure strictly required test markers are mapped
 python -m pytest tests/v3/ -v
 echo "   ✅ PyTest Execution PASSED."
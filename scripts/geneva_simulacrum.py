@@ -43,7 +43,7 @@ async def run_simulacrum():
     logger.info("🧠 2. Construindo a Fatura Mental via Pydantic (Testando Validator Dinâmico)...")
     
     # O Dispatcher faria cache na memória:
-    active_rules = om.get_tenant_active_context(tenant, "2026-02-15")
+    active_rules = await om.get_tenant_active_context(tenant, "2026-02-15")
     valid_rates = active_rules.get('tva_rates', [8.1, 2.6])
     logger.info(f"O Córtex está ciente das Leis Atuais deste Tenant: {valid_rates}%")
     
@@ -99,7 +99,7 @@ async def run_simulacrum():
     logger.info("⚖️ 5. Despertando The Reconciliation Engine...")
     reconciliation = ReconciliationEngine(om)
     # Force the Tier 1 Exact Match to catch it
-    reconciliation.run_matching_cycle(tenant)
+    await reconciliation.run_matching_cycle(tenant)
     
     # Check what happened 
     with om.driver.session() as session:
@@ -3,6 +3,7 @@ Menir Core V5.1 - Incremental Graph Backup (Chronos)
 A low-impedance script to snapshot the latest mutated nodes (Provenance/Audit)
 and export them safely. Designed to run as a CronJob via Docker or system level.
 """
+import asyncio
 import os
 import sys
 import json
@@ -19,7 +20,7 @@ logger = logging.getLogger("GraphBackup")
 
 from dotenv import load_dotenv
 
-def export_mutations_snapshot():
+async def export_mutations_snapshot():
     start = time.time()
     
     # Load Credentials
@@ -47,24 +48,26 @@ def export_mutations_snapshot():
     today = datetime.now().strftime("%Y-%m-%d")
     filepath = os.path.join(export_dir, f"menir_mutations_{today}.json")
     
+    # O output do Neo4j dateTime types precisa ser stringificado
+    def serialize_neo4j(obj):
+        if hasattr(obj, 'isoformat'):
+            return obj.isoformat()
+        return str(obj)
+
     try:
-        with om.driver.session() as session:
-            result = session.run(query)
-            data = [record.data() for record in result]
-            
-        # O output do Neo4j dateTime types precisa ser stringificado
-        def serialize_neo4j(obj):
-            if hasattr(obj, 'isoformat'):
-                return obj.isoformat()
-            return str(obj)
-            
+        # Streaming: cada mutação vai direto para o arquivo (array JSON escrito incrementalmente)
+        count = 0
         with open(filepath, 'w') as f:
-            json.dump(data, f, default=serialize_neo4j, indent=2)
+            f.write("[")
+            async for record in om.graph.stream(query):
+                f.write(",\n" if count else "\n")
+                f.write(json.dumps(record, default=serialize_neo4j))
+                count += 1
+            f.write("\n]\n")
             
-        logger.info(f"💾 Snapshot de Baixa Impedância gerado em {filepath} ({len(data)} mutações salvos em {(time.time()-start)*1000:.1f}ms).")
+        logger.info(f"💾 Snapshot de Baixa Impedância gerado em {filepath} ({count} mutações salvos em {(time.time()-start)*1000:.1f}ms).")
     except Exception as e:
         logger.error(f"❌ Falha no Backup Incremental: {e}")
 
 if __name__ == "__main__":
-    import time
-    export_mutations_snapshot()
+    asyncio.run(export_mutations_snapshot())
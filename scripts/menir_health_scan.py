@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 import subprocess
@@ -75,7 +76,7 @@ def check_neo4j_health():
 
     def _connect():
         manager = MenirOntologyManager()
-        result = manager.check_system_health()
+        result = asyncio.run(manager.check_system_health())
         manager.close()
         return result
 
@@ -0,0 +1,159 @@
+"""
+Menir Core V5.2 - Int8 Embedding Migration (Chronos Compactor)
+Converts existing float embeddings on Lead/Event/Product/Concept/Chunk nodes
+into int8 codes (embedding_q + scale/offset) and moves the full-precision
+vector to a cold :FullEmbedding node used only for re-ranking.
+
+Uso:
+  python scripts/migrate_embeddings_int8.py --tenant BECO --report
+  python scripts/migrate_embeddings_int8.py --tenant BECO [--labels Lead Chunk] [--keep-float]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+# Adjust module path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+from src.v3.core.neo4j_pool import get_shared_driver
+from src.v3.core.quantization import (
+    QUANTIZABLE_LABELS,
+    QuantizedVectorStore,
+    embedding_memory_report,
+    quantize_int8,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+logger = logging.getLogger("EmbeddingInt8Migration")
+
+
+def _safe(value: str) -> str:
+    return value.replace("`", "").replace(";", "")
+
+
+async def report(driver, tenant: str, labels: list[str]) -> dict:
+    """Relatório de ocupação estimada do property store por label."""
+    totals = {"float_bytes": 0, "int8_bytes": 0}
+    async with driver.session() as session:
+        for label in labels:
+            query = f"""
+            MATCH (n:`{_safe(label)}`:`{_safe(tenant)}`)
+            RETURN count(n.embedding) AS float_count,
+                   count(n.embedding_q) AS int8_count,
+                   max(coalesce(size(n.embedding), size(n.embedding_q))) AS dim
+            """
+            record = await (await session.run(query)).single()
+            if not record:
+                continue
+            dim = record["dim"] or 768
+            as_float = embedding_memory_report(record["float_count"], dim)
+            as_int8 = embedding_memory_report(record["int8_count"], dim)
+            current = as_float["float_bytes"] + as_int8["int8_bytes"]
+            target = embedding_memory_report(record["float_count"] + record["int8_count"], dim)
+            totals["float_bytes"] += target["float_bytes"]
+            totals["int8_bytes"] += target["int8_bytes"]
+            print(
+                f"{label:<8} float={record['float_count']:>7} int8={record['int8_count']:>7} "
+                f"dim={dim:<4} atual={current / 1e6:8.2f} MB  "
+                f"all-float={target['float_bytes'] / 1e6:8.2f} MB  "
+                f"all-int8={target['int8_bytes'] / 1e6:8.2f} MB"
+            )
+    saved = totals["float_bytes"] - totals["int8_bytes"]
+    print(f"Economia potencial no page cache: {saved / 1e6:.2f} MB")
+    return totals
+
+
+async def migrate_label(
+    driver, tenant: str, label: str, batch_size: int, keep_float: bool
+) -> int:
+    safe_label = _safe(label)
+    safe_tenant = _safe(tenant)
+
+    # Nós migrados saem do filtro, então o próprio predicado funciona como cursor.
+    # Só nós com uid: é a chave do índice int8 e do :FullEmbedding (QuantizedVectorStore);
+    # sem ela o vetor quantizado ficaria invisível para a busca.
+    fetch = f"""
+    MATCH (n:`{safe_label}`:`{safe_tenant}`)
+    WHERE n.embedding IS NOT NULL AND n.embedding_q IS NULL AND n.uid IS NOT NULL
+    RETURN elementId(n) AS eid, n.uid AS key, n.embedding AS embedding
+    LIMIT $batch_size
+    """
+    without_uid = f"""
+    MATCH (n:`{safe_label}`:`{safe_tenant}`)
+    WHERE n.embedding IS NOT NULL AND n.embedding_q IS NULL AND n.uid IS NULL
+    RETURN count(n) AS pending
+    """
+    write = f"""
+    UNWIND $rows AS row
+    MATCH (n:`{safe_label}`:`{safe_tenant}`) WHERE elementId(n) = row.eid
+    SET n.embedding_q = row.codes,
+        n.embedding_scale = row.scale,
+        n.embedding_offset = row.offset
+    MERGE (f:FullEmbedding:`{safe_tenant}` {{uid: row.full_uid}})
+    SET f.embedding = n.embedding, f.label = $label
+    MERGE (n)-[:HAS_FULL_EMBEDDING]->(f)
+    WITH n WHERE NOT $keep_float
+    REMOVE n.embedding
+    """
+
+    migrated = 0
+    async with driver.session() as session:
+        while True:
+            result = await session.run(fetch, batch_size=batch_size)
+            records = [r async for r in result]
+            if not records:
+                break
+
+            rows = []
+            for r in records:
+                qv = quantize_int8(r["embedding"])
+                rows.append(
+                    {
+                        "eid": r["eid"],
+                        "full_uid": QuantizedVectorStore.full_embedding_uid(label, r["key"]),
+                        "codes": qv.data,
+                        "scale": qv.scale,
+                        "offset": qv.offset,
+                    }
+                )
+            await session.execute_write(
+                lambda tx: tx.run(write, rows=rows, label=safe_label, keep_float=keep_float)
+            )
+            migrated += len(rows)
+            logger.info(f"🗜️ {label}@{tenant}: {migrated} vetores quantizados...")
+
+        record = await (await session.run(without_uid)).single()
+        if record and record["pending"]:
+            logger.warning(f"⚠️ {label}@{tenant}: {record['pending']} nós sem uid mantidos em float.")
+    return migrated
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Menir int8 embedding migration")
+    parser.add_argument("--tenant", required=True, help="Tenant label (ex: BECO)")
+    parser.add_argument("--labels", nargs="+", default=list(QUANTIZABLE_LABELS))
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--keep-float", action="store_true", help="Mantém n.embedding no nó")
+    parser.add_argument("--report", action="store_true", help="Apenas relatório de memória")
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    driver = get_shared_driver()
+
+    if args.report:
+        await report(driver, args.tenant, args.labels)
+        return
+
+    total = 0
+    for label in args.labels:
+        total += await migrate_label(driver, args.tenant, label, args.batch_size, args.keep_float)
+    logger.info(f"✅ Migração int8 concluída: {total} vetores em {args.tenant}.")
+    await report(driver, args.tenant, args.labels)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""
+Menir Core V5.2 - Tenant Sharding CLI
+Copia o subgrafo rotulado de um tenant para um database Neo4j dedicado.
+A origem não é alterada; o roteamento só muda quando o mapa é atualizado.
+
+Uso:
+  python -m scripts.migrate_tenant_database BECO beco --dry-run
+  python -m scripts.migrate_tenant_database BECO beco [--source-database neo4j] [--batch-size 1000]
+  python -m scripts.migrate_tenant_database BECO beco --no-create   # database já criado (Community/Aura)
+
+Depois de validar: MENIR_TENANT_DATABASES="BECO=beco,..." e reinicie os processos.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+# Adjust module path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+from src.v3.core.tenant_sharding import TenantShardCopier
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+logger = logging.getLogger("TenantShardingCLI")
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Menir: move um tenant para o seu próprio database")
+    parser.add_argument("tenant", help="Label do tenant (ex: BECO)")
+    parser.add_argument("database", help="Database de destino (ex: beco)")
+    parser.add_argument("--source-database", default=None, help="Database de origem (default: NEO4J_DB)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=3600, help="Timeout por transação de streaming (s)")
+    parser.add_argument("--no-create", action="store_true", help="Não executa CREATE DATABASE")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas conta nós/relacionamentos na origem")
+    args = parser.parse_args()
+
+    load_dotenv(override=True)
+    copier = TenantShardCopier(
+        args.tenant,
+        args.database,
+        source_database=args.source_database,
+        batch_size=args.batch_size,
+        timeout=args.timeout,
+    )
+
+    if args.dry_run:
+        nodes, rels = await copier.counts(args.source_database)
+        print(f"{args.tenant}: {nodes} nós, {rels} relacionamentos a copiar para '{args.database}'.")
+        return 0
+
+    report = await copier.run(create_database=not args.no_create)
+    print(
+        f"{args.tenant} -> {args.database}: nós {report.target_nodes}/{report.source_nodes}, "
+        f"relacionamentos {report.target_relationships}/{report.source_relationships}"
+    )
+    if not report.verified:
+        print("❌ Contagens divergentes: reexecute (a cópia é idempotente) antes de trocar o roteamento.")
+        return 1
+    print(f"✅ Pronto. Adicione '{args.tenant}={args.database}' em MENIR_TENANT_DATABASES e reinicie.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -27,3 +27,8 @@ OPTIONS {
     `vector.similarity_function`: 'cosine'
   }
 };
+
+// Full-text (Lucene) index para busca híbrida (MenirBridge.hybrid_search)
+CREATE FULLTEXT INDEX menir_fulltext IF NOT EXISTS
+FOR (n:Chunk|Document|Invoice|Vendor|Person|BankAccount)
+ON EACH [n.text, n.name, n.filename, n.vendor_name, n.vendor_iban, n.ide_number, n.iban];
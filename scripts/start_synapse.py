@@ -1,4 +1,6 @@
 import asyncio
+import logging
+
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -6,11 +8,25 @@ from src.v3.core.synapse import MenirSynapse
 from src.v3.core.menir_runner import MenirAsyncRunner
 from src.v3.meta_cognition import MenirOntologyManager
 from src.v3.menir_intel import MenirIntel
+from src.v3.core.schema_migrations import ensure_schema
+from src.v3.core.write_behind import flush_all
+from src.v3.core.existence_filter import get_existence_index
+
+logger = logging.getLogger("StartSynapse")
 
 async def start():
     # Load required core systems for synapse to boot
     intel = MenirIntel()
     ontology = MenirOntologyManager()
+    # Mesmo boot degradado do menir_runner: schema/Bloom com falha não impedem a API de subir
+    try:
+        await ensure_schema()
+    except Exception:
+        logger.exception("🚨 Falha ao aplicar migrações de schema no boot.")
+    try:
+        await get_existence_index().seed(ontology.graph)
+    except Exception:
+        logger.exception("🚨 Falha ao semear os filtros de existência; checagens seguem no grafo.")
     runner = MenirAsyncRunner(intel, ontology)
     synapse = MenirSynapse(runner)
     
@@ -23,6 +39,8 @@ async def start():
             await asyncio.sleep(3600)
     except asyncio.CancelledError:
         pass
+    finally:
+        await flush_all()
 
 if __name__ == "__main__":
     asyncio.run(start())
@@ -2,7 +2,6 @@
 import os
 import logging
 import json
-import time
 from datetime import datetime
 from pathlib import Path
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Security, Depends
@@ -25,21 +24,14 @@ logger = logging.getLogger("menir_server")
 
 # --- Lifespan ---
 from contextlib import asynccontextmanager
-import tempfile
+from src.v3.core.tenant_lock import tenant_lock_manager
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Sweep orphaned ASGI cross-process locks upon container/uvicorn restart
-    lock_dir = Path(tempfile.gettempdir()) / "menir_tenant_locks"
-    if lock_dir.exists():
-        now = time.time()
-        for f in lock_dir.glob("*.lock"):
-            try:
-                if now - f.stat().st_mtime > 60:
-                    f.unlink()
-                    logger.info(f"🧹 Lifespan Sweep: Orfan lock {f.name} expurgado (>60s de idade).")
-            except OSError:
-                pass
+    # Sweep orphaned tenant leases/waiters upon container/uvicorn restart
+    purged = tenant_lock_manager().purge()
+    if purged:
+        logger.info(f"🧹 Lifespan Sweep: {purged} leases/waiters órfãos de tenant expurgados.")
     yield
 
 # --- FastAPI App ---
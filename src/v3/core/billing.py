@@ -1,12 +1,14 @@
 import time
+from bisect import bisect_right
 from enum import Enum
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from typing import Optional
+from typing import Iterable, Optional
 
 from pydantic import BaseModel, Field, AwareDatetime, field_validator
 from neo4j import AsyncDriver
 from neo4j.exceptions import ClientError, Neo4jError
+from src.v3.tenant_middleware import CAUSAL, READ, WRITE, session_options
 
 SWISS_TZ = ZoneInfo("Europe/Zurich")
 
@@ -23,6 +25,7 @@ class ConcurrentMutationError(DomainException): pass
 APOC_ERROR_MAP = {
     "ERR-BI-01: Violação Bitemporal": TemporalOverlapError,
     "ERR-BI-02: Optimistic Lock Failure": ConcurrentMutationError,
+    "ERR-BI-03: Stale Fencing Token": ConcurrentMutationError,
 }
 
 def translate_apoc_error(error: ClientError):
@@ -31,52 +34,38 @@ def translate_apoc_error(error: ClientError):
             return exception_class(error.message)
     return error
 
-# O Escudo de Starvation Inter-Processo (ASGI / Gunicorn)
-import os
-import time
-import tempfile
-from pathlib import Path
-
-_MULTIPROCESS_LOCK_DIR = Path(tempfile.gettempdir()) / "menir_tenant_locks"
-_MULTIPROCESS_LOCK_DIR.mkdir(parents=True, exist_ok=True)
+# Fila de mutação inter-processo (ASGI / Gunicorn): leases FIFO com fencing token
+from src.v3.core.tenant_lock import LockTimeoutError, TenantLockManager, tenant_lock_manager
 
 class InterProcessTenantLock:
     """
-    Trava multi-processo (Fast-Fail) nativa do Unix baseada em O_EXCL.
-    Resolve a asfixia do pool em instâncias ASGI horizontais (Gunicorn) sem rede 
-    e elimina o Memory Leak crônico evadindo o dicionário em estado global.
+    Lease do tenant no TenantLockManager (src/v3/core/tenant_lock.py).
+    Mutações concorrentes do mesmo cliente entram na fila FIFO em vez de
+    falhar; só a espera além de MENIR_TENANT_LOCK_WAIT vira
+    ConcurrentMutationError. O token de fencing segue para o Cypher.
     """
-    def __init__(self, client_uid: str):
+    def __init__(self, client_uid: str, manager: Optional[TenantLockManager] = None):
         self.client_uid = client_uid
-        self.lock_path = _MULTIPROCESS_LOCK_DIR / f"tenant_{client_uid}.lock"
+        self.manager = manager or tenant_lock_manager()
+        self.lease = None
+
+    @property
+    def token(self) -> int:
+        return self.lease.token
 
     async def __aenter__(self):
         try:
-            # Operação atômica do SO cruzando fronteiras de Forks no Python
-            fd = os.open(str(self.lock_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
-            os.close(fd)
-        except OSError as e:
-            if e.errno == 17: # EEXIST / FileExistsError
-                # Dead-worker Stale Lock Heuristics
-                try:
-                    mtime = os.path.getmtime(self.lock_path)
-                    if time.time() - mtime > 15: # Timeout de abandono de corrotina
-                        os.unlink(self.lock_path)
-                        return await self.__aenter__() # Tail recursion para retomar
-                except OSError:
-                    pass
-                raise ConcurrentMutationError(
-                    f"Repulsão ASGI Inter-Processo: Mutação travada para {self.client_uid}. "
-                    "Proteção Fast-Fail abortou o vazamento ao Pool Neo4j."
-                )
-            raise e
+            self.lease = await self.manager.acquire(self.client_uid)
+        except LockTimeoutError as e:
+            raise ConcurrentMutationError(
+                f"Fila de mutação esgotada para {self.client_uid}: {e} "
+                "Nenhuma conexão do Pool Neo4j foi tomada."
+            ) from e
+        await self.lease.__aenter__()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        try:
-            os.unlink(self.lock_path)
-        except OSError:
-            pass
+        await self.lease.release()
 
 class RuleMutationPayload(BaseModel):
     client_uid: str
@@ -107,10 +96,14 @@ class RuleMutationPayload(BaseModel):
 class ForensicAuditPayload(BaseModel):
     client_uid: str
     target_date: AwareDatetime 
+    # Tempo de transação: "o que o sistema sabia em known_at" (None = conhecimento atual)
+    known_at: Optional[AwareDatetime] = None
 
-    @field_validator('target_date', mode='after')
+    @field_validator('target_date', 'known_at', mode='after')
     @classmethod
-    def enforce_swiss_seasonality(cls, v: datetime) -> datetime:
+    def enforce_swiss_seasonality(cls, v: Optional[datetime]) -> Optional[datetime]:
+        if v is None:
+            return v
         naive_dt = v.replace(tzinfo=None)
         expected_swiss_dt = naive_dt.replace(tzinfo=SWISS_TZ)
         expected_offset = expected_swiss_dt.utcoffset()
@@ -128,9 +121,19 @@ class ForensicAuditPayload(BaseModel):
     def normalized_target_timestamp(self) -> int:
         return int(self.target_date.timestamp())
 
+    @property
+    def normalized_known_timestamp(self) -> Optional[int]:
+        return int(self.known_at.timestamp()) if self.known_at else None
+
 CYPHER_MUTATION_UNIFIED = """
 MATCH (c:Client {uid: $client_uid})
 
+CALL apoc.util.validate(
+    c.fencing_token IS NOT NULL AND c.fencing_token >= $fencing_token,
+    "ERR-BI-03: Stale Fencing Token - lease expirada e retomada por outro processo (token " + toString($fencing_token) + ").",
+    []
+)
+
 CALL {
     WITH c
     OPTIONAL MATCH (c)-[old_edge:ACTIVE_RULE]->(old:BillingRule)
@@ -166,20 +169,98 @@ FOREACH (ignore IN CASE WHEN old IS NOT NULL THEN [1] ELSE [] END |
 )
 
 CREATE (c)-[:ACTIVE_RULE]->(new)
+SET c.fencing_token = $fencing_token
 RETURN new.uid, new.version
 """
 
-class BillingManager:
+CYPHER_ACTIVE_VERSIONS = """
+UNWIND $client_uids AS uid
+MATCH (:Client {uid: uid})-[:ACTIVE_RULE]->(current:BillingRule)
+RETURN uid, current.version AS version
+"""
+
+CYPHER_RULE_CHAINS = """
+UNWIND $client_uids AS uid
+MATCH (:Client {uid: uid})-[:ACTIVE_RULE]->(current:BillingRule)
+MATCH (current)-[:PREVIOUS_VERSION*0..]->(rule:BillingRule)
+RETURN uid, current.version AS version, collect(properties(rule)) AS rules
+"""
+
+class RuleIntervalIndex:
+    """
+    Histórico bitemporal de um cliente em arrays ordenados por versão.
+    A cadeia só cresce para frente (apoc.util.validate barra retroativas), então
+    valid_from e created_at são ambos não-decrescentes: um bisect em cada eixo.
+    A versão k vale em [valid_from[k], valid_from[k+1]); no tempo de transação
+    T só existem as versões com created_at <= T, e a última delas ainda não
+    tinha valid_to.
+    """
+    def __init__(self, version: Optional[int], rules: Iterable[dict]):
+        self.version = version
+        self.rules = sorted(rules, key=lambda r: r["version"])
+        self.valid_from = [r["valid_from"] for r in self.rules]
+        self.created_at = [r.get("created_at", 0) for r in self.rules]
+
+    def resolve(self, at: int, known_at: Optional[int] = None) -> Optional[dict]:
+        known = len(self.rules) if known_at is None else bisect_right(self.created_at, known_at)
+        # Mesmo valid_from em versões seguidas: bisect_right pega a mais nova (a antiga tem intervalo vazio)
+        k = bisect_right(self.valid_from, at, 0, known) - 1
+        return self.rules[k] if k >= 0 else None
+
+class BillingRuleCache:
+    """
+    Índices por cliente carregados sob demanda. mutate_contract invalida o
+    cliente no commit; mutações de outros workers são detectadas pela versão
+    ativa (um hop, um round-trip por lote), e só as cadeias que mudaram são
+    relidas.
+    """
     def __init__(self, driver: AsyncDriver):
         self.driver = driver
+        self._indexes: dict[str, RuleIntervalIndex] = {}
+
+    def invalidate(self, client_uid: str) -> None:
+        self._indexes.pop(client_uid, None)
+
+    async def indexes(self, client_uids: Iterable[str]) -> dict[str, RuleIntervalIndex]:
+        uids = list(dict.fromkeys(client_uids))
+        if not uids:
+            return {}
+        async with self.driver.session(**session_options(READ, CAUSAL)) as session:
+            async def _versions(tx):
+                res = await tx.run(CYPHER_ACTIVE_VERSIONS, client_uids=uids)
+                return {r["uid"]: r["version"] async for r in res}
+
+            active = await session.execute_read(_versions)
+            stale = [
+                uid for uid in uids
+                if uid not in self._indexes or self._indexes[uid].version != active.get(uid)
+            ]
+            if stale:
+                async def _chains(tx):
+                    res = await tx.run(CYPHER_RULE_CHAINS, client_uids=stale)
+                    return [r async for r in res]
+
+                for record in await session.execute_read(_chains):
+                    self._indexes[record["uid"]] = RuleIntervalIndex(record["version"], record["rules"])
+                for uid in stale:
+                    if uid not in active:
+                        # Cliente sem regra (ou inexistente): índice vazio até a gênese
+                        self._indexes[uid] = RuleIntervalIndex(None, [])
+        return {uid: self._indexes[uid] for uid in uids}
+
+class BillingManager:
+    def __init__(self, driver: AsyncDriver, lock_manager: Optional[TenantLockManager] = None):
+        self.driver = driver
+        self.lock_manager = lock_manager
+        self.rule_cache = BillingRuleCache(driver)
 
     async def mutate_contract(self, payload: RuleMutationPayload) -> str:
-        # 1. Escudo em Camada Python multi-processo contra saturação do Neo4j
-        async with InterProcessTenantLock(payload.client_uid):
+        # 1. Fila por tenant em Camada Python multi-processo: uma mutação por vez chega ao Neo4j
+        async with InterProcessTenantLock(payload.client_uid, self.lock_manager) as lock:
             now = int(time.time())
             try:
-                # 2. Só toma uma conexão do pool se o semáforo ASGI liberou
-                async with self.driver.session() as session:
+                # 2. Só toma uma conexão do pool com a lease na mão
+                async with self.driver.session(**session_options(WRITE)) as session:
                     async def _work(tx):
                         res = await tx.run(
                             CYPHER_MUTATION_UNIFIED,
@@ -187,6 +268,7 @@ class BillingManager:
                             new_rate=payload.new_tariff,
                             effective_date=payload.normalized_effective_timestamp,
                             expected_version=payload.expected_version,
+                            fencing_token=lock.token,
                             now=now
                         )
                         return await res.single()
@@ -194,28 +276,30 @@ class BillingManager:
                     record = await session.execute_write(_work)
                     if not record:
                         raise Exception("Client não encontrado para Gênese/Mutação.")
+                    self.rule_cache.invalidate(payload.client_uid)
                     return record["new.uid"]
             except Neo4jError as e:
                 raise translate_apoc_error(e)
 
     async def resolve_active_rule_at(self, payload: ForensicAuditPayload) -> Optional[dict]:
         # Segurança geopolítica e tipagem forense já garantidas na borda Pydantic
-        invoice_timestamp = payload.normalized_target_timestamp
-        
-        query = """
-        MATCH (c:Client {uid: $client_uid})-[:ACTIVE_RULE]->(current_rule:BillingRule)
-        MATCH (current_rule)-[:PREVIOUS_VERSION*0..]->(historical_rule:BillingRule)
-        WHERE historical_rule.valid_from <= $invoice_date 
-          AND (historical_rule.valid_to IS NULL OR historical_rule.valid_to > $invoice_date)
-        RETURN historical_rule LIMIT 1
-        """
-        async with self.driver.session() as session:
-            async def _work(tx):
-                res = await tx.run(query, client_uid=payload.client_uid, invoice_date=invoice_timestamp)
-                return await res.single()
-                
-            record = await session.execute_read(_work)
-            
-            if record:
-                return dict(record["historical_rule"])
-            return None
+        indexes = await self.rule_cache.indexes([payload.client_uid])
+        rule = indexes[payload.client_uid].resolve(
+            payload.normalized_target_timestamp, payload.normalized_known_timestamp
+        )
+        return dict(rule) if rule else None
+
+    async def resolve_many(
+        self, client_ids: Iterable[str], at: datetime, known_at: Optional[datetime] = None
+    ) -> dict[str, Optional[dict]]:
+        """Regra vigente em `at` para cada cliente de uma rodada de faturamento (um round-trip, sem travessias)."""
+        if at.tzinfo is None or (known_at is not None and known_at.tzinfo is None):
+            raise ValueError("resolve_many exige datetimes com fuso (Europe/Zurich).")
+        at_ts = int(at.timestamp())
+        known_ts = int(known_at.timestamp()) if known_at else None
+        indexes = await self.rule_cache.indexes(client_ids)
+        resolved = {}
+        for uid, index in indexes.items():
+            rule = index.resolve(at_ts, known_ts)
+            resolved[uid] = dict(rule) if rule else None
+        return resolved
@@ -0,0 +1,257 @@
+"""
+Menir Core V5.2 - Columnar Batches
+Transações e faturas em colunas NumPy (um array estruturado por lote) em vez
+de listas de dicts, do parse camt à reconciliação e ao export Crésus:
+
+  MONEY -> int64 em centavos (8 bytes por linha, sem float boxed)
+  DATE  -> datetime64[D] (NaT = sem data)
+  CODE  -> string codificada por dicionário: int32 por linha + valores únicos
+           (moeda, IBAN, contraparte repetem muito); -1 = None
+  TEXT  -> objeto Python (ids e texto livre, quase sempre únicos: um
+           dicionário só duplicaria a memória)
+
+batch[a:b] é uma view do mesmo array (zero-copy) com os mesmos dicionários;
+máscaras e índices copiam só as linhas escolhidas. Dicionários podem ser
+compartilhados entre lotes: faturas e transações com os mesmos códigos de
+moeda é o que a reconciliação compara.
+
+Na fronteira com o driver Neo4j (parâmetros de UNWIND) os lotes viram linhas
+de novo com to_rows(), um lote por vez.
+"""
+
+from collections.abc import AsyncIterable, Iterable, Mapping, Sequence
+from typing import Any, ClassVar, TypeVar
+
+import numpy as np
+
+MONEY = "money"
+DATE = "date"
+CODE = "code"
+TEXT = "text"
+
+_DTYPES = {MONEY: np.int64, DATE: "datetime64[D]", CODE: np.int32, TEXT: object}
+_MISSING = {MONEY: 0, DATE: np.datetime64("NaT"), CODE: -1, TEXT: None}
+
+B = TypeVar("B", bound="ColumnarBatch")
+
+
+class StringDictionary:
+    """Valor -> código int32 estável na ordem de chegada; None = -1."""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: list[str] = []
+        self._codes: dict[str | None, int] = {None: -1}
+        for value in values:
+            self.code(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def code(self, value: str | None) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode(self, values: Sequence[str | None]) -> np.ndarray:
+        # Só os valores distintos passam por Python; a tradução linha a linha fica no map() em C
+        for value in dict.fromkeys(values):
+            if value not in self._codes:
+                self.code(value)
+        return np.fromiter(map(self._codes.__getitem__, values), dtype=np.int32, count=len(values))
+
+    def decode(self, codes: np.ndarray) -> list[str | None]:
+        # Última posição = None: o código -1 cai nela sem máscara
+        lookup = np.empty(len(self.values) + 1, dtype=object)
+        lookup[:-1] = self.values
+        return lookup[codes].tolist()
+
+
+def to_cents(values: Sequence[float | None]) -> np.ndarray:
+    """Valores monetários -> int64 em centavos (None = 0)."""
+    if None in values:
+        values = [v or 0.0 for v in values]
+    # rint arredonda meio-para-par como round(): mesmos centavos do caminho por linha
+    return np.rint(np.fromiter(values, dtype=np.float64, count=len(values)) * 100).astype(np.int64)
+
+
+def to_dates(values: Sequence[Any]) -> np.ndarray:
+    """ISO 'YYYY-MM-DD[...]' ou dias desde 1970-01-01 -> datetime64[D]; vazio/inválido = NaT."""
+    if set(map(type, values)) <= {int}:
+        return np.fromiter(values, dtype=np.int64, count=len(values)).astype("datetime64[D]")
+    text = [str(v)[:10] if v not in (None, "") else "NaT" for v in values]
+    try:
+        return np.array(text, dtype="datetime64[D]")
+    except ValueError:
+        out = np.empty(len(text), dtype="datetime64[D]")
+        for k, value in enumerate(values):
+            try:
+                out[k] = np.datetime64(int(value) if isinstance(value, (int, np.integer)) else text[k], "D")
+            except ValueError:
+                out[k] = np.datetime64("NaT")
+        return out
+
+
+class ColumnarBatch:
+    """Base: FIELDS = ((nome, tipo), ...); subclasses só declaram o schema."""
+
+    FIELDS: ClassVar[tuple[tuple[str, str], ...]] = ()
+
+    def __init__(self, data: np.ndarray, dictionaries: dict[str, StringDictionary]):
+        self.data = data
+        self.dictionaries = dictionaries
+
+    @classmethod
+    def dtype(cls) -> np.dtype:
+        return np.dtype([(name, _DTYPES[kind]) for name, kind in cls.FIELDS])
+
+    @classmethod
+    def new_dictionaries(cls, shared: Mapping[str, StringDictionary] | None = None) -> dict[str, StringDictionary]:
+        shared = shared or {}
+        # `in`, não `or`: um dicionário compartilhado ainda vazio tem len() == 0
+        return {
+            name: shared[name] if name in shared else StringDictionary()
+            for name, kind in cls.FIELDS
+            if kind == CODE
+        }
+
+    @classmethod
+    def from_rows(
+        cls: type[B],
+        rows: Sequence[Mapping[str, Any]],
+        dictionaries: Mapping[str, StringDictionary] | None = None,
+        keys: Mapping[str, str] | None = None,
+    ) -> B:
+        """
+        rows: dicts homogêneos (mesmo RETURN do driver, mesmo parser). keys:
+        campo -> chave da linha quando os nomes diferem; campos que a primeira
+        linha não traz viram None/0/NaT sem varrer as demais.
+        """
+        dictionaries = cls.new_dictionaries(dictionaries)
+        keys = keys or {}
+        present = rows[0].keys() if rows else {}
+        data = np.empty(len(rows), dtype=cls.dtype())
+        for name, kind in cls.FIELDS:
+            key = keys.get(name, name)
+            if key not in present:
+                data[name] = _MISSING[kind]
+                continue
+            values = [r[key] for r in rows]
+            if kind == MONEY:
+                data[name] = to_cents(values)
+            elif kind == DATE:
+                data[name] = to_dates(values)
+            elif kind == CODE:
+                data[name] = dictionaries[name].encode(values)
+            else:
+                data[name] = values
+        return cls(data, dictionaries)
+
+    @classmethod
+    async def from_stream(
+        cls: type[B],
+        rows: AsyncIterable[Mapping[str, Any]],
+        dictionaries: Mapping[str, StringDictionary] | None = None,
+        keys: Mapping[str, str] | None = None,
+        chunk_size: int = 10_000,
+    ) -> B:
+        """Registros de graph.stream() -> um lote, sem nunca reter mais que chunk_size dicts."""
+        dictionaries = cls.new_dictionaries(dictionaries)
+        parts, pending = [], []
+        async for row in rows:
+            pending.append(row)
+            if len(pending) >= chunk_size:
+                parts.append(cls.from_rows(pending, dictionaries, keys).data)
+                pending = []
+        parts.append(cls.from_rows(pending, dictionaries, keys).data)
+        return cls(np.concatenate(parts), dictionaries)
+
+    @classmethod
+    def concat(cls: type[B], batches: Sequence[B]) -> B:
+        """Lotes com os mesmos dicionários (ex: chunks de um mesmo parse)."""
+        if not batches:
+            return cls(np.empty(0, dtype=cls.dtype()), cls.new_dictionaries())
+        return cls(np.concatenate([b.data for b in batches]), batches[0].dictionaries)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self: B, index: slice | np.ndarray) -> B:
+        return type(self)(self.data[index], self.dictionaries)
+
+    @property
+    def nbytes(self) -> int:
+        """Colunas + valores únicos dos dicionários (texto livre não entra: é compartilhado com a origem)."""
+        return self.data.nbytes + sum(sum(map(len, d.values)) for d in self.dictionaries.values())
+
+    def money(self, name: str) -> np.ndarray:
+        return self.data[name] / 100.0
+
+    def days(self, name: str) -> np.ndarray:
+        """datetime64[D] -> int64 dias desde 1970-01-01 (NaT vira o mínimo de int64)."""
+        return self.data[name].astype(np.int64)
+
+    def strings(self, name: str) -> list[str | None]:
+        return self.dictionaries[name].decode(self.data[name])
+
+    def column(self, name: str) -> list[Any]:
+        """Coluna decodificada para Python (money -> float, date -> 'YYYY-MM-DD' ou '')."""
+        kind = dict(self.FIELDS)[name]
+        if kind == MONEY:
+            return self.money(name).tolist()
+        if kind == DATE:
+            text = np.datetime_as_string(self.data[name], unit="D")
+            return np.where(np.isnat(self.data[name]), "", text).tolist()
+        if kind == CODE:
+            return self.strings(name)
+        return self.data[name].tolist()
+
+    def to_rows(self) -> list[dict[str, Any]]:
+        names = [name for name, _ in self.FIELDS]
+        columns = [self.column(name) for name in names]
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+
+class TransactionBatch(ColumnarBatch):
+    """Lançamentos bancários (parse camt, ingestão, reconciliação)."""
+
+    FIELDS = (
+        ("id", TEXT),  # elementId quando carregado do grafo
+        ("tx_key", TEXT),
+        ("legacy_key", TEXT),  # só na ingestão: casa nós anteriores à chave natural
+        ("tx_id", TEXT),
+        ("amount", MONEY),
+        ("booking_date", DATE),
+        ("currency", CODE),
+        ("acct_iban", CODE),
+        ("payment_reference", TEXT),
+        ("counterparty_iban", CODE),
+        ("counterparty_name", CODE),
+        ("debtor_name", CODE),
+        ("remittance_info", TEXT),
+    )
+    DATE_FIELD = "booking_date"
+    IBAN_FIELD = "counterparty_iban"
+    PARTY_FIELD = "counterparty_name"
+
+
+class InvoiceBatch(ColumnarBatch):
+    """Faturas (reconciliação, export Crésus)."""
+
+    FIELDS = (
+        ("id", TEXT),
+        ("amount", MONEY),
+        ("issue_date", DATE),
+        ("issue_date_text", TEXT),  # Texto original: fallback do export quando issue_date é NaT
+        ("currency", CODE),
+        ("payment_reference", TEXT),
+        ("vendor_iban", CODE),
+        ("vendor_name", CODE),
+        ("cresus_account_id", CODE),
+        ("line_items_json", TEXT),
+        ("edge_id", TEXT),
+    )
+    DATE_FIELD = "issue_date"
+    IBAN_FIELD = "vendor_iban"
+    PARTY_FIELD = "vendor_name"
@@ -9,8 +9,14 @@ import logging
 import os
 import json
 from collections import defaultdict
+from collections.abc import AsyncIterator
+from contextlib import aclosing
 from datetime import datetime
-from src.v3.core.concurrency import run_in_custom_executor, io_pool
+
+import numpy as np
+
+from src.v3.core.columnar import InvoiceBatch
+from src.v3.tenant_middleware import CAUSAL
 
 logger = logging.getLogger("CresusExporter")
 
@@ -21,9 +27,16 @@ TVA_CODE_MAP = {
     2.6: "I26"
 }
 
+
+# Colunas do _stream_reconciled_graph -> campos do InvoiceBatch
+EXPORT_KEYS = {"amount": "total_amount", "issue_date_text": "issue_date"}
+
+
 class CresusExporter:
-    def __init__(self, ontology_manager):
+    def __init__(self, ontology_manager, batch_size: int | None = None):
         self.ontology_manager = ontology_manager
+        # Faturas formatadas (e escritas no arquivo) por vez
+        self.batch_size = batch_size or int(os.getenv("MENIR_CRESUS_BATCH_SIZE", "1000"))
 
     def _get_account_mapping(self, tenant: str, type_acc: str) -> str:
         """
@@ -49,97 +62,145 @@ class CresusExporter:
 
     async def export_reconciled(self, tenant: str, export_dir: str = "Menir_Cresus_Out") -> str | None:
         """
-        Queries the Graph for Reconciled Transactions and streams them to a .txt file.
+        Streams Reconciled Transactions from the Graph straight into a .txt file.
+        Records are pulled in fetch_size batches and formatted as columnar
+        InvoiceBatch chunks of MENIR_CRESUS_BATCH_SIZE rows (one file write per chunk).
         Utilizes aiofiles to prevent blocking the Event Loop during I/O Disk writing.
         """
         import aiofiles
 
-        # O Ponto Cego de Performance: Nós vamos delegar o tráfego da rede do Driver Neo4j
-        # para uma thread síncrona, e aguardar os resultados.
-        records = await run_in_custom_executor(io_pool, self._fetch_reconciled_graph, tenant)
+        filename = f"import_cresus_{tenant}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        filepath = os.path.join(export_dir, filename)
+        edge_ids: list[str] = []
+        # Fornecedores e contas se repetem entre lotes: um dicionário por export
+        dictionaries = InvoiceBatch.new_dictionaries()
+        pending: list[dict] = []
+        f = None
+
+        async def _flush() -> None:
+            batch = InvoiceBatch.from_rows(pending, dictionaries, keys=EXPORT_KEYS)
+            pending.clear()
+            # AIOFILES protege a fila do Watchdog contra Disk I/O Bottlenecks
+            await f.write(self._format_batch(tenant, batch))
+            edge_ids.extend(edge_id for edge_id in batch.data["edge_id"].tolist() if edge_id)
 
-        if not records:
-            logger.info(f"🚫 [CresusExporter] Nenhuma fatura nova reconciliada para {tenant}.")
+        try:
+            async with aclosing(self._stream_reconciled_graph(tenant)) as records:
+                async for r in records:
+                    if f is None:
+                        # Arquivo só nasce com o primeiro lançamento
+                        os.makedirs(export_dir, exist_ok=True)
+                        f = await aiofiles.open(filepath, mode="w", encoding="utf-8", newline="")
+                    pending.append(r)
+                    if len(pending) >= self.batch_size:
+                        await _flush()
+            if pending:
+                await _flush()
+        except Exception as e:
+            logger.exception(f"Failed Cypher Reconciled Extraction: {e}")
+            if f is not None:
+                await f.close()
+                os.remove(filepath)  # Export parcial nunca chega ao Crésus
             return None
 
-        os.makedirs(export_dir, exist_ok=True)
-        filename = f"import_cresus_{tenant}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        filepath = os.path.join(export_dir, filename)
+        if f is None:
+            logger.info(f"🚫 [CresusExporter] Nenhuma fatura nova reconciliada para {tenant}.")
+            return None
+        await f.close()
 
-        logger.info(f"🗃️ [CresusExporter] Escrevendo {len(records)} lançamentos em I/O Assíncrono.")
-
-        # AIOFILES protege a fila do Watchdog contra Disk I/O Bottlenecks
-        async with aiofiles.open(filepath, mode="w", encoding="utf-8", newline="") as f:
-            for r in records:
-                swiss_date = self._format_swiss_date(r.get("issue_date", ""))
-                compte_debit = self._get_account_mapping(tenant, "DEBIT")
-                
-                cresus_account_id = r.get("cresus_account_id")
-                compte_credit = cresus_account_id if cresus_account_id else "3400"
-                
-                piece = str(r.get("vendor_name", ""))[:10]
-                libelle = f"Facture {r.get('vendor_name', '')} / {swiss_date}"
-                
-                if not cresus_account_id:
-                    libelle += " [REVIEW_ACCOUNT]"
-                
-                items_json_str = r.get("line_items_json", "[]")
-                try:
-                    items = json.loads(items_json_str) if items_json_str else []
-                except Exception:
-                    items = []
-
-                if not items:
-                    # Fallback single line without TVA mapping if JSON is missing
-                    montant_str = f"{r.get('total_amount', 0.0):.2f}"
-                    line = f"{swiss_date}\t{compte_debit}\t{compte_credit}\t{piece}\t{libelle}\t{montant_str}\t\t\t\t1\t\t\r\n"
-                    await f.write(line)
-                    continue
-
-                # Agrupamento inteligente por alíquota (TVA groups)
-                tva_groups: dict[float, float] = defaultdict(float)
-                for item in items:
-                    tva_rate = item.get("tva_rate_applied")
-                    tva_rate = float(tva_rate) if tva_rate is not None else 0.0
-                    tva_groups[tva_rate] += float(item.get("gross_amount", 0.0))
-                
-                for tva_rate, amount in tva_groups.items():
-                    if amount == 0:
-                        continue
-                        
-                    tva_code = TVA_CODE_MAP.get(tva_rate, "")
-                    montant_str = f"{amount:.2f}"
-                    
-                    # Colunas do formato étendu epsitec (.txt TSV)
-                    # 1. Date (DD.MM.YYYY)
-                    # 2. Débit
-                    # 3. Crédit
-                    # 4. Pièce
-                    # 5. Libellé
-                    # 6. Montant (Brut)
-                    # 7. TVA Opt (vazio)
-                    # 8. Monnaie (vazio)
-                    # 9. Cours (vazio)
-                    # 10. Net/Brut (1 = Brut)
-                    # 11. Empty
-                    # 12. Code TVA (ex: I81)
-                    line = f"{swiss_date}\t{compte_debit}\t{compte_credit}\t{piece}\t{libelle}\t{montant_str}\t\t\t\t1\t\t{tva_code}\r\n"
-                    await f.write(line)
-
-            # O TODO de :[RECONCILED] para {exported: True} se mantém.
-
-        logger.info(f"✅ [CresusExporter] Arquivo TSV Extended (TVA) gerado: {filepath}")
+        logger.info(f"✅ [CresusExporter] Arquivo TSV Extended (TVA) gerado: {filepath} ({len(edge_ids)} lançamentos)")
 
         # Marcar aresta [:RECONCILED] como exported=True para garantir idempotência.
         # Apenas chamado após a escrita do arquivo confirmar sucesso.
-        edge_ids = [r["edge_id"] for r in records if r.get("edge_id")]
         if edge_ids:
-            await run_in_custom_executor(io_pool, self._mark_exported, edge_ids)
+            await self._mark_exported(edge_ids, tenant)
 
         return filepath
 
-    def _fetch_reconciled_graph(self, tenant: str) -> list:
-        """Synchronous Worker running inside asyncio.to_thread"""
+    def _format_batch(self, tenant: str, batch: InvoiceBatch) -> str:
+        """TSV lines (CRLF) for a batch of reconciled invoices, one line per TVA group."""
+        compte_debit = self._get_account_mapping(tenant, "DEBIT")
+
+        # Datas formatadas uma vez por dia distinto do lote
+        days, day_index = np.unique(batch.data["issue_date"], return_inverse=True)
+        undated = np.isnat(days).tolist()
+        swiss_days = [self._format_swiss_date(str(day)) if not nat else "" for day, nat in zip(days, undated)]
+        # Datas fora do ISO viram NaT na coluna: o texto original segue pelo fallback tolerante
+        raw_dates = batch.data["issue_date_text"].tolist()
+        cents = batch.data["amount"].tolist()
+        vendors = batch.strings("vendor_name")
+        accounts = batch.strings("cresus_account_id")
+        items_json = batch.data["line_items_json"].tolist()
+
+        return "".join(
+            self._invoice_lines(
+                self._format_swiss_date(str(raw_dates[k] or "")) if undated[d] else swiss_days[d],
+                compte_debit, accounts[k], vendors[k], cents[k], items_json[k],
+            )
+            for k, d in enumerate(day_index.tolist())
+        )
+
+    def _invoice_lines(
+        self,
+        swiss_date: str,
+        compte_debit: str,
+        cresus_account_id: str | None,
+        vendor_name: str | None,
+        total_cents: int,
+        items_json_str: str | None,
+    ) -> str:
+        """TSV lines (CRLF) for one reconciled invoice, one line per TVA group."""
+        compte_credit = cresus_account_id if cresus_account_id else "3400"
+
+        piece = str(vendor_name)[:10]
+        libelle = f"Facture {vendor_name} / {swiss_date}"
+
+        if not cresus_account_id:
+            libelle += " [REVIEW_ACCOUNT]"
+
+        try:
+            items = json.loads(items_json_str) if items_json_str else []
+        except Exception:
+            items = []
+
+        if not items:
+            # Fallback single line without TVA mapping if JSON is missing
+            montant_str = f"{total_cents / 100:.2f}"
+            return f"{swiss_date}\t{compte_debit}\t{compte_credit}\t{piece}\t{libelle}\t{montant_str}\t\t\t\t1\t\t\r\n"
+
+        # Agrupamento inteligente por alíquota (TVA groups)
+        tva_groups: dict[float, float] = defaultdict(float)
+        for item in items:
+            tva_rate = item.get("tva_rate_applied")
+            tva_rate = float(tva_rate) if tva_rate is not None else 0.0
+            tva_groups[tva_rate] += float(item.get("gross_amount", 0.0))
+
+        lines = []
+        for tva_rate, amount in tva_groups.items():
+            if amount == 0:
+                continue
+
+            tva_code = TVA_CODE_MAP.get(tva_rate, "")
+            montant_str = f"{amount:.2f}"
+
+            # Colunas do formato étendu epsitec (.txt TSV)
+            # 1. Date (DD.MM.YYYY)
+            # 2. Débit
+            # 3. Crédit
+            # 4. Pièce
+            # 5. Libellé
+            # 6. Montant (Brut)
+            # 7. TVA Opt (vazio)
+            # 8. Monnaie (vazio)
+            # 9. Cours (vazio)
+            # 10. Net/Brut (1 = Brut)
+            # 11. Empty
+            # 12. Code TVA (ex: I81)
+            lines.append(f"{swiss_date}\t{compte_debit}\t{compte_credit}\t{piece}\t{libelle}\t{montant_str}\t\t\t\t1\t\t{tva_code}\r\n")
+        return "".join(lines)
+
+    def _stream_reconciled_graph(self, tenant: str) -> AsyncIterator[dict]:
+        """Reconciled invoices not yet exported, streamed (async read, no worker thread)."""
         # Notice we extract the invoice amount just to be sure, and the vendor properties
         query = """
         // SECURITY: Parameter $tenant is injected strictly by isolated ContextVar upstream.
@@ -154,18 +215,12 @@ class CresusExporter:
                v.cresus_account_id AS cresus_account_id,
                elementId(r) AS edge_id
         """
-        try:
-            with self.ontology_manager.driver.session() as session:
-                result = session.run(query, tenant=tenant)
-                # Cast the driver iterable to a native RAM list to free the pool
-                return [record.data() for record in result]
-        except Exception as e:
-            logger.exception(f"Failed Cypher Reconciled Extraction: {e}")
-            return []
+        # Causal: o export precisa incluir os matches que a reconciliação acabou de gravar
+        return self.ontology_manager.graph.stream(query, {"tenant": tenant}, tenant=tenant, consistency=CAUSAL)
 
-    def _mark_exported(self, edge_ids: list[str]) -> None:
+    async def _mark_exported(self, edge_ids: list[str], tenant: str | None = None) -> None:
         """Flags :RECONCILED edges as exported to guarantee idempotência.
-        Runs synchronously inside asyncio.to_thread after successful file write.
+        Runs after successful file write.
         """
         query = """
         UNWIND $edge_ids AS eid
@@ -173,8 +228,7 @@ class CresusExporter:
         SET r.exported = true, r.exported_at = datetime()
         """
         try:
-            with self.ontology_manager.driver.session() as session:
-                session.run(query, edge_ids=edge_ids)
+            await self.ontology_manager.graph.write(query, {"edge_ids": edge_ids}, tenant=tenant)
             logger.info(f"📦 [CresusExporter] {len(edge_ids)} arestas [:RECONCILED] marcadas como exported=True.")
         except Exception as e:
             logger.exception(f"Failed to mark edges as exported: {e}")
@@ -24,19 +24,11 @@ class DocumentDispatcher:
         self.intel = intel
         self.ontology_manager = ontology_manager
 
-    def _quarantine(self, tenant: str, file_hash: str, doc_type: str, reason: str, override_status: str = 'QUARANTINE'):
-        safe_tenant = tenant.replace("`", "")
-        cypher = f"""
-        MERGE (d:Document:`{safe_tenant}` {{file_hash: $file_hash}})
-        SET d.status = $status,
-            d.quarantine_reason = $reason,
-            d.doc_type = $doc_type,
-            d.quarantined_at = datetime()
-        """
+    async def _quarantine(self, tenant: str, file_hash: str, doc_type: str, reason: str, override_status: str = 'QUARANTINE'):
         try:
-            with self.ontology_manager.driver.session() as session:
-                with session.begin_transaction() as tx:
-                    tx.run(cypher, file_hash=file_hash, reason=reason, doc_type=doc_type, status=override_status)
+            await self.ontology_manager.quarantine_document(
+                tenant, file_hash, reason, doc_type=doc_type, status=override_status
+            )
         except Exception as query_exc:
             logger.exception(f"Falha ao registrar quarentena do dispatcher no Neo4j: {query_exc}")
 
@@ -47,7 +39,7 @@ class DocumentDispatcher:
         try:
             classification = await self.classify(text)
         except Exception as e:
-            self._quarantine(tenant, file_hash, "Unknown", "Classification_Failed")
+            await self._quarantine(tenant, file_hash, "Unknown", "Classification_Failed")
             return SkillResult(success=False, nodes_and_edges=[], message=str(e))
         
         doc_type = classification.doc_type
@@ -57,12 +49,12 @@ class DocumentDispatcher:
 
         # Regra 1: Abaixo de 0.60
         if score < 0.60:
-            self._quarantine(tenant, file_hash, doc_type, "LOW_CONFIDENCE")
+            await self._quarantine(tenant, file_hash, doc_type, "LOW_CONFIDENCE")
             return SkillResult(success=False, nodes_and_edges=[], message=f"Abortado: LOW_CONFIDENCE ({score})")
         
         # Regra 2: Entre 0.60 e 0.85
         if score <= 0.85:
-            self._quarantine(tenant, file_hash, doc_type, f"LOW_CONFIDENCE_CLASSIFICATION (Score: {score})")
+            await self._quarantine(tenant, file_hash, doc_type, f"LOW_CONFIDENCE_CLASSIFICATION (Score: {score})")
             return SkillResult(success=False, nodes_and_edges=[], message=f"Quarentena Humana: Confidence {score}")
             
         # Regra 3: Acima de 0.85 (Roteamento Direto ou Stub)
@@ -73,7 +65,7 @@ class DocumentDispatcher:
         
         if doc_type in salary_types or doc_type in rh_types:
             # Stubs transparentes para RH e Salário (Pass-through)
-            self._quarantine(tenant, file_hash, doc_type, "Pending Skill Implementation", override_status="PENDING_SKILL")
+            await self._quarantine(tenant, file_hash, doc_type, "Pending Skill Implementation", override_status="PENDING_SKILL")
             return SkillResult(success=True, nodes_and_edges=[], message=f"Stub acionado: Documento retido em PENDING_SKILL ({doc_type}).")
             
         elif doc_type in invoice_types:
@@ -84,7 +76,7 @@ class DocumentDispatcher:
             
         else:
             # Qualquer outro tipo não mapeado (Ex: Tax etc) também cai no STUB genericamente
-            self._quarantine(tenant, file_hash, doc_type, "Skill not defined yet", override_status="PENDING_SKILL")
+            await self._quarantine(tenant, file_hash, doc_type, "Skill not defined yet", override_status="PENDING_SKILL")
             return SkillResult(success=True, nodes_and_edges=[], message=f"Stub acionado: PENDING_SKILL genérico para ({doc_type}).")
 
     async def classify(self, document_text: str) -> DispatcherClassification:
@@ -0,0 +1,355 @@
+"""
+Menir Core V5.2 - Embedding Backfill Worker (Chronos Indexer)
+Preenche embeddings faltantes em massa, de forma retomável:
+
+  1. Paginação keyset (elementId ou uid), sem SKIP. Com key="uid" num label
+     com índice em uid (Chunk, Document, ...) cada página é um seek no índice;
+     elementId não tem índice: cada página refiltra os nós restantes do label
+     (custo proporcional ao que falta — aceitável só em labels pequenos).
+     Nós com uid nulo não entram na paginação por uid: são contados em
+     `unkeyed` e reportados, nunca pulados em silêncio.
+  2. Embeddings em lote (até 100 textos por requisição) sob o mesmo
+     aiolimiter do MenirIntel — o backfill nunca rouba cota do hot path
+     além do RPM configurado.
+  3. Escrita por página via um único UNWIND (float ou int8, conforme
+     MENIR_EMBEDDING_QUANTIZATION).
+  4. Checkpoint JSON atômico após cada página: um crash retoma do último
+     cursor confirmado. Linhas cujo embedding falhou ficam registradas no
+     checkpoint (failures) e são retentadas no início de cada run().
+  5. Dry-run com estimativa de tokens, requisições, duração e custo.
+
+Substitui o legado src/embed_documents.py (síncrono, 1 nó por requisição, sleep fixo).
+"""
+
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Literal, Optional
+
+from src.v3.core.neo4j_pool import get_shared_driver
+from src.v3.core.quantization import QuantizedVectorStore, quantization_enabled, quantize_int8
+from src.v3.tenant_middleware import EVENTUAL, READ, WRITE, session_options, tenant_database
+
+logger = logging.getLogger("EmbeddingBackfill")
+
+BackfillKey = Literal["elementId", "uid"]
+EmbedBatchFn = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+# Texto embedado por label — deve espelhar o que o hot path envia a embed_and_persist
+TEXT_EXPRESSIONS: dict[str, str] = {
+    "Lead": "n.name + ' — ' + coalesce(n.intent_signal, '') + ' — ' + coalesce(n.source, '')",
+    "PersonNode": "coalesce(n.name, '') + ' ' + coalesce(n.role_or_context, '')",
+    "ProjectNode": "coalesce(n.name, '') + ' ' + coalesce(n.description, '')",
+    "LifeEventNode": "coalesce(n.name, n.title, '') + ' ' + coalesce(n.description, '')",
+    "InsightNode": "n.content",
+    "GoalNode": "n.title",
+    "Chunk": "n.text",
+    "Document": "n.text",
+}
+DEFAULT_TEXT_EXPRESSION = "coalesce(n.text, n.content, n.description, n.name, n.title)"
+
+# Heurística do tokenizer Gemini (~4 caracteres por token)
+CHARS_PER_TOKEN = 4
+DEFAULT_CHECKPOINT_DIR = Path(tempfile.gettempdir()) / "menir_backfill_checkpoints"
+
+
+def _safe(value: str) -> str:
+    return value.replace("`", "").replace(";", "")
+
+
+@dataclass
+class BackfillCheckpoint:
+    """Estado persistido de um backfill (tenant, label)."""
+    tenant: str
+    label: str
+    key: str
+    cursor: str = ""
+    embedded: int = 0
+    failed: int = 0
+    # Texto vazio (ou, em int8, nó sem uid): nada a embedar, não conta como falha
+    skipped: int = 0
+    # key="uid": nós sem embedding e com uid nulo, fora da paginação
+    unkeyed: int = 0
+    pages: int = 0
+    # Cursores (chave de paginação) das linhas que o cursor já passou sem embedding
+    failures: list[str] = field(default_factory=list)
+    done: bool = False
+    updated_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["BackfillCheckpoint"]:
+        if not path.exists():
+            return None
+        try:
+            return cls(**json.loads(path.read_text(encoding="utf-8")))
+        except (ValueError, TypeError):
+            logger.warning(f"⚠️ Checkpoint corrompido ignorado: {path}")
+            return None
+
+    def save(self, path: Path) -> None:
+        """Escrita atômica (tmp + os.replace) — nunca deixa um JSON truncado."""
+        self.updated_at = time.time()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(asdict(self), fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+
+@dataclass
+class BackfillEstimate:
+    label: str
+    nodes: int
+    chars: int
+    tokens: int
+    requests: int
+    minutes: float
+    cost_usd: float
+
+
+class EmbeddingBackfillWorker:
+    """
+    Worker retomável de backfill. Um (tenant, label) por chamada de run().
+    `embed_batch` e `driver` são injetáveis para testes e scripts.
+    """
+
+    def __init__(
+        self,
+        tenant: str,
+        driver: Any = None,
+        embed_batch: Optional[EmbedBatchFn] = None,
+        page_size: int = 500,
+        embed_batch_size: int = 100,
+        key: BackfillKey = "elementId",
+        checkpoint_dir: Optional[Path] = None,
+    ):
+        if key not in ("elementId", "uid"):
+            raise ValueError(f"Chave de paginação inválida: {key}")
+        self.tenant = tenant
+        self.driver = driver or get_shared_driver()
+        self._embed_batch = embed_batch
+        self.page_size = page_size
+        self.embed_batch_size = embed_batch_size
+        self.key = key
+        self.checkpoint_dir = Path(checkpoint_dir or DEFAULT_CHECKPOINT_DIR)
+
+    def _get_embed_batch(self) -> EmbedBatchFn:
+        if self._embed_batch is None:
+            # Mesmo MenirIntel (e aiolimiter) do EmbeddingService
+            from src.v3.core.embedding_service import EmbeddingService
+            self._embed_batch = EmbeddingService._get_intel().generate_embeddings
+        return self._embed_batch
+
+    def checkpoint_path(self, label: str) -> Path:
+        return self.checkpoint_dir / f"{_safe(self.tenant)}__{_safe(label)}.json"
+
+    def _key_expr(self) -> str:
+        return "elementId(n)" if self.key == "elementId" else "n.uid"
+
+    def _missing_predicate(self) -> str:
+        return "n.embedding IS NULL AND n.embedding_q IS NULL"
+
+    def _fetch_query(self, label: str, retry: bool = False) -> str:
+        """Próxima página após $cursor, ou (retry) as linhas falhas em $keys."""
+        text_expr = TEXT_EXPRESSIONS.get(label, DEFAULT_TEXT_EXPRESSION)
+        key_expr = self._key_expr()
+        position = f"{key_expr} IN $keys" if retry else f"{key_expr} IS NOT NULL AND {key_expr} > $cursor"
+        return f"""
+        MATCH (n:`{_safe(label)}`:`{_safe(self.tenant)}`)
+        WHERE {self._missing_predicate()} AND {position}
+        WITH n, {key_expr} AS k, {text_expr} AS text
+        RETURN elementId(n) AS eid, k AS cursor, n.uid AS node_key, text
+        ORDER BY k
+        LIMIT $page_size
+        """
+
+    def _unkeyed_query(self, label: str) -> str:
+        """key="uid": quantos nós pendentes a paginação por uid não alcança."""
+        return f"""
+        MATCH (n:`{_safe(label)}`:`{_safe(self.tenant)}`)
+        WHERE {self._missing_predicate()} AND n.uid IS NULL
+        RETURN count(n) AS unkeyed
+        """
+
+    def _write_query(self, label: str, quantized: bool) -> str:
+        safe_label, safe_tenant = _safe(label), _safe(self.tenant)
+        if not quantized:
+            return f"""
+            UNWIND $rows AS row
+            MATCH (n:`{safe_label}`:`{safe_tenant}`) WHERE elementId(n) = row.eid
+            SET n.embedding = row.embedding,
+                n.embedded_at = datetime()
+            """
+        return f"""
+        UNWIND $rows AS row
+        MATCH (n:`{safe_label}`:`{safe_tenant}`) WHERE elementId(n) = row.eid
+        SET n.embedding_q = row.codes,
+            n.embedding_scale = row.scale,
+            n.embedding_offset = row.offset,
+            n.embedded_at = datetime()
+        MERGE (f:FullEmbedding:`{safe_tenant}` {{uid: row.full_uid}})
+        SET f.embedding = row.embedding, f.label = $label
+        MERGE (n)-[:HAS_FULL_EMBEDDING]->(f)
+        """
+
+    async def estimate(self, label: str, price_per_mtok: Optional[float] = None) -> BackfillEstimate:
+        """Dry-run: nada é embedado nem escrito."""
+        if price_per_mtok is None:
+            price_per_mtok = float(os.getenv("MENIR_EMBEDDING_PRICE_PER_MTOK", "0.15"))
+        text_expr = TEXT_EXPRESSIONS.get(label, DEFAULT_TEXT_EXPRESSION)
+        query = f"""
+        MATCH (n:`{_safe(label)}`:`{_safe(self.tenant)}`)
+        WHERE {self._missing_predicate()}
+        WITH {text_expr} AS text
+        WHERE text IS NOT NULL AND trim(text) <> ''
+        RETURN count(*) AS nodes, sum(size(text)) AS chars
+        """
+        # Estimativa de custo: réplica defasada é aceitável
+        async with self.driver.session(database=tenant_database(self.tenant), **session_options(READ, EVENTUAL)) as session:
+            record = await (await session.run(query)).single()
+        nodes = (record["nodes"] if record else 0) or 0
+        chars = (record["chars"] if record else 0) or 0
+
+        tokens = math.ceil(chars / CHARS_PER_TOKEN)
+        requests = math.ceil(nodes / self.embed_batch_size) if nodes else 0
+        rpm = max(1, int(os.getenv("MENIR_GEMINI_RATE_LIMIT_RPM", 15)))
+        return BackfillEstimate(
+            label=label,
+            nodes=nodes,
+            chars=chars,
+            tokens=tokens,
+            requests=requests,
+            minutes=round(requests / rpm, 2),
+            cost_usd=round(tokens / 1_000_000 * price_per_mtok, 4),
+        )
+
+    async def run(self, label: str, restart: bool = False, max_pages: Optional[int] = None) -> BackfillCheckpoint:
+        """
+        Processa (tenant, label) até esgotar ou atingir max_pages.
+        Retoma do checkpoint existente, a menos que restart=True.
+        """
+        path = self.checkpoint_path(label)
+        ckpt = None if restart else BackfillCheckpoint.load(path)
+        if ckpt is not None and ckpt.key != self.key:
+            raise ValueError(
+                f"Checkpoint {path} usa chave '{ckpt.key}', worker configurado com '{self.key}'. Use restart."
+            )
+        if ckpt is None:
+            ckpt = BackfillCheckpoint(tenant=self.tenant, label=label, key=self.key)
+        elif ckpt.done and not ckpt.failures:
+            logger.info(f"⏭️ {label}@{self.tenant}: checkpoint já concluído ({ckpt.embedded} embeddings).")
+            return ckpt
+        else:
+            logger.info(f"♻️ Retomando {label}@{self.tenant} após cursor '{ckpt.cursor}' ({ckpt.embedded} feitos).")
+
+        quantized = quantization_enabled()
+        fetch = self._fetch_query(label)
+        write = self._write_query(label, quantized)
+        pages_this_run = 0
+
+        async with self.driver.session(database=tenant_database(self.tenant), **session_options(WRITE)) as session:
+
+            async def _embed_page(records: list[dict]) -> list[str]:
+                """Embeda e grava uma página; devolve os cursores das linhas que falharam."""
+                # int8: sem uid o nó não entra no índice do QuantizedVectorStore
+                candidates = [
+                    r for r in records
+                    if r["text"] and r["text"].strip() and (r["node_key"] is not None or not quantized)
+                ]
+                ckpt.skipped += len(records) - len(candidates)
+                rows, failed = await self._embed_rows(label, candidates, quantized)
+                if rows:
+                    await session.execute_write(
+                        lambda tx: tx.run(write, rows=rows, label=_safe(label))
+                    )
+                ckpt.embedded += len(rows)
+                return failed
+
+            # Falhas de execuções anteriores primeiro: o cursor já passou por elas
+            if ckpt.failures:
+                result = await session.run(
+                    self._fetch_query(label, retry=True), keys=ckpt.failures, page_size=len(ckpt.failures)
+                )
+                records = await result.data()
+                still_failed = set(await _embed_page(records))
+                # Linhas que sumiram do fetch já ganharam embedding (ou foram apagadas)
+                ckpt.failures = [key for key in ckpt.failures if key in still_failed]
+                ckpt.failed = len(ckpt.failures)
+                ckpt.save(path)
+                logger.info(f"🔁 {label}@{self.tenant}: {len(records) - len(still_failed)} falhas recuperadas.")
+
+            if ckpt.done:
+                return self._finish(ckpt, label, quantized)
+
+            if self.key == "uid":
+                record = await (await session.run(self._unkeyed_query(label))).single()
+                ckpt.unkeyed = (record["unkeyed"] if record else 0) or 0
+                if ckpt.unkeyed:
+                    logger.warning(
+                        f"⚠️ {label}@{self.tenant}: {ckpt.unkeyed} nós sem uid ficam fora do backfill por uid "
+                        f"(use key='elementId' para alcançá-los)."
+                    )
+
+            while max_pages is None or pages_this_run < max_pages:
+                result = await session.run(fetch, cursor=ckpt.cursor, page_size=self.page_size)
+                records = await result.data()
+                if not records:
+                    ckpt.done = True
+                    ckpt.save(path)
+                    break
+
+                failed = await _embed_page(records)
+
+                # Cursor só avança depois que a página está confirmada no grafo — e as
+                # falhas que ele deixa para trás ficam registradas no mesmo checkpoint
+                ckpt.cursor = records[-1]["cursor"]
+                ckpt.failures.extend(failed)
+                ckpt.failed = len(ckpt.failures)
+                ckpt.pages += 1
+                ckpt.save(path)
+                pages_this_run += 1
+                logger.info(
+                    f"🧭 {label}@{self.tenant}: página {ckpt.pages} — "
+                    f"{ckpt.embedded} embeddings, {ckpt.failed} falhos, {ckpt.skipped} sem texto."
+                )
+
+        return self._finish(ckpt, label, quantized)
+
+    async def _embed_rows(self, label: str, candidates: list[dict], quantized: bool) -> tuple[list[dict], list[str]]:
+        """Linhas do UNWIND de escrita + cursores dos candidatos sem vetor."""
+        embed_batch = self._get_embed_batch()
+        vectors: list[list[float]] = []
+        for start in range(0, len(candidates), self.embed_batch_size):
+            chunk = candidates[start:start + self.embed_batch_size]
+            vectors.extend(await embed_batch([r["text"] for r in chunk]))
+
+        rows, failed = [], []
+        for record, vector in zip(candidates, vectors):
+            if not vector:
+                failed.append(record["cursor"])
+                continue
+            row = {"eid": record["eid"], "embedding": list(vector)}
+            if quantized:
+                qv = quantize_int8(vector)
+                row.update(
+                    codes=qv.data,
+                    scale=qv.scale,
+                    offset=qv.offset,
+                    full_uid=QuantizedVectorStore.full_embedding_uid(label, record["node_key"]),
+                )
+            rows.append(row)
+        return rows, failed
+
+    def _finish(self, ckpt: BackfillCheckpoint, label: str, quantized: bool) -> BackfillCheckpoint:
+        if ckpt.failures:
+            logger.warning(f"⚠️ {label}@{self.tenant}: {len(ckpt.failures)} embeddings falhos; retentados no próximo run().")
+        if quantized and ckpt.embedded:
+            QuantizedVectorStore.invalidate(self.tenant, label)
+        return ckpt
@@ -4,7 +4,7 @@ embedding_service.py — Serviço de embedding async para o Menir OS.
 Responsabilidades:
   1. Gerar embeddings via google-genai>=1.0.0 de forma não-bloqueante.
   2. Persistir embedding no nó Neo4j correspondente.
-  3. Nunca bloquear o event loop principal — toda I/O via asyncio.to_thread.
+  3. Nunca bloquear o event loop principal — I/O Neo4j via graph_access (async).
   4. Retry automático para rate-limits da API Gemini (Tenacity).
 
 Uso:
@@ -32,7 +32,9 @@ from tenacity import (
 GEMINI_EMBEDDING_MODEL = "models/gemini-embedding-001"
 
 from src.v3.core.neo4j_pool import get_shared_driver
-from src.v3.core.concurrency import run_in_custom_executor, io_pool
+from src.v3.core.graph_access import get_graph
+from src.v3.core.quantization import QuantizedVectorStore, quantization_enabled
+from src.v3.tenant_middleware import EVENTUAL, READ, group_by_database, session_options
 
 logger = logging.getLogger("menir.embedding")
 
@@ -55,25 +57,20 @@ class EmbeddingService:
         return cls._intel_singleton
 
     @staticmethod
-    def _persist_embedding_sync(
+    async def _persist_embedding(
         node_label: str,
         node_id: str,
         embedding: list[float],
         tenant: str,
     ) -> None:
-        """
-        Persiste o embedding no nó Neo4j.
-        Síncrono — encapsulado para uso via asyncio.to_thread.
-        """
+        """Persiste o embedding no nó Neo4j."""
         safe_tenant = tenant.replace("`", "").replace(";", "")
         query = f"""
         MATCH (n:{node_label}:`{safe_tenant}` {{uid: $node_id}})
         SET n.embedding = $embedding,
             n.embedded_at = datetime()
         """
-        driver = get_shared_driver()
-        with driver.session() as session:
-            session.run(query, node_id=node_id, embedding=embedding)
+        await get_graph().write(query, {"node_id": node_id, "embedding": embedding}, tenant=tenant)
 
     @classmethod
     async def embed_and_persist(
@@ -97,12 +94,12 @@ class EmbeddingService:
             if not embedding:
                 raise ValueError("Falha na geração de embedding: Retorno vazio do Gemini.")
 
-            # Etapa 2: persistir no grafo (I/O de rede — custom executor)
-            await run_in_custom_executor(
-                io_pool,
-                cls._persist_embedding_sync,
-                label, node_id, embedding, tenant
-            )
+            # Etapa 2: persistir no grafo
+            if quantization_enabled():
+                # Modo int8: código compacto no nó, vetor float no :FullEmbedding frio
+                await QuantizedVectorStore.persist(label, node_id, embedding, tenant)
+            else:
+                await cls._persist_embedding(label, node_id, embedding, tenant)
 
             logger.info(f"✅ Embedding persistido: {label}:{node_id}")
 
@@ -131,32 +128,111 @@ class EmbeddingService:
             if not query_embedding:
                 return []
 
-            index_name = f"{label.lower()}_intent_index"
+            if quantization_enabled():
+                return await QuantizedVectorStore.search(
+                    query_embedding, label, tenant, top_k=top_k
+                )
 
-            def _search():
-                driver = get_shared_driver()
-                with driver.session() as session:
-                    result = session.run(
-                        f"""
-                        CALL db.index.vector.queryNodes(
-                            $index_name, $top_k, $embedding
-                        )
-                        YIELD node AS n, score
-                        WHERE n:`{tenant.replace('`','')}`
-                        RETURN n.uid AS id,
-                               n.name AS name,
-                               n.status AS status,
-                               score
-                        ORDER BY score DESC
-                        """,
-                        index_name=index_name,
-                        top_k=top_k,
-                        embedding=query_embedding,
-                    )
-                    return [record.data() for record in result]
+            index_name = f"{label.lower()}_intent_index"
 
-            return await run_in_custom_executor(io_pool, _search)
+            return await get_graph().read(
+                f"""
+                CALL db.index.vector.queryNodes(
+                    $index_name, $top_k, $embedding
+                )
+                YIELD node AS n, score
+                WHERE n:`{tenant.replace('`','')}`
+                RETURN n.uid AS id,
+                       n.name AS name,
+                       n.status AS status,
+                       score
+                ORDER BY score DESC
+                """,
+                {"index_name": index_name, "top_k": top_k, "embedding": query_embedding},
+                tenant=tenant,
+                consistency=EVENTUAL,
+            )
 
         except Exception:
             logger.exception(f"Falha na busca semântica para: {query_text[:60]}")
             return []
+
+    @classmethod
+    async def batch_semantic_search(
+        cls,
+        probes: list[tuple[str, str]],
+        tenants: list[str],
+        candidates: int = 10,
+    ) -> list[dict[str, dict | None]]:
+        """
+        Desambiguação em lote: N textos → 1 chamada de embedding em lote
+        + 1 query Cypher (UNWIND) contra os índices de todos os tenants.
+
+        probes: [(query_text, label), ...]
+        Retorna, para cada probe, {tenant: melhor_match | None}, onde
+        melhor_match = {"id", "name", "status", "score"}.
+        """
+        matches = [{t: None for t in tenants} for _ in probes]
+        if not probes:
+            return matches
+        try:
+            embeddings = await cls._get_intel().generate_embeddings([text for text, _ in probes])
+
+            if quantization_enabled():
+                # Índice int8 já residente em memória: buscas concorrentes, sem round-trip de KNN
+                jobs = [
+                    (i, tenant, QuantizedVectorStore.search(emb, label, tenant, top_k=1))
+                    for i, ((_, label), emb) in enumerate(zip(probes, embeddings))
+                    if emb
+                    for tenant in tenants
+                ]
+                hits = await asyncio.gather(*(job for _, _, job in jobs), return_exceptions=True)
+                for (i, tenant, _), found in zip(jobs, hits):
+                    if isinstance(found, BaseException):
+                        logger.warning(f"Busca int8 falhou para probe {i}@{tenant}: {found}")
+                    elif found:
+                        matches[i][tenant] = {k: found[0][k] for k in ("id", "name", "status", "score")}
+                return matches
+
+            rows = [
+                {"idx": i, "index_name": f"{label.lower()}_intent_index", "embedding": emb}
+                for i, ((_, label), emb) in enumerate(zip(probes, embeddings))
+                if emb
+            ]
+            if not rows:
+                return matches
+
+            # Uma consulta KNN por probe; o melhor vizinho de cada tenant
+            # sai do mesmo conjunto de candidatos.
+            query = """
+            UNWIND $rows AS row
+            CALL db.index.vector.queryNodes(row.index_name, $candidates, row.embedding)
+            YIELD node AS n, score
+            UNWIND [t IN $tenants WHERE t IN labels(n)] AS tenant
+            WITH row.idx AS idx, tenant, n, score
+            ORDER BY score DESC
+            WITH idx, tenant, collect({
+                id: n.uid,
+                name: coalesce(n.name, n.title, n.content),
+                status: n.status,
+                score: score
+            })[0] AS best
+            RETURN idx, tenant, best
+            """
+            driver = get_shared_driver()
+            # Sharding por tenant: uma consulta por database, com os tenants que moram nele
+            for database, group in group_by_database(tenants).items():
+                async with driver.session(database=database, **session_options(READ, EVENTUAL)) as session:
+                    result = await session.run(
+                        query,
+                        rows=rows,
+                        candidates=candidates,
+                        tenants=group,
+                    )
+                    async for record in result:
+                        matches[record["idx"]][record["tenant"]] = record["best"]
+            return matches
+
+        except Exception:
+            logger.exception(f"Falha na busca semântica em lote ({len(probes)} probes).")
+            return matches
@@ -0,0 +1,263 @@
+"""
+Menir Core V5.2 - Existence Filter (LRU + Bloom consultivo)
+Checagens "existe ou não?" (Document por sha256/uid, Vendor por nome/IDE).
+
+  exists()        -> LRU de positivos confirmados pelo grafo, com TTL; miss
+                     ou entrada expirada sempre vai ao grafo. Negativo nunca
+                     é respondido localmente: outros workers e escritas em
+                     Cypher cru (apply_proposals, scripts menir_ingest_*)
+                     não passam por este processo.
+  forget()        -> caminho que deleta um nó tira a chave do LRU na hora;
+                     deletes de outros processos expiram em MENIR_EXISTENCE_TTL
+  might_contain() -> Bloom por (tenant, label, propriedade), só para pular
+                     caches (Zefix por Vendor): pior caso é recalcular
+  seed()/add()    -> alimentam o Bloom no boot e a cada escrita do processo
+
+Configuração:
+  MENIR_BLOOM_FP_RATE   (default 0.01 = 1% de falsos positivos alvo)
+  MENIR_BLOOM_CAPACITY  (default 100000 chaves por filtro antes de degradar)
+  MENIR_EXISTENCE_LRU   (default 4096 positivos em memória)
+  MENIR_EXISTENCE_TTL   (default 300 s de validade de um positivo no LRU)
+"""
+
+import hashlib
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+
+from src.v3.core.schemas.identity import ALLOWED_TENANTS
+from src.v3.tenant_middleware import CAUSAL
+
+logger = logging.getLogger("ExistenceFilter")
+
+# Chaves consultadas no caminho quente: (label, propriedade)
+DOCUMENT_SHA256 = ("Document", "sha256")
+DOCUMENT_UID = ("Document", "uid")
+VENDOR_NAME = ("Vendor", "name")
+VENDOR_IDE = ("Vendor", "ide_number")
+# Namespaces com Bloom (consultados por might_contain); Document só usa o LRU de exists()
+NAMESPACES = (VENDOR_NAME, VENDOR_IDE)
+
+Namespace = tuple[str, str]
+
+
+class BloomFilter:
+    """Bloom clássico: m bits, k hashes por double hashing sobre blake2b."""
+
+    def __init__(self, capacity: int, fp_rate: float):
+        if not 0 < fp_rate < 1:
+            raise ValueError(f"fp_rate precisa estar em (0, 1): {fp_rate}")
+        self.capacity = max(capacity, 1)
+        self.fp_rate = fp_rate
+        self.size = math.ceil(-self.capacity * math.log(fp_rate) / (math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        new = False
+        for pos in self._positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                new = True
+        if new:
+            self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        for pos in self._positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self._bits[byte] & (1 << bit):
+                return False
+        return True
+
+    def estimated_fp_rate(self) -> float:
+        """(1 - e^(-kn/m))^k para o n inserido até agora."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class _Slot:
+    """Filtro de um (tenant, namespace) + contadores do relatório."""
+
+    __slots__ = ("bloom", "seeded", "seeding", "negatives", "queries", "lru_hits", "expired")
+
+    def __init__(self, bloom: BloomFilter):
+        self.bloom = bloom
+        self.seeded = False
+        self.seeding: set[str] | None = None
+        self.negatives = 0
+        self.queries = 0
+        self.lru_hits = 0
+        self.expired = 0
+
+
+class ExistenceIndex:
+    """LRU de positivos (com TTL) na frente do grafo + Bloom consultivo por tenant/namespace."""
+
+    def __init__(
+        self,
+        fp_rate: float | None = None,
+        capacity: int | None = None,
+        lru_size: int | None = None,
+        ttl: float | None = None,
+    ):
+        self.fp_rate = fp_rate or float(os.getenv("MENIR_BLOOM_FP_RATE", "0.01"))
+        self.capacity = capacity or int(os.getenv("MENIR_BLOOM_CAPACITY", "100000"))
+        self.lru_size = lru_size or int(os.getenv("MENIR_EXISTENCE_LRU", "4096"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("MENIR_EXISTENCE_TTL", "300"))
+        self._slots: dict[tuple[str, Namespace], _Slot] = {}
+        # chave -> instante (monotonic) em que o grafo confirmou
+        self._lru: OrderedDict[tuple[str, Namespace, str], float] = OrderedDict()
+
+    def _slot(self, tenant: str, namespace: Namespace) -> _Slot:
+        slot = self._slots.get((tenant, namespace))
+        if slot is None:
+            slot = self._slots[(tenant, namespace)] = _Slot(BloomFilter(self.capacity, self.fp_rate))
+        return slot
+
+    def add(self, tenant: str, namespace: Namespace, key: str | None) -> None:
+        """Registra uma escrita. Não mexe no LRU (a transação pode não commitar)."""
+        if not key:
+            return
+        slot = self._slot(tenant, namespace)
+        slot.bloom.add(key)
+        if slot.seeding is not None:
+            slot.seeding.add(key)
+
+    def forget(self, tenant: str, namespace: Namespace, key: str | None) -> None:
+        """Nó deletado: tira do LRU. O Bloom segue dizendo 'talvez' (só custa um cache miss)."""
+        if key:
+            self._lru.pop((tenant, namespace, key), None)
+
+    def might_contain(self, tenant: str, namespace: Namespace, key: str) -> bool:
+        """False = nenhuma escrita deste processo viu a chave. True = talvez (ou não semeado).
+
+        Consultivo: escritas de fora do processo não entram no Bloom. Use só
+        para pular caches; existência de verdade passa por exists().
+        """
+        slot = self._slots.get((tenant, namespace))
+        if slot is None or not slot.seeded:
+            return True
+        if key in slot.bloom:
+            return True
+        slot.negatives += 1
+        return False
+
+    async def exists(
+        self,
+        tenant: str,
+        namespace: Namespace,
+        key: str,
+        fetch: Callable[[], Awaitable[bool]],
+    ) -> bool:
+        """LRU (positivo confirmado há menos de ttl) -> grafo. Negativos não são guardados."""
+        lru_key = (tenant, namespace, key)
+        slot = self._slot(tenant, namespace)
+        confirmed_at = self._lru.get(lru_key)
+        if confirmed_at is not None:
+            if time.monotonic() - confirmed_at < self.ttl:
+                self._lru.move_to_end(lru_key)
+                slot.lru_hits += 1
+                return True
+            # Pode ter sido deletado por outro processo: reconfirma
+            del self._lru[lru_key]
+            slot.expired += 1
+
+        slot.queries += 1
+        found = bool(await fetch())
+        if found:
+            self._lru[lru_key] = time.monotonic()
+            if len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+        return found
+
+    def begin_seed(self, tenant: str, namespace: Namespace) -> None:
+        self._slot(tenant, namespace).seeding = set()
+
+    def finish_seed(self, tenant: str, namespace: Namespace, keys: Iterable[str]) -> None:
+        """Troca o filtro por um dimensionado para o grafo + escritas feitas durante o seed."""
+        slot = self._slot(tenant, namespace)
+        keys = [k for k in keys if k]
+        written = slot.seeding or set()
+        bloom = BloomFilter(max(self.capacity, 2 * (len(keys) + len(written))), self.fp_rate)
+        for key in keys:
+            bloom.add(key)
+        for key in written:
+            bloom.add(key)
+        slot.bloom = bloom
+        slot.seeding = None
+        slot.seeded = True
+
+    async def seed(self, graph: Any, tenants: Iterable[str] | None = None, namespaces: Iterable[Namespace] = NAMESPACES) -> None:
+        """Boot: lê todas as chaves de cada (tenant, namespace) do grafo."""
+        if tenants is None:
+            personal = os.getenv("MENIR_PERSONAL_TENANT_NAME", "PESSOAL").strip()
+            tenants = sorted(ALLOWED_TENANTS | {personal})
+        for tenant in tenants:
+            safe_tenant = tenant.replace("`", "")
+            for namespace in namespaces:
+                label, prop = namespace
+                self.begin_seed(tenant, namespace)
+                try:
+                    rows = await graph.read(
+                        f"MATCH (n:`{label}`:`{safe_tenant}`) WHERE n.`{prop}` IS NOT NULL RETURN n.`{prop}` AS k",
+                        tenant=tenant,
+                        consistency=CAUSAL,  # negativo do Bloom só vale se o seed viu tudo que já commitou
+                    )
+                except Exception:
+                    self._slot(tenant, namespace).seeding = None
+                    logger.exception(f"Seed do filtro {label}.{prop} ({tenant}) falhou; checagens seguem no grafo.")
+                    continue
+                self.finish_seed(tenant, namespace, (str(r["k"]) for r in rows))
+        for line in self.report():
+            logger.info(
+                f"🌸 Bloom {line['tenant']}/{line['label']}.{line['property']}: {line['keys']} chaves, "
+                f"{line['bits']} bits, k={line['hashes']}, FP estimado {line['estimated_fp_rate']:.4%}"
+            )
+
+    def report(self) -> list[dict[str, Any]]:
+        """Bloom (chaves, FP alvo/estimado, negativos) e economia de round trips do LRU."""
+        lines = []
+        for (tenant, (label, prop)), slot in sorted(self._slots.items()):
+            lines.append({
+                "tenant": tenant,
+                "label": label,
+                "property": prop,
+                "seeded": slot.seeded,
+                "keys": slot.bloom.count,
+                "bits": slot.bloom.size,
+                "hashes": slot.bloom.hashes,
+                "target_fp_rate": slot.bloom.fp_rate,
+                "estimated_fp_rate": slot.bloom.estimated_fp_rate(),
+                "bloom_negatives": slot.negatives,
+                "answered_locally": slot.lru_hits,
+                "expired": slot.expired,
+                "graph_queries": slot.queries,
+            })
+            if slot.bloom.count > slot.bloom.capacity:
+                logger.warning(
+                    f"Bloom {tenant}/{label}.{prop} acima da capacidade ({slot.bloom.count}/{slot.bloom.capacity}); "
+                    "aumente MENIR_BLOOM_CAPACITY ou re-semeie."
+                )
+        return lines
+
+
+_default: ExistenceIndex | None = None
+
+
+def get_existence_index() -> ExistenceIndex:
+    """Índice compartilhado do processo."""
+    global _default
+    if _default is None:
+        _default = ExistenceIndex()
+    return _default
@@ -0,0 +1,283 @@
+"""
+Menir Core V5.2 - Async Graph Access Layer
+Camada única de acesso ao Neo4j sobre o AsyncDriver compartilhado.
+
+  read()/write()  -> execute_read/execute_write (transações gerenciadas:
+                     retry automático de erros transitórios pelo driver,
+                     limitado por max_transaction_retry_time)
+  timeout         -> timeout de transação no servidor (unit_of_work) +
+                     prazo no cliente (asyncio.timeout) cobrindo os retries
+  tenant          -> roteamento de database por tenant (MENIR_TENANT_DATABASES),
+                     default = TenantContext ativo
+  consistency     -> leituras CAUSAL (default: esperam os bookmarks das
+                     escritas do processo) ou EVENTUAL (réplica sem espera);
+                     ver src/v3/tenant_middleware.py
+  stream()        -> registros um a um de uma transação de leitura, puxados
+                     em lotes de fetch_size (nada de .data() do resultado todo)
+  paginate()      -> páginas curtas por keyset (ex: uid > último uid visto):
+                     cada página é um read() com retry e o cursor `after`
+                     permite retomar de onde parou
+
+Nenhuma chamada aqui bloqueia o event loop: nada de `with driver.session()`
+síncrono nem salto para io_pool.
+
+Configuração:
+  MENIR_NEO4J_TX_TIMEOUT      (default 30s por transação)
+  MENIR_NEO4J_MAX_RETRY_TIME  (default 15s de retries gerenciados)
+  MENIR_NEO4J_FETCH_SIZE      (default 1000 registros por pull em stream())
+  MENIR_NEO4J_PAGE_SIZE       (default 1000 registros por página em paginate())
+  MENIR_TENANT_DATABASES      ("BECO=beco,SANTOS=santos"; sem entrada -> NEO4J_DB/default;
+                               ver src/v3/tenant_middleware.py)
+"""
+
+import asyncio
+import logging
+import os
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from typing import Any, TypeVar
+
+from neo4j import AsyncDriver, unit_of_work
+
+from src.v3.core.neo4j_pool import get_shared_driver
+from src.v3.core.schemas.identity import TenantContext
+from src.v3.tenant_middleware import CAUSAL, READ, WRITE, session_options, tenant_database
+
+logger = logging.getLogger("GraphAccess")
+
+T = TypeVar("T")
+
+# (alias no RETURN, expressão no MATCH), ex: ("uid", "q.uid"); a última chave precisa ser única
+Keyset = Sequence[tuple[str, str]]
+
+
+class GraphAccess:
+    """
+    Helpers async read()/write() com retries gerenciados, timeout por chamada
+    e roteamento de database por tenant. Retornam list[dict] (result.data()).
+    """
+
+    def __init__(
+        self,
+        driver: AsyncDriver | None = None,
+        timeout: float | None = None,
+        max_retry_time: float | None = None,
+    ):
+        self._driver = driver
+        self.timeout = timeout or float(os.getenv("MENIR_NEO4J_TX_TIMEOUT", "30"))
+        self.max_retry_time = max_retry_time or float(os.getenv("MENIR_NEO4J_MAX_RETRY_TIME", "15"))
+        self.fetch_size = int(os.getenv("MENIR_NEO4J_FETCH_SIZE", "1000"))
+        self.page_size = int(os.getenv("MENIR_NEO4J_PAGE_SIZE", "1000"))
+
+    @property
+    def driver(self) -> AsyncDriver:
+        return self._driver or get_shared_driver()
+
+    async def read(
+        self,
+        query: str,
+        params: dict[str, Any] | None = None,
+        *,
+        tenant: str | None = None,
+        database: str | None = None,
+        timeout: float | None = None,
+        consistency: str = CAUSAL,
+    ) -> list[dict[str, Any]]:
+        return await self._execute(False, _collect(query, params), tenant, database, timeout, consistency)
+
+    async def write(
+        self,
+        query: str,
+        params: dict[str, Any] | None = None,
+        *,
+        tenant: str | None = None,
+        database: str | None = None,
+        timeout: float | None = None,
+    ) -> list[dict[str, Any]]:
+        return await self._execute(True, _collect(query, params), tenant, database, timeout, CAUSAL)
+
+    async def read_one(self, query: str, params: dict[str, Any] | None = None, **options: Any) -> dict[str, Any] | None:
+        rows = await self.read(query, params, **options)
+        return rows[0] if rows else None
+
+    async def write_one(self, query: str, params: dict[str, Any] | None = None, **options: Any) -> dict[str, Any] | None:
+        rows = await self.write(query, params, **options)
+        return rows[0] if rows else None
+
+    async def transaction(
+        self,
+        work: Callable[[Any], Awaitable[T]],
+        *,
+        write: bool = True,
+        tenant: str | None = None,
+        database: str | None = None,
+        timeout: float | None = None,
+        consistency: str = CAUSAL,
+    ) -> T:
+        """
+        Unidade de trabalho arbitrária numa transação gerenciada (vários
+        statements, ex: NodePersistenceOrchestrator.persist). `work` pode ser
+        reexecutada em retry: deve ser idempotente (MERGE).
+        """
+        return await self._execute(write, work, tenant, database, timeout, consistency)
+
+    async def stream(
+        self,
+        query: str,
+        params: dict[str, Any] | None = None,
+        *,
+        tenant: str | None = None,
+        database: str | None = None,
+        timeout: float | None = None,
+        consistency: str = CAUSAL,
+        fetch_size: int | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Registros de uma única transação de leitura, puxados do servidor em
+        lotes de fetch_size: memória constante e primeiro registro sem esperar
+        o último. Sem retry (o consumidor já viu parte das linhas); varreduras
+        longas sobre chaves indexadas devem usar paginate().
+        Quem interrompe a iteração deve usar contextlib.aclosing().
+        """
+        tenant = tenant or TenantContext.get()
+        database = database or tenant_database(tenant)
+        async with self.driver.session(
+            database=database,
+            fetch_size=fetch_size or self.fetch_size,
+            **session_options(READ, consistency),
+        ) as session:
+            tx = await session.begin_transaction(timeout=timeout or self.timeout)
+            try:
+                result = await tx.run(query, params or {})
+                async for record in result:
+                    yield record.data()
+            finally:
+                await tx.close()
+
+    def paginate(
+        self,
+        query: str,
+        params: dict[str, Any] | None = None,
+        *,
+        keyset: Keyset,
+        after: Sequence[Any] | None = None,
+        page_size: int | None = None,
+        **options: Any,
+    ) -> "KeysetCursor":
+        """
+        Itera `query` em páginas por keyset. A query marca o predicado com
+        {keyset} e termina no RETURN (que precisa devolver os aliases do
+        keyset); ORDER BY/LIMIT são acrescentados aqui. `after` retoma a partir
+        de um cursor salvo (KeysetCursor.after). Chaves do keyset devem ser não
+        nulas (uid, tx_key, ...): linhas com chave nula não são devolvidas.
+        """
+        return KeysetCursor(self, keyset_query(query, keyset), params or {}, keyset, after, page_size or self.page_size, options)
+
+    async def _execute(
+        self,
+        write: bool,
+        work: Callable[[Any], Awaitable[T]],
+        tenant: str | None,
+        database: str | None,
+        timeout: float | None,
+        consistency: str,
+    ) -> T:
+        tenant = tenant or TenantContext.get()
+        database = database or tenant_database(tenant)
+        tx_timeout = timeout or self.timeout
+        managed = unit_of_work(timeout=tx_timeout)(work)
+
+        # Prazo do cliente: uma transação completa + janela de retries gerenciados
+        async with asyncio.timeout(tx_timeout + self.max_retry_time):
+            async with self.driver.session(
+                database=database,
+                max_transaction_retry_time=self.max_retry_time,
+                **session_options(WRITE if write else READ, consistency),
+            ) as session:
+                if write:
+                    return await session.execute_write(managed)
+                return await session.execute_read(managed)
+
+
+def keyset_query(query: str, keyset: Keyset) -> str:
+    """
+    Expande {keyset} em (k1 > a1) OR (k1 = a1 AND k2 > a2) ... e ordena/limita pelos aliases.
+    As chaves precisam ser não nulas: `k > $_after` nunca é verdadeiro para NULL,
+    então o predicado exige `k IS NOT NULL` em todas elas e linhas com chave nula
+    ficam fora de todas as páginas (não só das seguintes à primeira).
+    """
+    if "{keyset}" not in query:
+        raise ValueError("Query paginada precisa do marcador {keyset} no WHERE.")
+    if not keyset:
+        raise ValueError("Keyset vazio.")
+    branches = []
+    for i, (_, expression) in enumerate(keyset):
+        terms = [f"{expr} = $_after[{j}]" for j, (_, expr) in enumerate(keyset[:i])]
+        terms.append(f"{expression} > $_after[{i}]")
+        branches.append("(" + " AND ".join(terms) + ")")
+    not_null = " AND ".join(f"{expr} IS NOT NULL" for _, expr in keyset)
+    predicate = f"{not_null} AND ($_after IS NULL OR {' OR '.join(branches)})"
+    order = ", ".join(alias for alias, _ in keyset)
+    return f"{query.replace('{keyset}', predicate).rstrip()}\nORDER BY {order}\nLIMIT $_page_size"
+
+
+class KeysetCursor:
+    """Iterador assíncrono por páginas; `after` é o keyset da última linha entregue."""
+
+    def __init__(
+        self,
+        graph: GraphAccess,
+        query: str,
+        params: dict[str, Any],
+        keyset: Keyset,
+        after: Sequence[Any] | None,
+        page_size: int,
+        options: dict[str, Any],
+    ):
+        self.graph = graph
+        self.query = query
+        self.params = params
+        self.aliases = [alias for alias, _ in keyset]
+        self.after = tuple(after) if after is not None else None
+        self.page_size = page_size
+        self.options = options
+        self.pages = 0
+
+    async def __aiter__(self) -> AsyncIterator[dict[str, Any]]:
+        while True:
+            rows = await self.graph.read(
+                self.query,
+                {**self.params, "_after": list(self.after) if self.after else None, "_page_size": self.page_size},
+                **self.options,
+            )
+            self.pages += 1
+            for row in rows:
+                self.after = tuple(row[alias] for alias in self.aliases)
+                yield row
+            if len(rows) < self.page_size:
+                return
+
+
+def _collect(query: str, params: dict[str, Any] | None) -> Callable[[Any], Awaitable[list[dict[str, Any]]]]:
+    async def _work(tx):
+        result = await tx.run(query, params or {})
+        return await result.data()
+    return _work
+
+
+_default: GraphAccess | None = None
+
+
+def get_graph() -> GraphAccess:
+    """GraphAccess compartilhado (sobre o driver do Neo4jPoolManager)."""
+    global _default
+    if _default is None:
+        _default = GraphAccess()
+    return _default
+
+
+async def read(query: str, params: dict[str, Any] | None = None, **options: Any) -> list[dict[str, Any]]:
+    return await get_graph().read(query, params, **options)
+
+
+async def write(query: str, params: dict[str, Any] | None = None, **options: Any) -> list[dict[str, Any]]:
+    return await get_graph().write(query, params, **options)
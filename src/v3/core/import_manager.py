@@ -6,6 +6,7 @@ Handles massive data ingestion with checkpointing using ImportBatch nodes.
 import logging
 from typing import Any, List
 from src.v3.menir_bridge import get_bridge
+from src.v3.tenant_middleware import CAUSAL
 from src.v3.core.schemas.identity import TenantContext
 
 logger = logging.getLogger("ImportManager")
@@ -28,14 +29,14 @@ class ImportManager:
             b.project = $proj
         RETURN b
         """
-        async with self.bridge.driver.session() as session:
+        async with self.bridge.driver.write_session() as session:
             await session.run(query, uid=batch_id, desc=description, proj=tenant_id)
 
     async def get_batch_progress(self, batch_id: str) -> int:
         """Returns the last_processed_index for a batch."""
         tenant_id = TenantContext.get()
         query = f"MATCH (b:ImportBatch:`{tenant_id}` {{uid: $uid}}) RETURN b.last_processed_index as idx"
-        async with self.bridge.driver.session() as session:
+        async with self.bridge.driver.read_session(CAUSAL) as session:
             result = await session.run(query, uid=batch_id)
             record = await result.single()
             return record["idx"] if record and record["idx"] is not None else -1
@@ -48,7 +49,7 @@ class ImportManager:
         SET b.last_processed_index = $idx,
             b.updated_at = datetime()
         """
-        async with self.bridge.driver.session() as session:
+        async with self.bridge.driver.write_session() as session:
             await session.run(query, uid=batch_id, idx=last_index)
 
     async def finalize_batch(self, batch_id: str):
@@ -59,7 +60,7 @@ class ImportManager:
         SET b.status = 'COMPLETED',
             b.completed_at = datetime()
         """
-        async with self.bridge.driver.session() as session:
+        async with self.bridge.driver.write_session() as session:
             await session.run(query, uid=batch_id)
 
     def get_retransmit_query(self, tenant_id: str) -> str:
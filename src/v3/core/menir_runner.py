@@ -42,7 +42,6 @@ logging.basicConfig(
 from src.v3.core.reconciliation import ReconciliationEngine  # noqa: E402
 from src.v3.menir_intel import MenirIntel  # noqa: E402
 from src.v3.meta_cognition import MenirOntologyManager  # noqa: E402
-from src.v3.core.concurrency import run_in_custom_executor, io_pool
 
 # Imported Locally inside MenirAsyncRunner.__init__ to prevent Circular Imports
 
@@ -106,7 +105,7 @@ class MenirAsyncRunner:
         except Exception as e:
             logger.exception(f"⚠️ Erro ao arquivar o documento {file_path}: {e}")
 
-    def _quarantine_document(self, file_path: str, tenant: str):
+    async def _quarantine_document(self, file_path: str, tenant: str):
         """
         Move o arquivo reprovado para a pasta Quarentena.
         Isso retira a fatura corrompida do Loop do Watchdog, evitando Deadlocks de I/O.
@@ -134,7 +133,7 @@ class MenirAsyncRunner:
             # C-04: Quarentena Dupla (File + Graph Node)
             # Use hash as best-effort if available, else filename
             file_hash = filename.split('_')[0] if '_' in filename else filename
-            self.ontology_manager.inject_entropy_anomaly(
+            await self.ontology_manager.inject_entropy_anomaly(
                 tenant, file_hash, "QuarantineEvent", f"Moved to {dest_path}", 1
             )
             
@@ -158,7 +157,7 @@ class MenirAsyncRunner:
                 # Para simplificar o esqueleto: XML cai pra Banco, PDF/Imagem cai pra Fatura.
                 ext = file_path.lower().rsplit(".", 1)[-1] if "." in file_path else ""
 
-                if ext in ["xml", "camt053"]:
+                if ext in ["xml", "camt053", "camt052", "camt054", "zip"]:
                     logger.info("➡️ Roteando para a Camt053Skill (Banco).")
                     # Tenant passado apenas no root do context
                     result = await self.camt053_skill.process_statement(file_path)
@@ -171,7 +170,7 @@ class MenirAsyncRunner:
                     self._archive_document(file_path, tenant)
                 else:
                     logger.warning(f"❌ Falha de Skill no arquivo {file_path}: {result.message}")
-                    self._quarantine_document(file_path, tenant)
+                    await self._quarantine_document(file_path, tenant)
 
             except Exception as e:
                 logger.exception(f"Erro catastrófico no Worker para {file_path}: {e}")
@@ -207,7 +206,7 @@ class MenirAsyncRunner:
 
                     # 0. The Circuit Breaker (Phase 32)
                     # Verifica a resiliência estrutural antes de gastar cota LLM
-                    is_healthy = await run_in_custom_executor(io_pool, self.ontology_manager.check_system_health)
+                    is_healthy = await self.ontology_manager.check_system_health()
                     if not is_healthy:
                         logger.error(
                             "🛑 WATCHDOG HALTED: System is operating with dead FATAL dependencies. Skipping processing cycle."
@@ -228,7 +227,7 @@ class MenirAsyncRunner:
                     from src.v3.core.schemas.identity import locked_tenant_context
                     
                     with locked_tenant_context(tenant):
-                        await run_in_custom_executor(io_pool, self.reconciliation_engine.run_matching_cycle)
+                        await self.reconciliation_engine.run_matching_cycle()
 
             except Exception as e:
                 logger.exception(f"🚨 Watchdog Loop Crash: {e}")
@@ -252,6 +251,30 @@ if __name__ == "__main__":
 
         ontology = MenirOntologyManager()
 
+        # 1b. Constraints/índices versionados (idempotente) antes de qualquer MERGE
+        from src.v3.core.schema_migrations import ensure_schema
+
+        try:
+            await ensure_schema()
+        except Exception:
+            logger.exception("🚨 Falha ao aplicar migrações de schema no boot.")
+
+        # 1c. Reaplica escritas write-behind que ficaram no spill file (crash anterior)
+        from src.v3.core.write_behind import flush_all
+
+        try:
+            await ontology.write_behind.recover()
+        except Exception:
+            logger.exception("🚨 Falha ao reaplicar o spill file do write-behind.")
+
+        # 1d. Filtros de existência (Bloom) semeados antes do primeiro documento
+        from src.v3.core.existence_filter import get_existence_index
+
+        try:
+            await get_existence_index().seed(ontology.graph)
+        except Exception:
+            logger.exception("🚨 Falha ao semear os filtros de existência; checagens seguem no grafo.")
+
         # 2. Inicia o Cérebro, passando o OntologyManager para ele ler a própria Persona do Banco
         intel = MenirIntel(ontology=ontology)
 
@@ -260,7 +283,11 @@ if __name__ == "__main__":
 
         # 4. Trava o loop principal monitorando a pasta Inbox (Tenant default: BECO)
         inbox_path = os.getenv("MENIR_INBOX", "Menir_Inbox/BECO")
-        await runner.start_watchdog(inbox_dir=inbox_path, tenant="BECO")
+        try:
+            await runner.start_watchdog(inbox_dir=inbox_path, tenant="BECO")
+        finally:
+            # Flush-on-shutdown: nada de escrita coalescida perdida no desligamento
+            await flush_all()
 
     try:
         asyncio.run(boot_sequence())
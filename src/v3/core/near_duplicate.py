@@ -0,0 +1,261 @@
+"""
+Menir Core V5.2 - Near-Duplicate Prefilter (MinHash LSH)
+Intercepta capturas e leads repetidos (mensagem encaminhada duas vezes,
+lembrete levemente editado) ANTES de qualquer chamada LLM/embedding.
+
+  1. Normalização (minúsculas, sem acentos/pontuação, espaços colapsados).
+  2. Duplicata exata: SHA-256 do texto normalizado.
+  3. Quase-duplicata: assinatura MinHash sobre shingles de caracteres +
+     LSH em bandas; candidatos confirmados pela Jaccard estimada >= limiar.
+
+Índice local, em memória, por (tenant, namespace) — nunca cruza tenants.
+Configuração:
+  MENIR_DEDUP_JACCARD_THRESHOLD (default 0.85)
+  MENIR_DEDUP_NUM_PERM          (default 128)
+  MENIR_DEDUP_MAX_ENTRIES       (default 50000 por índice, LRU)
+"""
+
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger("NearDuplicate")
+
+SHINGLE_SIZE = 5
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+# Prefixos de encaminhamento não mudam o conteúdo da nota
+_FORWARD_PREFIX = re.compile(r"^((fwd?|enc|encaminhad[ao]|forwarded( message)?|tr)\s*:?\s*)+")
+
+
+def jaccard_threshold() -> float:
+    return float(os.getenv("MENIR_DEDUP_JACCARD_THRESHOLD", "0.85"))
+
+
+def normalize_text(text: str) -> str:
+    """Forma canônica para comparação: sem acentos, pontuação ou caixa."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = _SPACES.sub(" ", _NON_WORD.sub(" ", text)).strip()
+    return _FORWARD_PREFIX.sub("", text).strip()
+
+
+def shingles(normalized: str, k: int = SHINGLE_SIZE) -> set[str]:
+    if len(normalized) <= k:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + k] for i in range(len(normalized) - k + 1)}
+
+
+def _optimal_bands(threshold: float, num_perm: int) -> tuple[int, int]:
+    """
+    Escolhe (bandas, linhas) com b*r <= num_perm minimizando a área de
+    falso-positivo + falso-negativo da curva S 1-(1-s^r)^b em torno do limiar.
+    """
+    grid = np.linspace(0.0, 1.0, 201)
+    step = grid[1] - grid[0]
+    below = grid < threshold
+    best, best_err = (1, num_perm), float("inf")
+    for b in range(1, num_perm + 1):
+        r = num_perm // b
+        prob = 1.0 - (1.0 - grid ** r) ** b
+        fp = prob[below].sum() * step
+        fn = (1.0 - prob[~below]).sum() * step
+        if fp + fn < best_err:
+            best, best_err = (b, r), fp + fn
+    return best
+
+
+class MinHasher:
+    """Permutações universais (a*x + b) mod p sobre hashes de 32 bits."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, items: set[str]) -> np.ndarray:
+        sig = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        if not items:
+            return sig
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in items],
+            dtype=np.uint64,
+        )
+        # Overflow uint64 intencional (mesma aritmética do datasketch)
+        with np.errstate(over="ignore"):
+            perms = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return perms.min(axis=0)
+
+
+@dataclass(frozen=True)
+class DuplicateHit:
+    key: str
+    jaccard: float
+    exact: bool
+    payload: Any = None
+
+
+@dataclass
+class _Entry:
+    signature: np.ndarray
+    digest: str
+    band_keys: list[bytes]
+    payload: Any = None
+
+
+class MinHashLSHIndex:
+    """Índice LSH com capacidade limitada (LRU)."""
+
+    def __init__(self, threshold: float, num_perm: int = 128, max_entries: int = 50_000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = _optimal_bands(threshold, num_perm)
+        self._buckets: list[dict[bytes, set[str]]] = [{} for _ in range(self.bands)]
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._by_digest: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _band_keys(self, sig: np.ndarray) -> list[bytes]:
+        return [sig[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    @staticmethod
+    def _digest(normalized: str) -> str:
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def add(self, key: str, text: str, payload: Any = None) -> None:
+        normalized = normalize_text(text)
+        if not normalized:
+            return
+        self.remove(key)
+        sig = self.hasher.signature(shingles(normalized))
+        entry = _Entry(sig, self._digest(normalized), self._band_keys(sig), payload)
+        for band, bkey in zip(self._buckets, entry.band_keys):
+            band.setdefault(bkey, set()).add(key)
+        self._entries[key] = entry
+        self._by_digest[entry.digest] = key
+        while len(self._entries) > self.max_entries:
+            self.remove(next(iter(self._entries)))
+
+    def remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band, bkey in zip(self._buckets, entry.band_keys):
+            members = band.get(bkey)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del band[bkey]
+        if self._by_digest.get(entry.digest) == key:
+            del self._by_digest[entry.digest]
+
+    def query(self, text: str) -> DuplicateHit | None:
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+
+        exact_key = self._by_digest.get(self._digest(normalized))
+        if exact_key is not None:
+            self._entries.move_to_end(exact_key)
+            return DuplicateHit(exact_key, 1.0, True, self._entries[exact_key].payload)
+
+        sig = self.hasher.signature(shingles(normalized))
+        candidates: set[str] = set()
+        for band, bkey in zip(self._buckets, self._band_keys(sig)):
+            candidates |= band.get(bkey, set())
+
+        best: DuplicateHit | None = None
+        for key in candidates:
+            jaccard = float(np.mean(self._entries[key].signature == sig))
+            if jaccard >= self.threshold and (best is None or jaccard > best.jaccard):
+                best = DuplicateHit(key, jaccard, False, self._entries[key].payload)
+        if best is not None:
+            self._entries.move_to_end(best.key)
+        return best
+
+
+@dataclass
+class DedupStats:
+    checks: int = 0
+    exact_hits: int = 0
+    near_hits: int = 0
+    misses: int = 0
+    by_tenant: dict[str, int] = field(default_factory=dict)
+
+
+class NearDuplicateFilter:
+    """
+    Registro de índices por (tenant, namespace) + métricas globais.
+    Namespaces em uso: "capture" (MenirCapture.ingest) e "lead:<nome normalizado>"
+    (LeadSkill: um índice por nome, quase-duplicata só do intent).
+    """
+
+    _indexes: dict[tuple[str, str], MinHashLSHIndex] = {}
+    _stats = DedupStats()
+
+    @classmethod
+    def _index(cls, tenant: str, namespace: str) -> MinHashLSHIndex:
+        key = (tenant, namespace)
+        if key not in cls._indexes:
+            cls._indexes[key] = MinHashLSHIndex(
+                threshold=jaccard_threshold(),
+                num_perm=int(os.getenv("MENIR_DEDUP_NUM_PERM", "128")),
+                max_entries=int(os.getenv("MENIR_DEDUP_MAX_ENTRIES", "50000")),
+            )
+        return cls._indexes[key]
+
+    @classmethod
+    def check(cls, tenant: str, namespace: str, text: str) -> DuplicateHit | None:
+        hit = cls._index(tenant, namespace).query(text)
+        stats = cls._stats
+        stats.checks += 1
+        if hit is None:
+            stats.misses += 1
+            return None
+        if hit.exact:
+            stats.exact_hits += 1
+        else:
+            stats.near_hits += 1
+        stats.by_tenant[tenant] = stats.by_tenant.get(tenant, 0) + 1
+        logger.info(
+            f"♻️ Duplicata {'exata' if hit.exact else 'próxima'} ({namespace}@{tenant}) "
+            f"de {hit.key} — Jaccard≈{hit.jaccard:.2f}. LLM/embeddings evitados."
+        )
+        return hit
+
+    @classmethod
+    def remember(cls, tenant: str, namespace: str, key: str, text: str, payload: Any = None) -> None:
+        cls._index(tenant, namespace).add(key, text, payload)
+
+    @classmethod
+    def metrics(cls) -> dict[str, Any]:
+        stats = cls._stats
+        hits = stats.exact_hits + stats.near_hits
+        return {
+            "jaccard_threshold": jaccard_threshold(),
+            "checks": stats.checks,
+            "exact_hits": stats.exact_hits,
+            "near_hits": stats.near_hits,
+            "misses": stats.misses,
+            "hit_rate": round(hits / stats.checks, 4) if stats.checks else 0.0,
+            "hits_by_tenant": dict(stats.by_tenant),
+            "indexed": {f"{t}:{ns}": len(idx) for (t, ns), idx in cls._indexes.items()},
+        }
+
+    @classmethod
+    def reset(cls) -> None:
+        cls._indexes.clear()
+        cls._stats = DedupStats()
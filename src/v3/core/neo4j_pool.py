@@ -2,6 +2,12 @@
 Menir Core V5.1 - Unified Neo4j Connection Pool
 A thread-safe singleton managing the primary Neo4j Driver.
 Prevents "Write-Lock Saturation" caused by multiple module instantiations.
+
+Pool tuning (env, sem mudar código):
+  NEO4J_MAX_CONNECTION_POOL_SIZE      (default 50 conexões por servidor)
+  NEO4J_CONNECTION_ACQUISITION_TIMEOUT (default 60s esperando conexão livre)
+  NEO4J_MAX_CONNECTION_LIFETIME       (default 3600s antes de reciclar a conexão)
+  MENIR_NEO4J_METRICS                 (default 1: sessões instrumentadas, ver pool_metrics.py)
 """
 
 import logging
@@ -12,6 +18,8 @@ from typing import Optional
 
 from neo4j import AsyncGraphDatabase, AsyncDriver
 
+from src.v3.core.pool_metrics import InstrumentedDriver, get_pool_metrics
+
 logger = logging.getLogger("Neo4jPool")
 
 class Neo4jPoolManager:
@@ -36,19 +44,23 @@ class Neo4jPoolManager:
         if not password:
             logger.warning("NEO4J_PASSWORD is not set. Database connections will fail.")
 
-        self.driver: AsyncDriver = AsyncGraphDatabase.driver(
-            uri, 
-            auth=(user, password),
-            max_connection_lifetime=3600,
-            max_connection_pool_size=50,
-            connection_acquisition_timeout=60.0
-        )
+        pool_config = {
+            "max_connection_lifetime": float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600")),
+            "max_connection_pool_size": int(os.getenv("NEO4J_MAX_CONNECTION_POOL_SIZE", "50")),
+            "connection_acquisition_timeout": float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "60")),
+        }
+        driver = AsyncGraphDatabase.driver(uri, auth=(user, password), **pool_config)
+        if os.getenv("MENIR_NEO4J_METRICS", "1") != "0":
+            metrics = get_pool_metrics()
+            metrics.config = pool_config
+            driver = InstrumentedDriver(driver, metrics)
+        self.driver: AsyncDriver | InstrumentedDriver = driver
         # Async verify_connectivity in a separate thread if needed, or skip for bootstrap
         # In this singleton _init, we can't easily await.
         # We will verify on first use or use a simplified check.
-        logger.info("✅ Unified Neo4j AsyncDriver Instance created.")
+        logger.info(f"✅ Unified Neo4j AsyncDriver Instance created ({pool_config}).")
 
-    def get_driver(self) -> AsyncDriver:
+    def get_driver(self) -> AsyncDriver | InstrumentedDriver:
         return self.driver
 
     async def close(self):
@@ -62,6 +74,6 @@ def shutdown_pool():
     if Neo4jPoolManager._instance:
         Neo4jPoolManager._instance.close()
 
-def get_shared_driver() -> AsyncDriver:
+def get_shared_driver() -> AsyncDriver | InstrumentedDriver:
     """Helper method to access the unified driver."""
     return Neo4jPoolManager().get_driver()
@@ -0,0 +1,314 @@
+"""
+Menir Core V5.2 - Node Persistence Registry
+Mapeamento declarativo modelo Pydantic → template MERGE pré-compilado.
+
+Cada tipo registrado define label, chaves de MERGE, propriedades (com
+renomeação/conversão) e um trecho Cypher opcional (tail) para relações.
+A partir disso são gerados, UMA vez:
+  - o extrator de parâmetros (attrgetter + conversor por propriedade);
+  - o texto Cypher por (tenant, forma), em cache — forma simples ($param)
+    para persist e forma UNWIND (row.param) para persist_many.
+
+O orquestrador despacha por dict lookup em type(node). Tipos novos entram via
+register_node(...) sem editar o NodePersistenceOrchestrator.
+"""
+
+import operator
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import lru_cache
+from typing import Any
+
+from src.v3.core.schemas.base import BaseNode, Document
+from src.v3.core.schemas.financial import InvoiceData
+from src.v3.core.schemas.operational import (
+    ClientNode, EmployeeNode, TaxDossierNode, InsuranceNode, SalarySlipNode, TVADeclarationNode
+)
+from src.v3.core.schemas.personal import (
+    PersonNode, ProjectNode, LifeEventNode, GoalNode
+)
+from src.v3.core.schemas.santos import (
+    SignalInput, InsightInput, DecisionHubEntry
+)
+
+# Campos de BaseNode/governança que nunca viram propriedade do nó pelo registro
+_RESERVED_FIELDS = {
+    "uid", "project", "labels", "metadata",
+    "source_document_uid", "extraction_path", "extraction_confidence",
+}
+
+
+def to_float(value: Any) -> float | None:
+    """Conversor de Prop numérica; público porque a governança do orquestrador reusa."""
+    return float(value) if value is not None else None
+
+
+def _to_iso(value: Any) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def _to_enum_value(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
+
+def _dump_models(value: Any) -> list[dict]:
+    return [v.model_dump() for v in value]
+
+
+@dataclass(frozen=True)
+class Prop:
+    """
+    Propriedade do nó no grafo.
+    name: propriedade (e nome do parâmetro); source: atributo do modelo (default = name);
+    convert: conversão Python; cypher: expressão com {v} no lugar do valor;
+    literal: expressão Cypher sem parâmetro (ex: "datetime()").
+    """
+    name: str
+    source: str | None = None
+    convert: Callable[[Any], Any] | None = None
+    cypher: str = "{v}"
+    literal: str | None = None
+
+
+@dataclass(frozen=True)
+class NodeSpec:
+    model: type
+    label: str
+    props: tuple[Prop, ...]
+    merge_keys: tuple[str, ...] = ("uid",)
+    # n.project = $project (tenant saneado), como nos tipos operacionais
+    project: bool = False
+    # Exige source_document_uid existente (rastreabilidade FINMA)
+    provenance: bool = False
+    # Cypher após o SET: {p} = prefixo de parâmetro ("$" ou "row."),
+    # {carry} = variáveis do WITH, {tenant} e demais chaves de template_args
+    tail: str = ""
+    # Parâmetros extras (não gravados em n.*) consumidos pelo tail
+    extra: tuple[Prop, ...] = ()
+    # Argumentos de template dependentes do nó (ex: label do tenant referenciado)
+    template_args: Callable[[Any], dict[str, str]] | None = None
+    # Escolhe uma variante do spec para um nó específico
+    select: Callable[[Any], "NodeSpec | None"] | None = None
+    _extractors: tuple = field(default=(), init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        extractors = tuple(
+            (p.name, operator.attrgetter(p.source or p.name), p.convert)
+            for p in (*self.props, *self.extra)
+            if p.literal is None
+        )
+        object.__setattr__(self, "_extractors", extractors)
+
+    def params(self, node: Any) -> dict[str, Any]:
+        """Extrator gerado no registro: sem introspecção por chamada."""
+        out = {"uid": node.uid}
+        for name, getter, convert in self._extractors:
+            value = getter(node)
+            out[name] = convert(value) if convert is not None else value
+        return out
+
+    def args_for(self, node: Any) -> tuple[tuple[str, str], ...]:
+        if self.template_args is None:
+            return ()
+        return tuple(sorted((k, str(v).replace("`", "")) for k, v in self.template_args(node).items()))
+
+    def statement(
+        self, tenant: str, batched: bool, args: tuple[tuple[str, str], ...] = (), governance: str = ""
+    ) -> str:
+        """governance: trecho Cypher (mesmos placeholders do tail) inserido entre o SET e o tail."""
+        return _compile(self, tenant, batched, args, governance)
+
+
+@lru_cache(maxsize=1024)
+def _compile(
+    spec: NodeSpec, tenant: str, batched: bool, args: tuple[tuple[str, str], ...], governance: str = ""
+) -> str:
+    p = "row." if batched else "$"
+    keys = ", ".join(f"{k}: {p}{k}" for k in spec.merge_keys)
+    assignments = [
+        f"n.{prop.name} = {prop.literal if prop.literal is not None else prop.cypher.format(v=p + prop.name)}"
+        for prop in spec.props
+    ]
+    if spec.project:
+        assignments.append("n.project = $project")
+    head = "UNWIND $rows AS row\nMERGE" if batched else "MERGE"
+    q = f"{head} (n:{spec.label}:`{tenant}` {{{keys}}})"
+    if assignments:
+        q += "\nSET " + ",\n    ".join(assignments)
+    carry = "n, row" if batched else "n"
+    for fragment in (governance, spec.tail):
+        if fragment:
+            q += fragment.format(p=p, carry=carry, tenant=tenant, **dict(args))
+    return q
+
+
+_REGISTRY: dict[type, NodeSpec] = {}
+
+
+def auto_props(model: type) -> tuple[Prop, ...]:
+    """Propriedades derivadas dos campos do modelo (tipos plugados sem spec manual)."""
+    props = []
+    for name, info in model.model_fields.items():
+        if name in _RESERVED_FIELDS:
+            continue
+        annotation = str(info.annotation)
+        if "Decimal" in annotation:
+            props.append(Prop(name, convert=to_float))
+        elif "datetime" in annotation:
+            props.append(Prop(name, convert=_to_iso, cypher="datetime({v})"))
+        elif "date" in annotation:
+            props.append(Prop(name, convert=_to_iso, cypher="date({v})"))
+        elif isinstance(info.default, Enum) or "Enum" in annotation or "Status" in annotation:
+            props.append(Prop(name, convert=_to_enum_value))
+        else:
+            props.append(Prop(name))
+    return tuple(props)
+
+
+def register_node(
+    model: type,
+    label: str | None = None,
+    props: tuple[Prop, ...] | None = None,
+    **options: Any,
+) -> NodeSpec:
+    """
+    Registra (ou substitui) o mapeamento de um modelo.
+    Sem `props`, as propriedades são derivadas dos campos do modelo;
+    `provenance` default = o modelo declara source_document_uid.
+    """
+    options.setdefault("provenance", "source_document_uid" in model.model_fields)
+    spec = NodeSpec(
+        model=model,
+        label=label or model.__name__,
+        props=props if props is not None else auto_props(model),
+        **options,
+    )
+    _REGISTRY[model] = spec
+    _compile.cache_clear()
+    return spec
+
+
+def resolve_spec(node: BaseNode) -> NodeSpec | None:
+    """Dispatch O(1) por type(node); variantes via spec.select."""
+    spec = _REGISTRY.get(type(node))
+    if spec is not None and spec.select is not None:
+        spec = spec.select(node) or spec
+    return spec
+
+
+def registered_models() -> tuple[type, ...]:
+    return tuple(_REGISTRY)
+
+
+def registered_specs() -> tuple[NodeSpec, ...]:
+    return tuple(_REGISTRY.values())
+
+
+# ---------------------------------------------------------------------------
+# Tipos nativos do Menir (paridade com o grafo histórico do orquestrador)
+# ---------------------------------------------------------------------------
+
+register_node(
+    Document,
+    props=(
+        Prop("file_hash", source="sha256"),
+        Prop("name"),
+        Prop("source"),
+        Prop("status", convert=_to_enum_value),
+    ),
+    project=True,
+)
+register_node(ClientNode, props=(Prop("name"), Prop("client_type"), Prop("ide_number"), Prop("address")), project=True)
+register_node(EmployeeNode, props=(Prop("full_name"), Prop("avs_number"), Prop("role"), Prop("hiring_date")), project=True)
+register_node(TaxDossierNode, props=(Prop("year"), Prop("tax_authority"), Prop("status")), project=True)
+register_node(InsuranceNode, props=(Prop("policy_number"), Prop("provider_name"), Prop("insurance_type")), project=True)
+register_node(
+    SalarySlipNode,
+    props=(Prop("period"), Prop("gross_salary"), Prop("net_salary"), Prop("avs_deduction"), Prop("lpp_deduction")),
+    project=True,
+)
+register_node(
+    TVADeclarationNode,
+    props=(Prop("period"), Prop("total_sales"), Prop("tva_collected"), Prop("tva_deductible"), Prop("amount_due")),
+    project=True,
+)
+register_node(
+    InvoiceData,
+    label="Invoice",
+    props=(
+        Prop("vendor_name"),
+        Prop("doc_type"),
+        Prop("ide_number"),
+        Prop("avs_number"),
+        Prop("language"),
+        Prop("vendor_iban"),
+        Prop("payment_reference"),
+        Prop("currency"),
+        Prop("issue_date"),
+        Prop("subtotal"),
+        Prop("tips", source="tip_or_unregulated_amount"),
+        Prop("total_amount"),
+        Prop("requires_justification", source="requires_manual_justification"),
+    ),
+    project=True,
+    extra=(Prop("items", convert=_dump_models),),
+    # FOREACH mantém a linha mesmo sem itens; Vendor por último (o MATCH filtra)
+    tail="""
+WITH {carry}
+FOREACH (item IN {p}items |
+    MERGE (li:LineItem:`{tenant}` {{invoice_uid: {p}uid, description: item.description}})
+    SET li.gross_amount = item.gross_amount,
+        li.tva_rate_applied = item.tva_rate_applied,
+        li.project = $project
+    MERGE (n)-[:CONTAINS]->(li)
+)
+WITH {carry}
+MATCH (v:Vendor:`{tenant}` {{name: {p}vendor_name}})
+MERGE (v)-[:ISSUED_BY]->(n)""",
+)
+
+_VIRTUAL_PERSON = NodeSpec(
+    model=PersonNode,
+    label="PersonNode",
+    props=(Prop("name"), Prop("is_virtual", literal="true"), Prop("referenced_tenant")),
+    extra=(Prop("referenced_uid"),),
+    template_args=lambda n: {"ref_tenant": n.referenced_tenant},
+    tail="""
+WITH {carry}
+MERGE (ref:PersonNode:`{ref_tenant}` {{uid: {p}referenced_uid}})
+MERGE (n)-[:REFERENCED_FROM]->(ref)""",
+)
+register_node(
+    PersonNode,
+    props=(Prop("name"), Prop("role_or_context"), Prop("trust_score")),
+    select=lambda n: _VIRTUAL_PERSON if n.is_virtual and n.referenced_uid else None,
+)
+register_node(ProjectNode, props=(Prop("name"), Prop("description"), Prop("status")))
+register_node(LifeEventNode, props=(Prop("title"), Prop("date"), Prop("impact_level")))
+register_node(
+    InsightInput,
+    label="Insight",
+    props=(
+        Prop("content"),
+        Prop("tags"),
+        Prop("initial_score", convert=to_float),
+        Prop("decay_lambda", convert=to_float),
+        Prop("created_at", convert=_to_iso, cypher="datetime({v})"),
+    ),
+)
+register_node(
+    SignalInput,
+    label="Signal",
+    props=(
+        Prop("signal_type"),
+        Prop("weight", convert=to_float),
+        Prop("description"),
+        Prop("origin_tenant_hash"),
+        Prop("initial_score", convert=to_float),
+        Prop("decay_lambda", convert=to_float),
+        Prop("created_at", convert=_to_iso, cypher="datetime({v})"),
+    ),
+)
+register_node(DecisionHubEntry, label="DecisionHub", props=(Prop("last_update", literal="datetime()"),))
+register_node(GoalNode, props=(Prop("title"), Prop("deadline"), Prop("status")))
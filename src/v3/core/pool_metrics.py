@@ -0,0 +1,247 @@
+"""
+Menir Core V5.2 - Neo4j Pool Instrumentation
+Wrapper fino sobre o AsyncDriver compartilhado que mede o que o pool do
+driver não expõe:
+
+  acquisition_wait  -> histograma da espera por conexão (inclui a resolução
+                       da tabela de rotas no cluster)
+  session_lifetime  -> histograma por call site (módulo:função que abriu a
+                       sessão; camadas de acesso são puladas)
+  tx_retries        -> tentativas extras de execute_read/execute_write
+  leaked_sessions   -> sessões coletadas sem close(); sessões abertas há mais
+                       de MENIR_NEO4J_LEAK_WARN_S geram warning no snapshot
+
+Exposto em GET /metrics/neo4j (Synapse). Sem hooks públicos de pool no
+driver, a espera é medida em AsyncSession._connect; se a API interna mudar,
+só essa métrica some — o resto segue funcionando.
+"""
+
+import bisect
+import functools
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Any
+
+logger = logging.getLogger("Neo4jPoolMetrics")
+
+# Limites superiores dos buckets em ms (o último bucket é +inf)
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+# Frames dessas camadas não contam como call site: quem abriu a sessão é quem as chamou
+_PASS_THROUGH = ("neo4j_pool", "pool_metrics", "tenant_middleware", "graph_access", "contextlib")
+
+
+class Histogram:
+    """Histograma de buckets fixos (ms) com soma, máximo e quantis aproximados."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def quantile(self, q: float) -> float:
+        """Limite superior do bucket que contém o quantil q (o máximo no último bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max, 3),
+            "buckets": {
+                (f"le_{b}" if i < len(BUCKETS_MS) else "le_inf"): n
+                for i, (b, n) in enumerate(zip((*BUCKETS_MS, None), self.counts))
+                if n
+            },
+        }
+
+
+class PoolMetrics:
+    """Contadores do processo; uma instância compartilhada (get_pool_metrics)."""
+
+    def __init__(self, leak_warn_s: float | None = None):
+        self.leak_warn_s = leak_warn_s or float(os.getenv("MENIR_NEO4J_LEAK_WARN_S", "300"))
+        self.config: dict[str, Any] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        self.acquisition = Histogram()
+        self.lifetimes: dict[str, Histogram] = defaultdict(Histogram)
+        self.retries: dict[str, int] = defaultdict(int)
+        self.transactions: dict[str, int] = defaultdict(int)
+        self.leaked: dict[str, int] = defaultdict(int)
+        self._open: dict[int, tuple[str, float]] = {}
+
+    def session_opened(self, session_id: int, call_site: str) -> None:
+        self._open[session_id] = (call_site, time.monotonic())
+
+    def session_closed(self, session_id: int) -> None:
+        opened = self._open.pop(session_id, None)
+        if opened:
+            call_site, started = opened
+            self.lifetimes[call_site].observe((time.monotonic() - started) * 1000)
+
+    def session_leaked(self, session_id: int) -> None:
+        opened = self._open.pop(session_id, None)
+        if opened:
+            self.leaked[opened[0]] += 1
+            logger.warning(f"🚰 Sessão Neo4j aberta em {opened[0]} foi coletada sem close().")
+
+    def snapshot(self) -> dict[str, Any]:
+        now = time.monotonic()
+        open_by_site: dict[str, dict[str, Any]] = {}
+        for call_site, started in self._open.values():
+            age = now - started
+            entry = open_by_site.setdefault(call_site, {"open": 0, "oldest_s": 0.0})
+            entry["open"] += 1
+            entry["oldest_s"] = round(max(entry["oldest_s"], age), 3)
+        for call_site, entry in open_by_site.items():
+            if entry["oldest_s"] > self.leak_warn_s:
+                logger.warning(
+                    f"⏳ {entry['open']} sessão(ões) Neo4j de {call_site} abertas há {entry['oldest_s']:.0f}s "
+                    f"(> MENIR_NEO4J_LEAK_WARN_S={self.leak_warn_s:.0f})."
+                )
+
+        slowest = sorted(self.lifetimes.items(), key=lambda kv: kv[1].max, reverse=True)
+        return {
+            "config": self.config,
+            "acquisition_wait": self.acquisition.snapshot(),
+            "open_sessions": sum(e["open"] for e in open_by_site.values()),
+            "open_by_call_site": open_by_site,
+            "session_lifetime_by_call_site": {site: h.snapshot() for site, h in slowest},
+            "transactions": dict(self.transactions),
+            "tx_retries": dict(self.retries),
+            "leaked_sessions": dict(self.leaked),
+        }
+
+
+_default: PoolMetrics | None = None
+
+
+def get_pool_metrics() -> PoolMetrics:
+    global _default
+    if _default is None:
+        _default = PoolMetrics()
+    return _default
+
+
+def _call_site() -> str:
+    """módulo:função do primeiro frame fora das camadas de acesso ao driver."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "?")
+        if module.rsplit(".", 1)[-1] not in _PASS_THROUGH:
+            return f"{module}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class InstrumentedSession:
+    """Delegação transparente para AsyncSession, medindo tempo de vida, espera e retries."""
+
+    def __init__(self, session: Any, metrics: PoolMetrics, call_site: str):
+        self._session = session
+        self._metrics = metrics
+        self._call_site = call_site
+        self._closed = False
+        metrics.session_opened(id(self), call_site)
+
+        connect = getattr(session, "_connect", None)
+        if connect is not None:
+            @functools.wraps(connect)
+            async def _timed_connect(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await connect(*args, **kwargs)
+                finally:
+                    metrics.acquisition.observe((time.perf_counter() - started) * 1000)
+
+            session._connect = _timed_connect
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
+
+    async def __aenter__(self) -> "InstrumentedSession":
+        await self._session.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        try:
+            return await self._session.__aexit__(exc_type, exc_value, traceback)
+        finally:
+            self._mark_closed()
+
+    async def close(self) -> None:
+        try:
+            await self._session.close()
+        finally:
+            self._mark_closed()
+
+    def _mark_closed(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._metrics.session_closed(id(self))
+
+    async def execute_read(self, transaction_function, *args, **kwargs):
+        return await self._session.execute_read(self._counted(transaction_function), *args, **kwargs)
+
+    async def execute_write(self, transaction_function, *args, **kwargs):
+        return await self._session.execute_write(self._counted(transaction_function), *args, **kwargs)
+
+    def _counted(self, transaction_function):
+        """Conta tentativas; wraps preserva timeout/metadata de @unit_of_work."""
+        metrics, call_site = self._metrics, self._call_site
+        attempts = 0
+
+        @functools.wraps(transaction_function)
+        async def _attempt(tx, *args, **kwargs):
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                metrics.transactions[call_site] += 1
+            else:
+                metrics.retries[call_site] += 1
+            return await transaction_function(tx, *args, **kwargs)
+
+        return _attempt
+
+    def __del__(self):
+        if not self.__dict__.get("_closed", True):
+            self._metrics.session_leaked(id(self))
+
+
+class InstrumentedDriver:
+    """AsyncDriver com sessões instrumentadas; o resto é delegado ao driver original."""
+
+    def __init__(self, driver: Any, metrics: PoolMetrics | None = None):
+        self._driver = driver
+        self.metrics = metrics or get_pool_metrics()
+
+    def session(self, **kwargs) -> InstrumentedSession:
+        return InstrumentedSession(self._driver.session(**kwargs), self.metrics, _call_site())
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._driver, name)
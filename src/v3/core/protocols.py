@@ -20,7 +20,7 @@ class ReconciliationProtocol(Protocol):
     """
     Contrato para o motor de Reconciliação Cypher.
     """
-    def run_matching_cycle(self) -> None:
+    async def run_matching_cycle(self) -> None:
         ...
 
 @runtime_checkable
@@ -28,7 +28,7 @@ class EventRunner(Protocol):
     """
     Contrato do Control Plane para o Synapse.
     """
-    def _quarantine_document(self, file_path: str, tenant: str) -> None:
+    async def _quarantine_document(self, file_path: str, tenant: str) -> None:
         ...
     def flush_quarantine(self) -> None:
         ...
@@ -8,11 +8,29 @@ linked to the invoking Agent and the affected Entity, complying with Swiss nFADP
 import json
 import logging
 import uuid
+from datetime import datetime, timezone
 
+from src.v3.core.write_behind import register_statement
 from src.v3.meta_cognition import MenirOntologyManager
 
 logger = logging.getLogger("MenirProv")
 
+# MERGE por event_id: replay do spill file não duplica eventos.
+# Se houver um Entity ID Alvo (ElementId do Neo4j ou um UID lógico), a gente amarra a teia.
+# Devido à natureza abstrata (target pode ser Tenant, Invoice, etc) usamos um MATCH abrangente.
+register_statement("prov_event", """
+UNWIND $rows AS row
+MERGE (a:Agent {name: row.agent})
+MERGE (e:Event {event_id: row.event_id})
+ON CREATE SET e.timestamp = datetime(row.at),
+              e.action = row.action,
+              e.metadata = row.meta_json
+MERGE (a)-[:TRIGGERED]->(e)
+WITH e, row WHERE row.target_node_id IS NOT NULL
+MATCH (target) WHERE target.uid = row.target_node_id OR target.elementId = row.target_node_id OR target.name = row.target_node_id
+MERGE (e)-[:AFFECTED]->(target)
+""")
+
 
 class MenirProv:
     def __init__(self, ontology_manager: MenirOntologyManager):
@@ -31,55 +49,32 @@ class MenirProv:
             "CRESUS_EXPORT_FORCED",
         }
 
-    def record_event(
+    async def record_event(
         self, agent: str, action: str, target_metadata: dict, target_node_id: str | None = None
     ):
         """
         Gera um registro na malha de eventos PROV-O do Neo4j.
         (Agent)-[:TRIGGERED]->(Event)-[:AFFECTED]->(Entity)
+        Write-behind: eventos de um mesmo ciclo descem num único UNWIND.
         """
         # Proteção contra Inflação de Vértices: Descarte passivo precoce O(1).
         if action not in self.REGISTERABLE_ACTIONS:
             logger.debug(f"🔇 Evento passivo {action} ignorado pelo auditor PROV-O.")
             return
 
-        event_id = f"evt_{uuid.uuid4().hex[:12]}"
-        meta_json = json.dumps(target_metadata, ensure_ascii=False)
-
-        # A montagem base do Agente e do Evento
-        query = """
-        MERGE (a:Agent {name: $agent})
-        CREATE (e:Event {
-            event_id: $event_id,   # noqa: W291
-            timestamp: datetime(),   # noqa: W291
-            action: $action,   # noqa: W291
-            metadata: $meta_json
-        })
-        MERGE (a)-[:TRIGGERED]->(e)
-        """
-
-        # Se houver um Entity ID Alvo (ElementId do Neo4j ou um UID lógico), a gente amarra a teia.
-        # Devido à natureza abstrata (target pode ser Tenant, Invoice, etc) usaremos um MATCH abrangente
-        # na variável de amarração se um ID for fornecido.
-        if target_node_id:
-            query += """
-            WITH e
-            MATCH (target) WHERE target.uid = $target_node_id OR target.elementId = $target_node_id OR target.name = $target_node_id
-            MERGE (e)-[:AFFECTED]->(target)
-            """
+        row = {
+            "agent": agent,
+            "event_id": f"evt_{uuid.uuid4().hex[:12]}",
+            "action": action,
+            "meta_json": json.dumps(target_metadata, ensure_ascii=False),
+            "target_node_id": target_node_id,
+            "at": datetime.now(timezone.utc).isoformat(),
+        }
 
         logger.info(f"📜 Registrando Evento de Auditoria PROV-O: {agent} -> {action}")
 
         try:
-            with self.ontology_manager.driver.session() as session:
-                session.run(
-                    query,
-                    agent=agent,
-                    event_id=event_id,
-                    action=action,
-                    meta_json=meta_json,
-                    target_node_id=target_node_id,
-                )
+            await self.ontology_manager.write_behind.enqueue("prov_event", row)
         except Exception as e:
             # Em sistemas críticos, falha de log não deve derrubar a execução, apenas alarmar severamente.
             logger.critical(
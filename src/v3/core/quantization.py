@@ -0,0 +1,351 @@
+"""
+Menir Core V5.2 - Int8 Scalar Quantization for Embeddings
+Compacts 768-dim float vectors into int8 byte arrays (per-vector scale/offset).
+The compact codes feed a first-pass local ANN scan; the top candidates are
+re-ranked against the full-precision vectors fetched on demand from the graph.
+
+Layout no grafo (modo int8):
+  (n:Label:`Tenant`) {embedding_q: byte[], embedding_scale, embedding_offset}
+  (n)-[:HAS_FULL_EMBEDDING]->(:FullEmbedding:`Tenant` {uid, embedding: float[]})
+
+O vetor float sai do nó quente e vai para um nó frio, lido apenas no re-ranking.
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from src.v3.core.neo4j_pool import get_shared_driver
+from src.v3.tenant_middleware import CAUSAL, EVENTUAL, READ, WRITE, session_options, tenant_database
+
+logger = logging.getLogger("menir.quantization")
+
+# Labels que carregam embeddings de 768 dimensões no grafo
+QUANTIZABLE_LABELS = ("Lead", "Event", "Product", "Concept", "Chunk")
+
+INT8_LEVELS = 255.0
+INT8_SHIFT = 128.0
+
+# Neo4j armazena float[] como double (8 bytes/elemento) + cabeçalho do array
+_NEO4J_ARRAY_HEADER_BYTES = 16
+
+
+def quantization_enabled() -> bool:
+    """Feature flag lida em tempo de chamada (MENIR_EMBEDDING_QUANTIZATION=int8)."""
+    return os.getenv("MENIR_EMBEDDING_QUANTIZATION", "float").strip().lower() == "int8"
+
+
+def rerank_factor() -> int:
+    """Quantos candidatos por resultado final a busca int8 envia ao re-ranking float."""
+    return max(1, int(os.getenv("MENIR_QUANTIZED_RERANK_FACTOR", 4)))
+
+
+def index_ttl() -> float:
+    """Validade (s) do índice int8 local; depois disso é recarregado do grafo."""
+    return float(os.getenv("MENIR_QUANTIZED_INDEX_TTL", 300))
+
+
+@dataclass(frozen=True)
+class QuantizedVector:
+    data: bytes
+    scale: float
+    offset: float
+
+    def dequantize(self) -> np.ndarray:
+        return dequantize_int8(self.data, self.scale, self.offset)
+
+
+def quantize_int8(vector: Any) -> QuantizedVector:
+    """
+    Affine min/max quantization: x ≈ scale * (q + 128) + offset, q ∈ [-128, 127].
+    Erro máximo por componente = scale / 2.
+    """
+    arr = np.asarray(vector, dtype=np.float32)
+    if arr.ndim != 1 or arr.size == 0:
+        raise ValueError("quantize_int8 espera um vetor 1-D não vazio.")
+
+    lo = float(arr.min())
+    hi = float(arr.max())
+    scale = (hi - lo) / INT8_LEVELS
+    if scale == 0.0:
+        # Vetor constante: qualquer escala positiva reconstrói exatamente via offset
+        scale = 1.0
+
+    codes = np.clip(np.rint((arr - lo) / scale) - INT8_SHIFT, -128, 127).astype(np.int8)
+    return QuantizedVector(data=codes.tobytes(), scale=scale, offset=lo)
+
+
+def dequantize_int8(data: bytes, scale: float, offset: float) -> np.ndarray:
+    codes = np.frombuffer(bytes(data), dtype=np.int8).astype(np.float32)
+    return (codes + INT8_SHIFT) * np.float32(scale) + np.float32(offset)
+
+
+def cosine_rerank(
+    query: Any, candidates: dict[str, Any], top_k: int
+) -> list[tuple[str, float]]:
+    """Re-ranking exato (cosseno) sobre os vetores full-precision dos candidatos."""
+    if not candidates:
+        return []
+    q = np.asarray(query, dtype=np.float32)
+    q_norm = float(np.linalg.norm(q)) or 1.0
+    uids = list(candidates.keys())
+    matrix = np.asarray([candidates[u] for u in uids], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1)
+    norms[norms == 0.0] = 1.0
+    scores = (matrix @ q) / (norms * q_norm)
+    order = np.argsort(-scores)[:top_k]
+    return [(uids[i], float(scores[i])) for i in order]
+
+
+class QuantizedVectorIndex:
+    """
+    Índice local em memória sobre os códigos int8.
+    A varredura é um produto matriz-vetor int8→float32 com a correção afim
+    aplicada por linha, sem desquantizar a matriz inteira.
+    """
+
+    def __init__(self, dim: int = 768):
+        self.dim = dim
+        self._uids: list[str] = []
+        self._positions: dict[str, int] = {}
+        self._codes = np.empty((0, dim), dtype=np.int8)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._offsets = np.empty(0, dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._uids)
+
+    def __contains__(self, uid: str) -> bool:
+        return uid in self._positions
+
+    @property
+    def nbytes(self) -> int:
+        return int(
+            self._codes.nbytes + self._scales.nbytes + self._offsets.nbytes + self._norms.nbytes
+        )
+
+    def add_many(self, rows: list[tuple[str, bytes, float, float]]) -> None:
+        """Adiciona (uid, codes, scale, offset); uids repetidos são substituídos."""
+        fresh: list[tuple[str, bytes, float, float]] = []
+        for uid, data, scale, offset in rows:
+            if len(data) != self.dim:
+                raise ValueError(
+                    f"Código int8 com {len(data)} bytes; índice espera {self.dim} dimensões."
+                )
+            pos = self._positions.get(uid)
+            if pos is None:
+                fresh.append((uid, data, scale, offset))
+                continue
+            self._codes[pos] = np.frombuffer(bytes(data), dtype=np.int8)
+            self._scales[pos] = scale
+            self._offsets[pos] = offset
+            self._norms[pos] = np.linalg.norm(dequantize_int8(data, scale, offset)) or 1.0
+
+        if not fresh:
+            return
+
+        codes = np.frombuffer(b"".join(bytes(r[1]) for r in fresh), dtype=np.int8).reshape(
+            len(fresh), self.dim
+        )
+        scales = np.asarray([r[2] for r in fresh], dtype=np.float32)
+        offsets = np.asarray([r[3] for r in fresh], dtype=np.float32)
+        restored = (codes.astype(np.float32) + INT8_SHIFT) * scales[:, None] + offsets[:, None]
+        norms = np.linalg.norm(restored, axis=1).astype(np.float32)
+        norms[norms == 0.0] = 1.0
+
+        base = len(self._uids)
+        for i, row in enumerate(fresh):
+            self._positions[row[0]] = base + i
+            self._uids.append(row[0])
+        self._codes = np.vstack([self._codes, codes])
+        self._scales = np.concatenate([self._scales, scales])
+        self._offsets = np.concatenate([self._offsets, offsets])
+        self._norms = np.concatenate([self._norms, norms])
+
+    def add(self, uid: str, qv: QuantizedVector) -> None:
+        self.add_many([(uid, qv.data, qv.scale, qv.offset)])
+
+    def search(self, query: Any, top_k: int) -> list[tuple[str, float]]:
+        """Top-k aproximado por cosseno sobre os vetores reconstruídos."""
+        if not self._uids or top_k <= 0:
+            return []
+        y = np.asarray(query, dtype=np.float32)
+        y_norm = float(np.linalg.norm(y)) or 1.0
+        y_sum = float(y.sum())
+
+        # x_i · y = scale_i * (q_i · y + 128 * Σy) + offset_i * Σy
+        raw = self._codes.astype(np.float32) @ y
+        dots = self._scales * (raw + INT8_SHIFT * y_sum) + self._offsets * y_sum
+        scores = dots / (self._norms * y_norm)
+
+        k = min(top_k, len(self._uids))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        ordered = candidates[np.argsort(-scores[candidates])]
+        return [(self._uids[i], float(scores[i])) for i in ordered]
+
+
+def embedding_memory_report(n_vectors: int, dim: int = 768) -> dict[str, Any]:
+    """
+    Estimativa de bytes no property store (page cache) por representação.
+    float: double[dim]; int8: byte[dim] + scale/offset (2 doubles).
+    """
+    float_bytes = n_vectors * (dim * 8 + _NEO4J_ARRAY_HEADER_BYTES)
+    int8_bytes = n_vectors * (dim + _NEO4J_ARRAY_HEADER_BYTES + 2 * 8)
+    return {
+        "vectors": n_vectors,
+        "dimensions": dim,
+        "float_bytes": float_bytes,
+        "int8_bytes": int8_bytes,
+        "saved_bytes": float_bytes - int8_bytes,
+        "compression_ratio": round(float_bytes / int8_bytes, 2) if int8_bytes else 0.0,
+    }
+
+
+class QuantizedVectorStore:
+    """
+    Busca semântica int8 apoiada no grafo, com um índice local por (tenant, label).
+    O índice é carregado preguiçosamente e atualizado a cada embedding persistido
+    neste processo; escritas de outros processos entram quando o índice expira
+    (MENIR_QUANTIZED_INDEX_TTL). Índice vazio não é guardado.
+    """
+
+    _indexes: dict[tuple[str, str], QuantizedVectorIndex] = {}
+    _loaded_at: dict[tuple[str, str], float] = {}
+
+    @staticmethod
+    def _safe(value: str) -> str:
+        return value.replace("`", "").replace(";", "")
+
+    @classmethod
+    def invalidate(cls, tenant: str | None = None, label: str | None = None) -> None:
+        for key in list(cls._indexes):
+            if (tenant is None or key[0] == tenant) and (label is None or key[1] == label):
+                del cls._indexes[key]
+                cls._loaded_at.pop(key, None)
+
+    @classmethod
+    def full_embedding_uid(cls, label: str, node_id: str) -> str:
+        """uid do :FullEmbedding de um nó. node_id é sempre n.uid: a busca int8 só enxerga nós com uid."""
+        return f"{cls._safe(label)}:{node_id}"
+
+    @classmethod
+    async def persist(
+        cls, label: str, node_id: str, embedding: list[float], tenant: str, driver: Any = None
+    ) -> QuantizedVector:
+        """Grava o código int8 no nó e move o vetor float para o :FullEmbedding frio."""
+        qv = quantize_int8(embedding)
+        safe_label = cls._safe(label)
+        safe_tenant = cls._safe(tenant)
+        query = f"""
+        MATCH (n:`{safe_label}`:`{safe_tenant}` {{uid: $node_id}})
+        SET n.embedding_q = $codes,
+            n.embedding_scale = $scale,
+            n.embedding_offset = $offset,
+            n.embedded_at = datetime()
+        REMOVE n.embedding
+        MERGE (f:FullEmbedding:`{safe_tenant}` {{uid: $full_uid}})
+        SET f.embedding = $embedding, f.label = $label
+        MERGE (n)-[:HAS_FULL_EMBEDDING]->(f)
+        """
+        driver = driver or get_shared_driver()
+        async with driver.session(database=tenant_database(tenant), **session_options(WRITE)) as session:
+            await session.run(
+                query,
+                node_id=node_id,
+                codes=qv.data,
+                scale=qv.scale,
+                offset=qv.offset,
+                full_uid=cls.full_embedding_uid(label, node_id),
+                embedding=list(embedding),
+                label=safe_label,
+            )
+
+        index = cls._indexes.get((tenant, label))
+        if index is not None and index.dim == len(qv.data):
+            index.add(node_id, qv)
+        return qv
+
+    @classmethod
+    async def _load_index(cls, label: str, tenant: str, driver: Any) -> QuantizedVectorIndex:
+        key = (tenant, label)
+        if key in cls._indexes and time.monotonic() - cls._loaded_at[key] < index_ttl():
+            return cls._indexes[key]
+
+        query = f"""
+        MATCH (n:`{cls._safe(label)}`:`{cls._safe(tenant)}`)
+        WHERE n.embedding_q IS NOT NULL
+        RETURN n.uid AS uid, n.embedding_q AS codes,
+               n.embedding_scale AS scale, n.embedding_offset AS offset
+        """
+        rows: list[tuple[str, bytes, float, float]] = []
+        async with driver.session(database=tenant_database(tenant), **session_options(READ, CAUSAL)) as session:
+            result = await session.run(query)
+            async for record in result:
+                rows.append(
+                    (record["uid"], bytes(record["codes"]), record["scale"], record["offset"])
+                )
+
+        if not rows:
+            # Nada quantizado ainda: não fixa a dimensão nem esconde os próximos embeddings
+            cls.invalidate(tenant, label)
+            return QuantizedVectorIndex()
+
+        index = QuantizedVectorIndex(dim=len(rows[0][1]))
+        index.add_many(rows)
+        cls._indexes[key] = index
+        cls._loaded_at[key] = time.monotonic()
+        logger.info(
+            f"🗜️ Índice int8 carregado: {label}@{tenant} ({len(index)} vetores, {index.nbytes} bytes)."
+        )
+        return index
+
+    @classmethod
+    async def search(
+        cls,
+        query_embedding: list[float],
+        label: str,
+        tenant: str,
+        top_k: int = 5,
+        driver: Any = None,
+    ) -> list[dict]:
+        """
+        Primeira passada int8 local (top_k * rerank_factor) → re-ranking float
+        com os vetores full-precision buscados sob demanda.
+        Mesmo formato de saída de EmbeddingService.semantic_search.
+        """
+        driver = driver or get_shared_driver()
+        index = await cls._load_index(label, tenant, driver)
+        shortlist = index.search(query_embedding, top_k * rerank_factor())
+        if not shortlist:
+            return []
+
+        query = f"""
+        MATCH (n:`{cls._safe(label)}`:`{cls._safe(tenant)}`)-[:HAS_FULL_EMBEDDING]->(f:FullEmbedding)
+        WHERE n.uid IN $uids
+        RETURN n.uid AS id, n.name AS name, n.status AS status, n.text AS text,
+               f.embedding AS embedding
+        """
+        details: dict[str, dict] = {}
+        async with driver.session(database=tenant_database(tenant), **session_options(READ, EVENTUAL)) as session:
+            result = await session.run(query, uids=[uid for uid, _ in shortlist])
+            async for record in result:
+                details[record["id"]] = record.data()
+
+        ranked = cosine_rerank(
+            query_embedding, {uid: d["embedding"] for uid, d in details.items()}, top_k
+        )
+        return [
+            {
+                "id": uid,
+                "name": details[uid]["name"],
+                "status": details[uid]["status"],
+                "text": details[uid]["text"],
+                "score": score,
+            }
+            for uid, score in ranked
+        ]
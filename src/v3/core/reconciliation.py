@@ -1,154 +1,284 @@
 """
 Menir Core V5.1 - Hybrid Reconciliation Engine
-Orchestrates Cypher-based matching algorithms to bind Invoices to Bank Transactions.
+Orchestrates matching algorithms to bind Invoices to Bank Transactions.
 Establishes Tiers of confidence for accounting auto-reconciliation.
 """
 
 import logging
+import time
+from concurrent.futures import Executor
 
+import numpy as np
+
+from src.v3.core.columnar import InvoiceBatch, StringDictionary, TransactionBatch
+from src.v3.core.concurrency import cpu_pool, run_in_custom_executor
+from src.v3.core.graph_access import KeysetCursor
+from src.v3.core.reconciliation_assignment import assignment_pool
+from src.v3.core.reconciliation_subset import RECONCILED_BY, GroupMatch, match_groups, open_after
+from src.v3.core.reconciliation_sweep import TIER_2, TIERS, OpenItems, TierMatches, match_tiers
 from src.v3.meta_cognition import MenirOntologyManager
+from src.v3.tenant_middleware import CAUSAL
 
 logger = logging.getLogger("ReconciliationEngine")
 
+# Linhas por UNWIND dentro da transação única de escrita dos matches
+WRITE_BATCH_SIZE = 5000
+
 
 from src.v3.core.schemas.identity import TenantContext
 
 class ReconciliationEngine:
-    def __init__(self, ontology_manager: MenirOntologyManager):
+    def __init__(self, ontology_manager: MenirOntologyManager, assignment_executor: Executor | None = None):
         self.ontology_manager = ontology_manager
+        # Assignment por componente fora do GIL (pool de processos, ver reconciliation_assignment)
+        self.assignment_executor = assignment_executor or assignment_pool()
 
-    def run_matching_cycle(self):
+    async def run_matching_cycle(self):
         """
-        Executes the hierarchical Cypher cascading match between Invoices and Transactions.
+        Executes the hierarchical cascading match between Invoices and Transactions:
+        open nodes are loaded once, matched in memory (tier 0 by creditor
+        reference, then sort-and-sweep on amount/date; see
+        src/v3/core/reconciliation_sweep.py), reduced to a 1:1 min-cost
+        assignment per ambiguity cluster (reconciliation_assignment.py); what
+        stays open is searched for grouped payments (one transfer for several
+        invoices, or instalments) by bounded subset-sum per counterparty
+        (reconciliation_subset.py). Everything is written back in one transaction.
         """
         tenant = TenantContext.get()
         if not tenant:
             raise ValueError("Reconciliation requires an active TenantContext.")
             
         logger.info(f"🔄 Iniciando Ciclo de Reconciliação para o Tenant: {tenant}")
-        self._tier_1_exact_match(tenant)
-        self._tier_2_fuzzy_match(tenant)
-        logger.info(f"✅ Ciclo de Reconciliação finalizado para {tenant}.")
+        started = time.perf_counter()
+        invoices, transactions = await self._load_open_items(tenant)
+        reference_pairs = await self._load_reference_pairs(tenant, invoices, transactions)
+        loaded = time.perf_counter()
+        # CPU-bound (sweep + assignment): fora do event loop
+        results = await run_in_custom_executor(
+            # executor posicional: run_in_custom_executor já tem um parâmetro `executor`
+            cpu_pool, match_tiers, invoices, transactions, TIERS, self.assignment_executor,
+            reference_pairs=reference_pairs,
+        )
+        groups = await run_in_custom_executor(
+            cpu_pool, match_groups, invoices, transactions, *open_after(invoices, transactions, results)
+        )
+        swept = time.perf_counter()
+        await self._write_matches(tenant, invoices, transactions, results, groups)
 
-    def _tier_1_exact_match(self, tenant: str):
-        """
-        TIER 1 (Exact Match):
-        Tolerance of 0.05 on amount, payment within 30 days after invoice issue.
-        """
+        for matches in results:
+            icon = "⚠️" if matches.tier is TIER_2 else "🎯"
+            source = "com a mesma referência" if matches.tier.by_reference else "na faixa de valor"
+            logger.info(
+                f"{icon} [{matches.tier.name}] {matches.tier.rel_type}: {len(matches)} pares "
+                f"({matches.candidates} candidatos {source}, {matches.clusters} clusters ambíguos resolvidos)"
+            )
+        if groups:
+            logger.info(
+                f"🧩 [{RECONCILED_BY}] {len(groups)} grupos: "
+                f"{sum(g.kind == 'many_to_one' for g in groups)} transferências para várias faturas, "
+                f"{sum(g.kind == 'split' for g in groups)} faturas pagas em parcelas"
+            )
+        logger.info(
+            f"✅ Ciclo de Reconciliação finalizado para {tenant}: {len(invoices)} faturas x {len(transactions)} transações "
+            f"(load {(loaded - started) * 1000:.0f}ms, match {(swept - loaded) * 1000:.0f}ms, "
+            f"write {(time.perf_counter() - swept) * 1000:.0f}ms)."
+        )
+
+    async def _load_open_items(self, tenant: str) -> tuple[OpenItems, OpenItems]:
+        """Invoices e Transactions abertas do tenant em lotes colunares (streaming), depois OpenItems."""
         safe_tenant = tenant.replace("`", "")
-        query = f"""
-        // TIER 1: EXACT MATCH
+        invoice_query = f"""
         MATCH (t:Tenant {{name: $tenant}})-[:RECEIVED]->(i:Invoice:`{safe_tenant}`)
-        WHERE NOT (i)-[:RECONCILED]->() AND NOT (i)-[:RECONCILED_NEEDS_REVIEW]->()
+        WHERE NOT (i)-[:RECONCILED]->() AND NOT (i)-[:RECONCILED_NEEDS_REVIEW]->() AND NOT (i)-[:RECONCILED_BY]->()
           AND i.total_amount IS NOT NULL AND i.issue_date IS NOT NULL
-
-        MATCH (t)-[:OWNS_ACCOUNT]->(ba:BankAccount)-[:HAS_TRANSACTION]->(tr:Transaction:`{safe_tenant}`)
-        WHERE NOT ()-[:RECONCILED]->(tr) AND NOT ()-[:RECONCILED_NEEDS_REVIEW]->(tr)
+        RETURN DISTINCT elementId(i) AS id, toFloat(i.total_amount) AS amount,
+               duration.inDays(date("1970-01-01"), date(i.issue_date)).days AS day,
+               i.currency AS currency, i.vendor_iban AS iban, i.vendor_name AS party
+        """
+        tx_query = f"""
+        MATCH (t:Tenant {{name: $tenant}})-[:OWNS_ACCOUNT]->(ba:BankAccount)-[:HAS_TRANSACTION]->(tr:Transaction:`{safe_tenant}`)
+        WHERE NOT ()-[:RECONCILED]->(tr) AND NOT ()-[:RECONCILED_NEEDS_REVIEW]->(tr) AND NOT ()-[:RECONCILED_BY]->(tr)
           AND tr.amount IS NOT NULL AND tr.booking_date IS NOT NULL
-
-        // Constraints
-        WITH i, tr, abs(i.total_amount - abs(tr.amount)) AS delta,
-             duration.inDays(date(i.issue_date), date(tr.booking_date)).days AS days_diff
-               # noqa: W293
-        WHERE delta <= 0.05   # noqa: W291
-          AND days_diff >= 0   # noqa: W291
-          AND days_diff <= 30
-          AND i.currency = tr.currency
-
-        // Materialize
-        MERGE (i)-[r:RECONCILED]->(tr)
-        SET r.confidence = "HIGH", r.delta = delta, r.reconciled_at = datetime()
-          # noqa: W293
-        RETURN count(r) as matched_count
+        RETURN DISTINCT elementId(tr) AS id, toFloat(tr.amount) AS amount,
+               duration.inDays(date("1970-01-01"), date(tr.booking_date)).days AS day,
+               tr.currency AS currency, tr.counterparty_iban AS iban, tr.counterparty_name AS party
         """
-        with self.ontology_manager.driver.session() as session:
-            result = session.run(query, tenant=tenant).single()
-            count = result["matched_count"] if result else 0
-            logger.info(f"🎯 [TIER 1] Exact Matches encontrados e reconciliados: {count}")
+        graph = self.ontology_manager.graph
+        # Mesmo dicionário de moeda dos dois lados: o sweep compara os códigos
+        shared = {"currency": StringDictionary()}
+        # Causal: o ciclo precisa ver as faturas/transações que a ingestão acabou de gravar
+        invoices = await InvoiceBatch.from_stream(
+            graph.stream(invoice_query, {"tenant": tenant}, tenant=tenant, consistency=CAUSAL),
+            shared,
+            keys={"issue_date": "day", "vendor_iban": "iban", "vendor_name": "party"},
+        )
+        transactions = await TransactionBatch.from_stream(
+            graph.stream(tx_query, {"tenant": tenant}, tenant=tenant, consistency=CAUSAL),
+            shared,
+            keys={"booking_date": "day", "counterparty_iban": "iban", "counterparty_name": "party"},
+        )
+        return OpenItems.from_batch(invoices), OpenItems.from_batch(transactions)
 
-    def _tier_2_fuzzy_match(self, tenant: str):
+    async def _load_reference_pairs(
+        self, tenant: str, invoices: OpenItems, transactions: OpenItems
+    ) -> tuple[np.ndarray, np.ndarray]:
         """
-        TIER 2 (Fuzzy Match):
-        Delta up to 5% (to absorb FX rates), payment within 45 days after invoice issue.
+        Candidatos do tier 0 pelo grafo, a partir das faturas abertas já carregadas:
+        seek por elementId em cada uma e, para as que têm referência, seek no
+        índice payment_reference da Transaction (migração 5). Faturas fechadas
+        nunca são lidas; pares com transação já fechada são descartados aqui.
         """
+        if not len(invoices) or not len(transactions):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
         safe_tenant = tenant.replace("`", "")
         query = f"""
-        // TIER 2: FUZZY MATCH
-        MATCH (t:Tenant {{name: $tenant}})-[:RECEIVED]->(i:Invoice:`{safe_tenant}`)
-        WHERE NOT (i)-[:RECONCILED]->() AND NOT (i)-[:RECONCILED_NEEDS_REVIEW]->()
-          AND i.total_amount IS NOT NULL AND i.issue_date IS NOT NULL
+        UNWIND $invoice_ids AS invoice_id
+        MATCH (i:Invoice:`{safe_tenant}`)
+        WHERE elementId(i) = invoice_id AND i.payment_reference IS NOT NULL
+        MATCH (tr:Transaction:`{safe_tenant}`)
+        USING INDEX tr:Transaction(payment_reference)
+        WHERE tr.payment_reference = i.payment_reference
+        RETURN elementId(i) AS i, elementId(tr) AS t
+        """
+        invoice_at = {node_id: k for k, node_id in enumerate(invoices.ids)}
+        transaction_at = {node_id: k for k, node_id in enumerate(transactions.ids)}
+        pairs_inv: list[int] = []
+        pairs_tx: list[int] = []
+        graph = self.ontology_manager.graph
+        params = {"invoice_ids": list(invoices.ids)}
+        async for row in graph.stream(query, params, tenant=tenant, consistency=CAUSAL):
+            i, t = invoice_at.get(row["i"]), transaction_at.get(row["t"])
+            if i is not None and t is not None:
+                pairs_inv.append(i)
+                pairs_tx.append(t)
+        return np.asarray(pairs_inv, dtype=np.int64), np.asarray(pairs_tx, dtype=np.int64)
 
-        MATCH (t)-[:OWNS_ACCOUNT]->(ba:BankAccount)-[:HAS_TRANSACTION]->(tr:Transaction:`{safe_tenant}`)
-        WHERE NOT ()-[:RECONCILED]->(tr) AND NOT ()-[:RECONCILED_NEEDS_REVIEW]->(tr)
-          AND tr.amount IS NOT NULL AND tr.booking_date IS NOT NULL
+    async def _write_matches(
+        self,
+        tenant: str,
+        invoices: OpenItems,
+        transactions: OpenItems,
+        results: list[TierMatches],
+        groups: list[GroupMatch] | None = None,
+    ) -> None:
+        """Todos os tiers e grupos numa única transação de escrita, em lotes UNWIND."""
+        batches = [
+            (matches.tier, rows[i : i + WRITE_BATCH_SIZE])
+            for matches in results
+            if len(matches)
+            for rows in [matches.rows(invoices, transactions)]
+            for i in range(0, len(rows), WRITE_BATCH_SIZE)
+        ]
+        group_rows = [row for group in groups or [] for row in group.rows(invoices, transactions)]
+        if not batches and not group_rows:
+            return
 
-        // Constraints
-        WITH i, tr, abs(i.total_amount - abs(tr.amount)) AS delta,
-             duration.inDays(date(i.issue_date), date(tr.booking_date)).days AS days_diff
-               # noqa: W293
-        // Fuzzy margin: delta <= 5% of invoice total
-        WHERE delta <= (i.total_amount * 0.05)
-          AND days_diff >= 0   # noqa: W291
-          AND days_diff <= 45
-          AND i.currency = tr.currency
-
-        // Materialize
-        MERGE (i)-[r:RECONCILED_NEEDS_REVIEW]->(tr)
-        SET r.confidence = "MEDIUM", r.delta = delta, r.reconciled_at = datetime()
-          # noqa: W293
-        RETURN count(r) as matched_count
-        """
-        with self.ontology_manager.driver.session() as session:
-            result = session.run(query, tenant=tenant).single()
-            count = result["matched_count"] if result else 0
-            logger.info(f"⚠️ [TIER 2] Fuzzy Matches encaminhados para revisão: {count}")
+        async def _work(tx):
+            for tier, rows in batches:
+                result = await tx.run(
+                    f"""
+                    UNWIND $rows AS row
+                    MATCH (i:Invoice) WHERE elementId(i) = row.i
+                    MATCH (tr:Transaction) WHERE elementId(tr) = row.t
+                    MERGE (i)-[r:{tier.rel_type}]->(tr)
+                    SET r.confidence = $confidence, r.score = row.score, r.delta = row.delta, r.tier = $tier,
+                        r.reconciled_at = datetime()
+                    """,
+                    {"rows": rows, "confidence": tier.confidence, "tier": tier.name},
+                )
+                await result.consume()
+            for i in range(0, len(group_rows), WRITE_BATCH_SIZE):
+                result = await tx.run(
+                    f"""
+                    UNWIND $rows AS row
+                    MATCH (i:Invoice) WHERE elementId(i) = row.i
+                    MATCH (tr:Transaction) WHERE elementId(tr) = row.t
+                    MERGE (i)-[r:{RECONCILED_BY}]->(tr)
+                    SET r.group_id = row.group, r.kind = row.kind, r.group_size = row.size,
+                        r.score = row.score, r.delta = row.delta, r.reconciled_at = datetime()
+                    """,
+                    {"rows": group_rows[i : i + WRITE_BATCH_SIZE]},
+                )
+                await result.consume()
+
+        await self.ontology_manager.graph.transaction(_work, tenant=tenant)
 
-    def get_quarantine_nodes(self) -> dict:
+    def stream_quarantine_nodes(self, kind: str, after: str | None = None) -> KeysetCursor:
         """
-        TIER 3 (Quarantine / Orphans):
-        Returns Invoices and Transactions older than 45 days without reconciliation,
-        or those with critical extraction failures (missing amounts/dates).
+        TIER 3 (Quarantine / Orphans), streamed:
+        Invoices ("invoice") or Transactions ("transaction") older than 45 days
+        without reconciliation, or with critical extraction failures (missing
+        amounts/dates). Pages by the MERGE key (Invoice.uid / Transaction.tx_key),
+        so every page is an index seek instead of a label scan; both keys are
+        always set (persist assigns uid, migration 6 backfills tx_key). Yields
+        {"properties": {...}, "key": <uid|tx_key>}; resume with after=<key>.
         """
         tenant = TenantContext.get()
         if not tenant:
             raise ValueError("Quarantine scan requires an active TenantContext.")
-            
+
         safe_tenant = tenant.replace("`", "")
 
-        invoice_query = f"""
-        MATCH (t:Tenant {{name: $tenant}})-[:RECEIVED]->(i:Invoice:`{safe_tenant}`)
-        WHERE NOT (i)-[:RECONCILED]->() AND NOT (i)-[:RECONCILED_NEEDS_REVIEW]->()
-        WITH i,   # noqa: W291
-             CASE WHEN i.issue_date IS NOT NULL   # noqa: W291
-                  THEN duration.inDays(date(i.issue_date), date()).days   # noqa: W291
-                  ELSE 999   # noqa: W291
-             END AS days_old
-        WHERE days_old > 45 OR i.total_amount IS NULL OR i.issue_date IS NULL
-        RETURN i {{.*}} AS properties
-        """
+        if kind == "invoice":
+            query = f"""
+            MATCH (i:Invoice:`{safe_tenant}`)
+            USING INDEX i:Invoice(uid)
+            WHERE i.uid IS NOT NULL AND {{keyset}}
+            MATCH (t:Tenant {{name: $tenant}})-[:RECEIVED]->(i)
+            WHERE NOT (i)-[:RECONCILED]->() AND NOT (i)-[:RECONCILED_NEEDS_REVIEW]->() AND NOT (i)-[:RECONCILED_BY]->()
+            WITH i,
+                 CASE WHEN i.issue_date IS NOT NULL
+                      THEN duration.inDays(date(i.issue_date), date()).days
+                      ELSE 999
+                 END AS days_old
+            WHERE days_old > 45 OR i.total_amount IS NULL OR i.issue_date IS NULL
+            RETURN i {{.*}} AS properties, i.uid AS key
+            """
+            keyset = [("key", "i.uid")]
+        elif kind == "transaction":
+            query = f"""
+            MATCH (tr:Transaction:`{safe_tenant}`)
+            USING INDEX tr:Transaction(tx_key)
+            WHERE tr.tx_key IS NOT NULL AND {{keyset}}
+            MATCH (t:Tenant {{name: $tenant}})-[:OWNS_ACCOUNT]->(ba:BankAccount)-[:HAS_TRANSACTION]->(tr)
+            WHERE NOT ()-[:RECONCILED]->(tr) AND NOT ()-[:RECONCILED_NEEDS_REVIEW]->(tr) AND NOT ()-[:RECONCILED_BY]->(tr)
+            WITH tr,
+                 CASE WHEN tr.booking_date IS NOT NULL
+                      THEN duration.inDays(date(tr.booking_date), date()).days
+                      ELSE 999
+                 END AS days_old
+            WHERE days_old > 45 OR tr.amount IS NULL OR tr.booking_date IS NULL
+            RETURN tr {{.*}} AS properties, tr.tx_key AS key
+            """
+            keyset = [("key", "tr.tx_key")]
+        else:
+            raise ValueError(f"Tipo de quarentena inválido: {kind}")
 
-        tx_query = f"""
-        MATCH (t:Tenant {{name: $tenant}})-[:OWNS_ACCOUNT]->(ba:BankAccount)-[:HAS_TRANSACTION]->(tr:Transaction:`{safe_tenant}`)
-        WHERE NOT ()-[:RECONCILED]->(tr) AND NOT ()-[:RECONCILED_NEEDS_REVIEW]->(tr)
-        WITH tr,   # noqa: W291
-             CASE WHEN tr.booking_date IS NOT NULL   # noqa: W291
-                  THEN duration.inDays(date(tr.booking_date), date()).days   # noqa: W291
-                  ELSE 999   # noqa: W291
-             END AS days_old
-        WHERE days_old > 45 OR tr.amount IS NULL OR tr.booking_date IS NULL
-        RETURN tr {{.*}} AS properties
-        """
+        return self.ontology_manager.graph.paginate(
+            query,
+            {"tenant": tenant},
+            keyset=keyset,
+            after=[after] if after else None,
+            tenant=tenant,
+            consistency=CAUSAL,
+        )
 
+    async def get_quarantine_nodes(self) -> dict:
+        """
+        TIER 3 (Quarantine / Orphans) as a single payload, built page by page
+        from stream_quarantine_nodes (callers that can consume incrementally
+        should iterate the stream instead).
+        """
         from typing import Any
         payload: dict[str, list[dict[str, Any]]] = {"orphaned_invoices": [], "orphaned_transactions": []}
 
+        invoices = self.stream_quarantine_nodes("invoice")
+        transactions = self.stream_quarantine_nodes("transaction")
         try:
-            with self.ontology_manager.driver.session() as session:
-                inv_result = session.run(invoice_query, tenant=tenant)
-                payload["orphaned_invoices"] = [r["properties"] for r in inv_result]
-
-                tx_result = session.run(tx_query, tenant=tenant)
-                payload["orphaned_transactions"] = [r["properties"] for r in tx_result]
+            async for row in invoices:
+                payload["orphaned_invoices"].append(row["properties"])
+            async for row in transactions:
+                payload["orphaned_transactions"].append(row["properties"])
         except Exception as e:
             logger.exception(f"Failed to query quarantine nodes: {e}")
 
@@ -157,6 +287,5 @@ class ReconciliationEngine:
         )
         return payload
 
-
 if __name__ == "__main__":
     pass
@@ -0,0 +1,289 @@
+"""
+Menir Core V5.2 - Optimal Assignment for Ambiguous Reconciliation Candidates
+Os joins do sweep (reconciliation_sweep.py) devolvem TODOS os pares que passam
+no tier: 3 mensalidades iguais do mesmo fornecedor na mesma janela viram 9
+arestas. Aqui cada tier é resolvido como assignment 1:1 de custo mínimo:
+
+  1. score por par: 1 - média(delta / tolerância, distância em dias / janela)
+  2. grafo de candidatos esparsificado: cada fatura mantém os
+     MAX_CANDIDATES_PER_INVOICE melhores pares
+  3. componentes conexas (hook + pointer jumping em numpy); componente com
+     uma aresta só é casada direto
+  4. o resto é resolvido por caminho aumentante mínimo (Hungarian / Jonker-
+     Volgenant denso), componentes em paralelo; componente maior que
+     MAX_COMPONENT_SIDE é cortada em blocos de faturas (por data) resolvidos
+     em sequência com as transações que sobraram
+
+O laço do caminho aumentante é Python sobre vetores pequenos e segura o GIL:
+threads não escalam. O ReconciliationEngine usa um pool de PROCESSOS
+(assignment_pool(), MENIR_RECON_EXECUTOR=process); assign() sem executor cai
+no pool de threads do módulo, útil só para componentes pequenas e testes.
+
+A confiança do par escolhido é o score descontado pela melhor alternativa que
+disputava a mesma fatura ou transação: cluster sem disputa = score; empate
+perfeito = metade do score.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from src.v3.core.reconciliation_sweep import MatchTier, OpenItems, TierMatches
+
+# Lado máximo (faturas ou transações) de uma matriz densa resolvida de uma vez
+MAX_COMPONENT_SIDE = int(os.getenv("MENIR_RECON_MAX_COMPONENT", "128"))
+# Pares mantidos por fatura antes de montar as componentes
+MAX_CANDIDATES_PER_INVOICE = int(os.getenv("MENIR_RECON_MAX_CANDIDATES", "8"))
+RECON_WORKERS = int(os.getenv("MENIR_RECON_WORKERS", "4"))
+# "process" (default): componentes resolvidas em processos; "thread": no pool de threads
+RECON_EXECUTOR = os.getenv("MENIR_RECON_EXECUTOR", "process").strip().lower()
+
+# Custo de "não é candidato": maior que qualquer soma de custos reais (<= 1 por par)
+_FORBIDDEN = 1e9
+# Componentes por tarefa do pool (componentes pequenas não pagam o overhead do executor)
+_COMPONENTS_PER_TASK = 256
+
+_pool: ThreadPoolExecutor | None = None
+_process_pool: ProcessPoolExecutor | None = None
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=RECON_WORKERS, thread_name_prefix="MenirRecon")
+    return _pool
+
+
+def assignment_pool() -> Executor:
+    """Executor do assignment para o engine: processos (spawn, sem herdar threads/driver) ou threads."""
+    global _process_pool
+    if RECON_EXECUTOR == "thread":
+        return _executor()
+    if _process_pool is None:
+        # Workers sobem sob demanda no primeiro submit
+        _process_pool = ProcessPoolExecutor(
+            max_workers=RECON_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+def pair_scores(
+    invoices: "OpenItems", transactions: "OpenItems", tier: "MatchTier", inv: np.ndarray, tx: np.ndarray, delta: np.ndarray
+) -> np.ndarray:
+    """Score [0, 1] por par: valor e prazo, cada um relativo à folga do tier."""
+    tolerance = np.maximum(tier.tolerance(invoices.amount[inv]), 0.01)
+    days = transactions.day[tx] - invoices.day[inv]
+    # Distância ao pagamento "ideal" (mesmo dia), relativa ao lado da janela em que caiu
+    reach = np.where(days >= 0, max(tier.max_days, 1), max(-tier.min_days, 1))
+    cost = 0.5 * np.minimum(delta / tolerance, 1.0) + 0.5 * np.minimum(np.abs(days) / reach, 1.0)
+    return 1.0 - cost
+
+
+def linear_assignment(cost: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Assignment de custo mínimo (caminho aumentante mínimo com potenciais, O(n²·m)).
+    Retorna (linhas, colunas) com min(n, m) pares; a varredura de colunas é vetorizada.
+    """
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=np.int64)  # linha (1-based) dona da coluna; 0 = livre
+    way = np.zeros(m + 1, dtype=np.int64)
+    # Potenciais iniciais viáveis (u = mínimo da linha) e casamento guloso nas arestas justas:
+    # só as linhas que disputam a mesma coluna passam pelo caminho aumentante
+    u[1:] = cost.min(axis=1)
+    pending = []
+    for row, col in enumerate(np.argmin(cost, axis=1).tolist(), start=1):
+        if owner[col + 1] == 0:
+            owner[col + 1] = row
+        else:
+            pending.append(row)
+    for row in pending:
+        owner[0] = row
+        col = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[col] = True
+            current = owner[col]
+            free = ~used[1:]
+            reduced = cost[current - 1] - u[current] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = col
+            candidates = np.where(free, minv[1:], np.inf)
+            nxt = int(np.argmin(candidates)) + 1
+            step = candidates[nxt - 1]
+            visited = np.flatnonzero(used)
+            u[owner[visited]] += step
+            v[visited] -= step
+            minv[1:][free] -= step
+            col = nxt
+            if owner[col] == 0:
+                break
+        while col:
+            prev = way[col]
+            owner[col] = owner[prev]
+            col = prev
+
+    cols = np.flatnonzero(owner[1:])
+    rows = owner[cols + 1] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def connected_components(inv: np.ndarray, tx: np.ndarray, n_invoices: int) -> np.ndarray:
+    """Rótulo de componente por aresta (faturas e transações no mesmo espaço de nós)."""
+    a = inv.astype(np.int64)
+    b = tx.astype(np.int64) + n_invoices
+    nodes, inverse = np.unique(np.concatenate([a, b]), return_inverse=True)
+    a, b = inverse[: len(inv)], inverse[len(inv):]
+    parent = np.arange(len(nodes))
+    while True:
+        pa, pb = parent[a], parent[b]
+        if np.array_equal(pa, pb):
+            return pa
+        low = np.minimum(pa, pb)
+        np.minimum.at(parent, pa, low)
+        np.minimum.at(parent, pb, low)
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+
+def _solve_dense(inv: np.ndarray, tx: np.ndarray, cost: np.ndarray) -> np.ndarray:
+    """Índices (nas arestas dadas) do assignment ótimo de uma componente pequena."""
+    inv_ids, inv_local = np.unique(inv, return_inverse=True)
+    tx_ids, tx_local = np.unique(tx, return_inverse=True)
+    if len(inv_ids) == 1 or len(tx_ids) == 1:
+        return np.array([int(np.argmin(cost))])
+    matrix = np.full((len(inv_ids), len(tx_ids)), _FORBIDDEN)
+    edge = np.full((len(inv_ids), len(tx_ids)), -1, dtype=np.int64)
+    # Arestas duplicadas não existem: cada par sai uma vez do join
+    matrix[inv_local, tx_local] = cost
+    edge[inv_local, tx_local] = np.arange(len(cost))
+    rows, cols = linear_assignment(matrix)
+    chosen = edge[rows, cols]
+    return chosen[matrix[rows, cols] < _FORBIDDEN]
+
+
+def _solve_component(inv: np.ndarray, tx: np.ndarray, cost: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """Componente limitada a MAX_COMPONENT_SIDE por lado; maior que isso vira blocos por data."""
+    inv_ids, inv_local = np.unique(inv, return_inverse=True)
+    tx_ids, tx_local = np.unique(tx, return_inverse=True)
+    if len(inv_ids) <= MAX_COMPONENT_SIDE and len(tx_ids) <= MAX_COMPONENT_SIDE:
+        return _solve_dense(inv, tx, cost)
+
+    # Bloco de cada aresta = posição da fatura na ordem por data // MAX_COMPONENT_SIDE
+    rank = np.empty(len(inv_ids), dtype=np.int64)
+    rank[np.argsort(day[inv_ids], kind="stable")] = np.arange(len(inv_ids))
+    block = rank[inv_local] // MAX_COMPONENT_SIDE
+    # Dentro do bloco, arestas por custo: o corte do lado das transações fica com as melhores
+    by_block = np.lexsort((cost, block))
+    bounds = np.flatnonzero(np.r_[True, block[by_block][1:] != block[by_block][:-1], True])
+
+    taken = np.zeros(len(tx_ids), dtype=bool)
+    chosen = []
+    for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        edges = by_block[start:stop]
+        edges = edges[~taken[tx_local[edges]]]
+        if not len(edges):
+            continue
+        _, first = np.unique(tx_local[edges], return_index=True)
+        if len(first) > MAX_COMPONENT_SIDE:
+            allowed = np.zeros(len(tx_ids), dtype=bool)
+            allowed[tx_local[edges[np.sort(first)[:MAX_COMPONENT_SIDE]]]] = True
+            edges = edges[allowed[tx_local[edges]]]
+        picked = edges[_solve_dense(inv[edges], tx[edges], cost[edges])]
+        taken[tx_local[picked]] = True
+        chosen.append(picked)
+    return np.concatenate(chosen) if chosen else np.empty(0, dtype=np.int64)
+
+
+def _solve_batch(components: list[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]], day: np.ndarray) -> list[np.ndarray]:
+    return [edges[_solve_component(inv, tx, cost, day)] for edges, inv, tx, cost in components]
+
+
+def _best_alternative(nodes: np.ndarray, score: np.ndarray, chosen: np.ndarray) -> np.ndarray:
+    """Para cada aresta escolhida: melhor score entre as OUTRAS arestas do mesmo nó (0 se não há)."""
+    order = np.lexsort((-score, nodes))
+    sorted_nodes = nodes[order]
+    first = np.r_[True, sorted_nodes[1:] != sorted_nodes[:-1]]
+    starts = np.flatnonzero(first)
+    group = np.cumsum(first) - 1
+    top1_edge = order[starts]
+    has_second = np.r_[starts[1:], len(order)] - starts > 1
+    top2 = np.where(has_second, score[order[np.minimum(starts + 1, len(order) - 1)]], 0.0)
+
+    position = np.empty(len(order), dtype=np.int64)
+    position[order] = np.arange(len(order))
+    g = group[position[chosen]]
+    return np.where(top1_edge[g] == chosen, top2[g], score[top1_edge[g]])
+
+
+def assign(
+    invoices: "OpenItems", transactions: "OpenItems", matches: "TierMatches", executor: Executor | None = None
+) -> "TierMatches":
+    """Reduz os pares candidatos de um tier a um assignment 1:1 ótimo, com confiança por par."""
+    from src.v3.core.reconciliation_sweep import TierMatches
+
+    tier = matches.tier
+    if not len(matches):
+        return TierMatches(tier, matches.invoice, matches.transaction, matches.delta, matches.candidates, np.empty(0))
+
+    score = pair_scores(invoices, transactions, tier, matches.invoice, matches.transaction, matches.delta)
+    # Esparsificação: melhores MAX_CANDIDATES_PER_INVOICE pares de cada fatura
+    order = np.lexsort((-score, matches.invoice))
+    by_invoice = matches.invoice[order]
+    first = np.r_[True, by_invoice[1:] != by_invoice[:-1]]
+    rank = np.arange(len(order)) - np.maximum.accumulate(np.where(first, np.arange(len(order)), 0))
+    kept = np.sort(order[rank < MAX_CANDIDATES_PER_INVOICE])
+    inv, tx, cost = matches.invoice[kept], matches.transaction[kept], 1.0 - score[kept]
+
+    label = connected_components(inv, tx, len(invoices))
+    by_label = np.argsort(label, kind="stable")
+    bounds = np.flatnonzero(np.r_[True, label[by_label][1:] != label[by_label][:-1], True])
+    sizes = np.diff(bounds)
+
+    # Componente de uma aresta: casamento direto, sem matriz
+    singles = by_label[bounds[:-1][sizes == 1]]
+    components = [
+        (edges, inv[edges], tx[edges], cost[edges])
+        for start, stop in zip(bounds[:-1][sizes > 1].tolist(), bounds[1:][sizes > 1].tolist())
+        for edges in [by_label[start:stop]]
+    ]
+    # Tarefas equilibradas: maiores componentes primeiro, distribuídas em rodízio
+    components.sort(key=lambda c: len(c[0]), reverse=True)
+    tasks = min(len(components), max(RECON_WORKERS * 4, -(-len(components) // _COMPONENTS_PER_TASK)))
+    batches = [components[k::tasks] for k in range(tasks)]
+    if len(batches) > 1:
+        solved = [e for part in (executor or _executor()).map(_solve_batch, batches, [invoices.day] * len(batches)) for e in part]
+    else:
+        solved = [e for batch in batches for e in _solve_batch(batch, invoices.day)]
+    chosen = np.sort(np.concatenate([singles, *solved])) if solved else np.sort(singles)
+
+    kept_score = score[kept]
+    alternative = np.maximum(
+        _best_alternative(inv, kept_score, chosen), _best_alternative(tx, kept_score, chosen)
+    )
+    confidence = kept_score[chosen] * (1.0 - alternative / 2.0)
+    return TierMatches(
+        tier,
+        inv[chosen],
+        tx[chosen],
+        matches.delta[kept][chosen],
+        matches.candidates,
+        np.round(confidence, 4),
+        clusters=len(components),
+    )
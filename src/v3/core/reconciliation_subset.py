@@ -0,0 +1,221 @@
+"""
+Menir Core V5.2 - Grouped Reconciliation (bounded subset-sum)
+Roda depois dos tiers 1:1 (reconciliation_sweep.py), sobre o que ficou aberto:
+
+  many_to_one -> uma transferência paga N faturas do mesmo credor
+  split       -> uma fatura paga em N parcelas
+
+A busca é sempre restrita a um contraparte (IBAN normalizado; sem IBAN, o
+nome normalizado), à mesma moeda, a uma janela de datas e a no máximo
+MAX_SET_SIZE itens. Para cada alvo, os MAX_SEARCH_ITEMS candidatos mais
+próximos na data entram num meet-in-the-middle: somas de subconjuntos de cada
+metade (podadas acima do alvo), uma metade ordenada e busca binária da faixa
+de tolerância para cada soma da outra. O(2 · C(n/2, k)) em vez de O(C(n, k)).
+
+Cada grupo vira arestas (:Invoice)-[:RECONCILED_BY]->(:Transaction) com o
+mesmo group_id e um score combinado (valor, prazo médio e tamanho do grupo).
+"""
+
+import hashlib
+import itertools
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+from src.v3.core.reconciliation_sweep import OpenItems, TierMatches
+
+RECONCILED_BY = "RECONCILED_BY"
+MANY_TO_ONE = "many_to_one"
+SPLIT = "split"
+
+MAX_SET_SIZE = int(os.getenv("MENIR_RECON_MAX_SET", "4"))
+MAX_SEARCH_ITEMS = int(os.getenv("MENIR_RECON_SUBSET_ITEMS", "24"))
+GROUP_TOLERANCE = 0.05
+GROUP_MAX_DAYS = 45
+# Cada item a mais no grupo custa confiança: mais combinações possíveis, mais chance de acaso
+_SIZE_DECAY = 0.9
+
+
+@dataclass
+class GroupMatch:
+    kind: str
+    invoices: list[int]
+    transactions: list[int]
+    delta: float
+    score: float
+
+    def group_id(self, invoices: OpenItems, transactions: OpenItems) -> str:
+        """Estável entre ciclos: hash dos elementIds do grupo."""
+        members = sorted(invoices.ids[i] for i in self.invoices) + sorted(transactions.ids[t] for t in self.transactions)
+        return hashlib.sha1("|".join(members).encode()).hexdigest()[:16]
+
+    def rows(self, invoices: OpenItems, transactions: OpenItems) -> list[dict[str, Any]]:
+        """Uma linha por par fatura x transação do grupo (UNWIND de escrita)."""
+        group = self.group_id(invoices, transactions)
+        size = len(self.invoices) + len(self.transactions)
+        return [
+            {
+                "i": invoices.ids[i], "t": transactions.ids[t], "group": group, "kind": self.kind,
+                "size": size, "delta": self.delta, "score": self.score,
+            }
+            for i in self.invoices
+            for t in self.transactions
+        ]
+
+
+@lru_cache(maxsize=128)
+def _combinations(n: int, size: int) -> np.ndarray:
+    return np.array(list(itertools.combinations(range(n), size)), dtype=np.int64)
+
+
+def _half_sums(amounts: np.ndarray, offset: int, max_size: int, limit: float) -> tuple[np.ndarray, np.ndarray, list[tuple[int, ...]]]:
+    """Somas de todos os subconjuntos (inclusive o vazio) de até max_size itens, podadas em limit."""
+    sums, sizes, members = [np.zeros(1)], [np.zeros(1, dtype=np.int64)], [()]
+    for size in range(1, min(max_size, len(amounts)) + 1):
+        combos = _combinations(len(amounts), size)
+        totals = amounts[combos].sum(axis=1)
+        fits = totals <= limit
+        # Valores positivos: se nenhum subconjunto deste tamanho cabe, os maiores também não
+        if not fits.any():
+            break
+        sums.append(totals[fits])
+        sizes.append(np.full(int(fits.sum()), size))
+        members.extend(tuple(offset + k for k in combo) for combo in combos[fits].tolist())
+    return np.concatenate(sums), np.concatenate(sizes), members
+
+
+def subset_sum(
+    amounts: np.ndarray, target: float, tolerance: float = GROUP_TOLERANCE, max_size: int = MAX_SET_SIZE
+) -> tuple[tuple[int, ...], float] | None:
+    """
+    Meet-in-the-middle: subconjunto de 2..max_size índices com |soma - target| <= tolerance.
+    Entre os válidos, o de menor delta e depois o menor. amounts precisa ser positivo.
+    """
+    limit = target + tolerance
+    usable = np.flatnonzero((amounts > 0) & (amounts <= limit))
+    if len(usable) < 2:
+        return None
+    values = amounts[usable]
+    middle = len(values) // 2
+    left_sum, left_size, left_members = _half_sums(values[:middle], 0, max_size, limit)
+    right_sum, right_size, right_members = _half_sums(values[middle:], middle, max_size, limit)
+
+    order = np.argsort(right_sum, kind="stable")
+    sorted_sum = right_sum[order]
+    lo = np.searchsorted(sorted_sum, target - left_sum - tolerance - 1e-9, "left")
+    hi = np.searchsorted(sorted_sum, target - left_sum + tolerance + 1e-9, "right")
+    counts = hi - lo
+    if not counts.sum():
+        return None
+    left = np.repeat(np.arange(len(left_sum)), counts)
+    right = order[np.repeat(lo - (np.cumsum(counts) - counts), counts) + np.arange(int(counts.sum()))]
+    size = left_size[left] + right_size[right]
+    delta = np.abs(left_sum[left] + right_sum[right] - target)
+    keep = (size >= 2) & (size <= max_size) & (delta <= tolerance + 1e-9)
+    if not keep.any():
+        return None
+    left, right, size, delta = left[keep], right[keep], size[keep], delta[keep]
+    best = np.lexsort((size, np.round(delta, 2)))[0]
+    chosen = tuple(sorted(int(usable[k]) for k in left_members[left[best]] + right_members[right[best]]))
+    return chosen, float(delta[best])
+
+
+def _group_score(delta: float, tolerance: float, days: np.ndarray, size: int) -> float:
+    amount_score = 1.0 - 0.5 * min(delta / tolerance, 1.0) if tolerance else 1.0
+    date_score = 1.0 - 0.5 * float(np.mean(np.abs(days))) / GROUP_MAX_DAYS
+    return round(amount_score * date_score * _SIZE_DECAY ** (size - 2), 4)
+
+
+def open_after(invoices: OpenItems, transactions: OpenItems, results: list[TierMatches]) -> tuple[np.ndarray, np.ndarray]:
+    """Máscaras do que os tiers 1:1 deixaram aberto."""
+    invoice_open = np.ones(len(invoices), dtype=bool)
+    transaction_open = np.ones(len(transactions), dtype=bool)
+    for matches in results:
+        invoice_open[matches.invoice] = False
+        transaction_open[matches.transaction] = False
+    return invoice_open, transaction_open
+
+
+def _search(
+    targets: OpenItems,
+    target_rows: np.ndarray,
+    pool: OpenItems,
+    pool_rows: np.ndarray,
+    target_open: np.ndarray,
+    pool_open: np.ndarray,
+    direction: int,
+) -> list[tuple[int, tuple[int, ...], float, np.ndarray]]:
+    """
+    Para cada alvo (transação em many_to_one, fatura em split) procura um subconjunto
+    do pool da mesma contraparte. direction: +1 se o pool vem depois do alvo.
+    """
+    found = []
+    pool_amount = np.abs(pool.amount)
+    for target in target_rows[np.argsort(targets.day[target_rows], kind="stable")].tolist():
+        if not target_open[target]:
+            continue
+        rows = pool_rows[pool_open[pool_rows]]
+        days = (pool.day[rows] - targets.day[target]) * direction
+        rows = rows[
+            (days >= 0)
+            & (days <= GROUP_MAX_DAYS)
+            & (pool.currency[rows] == targets.currency[target])
+            & (pool.currency[rows] >= 0)
+        ]
+        if len(rows) < 2:
+            continue
+        # Os mais próximos na data: a busca fica limitada mesmo com contrapartes volumosas
+        rows = rows[np.argsort(np.abs(pool.day[rows] - targets.day[target]), kind="stable")[:MAX_SEARCH_ITEMS]]
+        hit = subset_sum(pool_amount[rows], abs(float(targets.amount[target])))
+        if hit is None:
+            continue
+        members, delta = hit
+        chosen = rows[list(members)]
+        target_open[target] = False
+        pool_open[chosen] = False
+        found.append((target, tuple(chosen.tolist()), delta, pool.day[chosen] - targets.day[target]))
+    return found
+
+
+def match_groups(
+    invoices: OpenItems,
+    transactions: OpenItems,
+    invoice_open: np.ndarray | None = None,
+    transaction_open: np.ndarray | None = None,
+) -> list[GroupMatch]:
+    """Grupos many_to_one e split entre os itens abertos, contraparte a contraparte."""
+    invoice_open = np.ones(len(invoices), dtype=bool) if invoice_open is None else invoice_open.copy()
+    transaction_open = np.ones(len(transactions), dtype=bool) if transaction_open is None else transaction_open.copy()
+
+    groups = []
+    # Primeiro pelo IBAN; o que sobrar, pelo nome da contraparte
+    for column in ("iban", "party"):
+        inv_keys, tx_keys = getattr(invoices, column), getattr(transactions, column)
+        if not inv_keys or not tx_keys:
+            continue
+        by_party: dict[str, tuple[list[int], list[int]]] = {}
+        for i, key in enumerate(inv_keys):
+            if key and invoice_open[i]:
+                by_party.setdefault(key, ([], []))[0].append(i)
+        for t, key in enumerate(tx_keys):
+            if key and transaction_open[t] and key in by_party:
+                by_party[key][1].append(t)
+
+        for inv_rows, tx_rows in by_party.values():
+            if not tx_rows or len(inv_rows) + len(tx_rows) < 3:
+                continue
+            inv_rows_a, tx_rows_a = np.asarray(inv_rows), np.asarray(tx_rows)
+            for t, chosen, delta, days in _search(
+                transactions, tx_rows_a, invoices, inv_rows_a, transaction_open, invoice_open, -1
+            ):
+                score = _group_score(delta, GROUP_TOLERANCE, days, len(chosen) + 1)
+                groups.append(GroupMatch(MANY_TO_ONE, list(chosen), [t], delta, score))
+            for i, chosen, delta, days in _search(
+                invoices, inv_rows_a, transactions, tx_rows_a, invoice_open, transaction_open, 1
+            ):
+                score = _group_score(delta, GROUP_TOLERANCE, days, len(chosen) + 1)
+                groups.append(GroupMatch(SPLIT, [i], list(chosen), delta, score))
+    return groups
@@ -0,0 +1,329 @@
+"""
+Menir Core V5.2 - Sort-and-Sweep Reconciliation
+Substitui os tiers Cypher cartesianos (toda Invoice aberta x toda Transaction
+aberta, filtradas no banco) por um sweep em memória:
+
+  1. carrega uma vez as Invoices e Transactions abertas do tenant como colunas
+     compactas (elementId, valor, dia epoch, moeda)
+  2. ordena as transações por |amount|
+  3. para cada fatura, a faixa de tolerância de valor vira um intervalo
+     [lo, hi) no vetor ordenado (busca binária sobre faturas também
+     ordenadas: os dois ponteiros só avançam)
+  4. filtra os candidatos da faixa pela janela de datas e pela moeda
+
+O(n log n + m log m + candidatos) em vez de O(n·m). Os joins devolvem TODOS
+os pares que passam no filtro do tier (mesmo predicado dos tiers Cypher);
+match_tiers os reduz a um assignment 1:1 de custo mínimo por componente
+(reconciliation_assignment.py) e o tier seguinte só vê o que ficou aberto.
+
+Antes dos tiers de valor/data roda o tier 0: join exato pela referência
+do credor (QRR/SCOR da fatura x RmtInf do camt, normalizadas na ingestão).
+No ciclo do engine os pares vêm do grafo pelos índices payment_reference
+(migração 5); sem eles, hash join em memória sobre a coluna reference.
+Os candidatos são só os pares com a mesma chave, e o que ele fecha sai da
+faixa de valor dos tiers seguintes.
+"""
+
+from collections.abc import Callable
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from src.v3.core.columnar import ColumnarBatch
+
+# Folga relativa na busca da faixa: o filtro exato (mesma aritmética float do Cypher) vem depois
+_BAND_EPSILON = 1e-9
+
+# Teto de pares candidatos materializados de uma vez (memória ~ 40 bytes/par)
+MAX_CANDIDATES_PER_CHUNK = 2_000_000
+
+
+@dataclass(frozen=True)
+class MatchTier:
+    name: str
+    rel_type: str
+    confidence: str
+    abs_tolerance: float
+    rel_tolerance: float
+    max_days: int
+    min_days: int = 0
+    # True: candidatos vêm do join por payment_reference em vez da faixa de valor
+    by_reference: bool = False
+
+    def tolerance(self, amount: np.ndarray) -> np.ndarray:
+        """Delta máximo aceito por fatura (negativo = nenhum par possível)."""
+        return self.abs_tolerance + self.rel_tolerance * amount
+
+
+# TIER 0 (Reference Match): mesma referência do credor; valor até 5% (taxas, desconto), pagamento
+# parcial não casa; janela larga nos dois sentidos: no QR a issue_date é a data de ingestão
+TIER_0 = MatchTier(
+    "TIER 0", "RECONCILED", "HIGH", abs_tolerance=0.05, rel_tolerance=0.05, max_days=365, min_days=-365,
+    by_reference=True,
+)
+# TIER 1 (Exact Match): delta <= 0.05, pagamento 0..30 dias após a emissão
+TIER_1 = MatchTier("TIER 1", "RECONCILED", "HIGH", abs_tolerance=0.05, rel_tolerance=0.0, max_days=30)
+# TIER 2 (Fuzzy Match): delta <= 5% do total (absorve câmbio), 0..45 dias
+TIER_2 = MatchTier("TIER 2", "RECONCILED_NEEDS_REVIEW", "MEDIUM", abs_tolerance=0.0, rel_tolerance=0.05, max_days=45)
+TIERS = (TIER_0, TIER_1, TIER_2)
+
+
+@dataclass
+class OpenItems:
+    """Colunas compactas de nós abertos (sem RECONCILED/RECONCILED_NEEDS_REVIEW)."""
+
+    ids: list[str]
+    amount: np.ndarray  # float64; |amount| para transações é aplicado no sweep
+    day: np.ndarray  # int64, dias desde 1970-01-01
+    currency: np.ndarray  # int32, -1 = sem moeda (nunca casa, como null = null no Cypher)
+    reference: list[str | None] = field(default_factory=list)  # payment_reference normalizada (vazio = sem coluna)
+    iban: list[str | None] = field(default_factory=list)  # IBAN da contraparte, sem espaços
+    party: list[str | None] = field(default_factory=list)  # nome da contraparte, casefold
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows: list[dict[str, Any]], codes: dict[str, int]) -> "OpenItems":
+        """rows: {"id", "amount", "day", "currency"[, "reference", "iban", "party"]}; codes é compartilhado entre os dois lados."""
+        currency = np.fromiter(
+            (codes.setdefault(r["currency"], len(codes)) if r["currency"] is not None else -1 for r in rows),
+            dtype=np.int32,
+            count=len(rows),
+        )
+        return cls(
+            ids=[r["id"] for r in rows],
+            amount=np.fromiter((r["amount"] for r in rows), dtype=np.float64, count=len(rows)),
+            day=np.fromiter((r["day"] for r in rows), dtype=np.int64, count=len(rows)),
+            currency=currency,
+            reference=[r.get("reference") for r in rows],
+            iban=[_iban_key(r.get("iban")) for r in rows],
+            party=[_party_key(r.get("party")) for r in rows],
+        )
+
+    @classmethod
+    def from_batch(cls, batch: "ColumnarBatch") -> "OpenItems":
+        """
+        Colunas direto de um InvoiceBatch/TransactionBatch. Os dois lados
+        precisam compartilhar o dicionário de moeda (os códigos são comparados
+        como estão); IBAN e nome são normalizados uma vez por valor distinto.
+        """
+        return cls(
+            ids=batch.data["id"].tolist(),
+            amount=batch.money("amount"),
+            day=batch.days(batch.DATE_FIELD),
+            currency=batch.data["currency"],
+            reference=batch.data["payment_reference"].tolist(),
+            iban=_normalized(batch, batch.IBAN_FIELD, _iban_key),
+            party=_normalized(batch, batch.PARTY_FIELD, _party_key),
+        )
+
+
+def _iban_key(value: str | None) -> str | None:
+    return "".join(value.split()).upper() if value else None
+
+
+def _party_key(value: str | None) -> str | None:
+    return " ".join(value.casefold().split()) if value else None
+
+
+def _normalized(batch: "ColumnarBatch", name: str, normalize: Callable[[str | None], str | None]) -> list[str | None]:
+    values = batch.dictionaries[name].values
+    lookup = np.empty(len(values) + 1, dtype=object)
+    lookup[:-1] = [normalize(v) for v in values]
+    lookup[-1] = None
+    return lookup[batch.data[name]].tolist()
+
+
+@dataclass
+class TierMatches:
+    tier: MatchTier
+    invoice: np.ndarray  # índices em OpenItems das faturas
+    transaction: np.ndarray  # índices em OpenItems das transações
+    delta: np.ndarray
+    candidates: int = 0
+    score: np.ndarray | None = None  # confiança [0, 1] por par (após o assignment)
+    clusters: int = 0  # componentes com disputa resolvidas pelo assignment
+
+    def __len__(self) -> int:
+        return len(self.invoice)
+
+    def rows(self, invoices: OpenItems, transactions: OpenItems) -> list[dict[str, Any]]:
+        """Linhas para o UNWIND de escrita."""
+        score = self.score.tolist() if self.score is not None else [None] * len(self)
+        return [
+            {"i": invoices.ids[i], "t": transactions.ids[t], "delta": float(d), "score": s}
+            for i, t, d, s in zip(self.invoice.tolist(), self.transaction.tolist(), self.delta.tolist(), score)
+        ]
+
+
+def _filter_pairs(
+    invoices: OpenItems,
+    transactions: OpenItems,
+    tier: MatchTier,
+    inv: np.ndarray,
+    tx: np.ndarray,
+    tx_key: np.ndarray,
+    tolerance: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Predicado exato do tier sobre pares candidatos (valor, janela de datas, moeda)."""
+    delta = np.abs(invoices.amount[inv] - tx_key[tx])
+    days = transactions.day[tx] - invoices.day[inv]
+    keep = (
+        (delta <= tolerance[inv])
+        & (days >= tier.min_days)
+        & (days <= tier.max_days)
+        & (invoices.currency[inv] == transactions.currency[tx])
+        & (invoices.currency[inv] >= 0)
+    )
+    return inv[keep], tx[keep], delta[keep]
+
+
+def reference_join(
+    invoices: OpenItems,
+    transactions: OpenItems,
+    tier: MatchTier,
+    invoice_open: np.ndarray | None = None,
+    transaction_open: np.ndarray | None = None,
+    pairs: tuple[np.ndarray, np.ndarray] | None = None,
+) -> TierMatches:
+    """
+    Pares com a mesma payment_reference. pairs: (fatura, transação) já
+    casados pelo índice no grafo; sem eles, dict referência -> transações,
+    uma consulta por fatura.
+    """
+    empty = np.empty(0, dtype=np.int64)
+    if pairs is not None:
+        inv, tx = pairs
+        keep = np.ones(len(inv), dtype=bool)
+        if invoice_open is not None:
+            keep &= invoice_open[inv]
+        if transaction_open is not None:
+            keep &= transaction_open[tx]
+        candidates = int(keep.sum())
+        inv, tx, delta = _filter_pairs(
+            invoices, transactions, tier, inv[keep], tx[keep], np.abs(transactions.amount), tier.tolerance(invoices.amount)
+        )
+        return TierMatches(tier, inv, tx, delta, candidates)
+    if not invoices.reference or not transactions.reference:
+        return TierMatches(tier, empty, empty, np.empty(0))
+
+    by_reference: dict[str, list[int]] = {}
+    for t, reference in enumerate(transactions.reference):
+        if reference and (transaction_open is None or transaction_open[t]):
+            by_reference.setdefault(reference, []).append(t)
+
+    pairs_inv: list[int] = []
+    pairs_tx: list[int] = []
+    for i, reference in enumerate(invoices.reference):
+        if not reference or (invoice_open is not None and not invoice_open[i]):
+            continue
+        matched = by_reference.get(reference)
+        if matched:
+            pairs_inv.extend([i] * len(matched))
+            pairs_tx.extend(matched)
+    if not pairs_inv:
+        return TierMatches(tier, empty, empty, np.empty(0))
+
+    inv, tx, delta = _filter_pairs(
+        invoices,
+        transactions,
+        tier,
+        np.asarray(pairs_inv, dtype=np.int64),
+        np.asarray(pairs_tx, dtype=np.int64),
+        np.abs(transactions.amount),
+        tier.tolerance(invoices.amount),
+    )
+    return TierMatches(tier, inv, tx, delta, len(pairs_inv))
+
+
+def sweep(
+    invoices: OpenItems,
+    transactions: OpenItems,
+    tier: MatchTier,
+    invoice_open: np.ndarray | None = None,
+    transaction_open: np.ndarray | None = None,
+) -> TierMatches:
+    """Todos os pares (fatura, transação) que passam no tier, via faixa de valor ordenada."""
+    empty = np.empty(0, dtype=np.int64)
+    if not len(invoices) or not len(transactions):
+        return TierMatches(tier, empty, empty, np.empty(0))
+
+    tx_key = np.abs(transactions.amount)
+    order = np.argsort(tx_key, kind="stable")
+    if transaction_open is not None:
+        order = order[transaction_open[order]]
+    sorted_key = tx_key[order]
+
+    tolerance = tier.tolerance(invoices.amount)
+    candidates = np.flatnonzero((tolerance >= 0) & (invoices.currency >= 0))
+    if invoice_open is not None:
+        candidates = candidates[invoice_open[candidates]]
+    # Faturas em ordem de valor: lo/hi são monotônicos (sweep de dois ponteiros)
+    candidates = candidates[np.argsort(invoices.amount[candidates], kind="stable")]
+    amount = invoices.amount[candidates]
+    slack = _BAND_EPSILON * np.maximum(1.0, np.abs(amount))
+    lo = np.searchsorted(sorted_key, amount - tolerance[candidates] - slack, "left")
+    hi = np.searchsorted(sorted_key, amount + tolerance[candidates] + slack, "right")
+    counts = hi - lo
+
+    found_inv, found_tx, found_delta = [], [], []
+    total_candidates = int(counts.sum())
+    start = 0
+    while start < len(candidates):
+        # Fatia de faturas cujo total de candidatos cabe no teto de memória
+        cumulative = np.cumsum(counts[start:])
+        stop = start + max(1, int(np.searchsorted(cumulative, MAX_CANDIDATES_PER_CHUNK, "right")))
+        chunk_counts = counts[start:stop]
+        n = int(chunk_counts.sum())
+        if n:
+            inv = np.repeat(candidates[start:stop], chunk_counts)
+            first = np.repeat(lo[start:stop] - (np.cumsum(chunk_counts) - chunk_counts), chunk_counts)
+            tx = order[first + np.arange(n)]
+
+            inv, tx, delta = _filter_pairs(invoices, transactions, tier, inv, tx, tx_key, tolerance)
+            found_inv.append(inv)
+            found_tx.append(tx)
+            found_delta.append(delta)
+        start = stop
+
+    if not found_inv:
+        return TierMatches(tier, empty, empty, np.empty(0), total_candidates)
+    return TierMatches(
+        tier,
+        np.concatenate(found_inv),
+        np.concatenate(found_tx),
+        np.concatenate(found_delta),
+        total_candidates,
+    )
+
+
+def match_tiers(
+    invoices: OpenItems,
+    transactions: OpenItems,
+    tiers: tuple[MatchTier, ...] = TIERS,
+    executor: Executor | None = None,
+    reference_pairs: tuple[np.ndarray, np.ndarray] | None = None,
+) -> list[TierMatches]:
+    """
+    Tiers em cascata, cada um resolvido 1:1: nó casado num tier sai dos seguintes.
+    reference_pairs: candidatos do tier 0 vindos do índice (ver reference_join).
+    """
+    from src.v3.core.reconciliation_assignment import assign
+
+    invoice_open = np.ones(len(invoices), dtype=bool)
+    transaction_open = np.ones(len(transactions), dtype=bool)
+    results = []
+    for tier in tiers:
+        if tier.by_reference:
+            candidates = reference_join(invoices, transactions, tier, invoice_open, transaction_open, reference_pairs)
+        else:
+            candidates = sweep(invoices, transactions, tier, invoice_open, transaction_open)
+        matches = assign(invoices, transactions, candidates, executor)
+        invoice_open[matches.invoice] = False
+        transaction_open[matches.transaction] = False
+        results.append(matches)
+    return results
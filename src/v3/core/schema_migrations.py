@@ -0,0 +1,354 @@
+"""
+Menir Core V5.2 - Versioned Schema Migrations
+Declaração única de constraints e índices (range, full-text, vetoriais) dos
+quais o código depende — toda chave de MERGE precisa de um índice, senão o
+MERGE degrada para label scan.
+
+  MIGRATIONS        -> lista versionada e append-only (nunca editar uma versão
+                       aplicada: criar a próxima)
+  ensure_schema()   -> no startup: aplica versões pendentes (DDL IF NOT EXISTS,
+                       idempotente), grava (:SchemaMigration {version}) e
+                       confere o resultado com SHOW INDEXES
+  Migration.data    -> passo de dados opcional, roda antes dos objetos (ex:
+                       fundir duplicatas antes de uma constraint de unicidade)
+  uncovered_merge_keys() -> check de CI: varre o código por MERGE (n:Label {...})
+                       e acusa chaves sem constraint/índice declarado
+"""
+
+import logging
+import os
+import re
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from src.v3.core.graph_access import GraphAccess, get_graph, tenant_database
+from src.v3.core.schemas.identity import ALLOWED_TENANTS
+from src.v3.core.transaction_keys import dedup_transactions
+from src.v3.menir_bridge import FULLTEXT_INDEX, FULLTEXT_LABELS, FULLTEXT_PROPERTIES
+from src.v3.tenant_middleware import CAUSAL
+
+logger = logging.getLogger("SchemaMigrations")
+
+UNIQUE = "UNIQUE"
+RANGE = "RANGE"
+FULLTEXT = "FULLTEXT"
+VECTOR = "VECTOR"
+
+
+@dataclass(frozen=True)
+class SchemaObject:
+    """Constraint ou índice declarado. labels/properties na ordem do Cypher."""
+    name: str
+    kind: str
+    labels: tuple[str, ...]
+    properties: tuple[str, ...]
+    dimensions: int | None = None
+
+    def create_statement(self) -> str:
+        label = self.labels[0]
+        if self.kind == UNIQUE:
+            props = ", ".join(f"n.{p}" for p in self.properties)
+            return f"CREATE CONSTRAINT {self.name} IF NOT EXISTS FOR (n:{label}) REQUIRE ({props}) IS UNIQUE"
+        if self.kind == RANGE:
+            props = ", ".join(f"n.{p}" for p in self.properties)
+            return f"CREATE INDEX {self.name} IF NOT EXISTS FOR (n:{label}) ON ({props})"
+        if self.kind == FULLTEXT:
+            labels = "|".join(self.labels)
+            props = ", ".join(f"n.{p}" for p in self.properties)
+            return f"CREATE FULLTEXT INDEX {self.name} IF NOT EXISTS FOR (n:{labels}) ON EACH [{props}]"
+        if self.kind == VECTOR:
+            return (
+                f"CREATE VECTOR INDEX {self.name} IF NOT EXISTS FOR (n:{label}) ON (n.{self.properties[0]}) "
+                f"OPTIONS {{indexConfig: {{`vector.dimensions`: {self.dimensions}, "
+                f"`vector.similarity_function`: 'cosine'}}}}"
+            )
+        raise ValueError(f"Tipo de schema desconhecido: {self.kind}")
+
+    def covers(self, label: str, keys: Iterable[str]) -> bool:
+        """Um MERGE em (label, keys) faz index seek se todas as propriedades indexadas estão nas chaves."""
+        if self.kind not in (UNIQUE, RANGE) or label not in self.labels:
+            return False
+        return set(self.properties) <= set(keys)
+
+    def matches(self, row: dict) -> bool:
+        """Linha de SHOW INDEXES correspondente (constraints aparecem via owningConstraint)."""
+        if self.kind == FULLTEXT:
+            return row.get("name") == self.name and row.get("type") == FULLTEXT
+        if row.get("entityType") != "NODE":
+            return False
+        if list(row.get("labelsOrTypes") or []) != [self.labels[0]]:
+            return False
+        if list(row.get("properties") or []) != list(self.properties):
+            return False
+        if self.kind == UNIQUE:
+            return row.get("type") == RANGE and bool(row.get("owningConstraint"))
+        return row.get("type") == self.kind
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    objects: tuple[SchemaObject, ...] = field(default=())
+    # (graph, database) -> corrige os dados que os objetos exigem; precisa ser reexecutável
+    data: Callable[[GraphAccess, str | None], Awaitable[object]] | None = None
+
+
+def _unique(label: str, *props: str) -> SchemaObject:
+    return SchemaObject(f"{label.lower()}_{'_'.join(props)}_unique", UNIQUE, (label,), props)
+
+
+def _range(label: str, *props: str) -> SchemaObject:
+    return SchemaObject(f"{label.lower()}_{'_'.join(props)}_idx", RANGE, (label,), props)
+
+
+def _vector(name: str, label: str, dimensions: int) -> SchemaObject:
+    return SchemaObject(name, VECTOR, (label,), ("embedding",), dimensions)
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "Constraints de unicidade para chaves globais", (
+        _unique("SchemaMigration", "version"),
+        _unique("Tenant", "name"),
+        _unique("Lead", "id"),
+        _unique("Event", "id"),
+        _unique("Product", "id"),
+        _unique("BillingRule", "uid"),
+    )),
+    Migration(2, "Range indexes para chaves de MERGE/MATCH por tenant", (
+        # Documentos e ingestão
+        _range("Document", "uid"),
+        _range("Document", "file_hash"),
+        _range("Document", "sha256"),
+        _range("Chunk", "uid"),
+        _range("ImportBatch", "uid"),
+        _range("QuarantineItem", "uid"),
+        _range("Anomaly", "file_hash"),
+        _range("FullEmbedding", "uid"),
+        # Financeiro
+        _range("Invoice", "uid"),
+        _range("Invoice", "file_hash"),
+        _range("LineItem", "invoice_uid", "description"),
+        _range("Vendor", "name"),
+        _range("BankAccount", "iban"),
+        _range("Transaction", "tx_id"),
+        _range("Client", "uid"),
+        _range("Client", "name"),
+        # Nós do NodePersistenceOrchestrator (MERGE por uid)
+        _range("ClientNode", "uid"),
+        _range("EmployeeNode", "uid"),
+        _range("TaxDossierNode", "uid"),
+        _range("InsuranceNode", "uid"),
+        _range("SalarySlipNode", "uid"),
+        _range("TVADeclarationNode", "uid"),
+        _range("PersonNode", "uid"),
+        _range("ProjectNode", "uid"),
+        _range("LifeEventNode", "uid"),
+        _range("Insight", "uid"),
+        _range("Signal", "uid"),
+        _range("DecisionHub", "uid"),
+        _range("GoalNode", "uid"),
+        # Grafo pessoal / entidades da MenirBridge
+        _range("Person", "uuid"),
+        _range("Person", "name"),
+        # System graph (meta-cognição)
+        _range("Agent", "name"),
+        _range("CoreSystem", "name"),
+        _range("Pipeline", "name"),
+        _range("Dependency", "name"),
+        _range("Developer", "name"),
+        _range("Rule", "name"),
+        _range("TaxRule", "name"),
+        _range("GoldenExample", "tenant"),
+    )),
+    Migration(3, "Índices full-text e vetoriais de busca", (
+        SchemaObject(FULLTEXT_INDEX, FULLTEXT, FULLTEXT_LABELS, FULLTEXT_PROPERTIES),
+        _vector("menir_vectors", "Chunk", 384),
+        _vector("personnode_intent_index", "PersonNode", 768),
+        _vector("projectnode_intent_index", "ProjectNode", 768),
+        _vector("lifeeventnode_intent_index", "LifeEventNode", 768),
+        _vector("insightnode_intent_index", "InsightNode", 768),
+        _vector("goalnode_intent_index", "GoalNode", 768),
+        _vector("lead_intent_index", "Lead", 768),
+        _vector("event_context_index", "Event", 768),
+        _vector("product_index", "Product", 768),
+    )),
+    Migration(4, "Eventos PROV-O idempotentes (write-behind)", (
+        _range("Event", "event_id"),
+    )),
+    Migration(5, "Referência do credor (tier 0 da reconciliação)", (
+        _range("Invoice", "payment_reference"),
+        _range("Transaction", "payment_reference"),
+    )),
+    Migration(6, "Chave natural determinística das transações bancárias", (
+        # tx_key inclui o tenant: única globalmente sem vazar lançamentos entre tenants
+        _unique("Transaction", "tx_key"),
+        _range("Transaction", "legacy_key"),
+    ), data=dedup_transactions),
+    Migration(7, "Lote de importação camt (rollback/retomada de extratos parciais)", (
+        _range("Transaction", "import_batch"),
+    )),
+)
+
+
+def declared_objects(migrations: Iterable[Migration] = MIGRATIONS) -> list[SchemaObject]:
+    return [obj for migration in migrations for obj in migration.objects]
+
+
+@dataclass
+class SchemaReport:
+    database: str | None
+    applied: list[int] = field(default_factory=list)
+    missing: list[str] = field(default_factory=list)
+    not_online: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing and not self.not_online
+
+
+def _target_databases() -> list[str | None]:
+    """Databases que recebem o schema: default + roteamento por tenant."""
+    personal = os.getenv("MENIR_PERSONAL_TENANT_NAME", "PESSOAL").strip()
+    databases: list[str | None] = []
+    for tenant in (None, *sorted(ALLOWED_TENANTS | {personal})):
+        database = tenant_database(tenant)
+        if database not in databases:
+            databases.append(database)
+    return databases
+
+
+async def apply_migrations(
+    graph: GraphAccess | None = None,
+    database: str | None = None,
+    migrations: Iterable[Migration] = MIGRATIONS,
+) -> list[int]:
+    """Aplica as versões ainda não registradas. Retorna as versões aplicadas agora."""
+    graph = graph or get_graph()
+    rows = await graph.read(
+        "MATCH (m:SchemaMigration) RETURN m.version AS version", database=database, consistency=CAUSAL
+    )
+    done = {row["version"] for row in rows}
+
+    applied = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version in done:
+            continue
+        logger.info(f"🧱 Schema v{migration.version}: {migration.description}")
+        if migration.data is not None:
+            await migration.data(graph, database)
+        # DDL não se mistura com escrita de dados: uma transação por objeto
+        for obj in migration.objects:
+            await graph.write(obj.create_statement(), database=database)
+        await graph.write(
+            """
+            MERGE (m:SchemaMigration {version: $version})
+            SET m.description = $description, m.applied_at = datetime()
+            """,
+            {"version": migration.version, "description": migration.description},
+            database=database,
+        )
+        applied.append(migration.version)
+    return applied
+
+
+async def verify_schema(
+    graph: GraphAccess | None = None,
+    database: str | None = None,
+    migrations: Iterable[Migration] = MIGRATIONS,
+) -> SchemaReport:
+    """Confere cada objeto declarado contra SHOW INDEXES."""
+    graph = graph or get_graph()
+    rows = await graph.read(
+        "SHOW INDEXES YIELD name, type, entityType, labelsOrTypes, properties, state, owningConstraint",
+        database=database,
+        consistency=CAUSAL,
+    )
+    report = SchemaReport(database=database)
+    for obj in declared_objects(migrations):
+        found = [row for row in rows if obj.matches(row)]
+        if not found:
+            report.missing.append(obj.name)
+        elif not any(row.get("state") == "ONLINE" for row in found):
+            report.not_online.append(obj.name)
+    return report
+
+
+async def ensure_schema(graph: GraphAccess | None = None) -> list[SchemaReport]:
+    """Hook de startup: migra e verifica todas as databases alvo."""
+    reports = []
+    for database in _target_databases():
+        applied = await apply_migrations(graph, database)
+        report = await verify_schema(graph, database)
+        report.applied = applied
+        if report.missing:
+            logger.error(f"❌ Schema incompleto em '{database or 'default'}': faltando {report.missing}")
+        elif report.not_online:
+            logger.warning(f"⏳ Índices ainda populando em '{database or 'default'}': {report.not_online}")
+        else:
+            logger.info(f"✅ Schema v{max(m.version for m in MIGRATIONS)} verificado em '{database or 'default'}'.")
+        reports.append(report)
+    return reports
+
+
+# ---------------------------------------------------------------------------
+# Check de CI: toda chave de MERGE precisa de constraint/índice declarado
+# ---------------------------------------------------------------------------
+
+_MERGE_NODE = re.compile(r"MERGE\s*\(\s*\w*\s*((?::\s*`?\w+`?)+)\s*\{([^{}]*)\}")
+_LABEL_PLACEHOLDER = re.compile(r":(?:`\{\w*\}`|\{\w*\})")
+_VALUE_PLACEHOLDER = re.compile(r"\{(\w*)\}")
+_KEY = re.compile(r"(\w+)\s*:")
+
+# src/v3: todo o código de produção que emite Cypher
+_SOURCE_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _tenant_labels() -> set[str]:
+    return ALLOWED_TENANTS | {os.getenv("MENIR_PERSONAL_TENANT_NAME", "PESSOAL").strip()}
+
+
+def merge_keys_in_source(source: str) -> set[tuple[str, tuple[str, ...]]]:
+    """(label, chaves) de cada MERGE de nó; labels dinâmicos e de tenant são ignorados."""
+    # f-strings: {{ }} são chaves literais do Cypher; {x} são placeholders Python
+    text = source.replace("{{", "\x01").replace("}}", "\x02")
+    text = _LABEL_PLACEHOLDER.sub("", text)
+    text = _VALUE_PLACEHOLDER.sub(r"$\1", text)
+    text = text.replace("\x01", "{").replace("\x02", "}")
+
+    tenants = _tenant_labels()
+    found = set()
+    for match in _MERGE_NODE.finditer(text):
+        labels = [label.strip().strip("`") for label in match.group(1).split(":") if label.strip()]
+        labels = [label for label in labels if label not in tenants]
+        keys = tuple(sorted(set(_KEY.findall(match.group(2)))))
+        if labels and keys:
+            found.add((labels[0], keys))
+    return found
+
+
+def collect_merge_keys(root: str | Path = _SOURCE_ROOT) -> dict[tuple[str, tuple[str, ...]], list[str]]:
+    """MERGE keys do código-fonte + templates do registro de persistência."""
+    from src.v3.core.persistence_registry import registered_specs
+
+    keys: dict[tuple[str, tuple[str, ...]], list[str]] = {}
+    for path in sorted(Path(root).rglob("*.py")):
+        for key in merge_keys_in_source(path.read_text(encoding="utf-8", errors="ignore")):
+            keys.setdefault(key, []).append(str(path))
+    for spec in registered_specs():
+        key = (spec.label, tuple(sorted(spec.merge_keys)))
+        keys.setdefault(key, []).append(f"persistence_registry:{spec.model.__name__}")
+    return keys
+
+
+def uncovered_merge_keys(
+    root: str | Path = _SOURCE_ROOT,
+    migrations: Iterable[Migration] = MIGRATIONS,
+) -> dict[tuple[str, tuple[str, ...]], list[str]]:
+    objects = declared_objects(migrations)
+    return {
+        (label, keys): where
+        for (label, keys), where in collect_merge_keys(root).items()
+        if not any(obj.covers(label, keys) for obj in objects)
+    }
@@ -61,6 +61,10 @@ class InvoiceData(BaseNode):
         default=None,
         description="Número de ordem de compra (PO Number) da empresa emissora. Nulo se não aplicável.",
     )
+    payment_reference: str | None = Field(
+        default=None,
+        description="Referência do credor (QRR ou SCOR/RF) normalizada: chave do tier 0 da reconciliação.",
+    )
     
     extraction_path: Literal["QR_DECODE", "GEMINI_FALLBACK"] = Field(
         description="Rastreabilidade: Caminho arquitetural utilizado para obter os dados."
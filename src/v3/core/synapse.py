@@ -26,6 +26,11 @@ from src.v3.skills.document_classifier_skill import DocumentClassifierSkill, Doc
 from src.v3.core.persistence import NodePersistenceOrchestrator
 from src.v3.core.schemas.base import Document, QuarantineItem, DocumentStatus
 from src.v3.core.concurrency import run_in_custom_executor, io_pool
+from src.v3.core.near_duplicate import NearDuplicateFilter
+from src.v3.core.existence_filter import get_existence_index
+from src.v3.core.graph_access import get_graph
+from src.v3.core.pool_metrics import get_pool_metrics
+from src.v3.tenant_middleware import EVENTUAL
 
 logger = logging.getLogger("MenirSynapse")
 
@@ -55,6 +60,38 @@ async def cors_middleware(request, handler):
         
     return response
 
+def _after_param(request) -> list[str] | None:
+    """?after=<uid>: retoma uma listagem paginada a partir do último uid recebido."""
+    after = request.query.get("after") if hasattr(request, "query") else None
+    return [after] if after else None
+
+
+async def _stream_json_array(request, rows, transform=lambda row: row) -> web.StreamResponse:
+    """
+    Escreve um array JSON página a página (chunked), sem materializar a listagem.
+    Falha no meio do stream (o 200 já foi): a conexão é abortada sem o chunk
+    final, e o cliente vê uma resposta incompleta em vez de um JSON truncado.
+    """
+    response = web.StreamResponse(status=200, headers={"Content-Type": "application/json"})
+    await response.prepare(request)
+    await response.write(b"[")
+    first = True
+    try:
+        async for row in rows:
+            chunk = json.dumps(transform(row), default=str)
+            await response.write((chunk if first else "," + chunk).encode("utf-8"))
+            first = False
+    except Exception:
+        logger.exception("🚨 Listagem interrompida no meio do stream; conexão abortada.")
+        response.force_close()
+        if request.transport is not None:
+            request.transport.abort()
+        return response
+    await response.write(b"]")
+    await response.write_eof()
+    return response
+
+
 class MenirSynapse:
     def __init__(self, runner, intel_instance=None):
         """
@@ -84,6 +121,7 @@ class MenirSynapse:
         self.app.add_routes(
             [
                 web.get("/status", self.handle_status_http),
+                web.get("/metrics/neo4j", self.handle_neo4j_metrics_http),
                 web.post("/auth/token", self.handle_auth_token_http),
                 web.post("/command", self.handle_command_http),
                 web.post("/mcp", self.mcp_server.handle_mcp_request),
@@ -242,7 +280,14 @@ class MenirSynapse:
                     res = await capture.ingest(text=text, current_tenant=tenant_name, media_path=media_path)
                     
                     if res and res.get("success"):
-                        if res.get("hitl"):
+                        if "duplicate_of" in res:
+                            if self.tg_bot:
+                                await self.tg_bot.send_message(
+                                    chat_id=chat_id,
+                                    text=f"♻️ Já registrado (similaridade {res['jaccard']:.0%}). Vinculado à memória existente.",
+                                    reply_to_message_id=message_id
+                                )
+                        elif res.get("hitl"):
                             hc = res["hitl"]
                             t_name = hc["target_name"]
                             hitl_id = str(uuid.uuid4())[:8]
@@ -423,7 +468,7 @@ class MenirSynapse:
         try:
             is_healthy = await gateway.execute(
                 priority=1, 
-                coro=run_in_custom_executor(io_pool, self.runner.ontology_manager.check_system_health)
+                coro=self.runner.ontology_manager.check_system_health()
             )
             degraded = not is_healthy
         except Exception:
@@ -437,8 +482,14 @@ class MenirSynapse:
             "command_queue_size": self.command_bus.qsize(),
             "priority_gate_queue": gateway.queue.qsize(),
             "degraded": degraded,
+            "near_duplicate": NearDuplicateFilter.metrics(),
+            "existence_filter": get_existence_index().report(),
         })
 
+    async def handle_neo4j_metrics_http(self, request):
+        """Espera por conexão, tempo de vida de sessão por call site, retries e vazamentos."""
+        return web.json_response(get_pool_metrics().snapshot())
+
     async def handle_command_http(self, request):
         auth_header = request.headers.get("Authorization", "")
         # Cryptographic Namespace Routing (Context Isolation)
@@ -491,14 +542,18 @@ class MenirSynapse:
         """Standard GET for Quarantine nodes (v1 compatible)"""
         target_tenant = await self._get_tenant_from_request(request)
         with locked_tenant_context(target_tenant):
-            with self.runner.ontology_manager.driver.session() as session:
-                query = f"MATCH (d:QuarantineItem:`{target_tenant}` {{status: 'PENDING'}}) " \
-                        "RETURN d.uid AS id, d.name AS name, d.file_hash AS file_hash, " \
-                        "d.quarantine_reason AS reason, d.quarantined_at AS date, " \
-                        "d.trust_score AS trust_score, d.routing_decision AS routing_decision"
-                result = session.run(query)
-                data = [record.data() for record in result.all()]
-                return web.json_response(data)
+            query = f"MATCH (d:QuarantineItem:`{target_tenant}` {{status: 'PENDING'}}) WHERE {{keyset}} " \
+                    "RETURN d.uid AS id, d.name AS name, d.file_hash AS file_hash, " \
+                    "d.quarantine_reason AS reason, d.quarantined_at AS date, " \
+                    "d.trust_score AS trust_score, d.routing_decision AS routing_decision"
+            rows = self.runner.ontology_manager.graph.paginate(
+                query,
+                keyset=[("id", "d.uid")],
+                after=_after_param(request),
+                tenant=target_tenant,
+                consistency=EVENTUAL,
+            )
+            return await _stream_json_array(request, rows)
 
     async def handle_retry_document(self, request):
         doc_id = request.match_info['id']
@@ -529,15 +584,11 @@ class MenirSynapse:
             RETURN d
             """
             
-        def _update():
-            with self.runner.ontology_manager.driver.session() as s:
-                params = {"uid": doc_id}
-                if action != "reject":
-                    params["feedback"] = corrected_json
-                res = s.run(query_update, **params).single()
-                return dict(res["d"]) if res else None
-                
-        doc = await run_in_custom_executor(io_pool, _update)
+        params = {"uid": doc_id}
+        if action != "reject":
+            params["feedback"] = corrected_json
+        res = await self.runner.ontology_manager.graph.write_one(query_update, params, tenant=target_tenant)
+        doc = res["d"] if res else None
         if not doc:
              return web.json_response({"error": "No document found"}, status=404)
              
@@ -731,31 +782,45 @@ class MenirSynapse:
     async def handle_get_quarantine_documents(self, request):
         """GET list of nodes in quarentena for this tenant."""
         target_tenant = await self._get_tenant_from_request(request)
-        async with get_shared_driver().session() as session:
-            query = f"MATCH (q:QuarantineItem:`{target_tenant}` {{status: 'PENDING'}}) " \
-                    "RETURN q { .*, date: q.quarantined_at } AS q"
-            items = await session.execute_read(
-                lambda tx: [record.data()["q"] for record in tx.run(query)]
-            )
-            return web.json_response(items)
+        query = f"MATCH (q:QuarantineItem:`{target_tenant}` {{status: 'PENDING'}}) WHERE {{keyset}} " \
+                "RETURN q { .*, date: q.quarantined_at } AS q, q.uid AS uid"
+        rows = get_graph().paginate(
+            query,
+            keyset=[("uid", "q.uid")],
+            after=_after_param(request),
+            tenant=target_tenant,
+            consistency=EVENTUAL,
+        )
+        return await _stream_json_array(request, rows, lambda row: row["q"])
+
+    async def _promote_quarantine_item(
+        self, uid: str, target_tenant: str, status: str, build_doc
+    ) -> str | None:
+        """
+        Promove QuarantineItem -> Document numa única transação gerenciada
+        (fetch + persist + marcação). None se o item não existir.
+        """
+        orchestrator = NodePersistenceOrchestrator()
+        q_fetch = f"MATCH (q:QuarantineItem:`{target_tenant}` {{uid: $uid}}) RETURN q"
+        q_mark = f"MATCH (q:QuarantineItem:`{target_tenant}` {{uid: $uid}}) SET q.status = $status"
+
+        async def _promote(tx):
+            res = await (await tx.run(q_fetch, uid=uid)).single()
+            if not res:
+                return None
+            new_doc = build_doc(res.data()["q"])
+            persisted_uid = await orchestrator.persist(new_doc, tx)
+            await (await tx.run(q_mark, uid=uid, status=status)).consume()
+            return persisted_uid
+
+        return await get_graph().transaction(_promote, tenant=target_tenant)
 
     async def handle_accept_quarantine_document(self, request):
         uid = request.match_info.get("uid")
         try:
             target_tenant = await self._get_tenant_from_request(request)
-            async with get_shared_driver().session() as session:
-                orchestrator = NodePersistenceOrchestrator()
-                # 1. Fetch item
-                q_fetch = f"MATCH (q:QuarantineItem:`{target_tenant}` {{uid: $uid}}) RETURN q"
-                res = await session.execute_read(
-                    lambda tx: tx.run(q_fetch, uid=uid).single()
-                )
-                if not res:
-                    return web.json_response({"error": "NotFound"}, status=404)
-                
-                q_data = res.data()["q"]
-                
-                # 2. Map to Document
+
+            def _accepted(q_data: dict) -> Document:
                 new_doc = Document(
                     uid=str(uuid.uuid4()),
                     project=target_tenant,
@@ -771,16 +836,12 @@ class MenirSynapse:
                     "confidence": q_data.get("confidence"),
                     "language": q_data.get("language")
                 }
-                
-                # 3. Persist
-                persisted_uid = await orchestrator.persist(new_doc, session)
-                
-                # 4. Mark Accepted
-                q_mark = f"MATCH (q:QuarantineItem:`{target_tenant}` {{uid: $uid}}) SET q.status = 'ACCEPTED'"
-                await session.execute_write(
-                    lambda tx: tx.run(q_mark, uid=uid)
-                )
-                    
+                return new_doc
+
+            persisted_uid = await self._promote_quarantine_item(uid, target_tenant, "ACCEPTED", _accepted)
+            if persisted_uid is None:
+                return web.json_response({"error": "NotFound"}, status=404)
+
             return web.json_response({"status": "ACCEPTED", "promoted_uid": persisted_uid})
         except Exception as e:
             logger.exception(f"Erro ao aceitar documento {uid}")
@@ -795,19 +856,8 @@ class MenirSynapse:
                  return web.json_response({"error": "Missing client_name"}, status=400)
 
             target_tenant = await self._get_tenant_from_request(request)
-            async with get_shared_driver().session() as session:
-                orchestrator = NodePersistenceOrchestrator()
-                # 1. Fetch item
-                q_fetch = f"MATCH (q:QuarantineItem:`{target_tenant}` {{uid: $uid}}) RETURN q"
-                res = await session.execute_read(
-                    lambda tx: tx.run(q_fetch, uid=uid).single()
-                )
-                if not res:
-                    return web.json_response({"error": "NotFound"}, status=404)
-                
-                q_data = res.data()["q"]
-                
-                # 2. Map to Document with correction
+
+            def _corrected(q_data: dict) -> Document:
                 new_doc = Document(
                     uid=str(uuid.uuid4()),
                     project=target_tenant,
@@ -823,16 +873,12 @@ class MenirSynapse:
                     "confidence": 1.0, # Now high trust because human corrected it
                     "language": q_data.get("language")
                 }
-                
-                # 3. Persist
-                persisted_uid = await orchestrator.persist(new_doc, session)
-                
-                # 4. Mark Accepted (Fixed/Corrected)
-                q_mark = f"MATCH (q:QuarantineItem:`{target_tenant}` {{uid: $uid}}) SET q.status = 'CORRECTED'"
-                await session.execute_write(
-                    lambda tx: tx.run(q_mark, uid=uid)
-                )
-                    
+                return new_doc
+
+            persisted_uid = await self._promote_quarantine_item(uid, target_tenant, "CORRECTED", _corrected)
+            if persisted_uid is None:
+                return web.json_response({"error": "NotFound"}, status=404)
+
             return web.json_response({"status": "CORRECTED", "promoted_uid": persisted_uid})
         except Exception as e:
             logger.exception(f"Erro ao corrigir documento {uid}")
@@ -859,16 +905,14 @@ class MenirSynapse:
         # Initial connection event
         await response.write(f"data: {json.dumps({'event': 'connected', 'tenant': target_tenant, 'timestamp': time.time()})}\n\n".encode('utf-8'))
         
-        from src.v3.core.neo4j_pool import get_shared_driver
-        driver = get_shared_driver()
-        
+        query = f"MATCH (q:QuarantineItem:`{target_tenant}` {{status: 'PENDING'}}) RETURN count(q) as cnt"
+
         try:
             while True:
                 # Poll for pending items (minimal payload)
-                async with driver.session() as session:
-                    query = f"MATCH (q:QuarantineItem:`{target_tenant}` {{status: 'PENDING'}}) RETURN count(q) as cnt"
-                    count = await session.execute_read(lambda tx: tx.run(query).single()["cnt"])
-                    
+                row = await get_graph().read_one(query, tenant=target_tenant, consistency=EVENTUAL)
+                count = row["cnt"] if row else 0
+
                 payload = {
                     "event": "quarantine_update",
                     "tenant": target_tenant,
@@ -901,10 +945,8 @@ class MenirSynapse:
                 request.match_info['uid'] = uid
                 return await self.handle_accept_quarantine_document(request)
             elif action == "REJECT":
-                from src.v3.core.neo4j_pool import get_shared_driver
-                async with get_shared_driver().session() as session:
-                    query = f"MATCH (q:QuarantineItem:`{target_tenant}` {{uid: $uid}}) SET q.status = 'REJECTED'"
-                    await session.execute_write(lambda tx: tx.run(query, uid=uid))
+                query = f"MATCH (q:QuarantineItem:`{target_tenant}` {{uid: $uid}}) SET q.status = 'REJECTED'"
+                await get_graph().write(query, {"uid": uid}, tenant=target_tenant)
                 return web.json_response({"status": "REJECTED"})
             
             return web.json_response({"error": "Unknown action"}, status=400)
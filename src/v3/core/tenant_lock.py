@@ -0,0 +1,323 @@
+"""
+Menir Core V5.2 - Tenant Lease Locks
+Trava de mutação por tenant entre processos (workers Gunicorn/uvicorn) com
+leases numa tabela SQLite em disco local, no lugar do arquivo O_EXCL:
+
+  leases  -> um titular por tenant, com expires_at (TTL explícito) renovado
+             em background enquanto a seção crítica roda
+  waiters -> fila FIFO por tenant (seq autoincremento): só a cabeça da fila
+             recebe a lease, concorrentes esperam em vez de falhar
+  token   -> fencing token estritamente crescente por tenant, entregue a
+             cada concessão; a escrita no Neo4j rejeita tokens antigos, então
+             um titular que perdeu a lease (pausa de GC, worker congelado) não
+             sobrescreve quem a retomou
+
+Dentro de um processo os waiters fazem fila num asyncio.Lock por tenant
+(FIFO, acordam no release) e só a cabeça entra na fila SQLite: entre
+processos a vez roda em round-robin, sem N waiters fazendo poll no disco. O
+intervalo de poll cresce com a posição na fila SQLite, de
+MENIR_TENANT_LOCK_HEAD_POLL (cabeça) até MENIR_TENANT_LOCK_POLL (leituras
+WAL, sem trava de escrita). Waiters mortos somem da fila quando o heartbeat
+passa do TTL, leases abandonadas quando expiram.
+
+O arquivo fica em disco local (MENIR_TENANT_LOCK_DB): lock de SQLite sobre
+NFS/SMB (NAS) não é confiável.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from src.v3.core.concurrency import io_pool, run_in_custom_executor
+
+logger = logging.getLogger("TenantLock")
+
+DEFAULT_DB_PATH = Path(tempfile.gettempdir()) / "menir_tenant_locks" / "leases.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    tenant TEXT PRIMARY KEY,
+    holder TEXT,
+    token INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS waiters (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant TEXT NOT NULL,
+    holder TEXT NOT NULL,
+    heartbeat REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS waiters_tenant_seq ON waiters (tenant, seq);
+"""
+
+
+class LockTimeoutError(Exception):
+    """A fila do tenant não andou dentro do wait_timeout."""
+
+
+class TenantLease:
+    """Lease concedida: token de fencing + renovação em background até o release."""
+
+    def __init__(self, manager: "TenantLockManager", tenant: str, holder: str, token: int, gate: "_Gate"):
+        self.manager = manager
+        self.tenant = tenant
+        self.holder = holder
+        self.token = token
+        self.lost = False
+        self._gate = gate
+        self._renewer: Optional[asyncio.Task] = None
+
+    async def renew(self) -> bool:
+        renewed = await run_in_custom_executor(io_pool, self.manager._renew, self.tenant, self.holder, self.token)
+        if not renewed and not self.lost:
+            self.lost = True
+            logger.warning(f"⚠️ Lease de {self.tenant} (token {self.token}) perdida antes do release.")
+        return renewed
+
+    async def release(self) -> None:
+        if self._renewer:
+            self._renewer.cancel()
+            self._renewer = None
+        if self._gate is None:
+            return
+        gate, self._gate = self._gate, None
+        try:
+            await run_in_custom_executor(io_pool, self.manager._release, self.tenant, self.holder, self.token)
+        finally:
+            gate.lock.release()
+            self.manager._leave(self.tenant, gate)
+
+    async def _keep_alive(self) -> None:
+        while True:
+            await asyncio.sleep(self.manager.ttl / 3)
+            if not await self.renew():
+                return
+
+    async def __aenter__(self) -> "TenantLease":
+        self._renewer = asyncio.create_task(self._keep_alive())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.release()
+
+
+class TenantLockManager:
+    def __init__(
+        self,
+        path: Optional[str | Path] = None,
+        ttl: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+        wait_timeout: Optional[float] = None,
+    ):
+        self.path = Path(path or os.getenv("MENIR_TENANT_LOCK_DB", str(DEFAULT_DB_PATH)))
+        self.ttl = ttl if ttl is not None else float(os.getenv("MENIR_TENANT_LOCK_TTL", "15"))
+        self.poll_interval = (
+            poll_interval if poll_interval is not None else float(os.getenv("MENIR_TENANT_LOCK_POLL", "0.05"))
+        )
+        self.head_poll_interval = min(self.poll_interval, float(os.getenv("MENIR_TENANT_LOCK_HEAD_POLL", "0.002")))
+        self.wait_timeout = (
+            wait_timeout if wait_timeout is not None else float(os.getenv("MENIR_TENANT_LOCK_WAIT", "30"))
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        # Uma fila local por tenant: só a cabeça dela disputa a fila SQLite
+        self._gates: dict[str, _Gate] = {}
+        self._connection().executescript(_SCHEMA)
+
+    # --- SQLite (roda no io_pool: cada operação é uma transação curta) ---
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        db = self._connection()
+        # IMMEDIATE: a trava de escrita vem antes da leitura da fila
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _peek(self, db: sqlite3.Connection, tenant: str, seq: int, now: float) -> tuple[int, bool]:
+        """(waiters vivos à frente de seq, lease livre ou expirada)."""
+        (ahead,) = db.execute(
+            "SELECT COUNT(*) FROM waiters WHERE tenant = ? AND seq < ? AND heartbeat >= ?", (tenant, seq, now - self.ttl)
+        ).fetchone()
+        lease = db.execute("SELECT holder, expires_at FROM leases WHERE tenant = ?", (tenant,)).fetchone()
+        return ahead, lease is None or lease[0] is None or lease[1] <= now
+
+    def _grant(self, db: sqlite3.Connection, tenant: str, holder: str, seq: int, now: float) -> Optional[int]:
+        db.execute("DELETE FROM waiters WHERE tenant = ? AND heartbeat < ?", (tenant, now - self.ttl))
+        ahead, free = self._peek(db, tenant, seq, now)
+        if ahead or not free:
+            return None
+        lease = db.execute("SELECT holder, token FROM leases WHERE tenant = ?", (tenant,)).fetchone()
+        if lease and lease[0] is not None:
+            logger.warning(f"⏳ Lease de {tenant} expirada ({lease[0]}, token {lease[1]}): retomada por {holder}.")
+        # Em ms de relógio como piso: sobrevive à perda do arquivo sem reusar tokens já vistos pelo grafo
+        token = max((lease[1] + 1) if lease else 1, int(now * 1000))
+        db.execute(
+            """
+            INSERT INTO leases (tenant, holder, token, expires_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (tenant) DO UPDATE SET
+                holder = excluded.holder, token = excluded.token, expires_at = excluded.expires_at
+            """,
+            (tenant, holder, token, now + self.ttl),
+        )
+        db.execute("DELETE FROM waiters WHERE seq = ?", (seq,))
+        return token
+
+    def _enqueue(self, tenant: str, holder: str) -> tuple[int, Optional[int]]:
+        """Entra na fila e, sem contenção, já sai com a lease (uma transação só)."""
+        now = time.time()
+        with self._transaction() as db:
+            seq = db.execute(
+                "INSERT INTO waiters (tenant, holder, heartbeat) VALUES (?, ?, ?)", (tenant, holder, now)
+            ).lastrowid
+            return seq, self._grant(db, tenant, holder, seq, now)
+
+    def _poll(self, tenant: str, holder: str, seq: int, heartbeat: bool) -> tuple[Optional[int], int]:
+        """
+        Leitura sem trava de escrita (WAL) enquanto não é a vez; a transação
+        IMMEDIATE só quando a cabeça encontra a lease livre ou o heartbeat vence.
+        Retorna (token, waiters à frente).
+        """
+        now = time.time()
+        ahead, free = self._peek(self._connection(), tenant, seq, now)
+        if (ahead or not free) and not heartbeat:
+            return None, ahead
+        with self._transaction() as db:
+            db.execute("UPDATE waiters SET heartbeat = ? WHERE seq = ?", (now, seq))
+            if not ahead and free:
+                return self._grant(db, tenant, holder, seq, now), 0
+        return None, ahead
+
+    def _abandon(self, seq: int) -> None:
+        with self._transaction() as db:
+            db.execute("DELETE FROM waiters WHERE seq = ?", (seq,))
+
+    def _renew(self, tenant: str, holder: str, token: int) -> bool:
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE leases SET expires_at = ? WHERE tenant = ? AND holder = ? AND token = ? AND expires_at > ?",
+                (now + self.ttl, tenant, holder, token, now),
+            )
+            return cursor.rowcount == 1
+
+    def _release(self, tenant: str, holder: str, token: int) -> None:
+        with self._transaction() as db:
+            # Só o titular do token libera: um release tardio não derruba a lease de quem a retomou
+            db.execute(
+                "UPDATE leases SET holder = NULL, expires_at = 0 WHERE tenant = ? AND holder = ? AND token = ?",
+                (tenant, holder, token),
+            )
+
+    def purge(self) -> int:
+        """Remove waiters sem heartbeat e libera leases expiradas (boot/lifespan). Retorna quantas linhas mudaram."""
+        now = time.time()
+        with self._transaction() as db:
+            waiters = db.execute("DELETE FROM waiters WHERE heartbeat < ?", (now - self.ttl,)).rowcount
+            leases = db.execute(
+                "UPDATE leases SET holder = NULL, expires_at = 0 WHERE holder IS NOT NULL AND expires_at <= ?", (now,)
+            ).rowcount
+        return waiters + leases
+
+    # --- API async ---
+
+    def _gate(self, tenant: str) -> "_Gate":
+        loop = asyncio.get_running_loop()
+        gate = self._gates.get(tenant)
+        if gate is None or gate.loop is not loop:
+            gate = self._gates[tenant] = _Gate(loop)
+        gate.users += 1
+        return gate
+
+    def _leave(self, tenant: str, gate: "_Gate") -> None:
+        gate.users -= 1
+        if gate.users == 0 and self._gates.get(tenant) is gate:
+            del self._gates[tenant]
+
+    async def acquire(self, tenant: str, wait_timeout: Optional[float] = None) -> TenantLease:
+        """Espera a vez na fila do processo e depois na fila entre processos. Use com `async with`."""
+        timeout = self.wait_timeout if wait_timeout is None else wait_timeout
+        deadline = time.monotonic() + timeout
+        gate = self._gate(tenant)
+        try:
+            try:
+                await asyncio.wait_for(gate.lock.acquire(), timeout)
+            except asyncio.TimeoutError:
+                raise LockTimeoutError(f"Fila de mutação de {tenant} não andou em {timeout:.1f}s.") from None
+            try:
+                holder = f"{os.getpid()}:{uuid.uuid4().hex[:12]}"
+                token = await self._queue(tenant, holder, deadline, timeout)
+            except BaseException:
+                gate.lock.release()
+                raise
+        except BaseException:
+            self._leave(tenant, gate)
+            raise
+        return TenantLease(self, tenant, holder, token, gate)
+
+    async def _queue(self, tenant: str, holder: str, deadline: float, timeout: float) -> int:
+        seq, token = await run_in_custom_executor(io_pool, self._enqueue, tenant, holder)
+        if token is not None:
+            return token
+        beat = time.monotonic()
+        interval = self.head_poll_interval
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LockTimeoutError(f"Fila de mutação de {tenant} não andou em {timeout:.1f}s.")
+                await asyncio.sleep(min(interval, remaining))
+                heartbeat = time.monotonic() - beat > self.ttl / 3
+                if heartbeat:
+                    beat = time.monotonic()
+                token, ahead = await run_in_custom_executor(io_pool, self._poll, tenant, holder, seq, heartbeat)
+                if token is not None:
+                    return token
+                # Quem está perto da cabeça vigia de perto (vira cabeça a qualquer release), o fundo da fila no ritmo normal
+                interval = min(self.poll_interval, self.head_poll_interval * (ahead + 1))
+        except BaseException:
+            # Timeout/cancelamento: sai da fila para não travar quem vem atrás
+            await asyncio.shield(run_in_custom_executor(io_pool, self._abandon, seq))
+            raise
+
+
+class _Gate:
+    """Fila FIFO local de um tenant: um waiter por processo na fila SQLite, o resto acorda no release."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+_default_manager: Optional[TenantLockManager] = None
+
+
+def tenant_lock_manager() -> TenantLockManager:
+    """Instância do processo (um arquivo SQLite compartilhado por todos os workers)."""
+    global _default_manager
+    if _default_manager is None:
+        _default_manager = TenantLockManager()
+    return _default_manager
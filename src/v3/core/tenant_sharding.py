@@ -0,0 +1,244 @@
+"""
+Menir Core V5.2 - Tenant Sharding (label -> database próprio)
+Copia o subgrafo de um tenant (nós com o label do tenant + vizinhos diretos
+sem o label, ex: :Tenant, :Agent) do database de origem para um database
+dedicado. Vizinhos rotulados com OUTRO tenant ficam de fora, assim como as
+arestas até eles: o database dedicado nunca recebe dados de outro tenant. A origem NÃO é apagada: depois de validar, o operador adiciona
+`TENANT=database` em MENIR_TENANT_DATABASES e o roteamento passa a valer.
+
+  1. CREATE DATABASE ... IF NOT EXISTS (opcional; exige Enterprise/Aura)
+  2. schema versionado (apply_migrations) no database novo
+  3. nós em streaming, MERGE por elementId de origem (reexecução idempotente)
+  4. relacionamentos em streaming, MERGE pelo mesmo id de origem
+  5. contagem origem x destino; só então remove as marcas de importação
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any
+
+from src.v3.core.graph_access import GraphAccess, get_graph
+from src.v3.core.schema_migrations import apply_migrations
+from src.v3.core.schemas.identity import ALLOWED_TENANTS
+from src.v3.tenant_middleware import CAUSAL
+
+logger = logging.getLogger("TenantSharding")
+
+IMPORT_LABEL = "_MenirImport"
+SOURCE_KEY = "_menir_src_id"
+IMPORT_INDEX = "menir_import_src_idx"
+
+
+def _q(name: str) -> str:
+    return "`" + name.replace("`", "") + "`"
+
+
+def _other_tenants(tenant: str) -> list[str]:
+    personal = os.getenv("MENIR_PERSONAL_TENANT_NAME", "PESSOAL").strip()
+    return sorted((ALLOWED_TENANTS | {personal}) - {tenant})
+
+
+@dataclass
+class ShardCopyReport:
+    tenant: str
+    source_database: str | None
+    target_database: str
+    nodes: int = 0
+    relationships: int = 0
+    source_nodes: int = 0
+    target_nodes: int = 0
+    source_relationships: int = 0
+    target_relationships: int = 0
+
+    @property
+    def verified(self) -> bool:
+        return (self.source_nodes, self.source_relationships) == (self.target_nodes, self.target_relationships)
+
+
+class TenantShardCopier:
+    """Copia o subgrafo rotulado de um tenant para o seu próprio database."""
+
+    def __init__(
+        self,
+        tenant: str,
+        target_database: str,
+        source_database: str | None = None,
+        graph: GraphAccess | None = None,
+        batch_size: int = 1000,
+        timeout: float = 3600,
+    ):
+        if target_database == source_database:
+            raise ValueError("Database de destino precisa ser diferente da origem.")
+        self.tenant = tenant
+        self.label = _q(tenant)
+        self.other_tenants = _other_tenants(tenant)
+        self.target = target_database
+        self.source = source_database
+        self.graph = graph or get_graph()
+        self.batch_size = batch_size
+        self.timeout = timeout
+
+    async def counts(self, database: str | None) -> tuple[int, int]:
+        """(nós do tenant, relacionamentos copiáveis tocando o tenant) num database.
+
+        Arestas até vizinhos de outro tenant não são copiadas, logo não contam.
+        """
+        row = await self.graph.read_one(
+            f"""
+            MATCH (n:{self.label})
+            OPTIONAL MATCH (n)-[r]-(m)
+            WHERE m:{self.label} OR none(l IN labels(m) WHERE l IN $other_tenants)
+            WITH count(DISTINCT n) AS nodes, count(DISTINCT r) AS rels
+            RETURN nodes, rels
+            """,
+            {"other_tenants": self.other_tenants},
+            database=database,
+            timeout=self.timeout,
+            consistency=CAUSAL,
+        )
+        return (row["nodes"], row["rels"]) if row else (0, 0)
+
+    async def run(self, create_database: bool = True) -> ShardCopyReport:
+        report = ShardCopyReport(self.tenant, self.source, self.target)
+        if create_database:
+            await self.graph.write(f"CREATE DATABASE {_q(self.target)} IF NOT EXISTS WAIT", database="system")
+
+        await apply_migrations(self.graph, self.target)
+        await self.graph.write(
+            f"CREATE INDEX {IMPORT_INDEX} IF NOT EXISTS FOR (n:{_q(IMPORT_LABEL)}) ON (n.{_q(SOURCE_KEY)})",
+            database=self.target,
+        )
+        await self.graph.write("CALL db.awaitIndexes()", database=self.target, timeout=self.timeout)
+
+        # Nós do tenant + vizinhos sem label de tenant (fronteira: :Tenant, :Agent, ...)
+        report.nodes += await self._stream(
+            f"MATCH (n:{self.label}) RETURN elementId(n) AS id, labels(n) AS labels, properties(n) AS props",
+            self._write_nodes,
+        )
+        report.nodes += await self._stream(
+            f"""
+            MATCH (n:{self.label})--(m)
+            WHERE NOT m:{self.label} AND none(l IN labels(m) WHERE l IN $other_tenants)
+            RETURN DISTINCT elementId(m) AS id, labels(m) AS labels, properties(m) AS props
+            """,
+            self._write_nodes,
+        )
+
+        rel_projection = "elementId(r) AS id, type(r) AS type, elementId(a) AS src, elementId(b) AS dst, properties(r) AS props"
+        report.relationships += await self._stream(
+            f"""
+            MATCH (a:{self.label})-[r]->(b)
+            WHERE b:{self.label} OR none(l IN labels(b) WHERE l IN $other_tenants)
+            RETURN {rel_projection}
+            """,
+            self._write_relationships,
+        )
+        report.relationships += await self._stream(
+            f"""
+            MATCH (a)-[r]->(b:{self.label})
+            WHERE NOT a:{self.label} AND none(l IN labels(a) WHERE l IN $other_tenants)
+            RETURN {rel_projection}
+            """,
+            self._write_relationships,
+        )
+
+        report.source_nodes, report.source_relationships = await self.counts(self.source)
+        report.target_nodes, report.target_relationships = await self.counts(self.target)
+        if report.verified:
+            await self._clear_import_marks()
+            logger.info(f"✅ Tenant {self.tenant} copiado para '{self.target}': {report.target_nodes} nós.")
+        else:
+            logger.error(
+                f"❌ Cópia de {self.tenant} divergente: origem {report.source_nodes}/{report.source_relationships}, "
+                f"destino {report.target_nodes}/{report.target_relationships}. Marcas mantidas para reexecução."
+            )
+        return report
+
+    async def _stream(self, query: str, sink) -> int:
+        """Lê a origem em streaming (uma transação) e grava no destino em lotes."""
+
+        async def _work(tx) -> int:
+            total = 0
+            batch: list[dict[str, Any]] = []
+            result = await tx.run(query, {"other_tenants": self.other_tenants})
+            async for record in result:
+                batch.append(record.data())
+                if len(batch) >= self.batch_size:
+                    total += await sink(batch)
+                    batch = []
+            if batch:
+                total += await sink(batch)
+            return total
+
+        return await self.graph.transaction(
+            _work, write=False, database=self.source, timeout=self.timeout, consistency=CAUSAL
+        )
+
+    async def _write_nodes(self, rows: list[dict[str, Any]]) -> int:
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row["labels"])), []).append({"id": row["id"], "props": row["props"]})
+        for labels, group in groups.items():
+            set_labels = f"SET n:{':'.join(_q(l) for l in labels)}" if labels else ""  # noqa: E741
+            await self.graph.write(
+                f"""
+                UNWIND $rows AS row
+                MERGE (n:{_q(IMPORT_LABEL)} {{{_q(SOURCE_KEY)}: row.id}})
+                SET n += row.props
+                {set_labels}
+                """,
+                {"rows": group},
+                database=self.target,
+                timeout=self.timeout,
+            )
+        return len(rows)
+
+    async def _write_relationships(self, rows: list[dict[str, Any]]) -> int:
+        groups: dict[str, list[dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(row["type"], []).append(row)
+        for rel_type, group in groups.items():
+            await self.graph.write(
+                f"""
+                UNWIND $rows AS row
+                MATCH (a:{_q(IMPORT_LABEL)} {{{_q(SOURCE_KEY)}: row.src}})
+                MATCH (b:{_q(IMPORT_LABEL)} {{{_q(SOURCE_KEY)}: row.dst}})
+                MERGE (a)-[r:{_q(rel_type)} {{{_q(SOURCE_KEY)}: row.id}}]->(b)
+                SET r += row.props
+                """,
+                {"rows": group},
+                database=self.target,
+                timeout=self.timeout,
+            )
+        return len(rows)
+
+    async def _clear_import_marks(self) -> None:
+        """Remove label/propriedade de importação em lotes e derruba o índice temporário."""
+        while True:
+            row = await self.graph.write_one(
+                f"""
+                MATCH (:{_q(IMPORT_LABEL)})-[r]->() WHERE r.{_q(SOURCE_KEY)} IS NOT NULL
+                WITH r LIMIT $batch
+                REMOVE r.{_q(SOURCE_KEY)}
+                RETURN count(r) AS done
+                """,
+                {"batch": self.batch_size},
+                database=self.target,
+            )
+            if not row or not row["done"]:
+                break
+        while True:
+            row = await self.graph.write_one(
+                f"""
+                MATCH (n:{_q(IMPORT_LABEL)})
+                WITH n LIMIT $batch
+                REMOVE n:{_q(IMPORT_LABEL)}, n.{_q(SOURCE_KEY)}
+                RETURN count(n) AS done
+                """,
+                {"batch": self.batch_size},
+                database=self.target,
+            )
+            if not row or not row["done"]:
+                break
+        await self.graph.write(f"DROP INDEX {IMPORT_INDEX} IF EXISTS", database=self.target)
@@ -0,0 +1,203 @@
+"""
+Menir Core V5.2 - Transaction Natural Keys
+Chave determinística das transações bancárias: o mesmo lançamento gera o
+mesmo tx_key em qualquer reimportação ou extrato sobreposto, e a ingestão faz
+MERGE nela (constraint de unicidade na migração 6).
+
+  tx_key = sha1(tenant | IBAN da conta | data contábil | valor em centavos |
+                moeda | referência | sequência)
+
+  tenant     -> o label do tenant entra na chave: dois tenants importando o
+                mesmo extrato geram nós distintos, e a constraint global não
+                denuncia a um tenant o que o outro tem
+
+  referência -> NtryRef, AcctSvcrRef, AddtlNtryInf ou Ustrd (espaços colapsados)
+  sequência  -> ordem do lançamento entre os idênticos nos demais campos do
+                mesmo extrato (dois cafés iguais no mesmo dia: 0 e 1)
+
+dedup_transactions() é o passo de dados da migração: recalcula a chave dos
+nós gravados antes dela (tx_id aleatório incluído), tenant a tenant, funde as
+duplicatas de reimportações do mesmo tenant (apoc.refactor.mergeNodes,
+arestas de reconciliação inclusas) e grava tx_key em todos, antes de a
+constraint existir.
+
+O parser antigo gravava currency = 'CHF' em qualquer conta, então a moeda dos
+nós legados não é confiável: eles recebem também legacy_key (a mesma chave sem
+a moeda), e a próxima importação do extrato adota o nó legado pela legacy_key
+e corrige tx_key e moeda com os valores do XML.
+"""
+
+import hashlib
+import logging
+import os
+import re
+from collections import Counter
+from typing import Any
+
+from src.v3.core.graph_access import GraphAccess
+from src.v3.core.schemas.identity import ALLOWED_TENANTS
+
+logger = logging.getLogger("TransactionKeys")
+
+WRITE_BATCH_SIZE = 5000
+
+# Fallback antigo do Camt053Skill: str(uuid.uuid4())[:8], sem valor de identidade
+_RANDOM_TX_ID = re.compile(r"^[0-9a-f]{8}$")
+
+# Marcador da legacy_key no lugar da moeda (nunca é um código ISO 4217)
+_NO_CURRENCY = "*"
+
+
+def _reference(reference: str | None) -> str:
+    return " ".join((reference or "").split())
+
+
+def transaction_key(
+    tenant: str | None,
+    acct_iban: str | None,
+    booking_date: str | None,
+    amount: float | None,
+    currency: str | None,
+    reference: str | None,
+    sequence: int = 0,
+) -> str:
+    cents = round((amount or 0.0) * 100)
+    parts = (
+        tenant or "",
+        (acct_iban or "").replace(" ", "").upper(),
+        booking_date or "",
+        str(cents),
+        (currency or "").upper(),
+        _reference(reference),
+        str(sequence),
+    )
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class KeySequencer:
+    """Atribui a sequência dos lançamentos idênticos dentro de um extrato de um tenant."""
+
+    def __init__(self, tenant: str | None = None) -> None:
+        self.tenant = tenant
+        self._seen: Counter[str] = Counter()
+
+    def key(
+        self,
+        acct_iban: str | None,
+        booking_date: str | None,
+        amount: float | None,
+        currency: str | None,
+        reference: str | None,
+    ) -> str:
+        base = transaction_key(self.tenant, acct_iban, booking_date, amount, currency, reference, -1)
+        sequence = self._seen[base]
+        self._seen[base] += 1
+        return transaction_key(self.tenant, acct_iban, booking_date, amount, currency, reference, sequence)
+
+    def legacy_key(
+        self,
+        acct_iban: str | None,
+        booking_date: str | None,
+        amount: float | None,
+        reference: str | None,
+    ) -> str:
+        """Chave sem moeda, com sequência própria: casa o lançamento com o nó legado de moeda chutada."""
+        return self.key(acct_iban, booking_date, amount, _NO_CURRENCY, reference)
+
+
+def legacy_reference(tx_id: str | None, remittance_info: str | None) -> str | None:
+    """Referência de um nó gravado antes das chaves: o tx_id, salvo quando era o UUID aleatório."""
+    if tx_id and not _RANDOM_TX_ID.match(tx_id):
+        return tx_id
+    return remittance_info
+
+
+def plan_dedup(rows: list[dict[str, Any]]) -> tuple[dict[str, tuple[str, str]], list[list[str]]]:
+    """
+    rows: nós existentes (id, tenant, iban, tx_id, booking_date, amount,
+    currency, remittance_info, ingested_at). Dentro de cada importação de um
+    tenant (mesmo ingested_at) os idênticos recebem sequência 0..n-1; nós do
+    mesmo tenant com a mesma chave vindos de importações diferentes são o
+    mesmo lançamento. Tenants diferentes nunca se fundem: a chave os separa.
+    Retorna (elementId -> (tx_key, legacy_key) dos que ficam, grupos [fica, duplicatas...]).
+    """
+    sequencers: dict[tuple[Any, Any], KeySequencer] = {}
+    by_key: dict[str, list[tuple[str, str]]] = {}
+    legacy: dict[str, str] = {}
+    for row in rows:
+        tenant = row.get("tenant")
+        sequencer = sequencers.setdefault((tenant, row.get("ingested_at")), KeySequencer(tenant))
+        reference = legacy_reference(row.get("tx_id"), row.get("remittance_info"))
+        key = sequencer.key(row.get("iban"), row.get("booking_date"), row.get("amount"), row.get("currency"), reference)
+        legacy.setdefault(key, sequencer.legacy_key(row.get("iban"), row.get("booking_date"), row.get("amount"), reference))
+        by_key.setdefault(key, []).append((row.get("ingested_at") or "", row["id"]))
+
+    keys, merges = {}, []
+    for key, nodes in by_key.items():
+        # Fica o mais antigo: é o que já carrega as reconciliações
+        ids = [node_id for _, node_id in sorted(nodes)]
+        keys[ids[0]] = (key, legacy[key])
+        if len(ids) > 1:
+            merges.append(ids)
+    return keys, merges
+
+
+def _tenant_of(labels: list[str]) -> str | None:
+    """Label de tenant de um nó Transaction (os nós legados só têm Transaction + tenant)."""
+    known = ALLOWED_TENANTS | {os.getenv("MENIR_PERSONAL_TENANT_NAME", "PESSOAL").strip()}
+    tenants = [label for label in labels if label in known]
+    candidates = tenants or sorted(labels)
+    return candidates[0] if candidates else None
+
+
+async def dedup_transactions(graph: GraphAccess, database: str | None = None) -> int:
+    """Passo de dados da migração 6. Retorna quantos nós duplicados foram fundidos."""
+    rows = []
+    async for row in graph.stream(
+        """
+        MATCH (ba:BankAccount)-[:HAS_TRANSACTION]->(tr:Transaction)
+        WHERE tr.tx_key IS NULL
+        RETURN elementId(tr) AS id, [label IN labels(tr) WHERE label <> 'Transaction'] AS labels,
+               ba.iban AS iban, tr.tx_id AS tx_id,
+               tr.booking_date AS booking_date, tr.amount AS amount,
+               tr.currency AS currency, tr.remittance_info AS remittance_info,
+               toString(tr.ingested_at) AS ingested_at
+        """,
+        database=database,
+    ):
+        row["tenant"] = _tenant_of(row.pop("labels") or [])
+        rows.append(row)
+    if not rows:
+        return 0
+
+    keys, merges = plan_dedup(rows)
+    for start in range(0, len(merges), WRITE_BATCH_SIZE):
+        await graph.write(
+            """
+            UNWIND $groups AS ids
+            MATCH (keep:Transaction) WHERE elementId(keep) = ids[0]
+            MATCH (dup:Transaction) WHERE elementId(dup) IN ids[1..]
+            WITH keep, collect(dup) AS dups
+            CALL apoc.refactor.mergeNodes([keep] + dups, {properties: "discard", mergeRels: true})
+            YIELD node
+            RETURN count(node) AS merged
+            """,
+            {"groups": merges[start : start + WRITE_BATCH_SIZE]},
+            database=database,
+        )
+
+    assigned = [{"id": node_id, "key": key, "legacy_key": legacy} for node_id, (key, legacy) in keys.items()]
+    for start in range(0, len(assigned), WRITE_BATCH_SIZE):
+        await graph.write(
+            """
+            UNWIND $rows AS row
+            MATCH (tr:Transaction) WHERE elementId(tr) = row.id
+            SET tr.tx_key = row.key, tr.legacy_key = row.legacy_key
+            """,
+            {"rows": assigned[start : start + WRITE_BATCH_SIZE]},
+            database=database,
+        )
+
+    duplicates = sum(len(ids) - 1 for ids in merges)
+    logger.info(f"🧹 Transações: {len(keys)} chaves gravadas, {duplicates} duplicatas fundidas.")
+    return duplicates
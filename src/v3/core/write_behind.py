@@ -0,0 +1,242 @@
+"""
+Menir Core V5.2 - Write-Behind Coalescing Buffer
+Escritas pequenas e frequentes (anomalias, eventos PROV-O) deixam de ser uma
+transação por linha:
+acumulam por (statement, tenant) e descem como UM `UNWIND $rows` quando o
+lote atinge N linhas ou após T ms.
+
+  register_statement() -> template `UNWIND $rows AS row ...` com {tenant}
+                          (substituído pelo label saneado, como no resto do core)
+  enqueue()            -> memória limitada: acima de max_pending o produtor
+                          espera o flush (backpressure)
+  spill file           -> opcional, JSON lines com fsync antes do enqueue
+                          retornar; recover() reaplica após crash (statements
+                          idempotentes: MERGE). Append e truncate sob o mesmo
+                          lock: o flush nunca apaga linha ainda não gravada
+  flush_all()          -> hook de shutdown: drena todos os buffers vivos
+
+Configuração:
+  MENIR_WRITE_BEHIND_ROWS         (default 200 linhas por UNWIND)
+  MENIR_WRITE_BEHIND_MS           (default 250ms de espera máxima)
+  MENIR_WRITE_BEHIND_MAX_PENDING  (default 10000 linhas em memória)
+  MENIR_WRITE_BEHIND_SPILL        (caminho do spill file; vazio = desligado)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import weakref
+from typing import Any
+
+from src.v3.core.concurrency import io_pool, run_in_custom_executor
+from src.v3.core.graph_access import GraphAccess, get_graph
+
+logger = logging.getLogger("WriteBehind")
+
+_STATEMENTS: dict[str, str] = {}
+_BUFFERS: "weakref.WeakSet[WriteBehindBuffer]" = weakref.WeakSet()
+
+
+def register_statement(name: str, template: str) -> None:
+    """Registra o template UNWIND de um tipo de escrita. {tenant} = label saneado."""
+    if "$rows" not in template:
+        raise ValueError(f"Statement '{name}' precisa consumir UNWIND $rows.")
+    _STATEMENTS[name] = template
+
+
+class WriteBehindBuffer:
+    """Buffer por (statement, tenant) com flush por tamanho ou por tempo."""
+
+    def __init__(
+        self,
+        graph: GraphAccess | None = None,
+        max_rows: int | None = None,
+        flush_interval_ms: float | None = None,
+        max_pending: int | None = None,
+        spill_path: str | None = None,
+    ):
+        self._graph = graph
+        self.max_rows = max_rows or int(os.getenv("MENIR_WRITE_BEHIND_ROWS", "200"))
+        self.flush_interval = (flush_interval_ms or float(os.getenv("MENIR_WRITE_BEHIND_MS", "250"))) / 1000
+        self.max_pending = max_pending or int(os.getenv("MENIR_WRITE_BEHIND_MAX_PENDING", "10000"))
+        self.spill_path = spill_path if spill_path is not None else (os.getenv("MENIR_WRITE_BEHIND_SPILL") or None)
+
+        self._rows: dict[tuple[str, str | None], list[dict[str, Any]]] = {}
+        self._pending = 0
+        self._flush_lock = asyncio.Lock()
+        # spill + append em _rows x checagem de vazio + truncate (sem esperar o grafo)
+        self._spill_lock = asyncio.Lock()
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"rows": 0, "transactions": 0, "dropped": 0}
+        _BUFFERS.add(self)
+
+    @property
+    def graph(self) -> GraphAccess:
+        return self._graph or get_graph()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def enqueue(self, statement: str, row: dict[str, Any], tenant: str | None = None) -> None:
+        await self.enqueue_many(statement, [row], tenant)
+
+    async def enqueue_many(self, statement: str, rows: list[dict[str, Any]], tenant: str | None = None) -> None:
+        if statement not in _STATEMENTS:
+            raise ValueError(f"Statement write-behind desconhecido: {statement}")
+        if not rows:
+            return
+
+        # Backpressure: memória cheia -> o produtor paga o flush
+        if self._pending + len(rows) > self.max_pending:
+            await self.flush()
+            if self._pending + len(rows) > self.max_pending:
+                raise RuntimeError("Write-behind saturado: flush falhou e o buffer está cheio.")
+
+        key = (statement, tenant)
+        async with self._spill_lock:
+            if self.spill_path:
+                lines = [
+                    json.dumps({"s": statement, "t": tenant, "r": row}, ensure_ascii=False, default=str)
+                    for row in rows
+                ]
+                await run_in_custom_executor(io_pool, self._spill, lines)
+            self._rows.setdefault(key, []).extend(rows)
+            self._pending += len(rows)
+
+        if len(self._rows[key]) >= self.max_rows:
+            self._spawn(self.flush(key))
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._on_timer)
+
+    async def flush(self, key: tuple[str, str | None] | None = None) -> int:
+        """Desce as linhas pendentes (de uma chave ou todas). Retorna linhas gravadas."""
+        async with self._flush_lock:
+            keys = [key] if key is not None else list(self._rows)
+            written = 0
+            for k in keys:
+                rows = self._rows.pop(k, None)
+                if not rows:
+                    continue
+                self._pending -= len(rows)
+                statement, tenant = k
+                query = _STATEMENTS[statement].replace("{tenant}", (tenant or "").replace("`", ""))
+                for start in range(0, len(rows), self.max_rows):
+                    chunk = rows[start:start + self.max_rows]
+                    try:
+                        await self.graph.write(query, {"rows": chunk}, tenant=tenant)
+                    except Exception:
+                        self._requeue(k, rows[start:])
+                        raise
+                    written += len(chunk)
+                    self.stats["rows"] += len(chunk)
+                    self.stats["transactions"] += 1
+
+            async with self._spill_lock:
+                # Sob o lock nenhum enqueue fica entre o append no spill e o append em _rows
+                if self._pending == 0:
+                    self._cancel_timer()
+                    if self.spill_path:
+                        await run_in_custom_executor(io_pool, self._truncate_spill)
+            return written
+
+    async def recover(self) -> int:
+        """Reaplica o spill file de uma execução anterior (boot)."""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return 0
+        entries = await run_in_custom_executor(io_pool, self._read_spill)
+        for entry in entries:
+            if entry.get("s") not in _STATEMENTS:
+                logger.error(f"Spill com statement desconhecido descartado: {entry.get('s')}")
+                continue
+            key = (entry["s"], entry.get("t"))
+            self._rows.setdefault(key, []).append(entry["r"])
+            self._pending += 1
+        if entries:
+            logger.warning(f"♻️ Write-behind: reaplicando {len(entries)} linhas do spill file.")
+        return await self.flush()
+
+    async def close(self) -> None:
+        """Flush-on-shutdown: aguarda flushes em voo e drena o restante."""
+        self._cancel_timer()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._spawn(self.flush())
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Flush write-behind falhou ({self._pending} linhas retidas): {task.exception()}")
+            # Nova tentativa no próximo intervalo
+            if self._pending and self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._on_timer)
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _requeue(self, key: tuple[str, str | None], rows: list[dict[str, Any]]) -> None:
+        room = max(self.max_pending - self._pending, 0)
+        kept = rows[:room]
+        if len(kept) < len(rows):
+            self.stats["dropped"] += len(rows) - len(kept)
+            logger.error(f"Write-behind cheio: {len(rows) - len(kept)} linhas de {key[0]} descartadas da memória.")
+        self._rows[key] = kept + self._rows.get(key, [])
+        self._pending += len(kept)
+
+    def _spill(self, lines: list[str]) -> None:
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _truncate_spill(self) -> None:
+        with open(self.spill_path, "w", encoding="utf-8") as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read_spill(self) -> list[dict[str, Any]]:
+        entries = []
+        with open(self.spill_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Linha truncada por crash no meio do append
+                    logger.warning("Linha corrompida no spill file ignorada.")
+        return entries
+
+
+async def flush_all() -> None:
+    """Hook de shutdown: drena todos os buffers vivos."""
+    for buffer in list(_BUFFERS):
+        try:
+            await buffer.close()
+        except Exception:
+            logger.exception("Falha ao drenar write-behind no shutdown.")
+
+
+_default: WriteBehindBuffer | None = None
+
+
+def get_write_behind() -> WriteBehindBuffer:
+    """Buffer compartilhado do processo (sobre o GraphAccess compartilhado)."""
+    global _default
+    if _default is None:
+        _default = WriteBehindBuffer()
+    return _default
@@ -6,16 +6,33 @@ Implements the core observational capabilities for the Agent.
 import asyncio
 import logging
 import os
+import re
 from typing import Any
 
+from src.v3.core.schemas.identity import TenantContext
 from src.v3.graph_schema import STRICT_SCHEMA
 from src.v3.mcp.security import PiiFilter
 from src.v3.menir_bridge import MenirBridge, get_bridge
 from src.v3.core.concurrency import run_in_custom_executor, io_pool
+from src.v3.tenant_middleware import CAUSAL, EVENTUAL, READ, WRITE
 
 # Initialize Helper Logger
 logger = logging.getLogger("MenirMCPTools")
 
+_WRITE_CLAUSES = re.compile(r"\b(CREATE|MERGE|SET|DELETE|DETACH|REMOVE|DROP|FOREACH|LOAD\s+CSV)\b")
+# CALL de procedure (não CALL { subquery }): só procedures sabidamente de leitura vão às réplicas
+_PROCEDURE_CALLS = re.compile(r"\bCALL\s+([A-Z_][\w.]*)")
+_READ_PROCEDURES = re.compile(
+    r"(DB\.INDEX\.(FULLTEXT|VECTOR)\.QUERY\w*|DB\.(LABELS|RELATIONSHIPTYPES|PROPERTYKEYS|SCHEMA\.\w+)"
+    r"|APOC\.(META|PATH|TEXT|COLL|CONVERT|MAP|DATE|NUMBER)\.\w+)"
+)
+
+# query_memory: registros puxados em lotes e teto de linhas devolvidas ao agente
+QUERY_MEMORY_FETCH_SIZE = int(os.getenv("MENIR_MCP_FETCH_SIZE", "200"))
+QUERY_MEMORY_MAX_ROWS = int(os.getenv("MENIR_MCP_MAX_ROWS", "1000"))
+# search_memory: teto de resultados por chamada
+SEARCH_MEMORY_MAX_LIMIT = 50
+
 # ==========================================
 # Tool Logic
 # ==========================================
@@ -116,11 +133,12 @@ class MenirTools:
         try:
 
             async def _run_query():
-                with bridge.driver.session() as session:
-                    result = session.run(query, days=days)
+                # Listagem diagnóstica: réplica sem esperar bookmarks
+                async with bridge.driver.read_session(EVENTUAL) as session:
+                    result = await session.run(query, days=days)
                     return [
                         {"file": r["file"], "hash": r["hash"], "error": r.get("error", "Unknown")}
-                        for r in result
+                        for r in await result.data()
                     ]
 
             return await asyncio.wait_for(_run_query(), timeout=5.0)
@@ -148,18 +166,60 @@ class MenirTools:
                 f"Isolamento: O Tenant {tenant_id} não tem permissão para queries destrutivas via MCP."
             )
 
-        def _run():
+        # Leitura pura vai às réplicas (eventual); cláusula de escrita ou procedure
+        # fora da allowlist de leitura (apoc.create.*, db.create.* ...) vai ao líder
+        if _WRITE_CLAUSES.search(upper_query) or _calls_write_procedure(upper_query):
+            access, consistency = WRITE, CAUSAL
+        else:
+            access, consistency = READ, EVENTUAL
+
+        try:
             bridge = get_bridge()
-            with bridge.driver.session() as session:
+            async with bridge.driver.session(access, consistency, fetch_size=QUERY_MEMORY_FETCH_SIZE) as session:
                 # Na v6.0 introduziremos Neo4j Role-Based Access Control por Tenant real.
-                result = session.run(cypher_query)
-                return [record.data() for record in result]
+                result = await session.run(cypher_query)
+                # Streaming com teto: nunca materializa o resultado inteiro de uma query aberta
+                rows: list[dict] = []
+                async for record in result:
+                    if len(rows) >= QUERY_MEMORY_MAX_ROWS:
+                        rows.append({"truncated": True, "max_rows": QUERY_MEMORY_MAX_ROWS})
+                        break
+                    rows.append(record.data())
+                return rows
+        except Exception as e:
+            logger.exception("Falha ao executar query_memory via MCP.")
+            return [{"error": str(e)}]
+
 
+    @staticmethod
+    async def search_memory(tenant_id: str, query_text: str, limit: int = 5) -> list[dict]:
+        """
+        Busca híbrida (full-text + vetor, fundidos por RRF) restrita ao tenant.
+        Sem embedding da pergunta (API fora), cai para a perna lexical.
+        """
+        if not tenant_id:
+            raise ValueError("Tenant_ID é obrigatório para search_memory.")
+        limit = max(1, min(int(limit), SEARCH_MEMORY_MAX_LIMIT))
+
+        embedding = None
         try:
-            return await run_in_custom_executor(io_pool, _run)
+            from src.v3.core.embedding_service import EmbeddingService
+            embedding = await EmbeddingService._get_intel().generate_embedding(query_text)
         except Exception as e:
-            logger.exception("Falha ao executar query_memory via MCP.")
+            logger.warning(f"search_memory sem embedding (somente lexical): {e}")
+
+        token = TenantContext.set(tenant_id)
+        try:
+            return await get_bridge().hybrid_search(query_text, embedding=embedding, limit=limit)
+        except Exception as e:
+            logger.exception("Falha ao executar search_memory via MCP.")
             return [{"error": str(e)}]
+        finally:
+            TenantContext.reset(token)
+
+
+def _calls_write_procedure(upper_query: str) -> bool:
+    return any(not _READ_PROCEDURES.fullmatch(name) for name in _PROCEDURE_CALLS.findall(upper_query))
 
 
 # Internal Helper for Explain Node
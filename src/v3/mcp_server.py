@@ -41,6 +41,19 @@ class MenirMCPServer:
                 },
                 "allowed_tenants": ["BECO", "SANTOS", "ROOT"],
             },
+            "search_memory": {
+                "name": "search_memory",
+                "description": "Busca híbrida (texto + semântica) no grafo do Tenant ativo: faturas, IBANs, números IDE, fornecedores e trechos de documentos. Use no lugar da query_memory quando não souber a estrutura exata do grafo.",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "query": {"type": "string", "description": "Texto livre ou identificador exato."},
+                        "limit": {"type": "integer", "description": "Máximo de resultados (padrão 5, teto 50)."},
+                    },
+                    "required": ["query"],
+                },
+                "allowed_tenants": ["BECO", "SANTOS"],
+            },
             "export_cresus_tabular": {
                 "name": "export_cresus_tabular",
                 "description": "Exporta as transações financeiras reconciliadas do Tenant ativo para formato tabular .txt do ERP Crésus.",
@@ -102,6 +115,12 @@ class MenirMCPServer:
             cypher = arguments.get("cypher_query", "")
             return await MenirTools.query_memory(tenant_id, cypher)
 
+        elif tool_name == "search_memory":
+            from src.v3.mcp.protools import MenirTools
+            return await MenirTools.search_memory(
+                tenant_id, arguments.get("query", ""), arguments.get("limit", 5)
+            )
+
         elif tool_name == "export_cresus_tabular":
             # Na versão integrada, chamaria o CresusExporter
             return {
@@ -3,8 +3,10 @@ Menir v3.5 Bridge Module
 Neo4j Interactions with Pydantic Type Safety & Tenacity Resilience.
 """
 
+import asyncio
 import logging
 import os
+import re
 
 from dotenv import load_dotenv
 from neo4j import exceptions
@@ -18,13 +20,61 @@ from tenacity import (
 
 from src.v3.core.schemas import BaseNode, Document, Relationship
 from src.v3.core.schemas.identity import TenantContext
-from src.v3.tenant_middleware import TenantAwareDriver
+from src.v3.tenant_middleware import CAUSAL, EVENTUAL, TenantAwareDriver
 from src.v3.core.neo4j_pool import get_shared_driver
+from src.v3.core.existence_filter import DOCUMENT_SHA256, get_existence_index
+from src.v3.core.quantization import QuantizedVectorStore, quantization_enabled
 
 # Force override to ignore stale shell variables
 load_dotenv(override=True)
 logger = logging.getLogger("MenirBridge")
 
+# Full-text (Lucene) index for exact identifiers the vector index misses
+# (invoice numbers, IBANs, IDE numbers, company names). Created by schema
+# migration 3 (ensure_schema at boot), which imports these constants.
+FULLTEXT_INDEX = "menir_fulltext"
+FULLTEXT_LABELS = ("Chunk", "Document", "Invoice", "Vendor", "Person", "BankAccount")
+FULLTEXT_PROPERTIES = ("text", "name", "filename", "vendor_name", "vendor_iban", "ide_number", "iban")
+
+# Reciprocal Rank Fusion constant (Cormack et al.; 60 is the usual default)
+RRF_K = 60
+
+# Ceiling of the candidate window a search leg widens to while looking for
+# `limit` hits of the active tenant in the shared (all-tenant) indexes
+SEARCH_MAX_CANDIDATES = int(os.getenv("MENIR_SEARCH_MAX_CANDIDATES", "5000"))
+
+_LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+
+def escape_lucene(text: str) -> str:
+    """Escapes Lucene query syntax so user text is matched literally."""
+    return _LUCENE_SPECIAL.sub(r"\\\1", text.strip())
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: dict[str, list[dict]], k: int = RRF_K, limit: int | None = None
+) -> list[dict]:
+    """
+    Fuses ranked result lists by uid: rrf = sum(1 / (k + rank)).
+    Each fused hit keeps the per-source score and rank (None when absent).
+    """
+    fused: dict[str, dict] = {}
+    for source, hits in ranked_lists.items():
+        for rank, hit in enumerate(hits, start=1):
+            entry = fused.setdefault(
+                hit["uid"],
+                {"uid": hit["uid"], "text": hit.get("text"), "rrf_score": 0.0}
+                | {f"{s}_score": None for s in ranked_lists}
+                | {f"{s}_rank": None for s in ranked_lists},
+            )
+            if entry["text"] is None:
+                entry["text"] = hit.get("text")
+            entry[f"{source}_score"] = hit["score"]
+            entry[f"{source}_rank"] = rank
+            entry["rrf_score"] += 1.0 / (k + rank)
+    ranked = sorted(fused.values(), key=lambda h: h["rrf_score"], reverse=True)
+    return ranked[:limit] if limit is not None else ranked
+
 
 
 _bridge_instance: "MenirBridge | None" = None
@@ -88,7 +138,7 @@ class MenirBridge:
         MATCH (d:Document:`{safe_tenant}` {{sha256: $sha, project: $proj}})
         RETURN count(d) > 0 as exists
         """
-        async with self.driver.session() as session:
+        async with self.driver.read_session(CAUSAL) as session:
             result = await session.run(query, sha=sha256, proj=project)
             record = await result.single()
             if record and record["exists"]:
@@ -104,10 +154,15 @@ class MenirBridge:
 
         safe_tenant = tenant_id.replace("`", "")
         query = f"MATCH (d:Document:`{safe_tenant}` {{sha256: $sha}}) RETURN count(d) > 0 as exists"
-        async with self.driver.session() as session:
-            result = await session.run(query, sha=sha256)
-            record = await result.single()
-            return record["exists"] if record else False
+
+        async def _fetch() -> bool:
+            async with self.driver.read_session(CAUSAL) as session:
+                result = await session.run(query, sha=sha256)
+                record = await result.single()
+                return record["exists"] if record else False
+
+        # Reprocessamento recente responde pelo LRU; negativo sempre confirmado no grafo
+        return await get_existence_index().exists(safe_tenant, DOCUMENT_SHA256, sha256, _fetch)
 
     @retry(
         stop=stop_after_attempt(5),
@@ -162,7 +217,7 @@ class MenirBridge:
                 "props": props,
             }
 
-        async with self.driver.session() as session:
+        async with self.driver.write_session() as session:
             await session.run(query, **params)
             # No try/except needed here, Tenacity handles the retries.
             # If it fails 5 times, it raises the exception up to the Runner.
@@ -194,7 +249,7 @@ class MenirBridge:
         SET r += $props, r.project = $proj
         """
 
-        async with self.driver.session() as session:
+        async with self.driver.write_session() as session:
             await session.run(
                 query,
                 src=rel.source_uid,
@@ -241,7 +296,7 @@ class MenirBridge:
         """
 
         try:
-            async with self.driver.session() as session:
+            async with self.driver.write_session() as session:
                 # 1. Try Exact
                 result = await (await session.run(query_exact, name=safe_name, sha=doc_hash)).single()
                 if result:
@@ -281,7 +336,7 @@ class MenirBridge:
         }}
         """
         try:
-            async with self.driver.session() as session:
+            async with self.driver.write_session() as session:
                 await session.run(query)
                 logger.info("✅ Native Vector Index 'menir_vectors' Ready.")
         except exceptions.ClientError as e:
@@ -312,9 +367,14 @@ class MenirBridge:
             c.generated_at = datetime()
         MERGE (c)-[:BELONGS_TO]->(d)
         """
-        async with self.driver.session() as session:
+        async with self.driver.write_session() as session:
             await session.run(query, uid=chunk_id, text=text, embedding=embedding, doc_sha=doc_sha)
 
+        if quantization_enabled():
+            await QuantizedVectorStore.persist(
+                "Chunk", chunk_id, embedding, tenant_id, driver=self.driver
+            )
+
     async def vector_search(
         self, embedding: list, limit: int = 5, min_score: float = 0.7
     ):
@@ -326,12 +386,111 @@ class MenirBridge:
             raise ValueError("Tenant_ID is required to prevent data leakage in Vector Search.")
         safe_tenant = str(tenant_id).replace("`", "")
 
+        if quantization_enabled():
+            hits = await QuantizedVectorStore.search(
+                embedding, "Chunk", tenant_id, top_k=limit, driver=self.driver
+            )
+            return [
+                {"text": h["text"], "score": h["score"], "uid": h["id"]}
+                for h in hits
+                if h["score"] >= min_score
+            ]
+
+        # Candidates come best-first: once one falls under min_score, widening is pointless
+        query = f"""
+        CALL db.index.vector.queryNodes('menir_vectors', $candidates, $embedding)
+        YIELD node, score
+        WITH collect({{node: node, score: score}}) AS raw
+        RETURN size(raw) AS scanned,
+               coalesce(raw[-1].score < $min_score, false) AS exhausted,
+               [h IN raw WHERE h.score >= $min_score AND '{safe_tenant}' IN labels(h.node) |
+                {{text: h.node.text, score: h.score, uid: h.node.uid}}][..$limit] AS hits
+        """
+        return await self._tenant_hits(query, limit, embedding=embedding, min_score=min_score)
+
+    async def lexical_search(self, query_text: str, limit: int = 5) -> list[dict]:
+        """
+        Lucene full-text search, filtered by Tenant_ID.
+        The index is shared across tenants; see _tenant_hits for how the
+        candidate window grows until `limit` tenant hits are found.
+        """
+        tenant_id = TenantContext.get()
+        if not tenant_id:
+            raise ValueError("Tenant_ID is required to prevent data leakage in Lexical Search.")
+        safe_tenant = str(tenant_id).replace("`", "")
+
+        lucene_query = escape_lucene(query_text)
+        if not lucene_query:
+            return []
+
         query = f"""
-        CALL db.index.vector.queryNodes('menir_vectors', $limit, $embedding)
+        CALL db.index.fulltext.queryNodes('{FULLTEXT_INDEX}', $q, {{limit: $candidates}})
         YIELD node, score
-        WHERE score >= $min_score AND '{safe_tenant}' IN labels(node)
-        RETURN node.text as text, score, node.uid as uid
+        WITH collect({{node: node, score: score}}) AS raw
+        RETURN size(raw) AS scanned, false AS exhausted,
+               [h IN raw WHERE '{safe_tenant}' IN labels(h.node) |
+                {{uid: coalesce(h.node.uid, h.node.sha256, elementId(h.node)),
+                  text: coalesce(h.node.text, h.node.name, h.node.vendor_name), score: h.score}}][..$limit] AS hits
+        """
+        return await self._tenant_hits(query, limit, q=lucene_query)
+
+    async def _tenant_hits(self, query: str, limit: int, **params) -> list[dict]:
+        """
+        Runs a search leg over a shared index with a growing candidate window
+        (x4 per round) until it yields `limit` hits of the active tenant, the
+        index has no more candidates (scanned < window, or `exhausted`), or
+        SEARCH_MAX_CANDIDATES is reached. A small tenant next to a large one
+        still gets a full page instead of whatever the first window held.
         """
-        async with self.driver.session() as session:
-            result = await session.run(query, limit=limit, embedding=embedding, min_score=min_score)
-            return [{"text": r["text"], "score": r["score"]} for r in await result.list()]
+        candidates = min(limit * 4, SEARCH_MAX_CANDIDATES)
+        async with self.driver.read_session(EVENTUAL) as session:
+            while True:
+                result = await session.run(query, candidates=candidates, limit=limit, **params)
+                row = await result.single()
+                if row is None:
+                    return []
+                hits = [dict(h) for h in row["hits"]]
+                if (
+                    len(hits) >= limit
+                    or row["exhausted"]
+                    or row["scanned"] < candidates
+                    or candidates >= SEARCH_MAX_CANDIDATES
+                ):
+                    return hits
+                candidates = min(candidates * 4, SEARCH_MAX_CANDIDATES)
+
+    async def hybrid_search(
+        self,
+        query_text: str,
+        embedding: list | None = None,
+        limit: int = 5,
+        min_score: float = 0.0,
+        rrf_k: int = RRF_K,
+    ) -> list[dict]:
+        """
+        Hybrid retrieval: full-text and vector queries run concurrently and
+        are fused with Reciprocal Rank Fusion.
+        Each hit carries rrf_score plus lexical_score/vector_score and their
+        ranks (None when the hit came from only one side).
+        Without an embedding, degrades to lexical-only ranking.
+        """
+        # Each leg fetches a deeper list so fusion can promote items ranked
+        # moderately by both sides.
+        depth = limit * 3
+        legs = {"lexical": self.lexical_search(query_text, limit=depth)}
+        if embedding:
+            legs["vector"] = self.vector_search(embedding, limit=depth, min_score=min_score)
+
+        results = await asyncio.gather(*legs.values(), return_exceptions=True)
+        ranked_lists: dict[str, list[dict]] = {}
+        for source, outcome in zip(legs, results):
+            if isinstance(outcome, BaseException):
+                # One degraded leg must not take down retrieval
+                logger.warning(f"Hybrid Search: {source} leg failed: {outcome}")
+                ranked_lists[source] = []
+            else:
+                ranked_lists[source] = outcome
+
+        if all(isinstance(o, BaseException) for o in results):
+            raise results[0]
+        return reciprocal_rank_fusion(ranked_lists, k=rrf_k, limit=limit)
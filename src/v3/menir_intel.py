@@ -127,6 +127,46 @@ class MenirIntel:
             logger.exception(f"Falha ao gerar embedding para texto: {text[:80]}...")
             return []
 
+    # Limite do endpoint batchEmbedContents do Gemini por requisição
+    EMBED_BATCH_MAX = 100
+
+    @retry(
+        stop=(stop_after_attempt(3) | stop_after_delay(60)),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+    )
+    async def generate_embeddings(self, texts: list[str]) -> list[list[float]]:
+        """
+        Versão em lote de generate_embedding: uma requisição (e um slot do
+        aiolimiter) para até EMBED_BATCH_MAX textos.
+        Retorna vetores na mesma ordem de `texts`; [] na posição que falhar.
+        """
+        if not texts:
+            return []
+        from google.genai import types
+        from src.v3.core.concurrency import run_in_custom_executor, io_pool
+
+        vectors: list[list[float]] = []
+        for start in range(0, len(texts), self.EMBED_BATCH_MAX):
+            chunk = texts[start:start + self.EMBED_BATCH_MAX]
+            try:
+                async with self.limiter:
+                    result = await run_in_custom_executor(
+                        io_pool,
+                        self.client.models.embed_content,
+                        model="models/gemini-embedding-001",
+                        contents=chunk,
+                        config=types.EmbedContentConfig(output_dimensionality=768),
+                        http_config={"timeout": 60.0}
+                    )
+                embeddings = (result.embeddings or []) if result else []
+                values = [list(e.values or []) for e in embeddings]
+                vectors.extend(values + [[] for _ in range(len(chunk) - len(values))])
+            except Exception:
+                logger.exception(f"Falha ao gerar lote de {len(chunk)} embeddings.")
+                vectors.extend([] for _ in chunk)
+        return vectors
+
     @cachedmethod(cache=operator.attrgetter("persona_cache"))
     def _fetch_system_persona(self) -> str:
         """
@@ -5,18 +5,15 @@ and the strict temporal Tax Ontology for Swiss ERP Integrations (Crésus).
 """
 
 import logging
+from datetime import datetime, timezone
 from typing import TYPE_CHECKING, TypeVar
 
-from cachetools import TTLCache, cached
-from neo4j import exceptions
-from tenacity import (
-    before_sleep_log,
-    retry,
-    retry_if_exception_type,
-    stop_after_attempt,
-    wait_exponential,
-)
+from cachetools import TTLCache
+
+from src.v3.core.graph_access import GraphAccess
 from src.v3.core.neo4j_pool import get_shared_driver
+from src.v3.core.write_behind import get_write_behind, register_statement
+from src.v3.tenant_middleware import CAUSAL, EVENTUAL
 
 if TYPE_CHECKING:
     from pydantic import BaseModel
@@ -25,6 +22,41 @@ T = TypeVar("T", bound="BaseModel")
 
 logger = logging.getLogger("MetaCognition")
 
+register_statement("entropy_anomaly", """
+UNWIND $rows AS row
+// 1. The Origin Document (The failed Invoice)
+// Even on failure, create an :Invoice placeholder to anchor the anomaly context.
+MERGE (i:Invoice:`{tenant}` {file_hash: row.file_hash})
+ON CREATE SET i.status = 'QUARANTINED', i.ingested_at = datetime(row.at)
+
+// 2. The Anomaly Event (Consolidated Anomaly Node)
+MERGE (a:Anomaly {file_hash: row.file_hash})
+SET a.type = row.error_type,
+    a.count = row.error_count,
+    a.details = row.raw_errors,
+    a.timestamp = datetime(row.at),
+    a.severity = "High"
+
+// 3. A Assinatura de Inépcia (Quem causou?)
+MERGE (ag:Agent {name: row.agent_name})
+MERGE (ag)-[:GENERATED_ANOMALY]->(a)
+
+// 4. Conexão Origem-Destino (Rule 12: Errors mapped via RECONCILED)
+MERGE (i)-[r:RECONCILED]->(a)
+SET r.status = 'FAILED_VALIDATION'
+""")
+
+# Quarentena NÃO passa pelo write-behind: o flip (e o import_batch de um rollback
+# parcial) precisa estar no grafo quando o chamador segue adiante.
+_DOCUMENT_QUARANTINE = """
+MERGE (d:Document:`{tenant}` {file_hash: $file_hash})
+SET d.status = $status,
+    d.quarantine_reason = $reason,
+    d.doc_type = coalesce($doc_type, d.doc_type),
+    d.import_batch = coalesce($import_batch, d.import_batch),
+    d.quarantined_at = datetime($at)
+"""
+
 
 class MenirOntologyManager:
     """
@@ -37,6 +69,13 @@ class MenirOntologyManager:
         self.driver = get_shared_driver()
         import os
         self.db_name = db_name or os.getenv("NEO4J_DB")
+        # Retries/timeouts ficam na camada de acesso (transações gerenciadas)
+        self.graph = GraphAccess(self.driver)
+        # Escritas pequenas (anomalias, eventos PROV) coalescidas em UNWIND
+        self.write_behind = get_write_behind()
+        # Cache de 1h para evitar exaustão do pool sob carga de 25k
+        self._context_cache: TTLCache = TTLCache(maxsize=100, ttl=3600)
+        self._golden_cache: TTLCache = TTLCache(maxsize=100, ttl=3600)
 
     def close(self):
         # Pool manager handles actual shutdown
@@ -54,15 +93,7 @@ class MenirOntologyManager:
             logger.exception(f"❌ Failed Strict OGM parsing for {model.__name__}: {e}")
             raise
 
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type(
-            (exceptions.ServiceUnavailable, exceptions.TransientError, exceptions.SessionExpired)
-        ),
-        before_sleep=before_sleep_log(logger, logging.WARNING),
-    )
-    def bootstrap_system_graph(self):
+    async def bootstrap_system_graph(self):
         """
         Injects the immutable Base Ontology and specific BECO ERP logic.
         Uses pure Cypher to guarantee schema rigidity and temporal constraints.
@@ -121,21 +152,12 @@ class MenirOntologyManager:
 
         RETURN core.name, tenant.name
         """
-        with self.driver.session(database=self.db_name) as session:
-            session.run(query)
-            logger.info(
-                "✅ Core System Ontology (Kernel) & Swiss Tax Rules successfully injected into the Graph."
-            )
+        await self.graph.write(query, database=self.db_name)
+        logger.info(
+            "✅ Core System Ontology (Kernel) & Swiss Tax Rules successfully injected into the Graph."
+        )
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=5),
-        retry=retry_if_exception_type(
-            (exceptions.ServiceUnavailable, exceptions.TransientError, exceptions.SessionExpired)
-        ),
-    )
-    @cached(cache=TTLCache(maxsize=100, ttl=3600))
-    def get_tenant_active_context(self, tenant_name: str, invoice_date: str) -> dict:
+    async def get_tenant_active_context(self, tenant_name: str, invoice_date: str) -> dict:
         """
         O Oráculo pergunta ao Banco: "Baseado nesta data, quais leis se aplicam?"
         This effectively combats Context Degradation and prevents hallucination
@@ -155,6 +177,10 @@ class MenirOntologyManager:
         MATCH (t:Tenant {name: $tenant_name})-[:HAS_TVA_RATE]->(tr:TVARate)
         RETURN tr.rate AS rate, tr.label AS label
         """
+        cache_key = (tenant_name, str(invoice_date))
+        if cache_key in self._context_cache:
+            return self._context_cache[cache_key]
+
         from typing import Any
         context_payload: dict[str, Any] = {
             "query_date": invoice_date,
@@ -163,39 +189,38 @@ class MenirOntologyManager:
             "tva_rates": [],
         }
 
-        with self.driver.session(database=self.db_name) as session:
-            # Fetch generic temporal rules
-            result = session.run(query_rules, tenant_name=tenant_name, invoice_date=invoice_date)
-            for record in result:
-                context_payload["active_rules"].append(
-                    {
-                        "rule_name": record["rule_name"],
-                        "authority": record["authority"],
-                        "parameters": record["active_properties"],
-                    }
-                )
-
-            # Fetch explicit TVA rates
-            result_tva = session.run(query_tva, tenant_name=tenant_name)
-            for record in result_tva:
-                context_payload["tva_rates"].append(float(record["rate"]))
+        # Fetch generic temporal rules
+        rules = await self.graph.read(
+            query_rules,
+            {"tenant_name": tenant_name, "invoice_date": invoice_date},
+            database=self.db_name,
+            consistency=CAUSAL,  # RELOAD_RULES precisa enxergar a regra recém-gravada
+        )
+        for record in rules:
+            context_payload["active_rules"].append(
+                {
+                    "rule_name": record["rule_name"],
+                    "authority": record["authority"],
+                    "parameters": record["active_properties"],
+                }
+            )
+
+        # Fetch explicit TVA rates
+        rates = await self.graph.read(
+            query_tva, {"tenant_name": tenant_name}, database=self.db_name, consistency=CAUSAL
+        )
+        for record in rates:
+            context_payload["tva_rates"].append(float(record["rate"]))
 
         if not context_payload["active_rules"] and not context_payload["tva_rates"]:
             logger.warning(
                 f"⚠️ NO ACTIVE TAX CONTEXT found for {tenant_name} on date {invoice_date}. Oracle will operate in the dark!"
             )
 
+        self._context_cache[cache_key] = context_payload
         return context_payload
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=5),
-        retry=retry_if_exception_type(
-            (exceptions.ServiceUnavailable, exceptions.TransientError, exceptions.SessionExpired)
-        ),
-    )
-    @cached(cache=TTLCache(maxsize=100, ttl=3600))
-    def get_golden_examples(self, tenant_name: str) -> list[dict]:
+    async def get_golden_examples(self, tenant_name: str) -> list[dict]:
         """
         Retorna os nós :GoldenExample para o Tenant específico.
         Usado para ancoragem semântica (Few-Shot Prompting / Style LoRA) para redução de alucinações.
@@ -205,31 +230,28 @@ class MenirOntologyManager:
         MATCH (g:GoldenExample {tenant: $tenant_name})
         RETURN g.input_text AS input_text, g.ideal_json AS ideal_json
         """
-        golden = []
-        with self.driver.session(database=self.db_name) as session:
-            result = session.run(query, tenant_name=tenant_name)
-            for record in result:
-                golden.append(
-                    {
-                        "input_text": record.get("input_text", ""),
-                        "ideal_json": record.get("ideal_json", ""),
-                    }
-                )
-
+        if tenant_name in self._golden_cache:
+            return self._golden_cache[tenant_name]
+
+        records = await self.graph.read(
+            query, {"tenant_name": tenant_name}, database=self.db_name, consistency=CAUSAL
+        )
+        golden = [
+            {
+                "input_text": record.get("input_text", ""),
+                "ideal_json": record.get("ideal_json", ""),
+            }
+            for record in records
+        ]
+
+        self._golden_cache[tenant_name] = golden
         if golden:
             logger.info(
                 f"✨ Retrieved {len(golden)} GoldenExamples from Graph for Tenant {tenant_name}."
             )
         return golden
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=3),
-        retry=retry_if_exception_type(
-            (exceptions.ServiceUnavailable, exceptions.TransientError, exceptions.SessionExpired)
-        ),
-    )
-    def check_system_health(self) -> bool:
+    async def check_system_health(self) -> bool:
         """
         Preemptive Meta-Diagnostic (Phase 32).
         The architecture queries its own topology to verify if all FATAL dependencies
@@ -241,32 +263,23 @@ class MenirOntologyManager:
         WHERE d.is_active = false AND d.criticality = 'FATAL'
         RETURN p.name AS pipeline, d.name AS dependency
         """
-        with self.driver.session(database=self.db_name) as session:
-            result = session.run(query)
-            failures = [
-                {"pipeline": record["pipeline"], "dependency": record["dependency"]}
-                for record in result
-            ]
-
-            if failures:
-                logger.error(
-                    f"❌ KERNEL PANIC: System Health Check failed! Dead dependencies found: {failures}"
-                )
-                logger.error("Circuit Breaker Tripped. Standby enforced.")
-                return False
-
-            logger.debug("✅ Kernel Health Check: All FATAL dependencies are active.")
-            return True
-
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_exponential(multiplier=1, min=1, max=10),
-        retry=retry_if_exception_type(
-            (exceptions.ServiceUnavailable, exceptions.TransientError, exceptions.SessionExpired)
-        ),
-        before_sleep=before_sleep_log(logger, logging.WARNING),
-    )
-    def inject_entropy_anomaly(
+        records = await self.graph.read(query, database=self.db_name, consistency=EVENTUAL)
+        failures = [
+            {"pipeline": record["pipeline"], "dependency": record["dependency"]}
+            for record in records
+        ]
+
+        if failures:
+            logger.error(
+                f"❌ KERNEL PANIC: System Health Check failed! Dead dependencies found: {failures}"
+            )
+            logger.error("Circuit Breaker Tripped. Standby enforced.")
+            return False
+
+        logger.debug("✅ Kernel Health Check: All FATAL dependencies are active.")
+        return True
+
+    async def inject_entropy_anomaly(
         self,
         tenant: str,
         file_hash: str,
@@ -278,51 +291,50 @@ class MenirOntologyManager:
         """
         Injects anomaly data into Neo4j.
         Consolidates multiple errors into a single :Anomaly node per document via file hashing
-        to prevent database transaction overhead.
-        """
-        query = """
-        // 1. The Origin Document (The failed Invoice)
-        // Even on failure, create an :Invoice placeholder to anchor the anomaly context.
-        MERGE (i:Invoice:`{tenant_safe}` {file_hash: $file_hash})
-        ON CREATE SET i.status = 'QUARANTINED', i.ingested_at = datetime()
-        
-        // 2. The Anomaly Event (Consolidated Anomaly Node)
-        MERGE (a:Anomaly {file_hash: $file_hash})
-        SET a.type = $error_type,
-            a.count = $error_count,
-            a.details = $raw_errors,
-            a.timestamp = datetime(),
-            a.severity = "High"
-            
-        // 3. A Assinatura de Inépcia (Quem causou?)
-        MERGE (ag:Agent {name: $agent_name})
-        MERGE (ag)-[:GENERATED_ANOMALY]->(a)
-        
-        // 4. Conexão Origem-Destino (Rule 12: Errors mapped via RECONCILED)
-        MERGE (i)-[r:RECONCILED]->(a)
-        SET r.status = 'FAILED_VALIDATION'
+        to prevent database transaction overhead. Write-behind: coalesced into one UNWIND per flush.
         """
-        safe_tenant = tenant.replace("`", "")
-        from typing import Any
-        params: dict[str, Any] = {
-            "tenant_safe": safe_tenant,
+        row = {
             "file_hash": file_hash,
             "error_type": error_type,
             "error_count": error_count,
             "raw_errors": raw_errors,
             "agent_name": agent_name,
+            "at": datetime.now(timezone.utc).isoformat(),
         }
         try:
-            with self.driver.session() as session:
-                session.run(query.replace("{tenant_safe}", safe_tenant), parameters=dict(params))
+            await self.write_behind.enqueue("entropy_anomaly", row, tenant=tenant)
             logger.warning(
-                f"☢️ Anomaly ({error_type}) with {error_count} errors injected into Graph (Tenant: {tenant})."
+                f"☢️ Anomaly ({error_type}) with {error_count} errors queued for Graph (Tenant: {tenant})."
             )
         except Exception as e:
             logger.exception(f"Failed to inject anomaly into graph for file {file_hash}: {e}")
 
+    async def quarantine_document(
+        self,
+        tenant: str,
+        file_hash: str,
+        reason: str,
+        doc_type: str | None = None,
+        status: str = "QUARANTINE",
+        import_batch: str | None = None,
+    ):
+        """
+        Flip de status do :Document para quarentena (síncrono, idempotente).
+        import_batch: lote de uma importação parcial (nós PARTIAL a desfazer ou retomar).
+        """
+        params = {
+            "file_hash": file_hash,
+            "status": status,
+            "reason": reason,
+            "doc_type": doc_type,
+            "import_batch": import_batch,
+            "at": datetime.now(timezone.utc).isoformat(),
+        }
+        query = _DOCUMENT_QUARANTINE.replace("{tenant}", tenant.replace("`", ""))
+        await self.graph.write(query, params, tenant=tenant)
+
 
-if __name__ == "__main__":
+async def _main():
     import os
 
     from dotenv import load_dotenv
@@ -339,19 +351,25 @@ if __name__ == "__main__":
     else:
         manager = MenirOntologyManager(uri, (user, pwd), db_name=db)
         print("🚀 Executing Base Ontology Bootstrap...")
-        manager.bootstrap_system_graph()
+        await manager.bootstrap_system_graph()
 
         print("\\n🕒 Querying Active Context for BECO on '2024-05-15':")
-        ctx = manager.get_tenant_active_context("BECO", "2024-05-15")
+        ctx = await manager.get_tenant_active_context("BECO", "2024-05-15")
         import json
 
         print(json.dumps(ctx, indent=2))
 
         print("\\n🕒 Querying Active Context for BECO on '1999-01-01' (Should be empty):")
-        ctx_old = manager.get_tenant_active_context("BECO", "1999-01-01")
+        ctx_old = await manager.get_tenant_active_context("BECO", "1999-01-01")
         print(json.dumps(ctx_old, indent=2))
 
         print("\\n🩺 Running Kernel Health Check...")
-        manager.check_system_health()
+        await manager.check_system_health()
 
         manager.close()
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    asyncio.run(_main())
@@ -27,37 +27,40 @@ async def generate_report():
         }
     }
     
-    with ontology.driver.session() as session:
-        # 1. Invoices (Excluindo quarentena por enquanto para o total billing)
-        invoices = session.run("""
-            MATCH (c:Client:BECO)-[:ORDERED]->(i:Invoice:BECO)
-            OPTIONAL MATCH (tr:Transaction:BECO)-[r:RECONCILED]->(i)
-            RETURN i.invoice_number as num, i.total_amount as amt, i.status as st, 
-                   c.name as client, tr.tx_id as tx, r.method as method
-        """)
+    graph = ontology.graph
+    # 1. Invoices (Excluindo quarentena por enquanto para o total billing), em streaming
+    invoices = graph.stream("""
+        MATCH (c:Client:BECO)-[:ORDERED]->(i:Invoice:BECO)
+        OPTIONAL MATCH (tr:Transaction:BECO)-[r:RECONCILED]->(i)
+        RETURN i.invoice_number as num, i.total_amount as amt, i.status as st, 
+               c.name as client, tr.tx_id as tx, r.method as method
+    """, tenant="BECO")
+
+    async for r in invoices:
+        inv_data = {
+            "number": r['num'],
+            "client": r['client'],
+            "amount": r['amt'],
+            "status": r['st']
+        }
+        report["invoices"]["total_issued"] += 1
+        report["invoices"]["total_amount_billed"] += (r['amt'] or 0.0)
         
-        for r in invoices:
-            inv_data = {
-                "number": r['num'],
-                "client": r['client'],
-                "amount": r['amt'],
-                "status": r['st']
-            }
-            report["invoices"]["total_issued"] += 1
-            report["invoices"]["total_amount_billed"] += (r['amt'] or 0.0)
-            
-            if r['tx']:
-                inv_data["reconciled_with"] = r['tx']
-                inv_data["match_method"] = r['method']
-                report["invoices"]["paid"].append(inv_data)
-                report["bank_reconciliation"]["reconciled_count"] += 1
-            else:
-                report["invoices"]["unpaid"].append(inv_data)
+        if r['tx']:
+            inv_data["reconciled_with"] = r['tx']
+            inv_data["match_method"] = r['method']
+            report["invoices"]["paid"].append(inv_data)
+            report["bank_reconciliation"]["reconciled_count"] += 1
+        else:
+            report["invoices"]["unpaid"].append(inv_data)
 
-        # 2. Quarantine Items
-        quarantine = session.run("MATCH (q:QuarantineItem:BECO) RETURN q.invoice_number as num, q.quarantine_reason as reason")
-        for r in quarantine:
-            report["invoices"]["quarantined"].append({"num": r['num'], "reason": r['reason']})
+    # 2. Quarantine Items
+    quarantine = graph.stream(
+        "MATCH (q:QuarantineItem:BECO) RETURN q.invoice_number as num, q.quarantine_reason as reason",
+        tenant="BECO",
+    )
+    async for r in quarantine:
+        report["invoices"]["quarantined"].append({"num": r['num'], "reason": r['reason']})
             
     # Salvar Report
     report_path = "beco_january_2026_report.json"
@@ -1,133 +1,387 @@
 """
 Menir Core V5.1 - Camt053 Banking Skill
-Deterministic parser for ISO 20022 camt.053 XML bank statements.
+Deterministic parser for ISO 20022 camt XML bank messages:
+camt.053 (Stmt), camt.052 intraday (Rpt) and camt.054 notifications (Ntfctn),
+as single XML documents or ZIP archives of them.
 Zero Intelligence (No LLM). Pure Cypher componentization.
+Streaming: iterparse com memória constante, ingestão em lotes de
+MENIR_CAMT_CHUNK_SIZE transações (default 1000), cada lote na sua transação.
+Documentos de um ZIP: até MENIR_CAMT_PARALLELISM (default 4) em paralelo, os
+extratos 053 antes dos 052/054 (o extrato prevalece na deduplicação).
+Cada documento é um lote de importação (import_batch): transações novas nascem
+PARTIAL e viram COMPLETE só no fim do documento. Qualquer falha põe o arquivo
+em quarentena com o id do lote, que pode ser desfeito (rollback_import_batch)
+ou retomado (reimportar o arquivo adota os nós PARTIAL do lote anterior).
 """
 
+import asyncio
+import hashlib
 import logging
 import os
+import uuid
 import xml.etree.ElementTree as ET
+import zipfile
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import BinaryIO
 
+import numpy as np
+
+from src.v3.core.columnar import TransactionBatch
+from src.v3.core.concurrency import cpu_pool, run_in_custom_executor
 from src.v3.core.menir_runner import SkillResult
+from src.v3.core.transaction_keys import KeySequencer
 from src.v3.meta_cognition import MenirOntologyManager
+from src.v3.skills.swiss_qr_parser import find_reference, normalize_reference
 
 logger = logging.getLogger("Camt053Skill")
 
+CAMT053_NS = "urn:iso:std:iso:20022:tech:xsd:camt.053.001.02"
+# Contêiner dos lançamentos: camt.053 Stmt, camt.052 Rpt, camt.054 Ntfctn
+STATEMENT_TAGS = frozenset({"Stmt", "Rpt", "Ntfctn"})
+# Preferência na deduplicação de um ZIP: o mesmo lançamento fica com o extrato 053
+MESSAGE_PRIORITY = {"BkToCstmrStmt": 0, "BkToCstmrAcctRpt": 1, "BkToCstmrDbtCdtNtfctn": 2}
+_READ_BLOCK = 1 << 20
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+class _HashingReader:
+    """Arquivo binário que acumula o SHA-256 enquanto o parser lê: uma única passada pelo disco."""
+
+    def __init__(self, raw: BinaryIO):
+        self._raw = raw
+        self._sha256 = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._raw.read(size)
+        self._sha256.update(data)
+        return data
+
+    def hexdigest(self) -> str:
+        # Parse interrompido (rollback, XML truncado): consome o resto para o hash cobrir o arquivo todo
+        while self.read(_READ_BLOCK):
+            pass
+        return self._sha256.hexdigest()
+
+
+def _message_priority(raw: BinaryIO) -> int:
+    """Tipo da mensagem camt pela raiz (053/052/054); só o início do documento é lido."""
+    depth = 0
+    try:
+        for _, elem in ET.iterparse(raw, events=("start",)):
+            depth += 1
+            if depth == 2:
+                return MESSAGE_PRIORITY.get(_local(elem.tag), len(MESSAGE_PRIORITY))
+    except ET.ParseError:
+        pass
+    return len(MESSAGE_PRIORITY)
+
+
+def _parse_entry(
+    entry: ET.Element, ns: dict[str, str], acct_iban: str, acct_ccy: str | None, keys: KeySequencer
+) -> dict:
+    """Um <Ntry> -> linha do UNWIND de Transaction."""
+    remittance = entry.findtext(".//ns:RmtInf/ns:Ustrd", namespaces=ns) or ""
+    reference = (
+        entry.findtext("ns:NtryRef", namespaces=ns)
+        or entry.findtext(".//ns:AcctSvcrRef", namespaces=ns)
+        or entry.findtext("ns:AddtlNtryInf", namespaces=ns)
+        or remittance
+    )
+    amount_el = entry.find("ns:Amt", namespaces=ns)
+    amount_str = (amount_el.text if amount_el is not None else None) or "0"
+    currency = (amount_el.get("Ccy") if amount_el is not None else None) or acct_ccy or "CHF"
+    cd_ind = entry.findtext(".//ns:CdtDbtInd", namespaces=ns) or "CRDT"
+    booking_date = (
+        entry.findtext("ns:BookgDt/ns:Dt", namespaces=ns)
+        or (entry.findtext("ns:BookgDt/ns:DtTm", namespaces=ns) or "")[:10]
+        or entry.findtext("ns:Dt", namespaces=ns)
+    )
+    # Referência estruturada do credor (QRR/SCOR); fallback: referência citada no texto livre
+    payment_reference = normalize_reference(
+        entry.findtext(".//ns:RmtInf/ns:Strd/ns:CdtrRefInf/ns:Ref", namespaces=ns)
+    ) or find_reference(remittance)
+
+    # Contraparte: quem recebeu (débito) ou quem pagou (crédito); chave dos pagamentos agrupados
+    party = "Cdtr" if cd_ind == "DBIT" else "Dbtr"
+    counterparty_iban = entry.findtext(f".//ns:RltdPties/ns:{party}Acct/ns:Id/ns:IBAN", namespaces=ns)
+    counterparty_name = (
+        entry.findtext(f".//ns:RltdPties/ns:{party}/ns:Nm", namespaces=ns)
+        or entry.findtext(f".//ns:RltdPties/ns:{party}/ns:Pty/ns:Nm", namespaces=ns)
+    )
+    if counterparty_name == "NOTPROVIDED":
+        counterparty_name = None
+
+    # Capturar Devedor (Foco no Ultimate Debtor para faturas)
+    debtor_name = (
+        entry.findtext(".//ns:RltdPties/ns:UltmtDbtr/ns:Nm", namespaces=ns)
+        or entry.findtext(".//ns:RltdPties/ns:Dbtr/ns:Nm", namespaces=ns)
+        or ""
+    )
+
+    try:
+        amount = float(amount_str)
+    except ValueError:
+        amount = 0.0
+
+    if cd_ind == "DBIT":
+        amount = -amount
+
+    # Chave natural: reimportar o extrato (ou um período sobreposto) cai nos mesmos nós
+    tx_key = keys.key(acct_iban, booking_date, amount, currency, reference)
+
+    return {
+        "tx_key": tx_key,
+        "legacy_key": keys.legacy_key(acct_iban, booking_date, amount, reference),
+        "tx_id": reference or tx_key,
+        "amount": amount,
+        "currency": currency,
+        "booking_date": booking_date or "",
+        "debtor_name": debtor_name,
+        "remittance_info": remittance,
+        "payment_reference": payment_reference,
+        "counterparty_iban": counterparty_iban,
+        "counterparty_name": counterparty_name,
+        "acct_iban": acct_iban,
+    }
+
+
+def iter_statement_chunks(
+    source: str | BinaryIO, chunk_size: int, tenant: str | None = None
+) -> Iterator[TransactionBatch]:
+    """
+    Parse incremental (iterparse) de um documento camt.052/053/054: cada <Ntry>
+    é convertido e removido da árvore assim que fecha, e as transações saem em
+    lotes colunares de chunk_size (dicionários compartilhados no documento).
+    A memória fica limitada ao lote corrente, não ao extrato. Vários
+    <Stmt>/<Rpt>/<Ntfctn> no mesmo documento são aceitos. O tenant entra na
+    chave natural (tx_key).
+    """
+    ns: dict[str, str] | None = None
+    stack: list[ET.Element] = []
+    acct_iban, acct_ccy = "UNKNOWN_IBAN", None
+    chunk: list[dict] = []
+    keys = KeySequencer(tenant)
+    dictionaries = TransactionBatch.new_dictionaries()
+
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            if ns is None:
+                # Namespace flexivel (camt.05x.001.02/.04/...)
+                ns = {"ns": elem.tag.split("}")[0][1:] if "}" in elem.tag else CAMT053_NS}
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        tag = _local(elem.tag)
+        parent = stack[-1] if stack else None
+        # Só os filhos diretos do extrato (e o próprio extrato) interessam; o resto é lido via find()
+        if parent is None or (tag not in STATEMENT_TAGS and _local(parent.tag) not in STATEMENT_TAGS):
+            continue
+
+        if tag == "Acct":
+            acct_iban = elem.findtext("ns:Id/ns:IBAN", namespaces=ns) or acct_iban
+            acct_ccy = elem.findtext("ns:Ccy", namespaces=ns) or acct_ccy
+        elif tag == "Ntry":
+            chunk.append(_parse_entry(elem, ns, acct_iban, acct_ccy, keys))
+            if len(chunk) >= chunk_size:
+                yield TransactionBatch.from_rows(chunk, dictionaries)
+                chunk = []
+        elif tag in STATEMENT_TAGS:
+            # Sequência por extrato: o mesmo lançamento tem a mesma chave no 054 e no 053
+            acct_iban, acct_ccy = "UNKNOWN_IBAN", None
+            keys = KeySequencer(tenant)
+        # Já consumido: sai da árvore (elem.clear() deixaria o nó vazio pendurado no pai)
+        parent.remove(elem)
+
+    if chunk:
+        yield TransactionBatch.from_rows(chunk, dictionaries)
+
+
+@dataclass
+class DocumentOutcome:
+    document: str
+    injected: int = 0
+    duplicates: int = 0
+    error: str | None = None
+    batch_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
 
 class Camt053Skill:
     """
-    Skill de processamento determinístico para extratos bancários Suíços (Camt.053).
+    Skill de processamento determinístico para extratos bancários Suíços
+    (família camt: 053 extrato, 052 intradiário, 054 avisos; XML ou ZIP).
     A extração é estanque à falha e guiada puramente pela ontologia do XML, sem I.A.
     """
 
-    def __init__(self, ontology_manager: MenirOntologyManager):
+    def __init__(
+        self,
+        ontology_manager: MenirOntologyManager,
+        chunk_size: int | None = None,
+        parallelism: int | None = None,
+    ):
         self.ontology_manager = ontology_manager
+        # Transações por transação Neo4j (um UNWIND idempotente por lote)
+        self.chunk_size = chunk_size or int(os.getenv("MENIR_CAMT_CHUNK_SIZE", "1000"))
+        # Documentos de um ZIP processados ao mesmo tempo
+        self.parallelism = parallelism or int(os.getenv("MENIR_CAMT_PARALLELISM", "4"))
 
     async def process_statement(self, file_path: str, tenant: str = "BECO") -> SkillResult:
         """
-        Lê e parseia o extrato XML determinístico.
+        Lê o extrato (ou cada XML de um ZIP) em streaming e injeta cada lote de
+        transações numa transação própria. O SHA-256 do documento (chave da
+        quarentena) é calculado na mesma leitura do parse.
         """
-        logger.info(f"🏦 Iniciando Parse Bancário Camt.053: {file_path}")
+        logger.info(f"🏦 Iniciando Parse Bancário camt: {file_path}")
 
         if not os.path.exists(file_path):
             return SkillResult(
                 success=False, nodes_and_edges=[], message="Arquivo XML não encontrado."
             )
 
+        if zipfile.is_zipfile(file_path):
+            return await self._process_archive(file_path, tenant)
+
         try:
-            import hashlib
-            with open(file_path, "rb") as f:
-                file_hash = hashlib.sha256(f.read()).hexdigest()
+            raw = open(file_path, "rb")
         except Exception as e:
             return SkillResult(success=False, nodes_and_edges=[], message=str(e))
 
         try:
-            # 1. Parsing Determinístico (Placeholder estrutural para namespace/etiquetas)
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-
-            # Namespace flexivel
-            ns_uri = root.tag.split("}")[0][1:] if "}" in root.tag else "urn:iso:std:iso:20022:tech:xsd:camt.053.001.02"
-            ns = {"ns": ns_uri}
-
-            transactions = []
-            acct_iban = root.findtext(".//ns:Acct/ns:Id/ns:IBAN", namespaces=ns) or "UNKNOWN_IBAN"
-
-            for entry in root.findall(".//ns:Ntry", namespaces=ns):
-                tx_id = (
-                    entry.findtext("ns:NtryRef", namespaces=ns)
-                    or entry.findtext(".//ns:AcctSvcrRef", namespaces=ns)
-                    or entry.findtext("ns:AddtlNtryInf", namespaces=ns)
-                    or str(uuid.uuid4())[:8]
-                )
-                amount_str = entry.findtext("ns:Amt", namespaces=ns) or "0"
-                cd_ind = entry.findtext(".//ns:CdtDbtInd", namespaces=ns) or "CRDT"
-                booking_date = (
-                    entry.findtext("ns:BookgDt/ns:Dt", namespaces=ns)
-                    or (entry.findtext("ns:BookgDt/ns:DtTm", namespaces=ns) or "")[:10]
-                    or entry.findtext("ns:Dt", namespaces=ns)
-                )
-                remittance = entry.findtext(".//ns:RmtInf/ns:Ustrd", namespaces=ns) or ""
-                
-                # Capturar Devedor (Foco no Ultimate Debtor para faturas)
-                debtor_name = (
-                    entry.findtext(".//ns:RltdPties/ns:UltmtDbtr/ns:Nm", namespaces=ns)
-                    or entry.findtext(".//ns:RltdPties/ns:Dbtr/ns:Nm", namespaces=ns)
-                    or ""
-                )
+            outcome = await self._ingest_document(raw, file_path, tenant, set())
+        finally:
+            raw.close()
 
-                try:
-                    amount = float(amount_str)
-                except ValueError:
-                    amount = 0.0
-
-                if cd_ind == "DBIT":
-                    amount = -amount
-
-                transactions.append(
-                    {
-                        "tx_id": tx_id,
-                        "amount": amount,
-                        "currency": "CHF",
-                        "booking_date": booking_date or "",
-                        "debtor_name": debtor_name,
-                        "remittance_info": remittance,
-                        "acct_iban": acct_iban,
-                    }
-                )
-
-            # 2. Injeção Idempotente no Neo4j
-            if transactions:
-                try:
-                    self._inject_transactions_into_graph(transactions, tenant)
-                except Exception as e:
-                    if str(e) == "TRANSACTION_ROLLBACK":
-                        self._quarantine_document(tenant, file_hash, "TRANSACTION_ROLLBACK")
-                        return SkillResult(
-                            success=False, nodes_and_edges=[], message="Injeção falhou: TRANSACTION_ROLLBACK"
-                        )
-                    raise
+        if outcome.error:
+            return SkillResult(success=False, nodes_and_edges=[], message=outcome.error)
+        return SkillResult(
+            success=True,
+            nodes_and_edges=[],
+            message=f"Camt053 processado: {outcome.injected} transações injetadas.",
+        )
 
+    async def _process_archive(self, file_path: str, tenant: str) -> SkillResult:
+        """ZIP do banco: cada XML é um documento (e um lote), até self.parallelism em paralelo."""
+        try:
+            archive = zipfile.ZipFile(file_path)
+        except Exception as e:
+            return SkillResult(success=False, nodes_and_edges=[], message=f"ZIP inválido: {e}")
+
+        with archive:
+            members = [
+                info.filename
+                for info in archive.infolist()
+                if not info.is_dir()
+                and info.filename.lower().endswith(".xml")
+                and not info.filename.startswith("__MACOSX/")
+            ]
+            if not members:
+                return SkillResult(success=False, nodes_and_edges=[], message="Nenhum documento camt no ZIP.")
+
+            limit = asyncio.Semaphore(self.parallelism)
+            # Chaves já gravadas nesta execução: o aviso 054 e o extrato 053 do mesmo lançamento entram uma vez
+            seen: set[str] = set()
+
+            def _priority(name: str) -> int:
+                with archive.open(name) as raw:
+                    return _message_priority(raw)
+
+            async def _member(name: str) -> DocumentOutcome:
+                async with limit:
+                    # ZipFile serializa o acesso ao arquivo; cada membro tem o seu cursor
+                    with archive.open(name) as raw:
+                        return await self._ingest_document(raw, name, tenant, seen)
+
+            # Uma fase por tipo de mensagem (053, depois 052, depois 054): quem fica com o
+            # lançamento repetido é o documento mais completo, não o que terminou primeiro
+            priorities = {name: await run_in_custom_executor(cpu_pool, _priority, name) for name in members}
+            outcomes: list[DocumentOutcome] = []
+            for priority in sorted(set(priorities.values())):
+                phase = [name for name in members if priorities[name] == priority]
+                outcomes.extend(await asyncio.gather(*(_member(name) for name in phase)))
+
+        injected = sum(o.injected for o in outcomes)
+        duplicates = sum(o.duplicates for o in outcomes)
+        failed = [o for o in outcomes if o.error]
+        summary = (
+            f"{len(outcomes)} documentos camt, {injected} transações injetadas, "
+            f"{duplicates} repetidas ignoradas"
+        )
+        logger.info(f"🗜️ {os.path.basename(file_path)}: {summary}.")
+        if failed:
+            details = "; ".join(f"{o.document}: {o.error}" for o in failed)
             return SkillResult(
-                success=True,
-                nodes_and_edges=[],
-                message=f"Camt053 processado: {len(transactions)} transações injetadas.",
+                success=False, nodes_and_edges=[], message=f"{summary}. Em quarentena ({len(failed)}): {details}"
             )
+        return SkillResult(success=True, nodes_and_edges=[], message=f"Camt processado: {summary}.")
+
+    async def _ingest_document(self, raw: BinaryIO, document: str, tenant: str, seen: set[str]) -> DocumentOutcome:
+        outcome = DocumentOutcome(document)
+        reader = _HashingReader(raw)
+        try:
+            chunks = iter_statement_chunks(reader, self.chunk_size, tenant)
+            while True:
+                # Parse do próximo lote fora do event loop
+                transactions = await run_in_custom_executor(cpu_pool, next, chunks, None)
+                if transactions is None:
+                    break
+
+                # Reserva antes do await: outro documento em voo não grava o mesmo lançamento
+                fresh = np.zeros(len(transactions), dtype=bool)
+                reserved: set[str] = set()
+                for k, key in enumerate(transactions.data["tx_key"].tolist()):
+                    if key not in seen and key not in reserved:
+                        reserved.add(key)
+                        fresh[k] = True
+                outcome.duplicates += len(transactions) - len(reserved)
+                if not reserved:
+                    continue
+                seen.update(reserved)
+
+                # Injeção Idempotente no Neo4j: lotes já gravados ficam PARTIAL até o fim do documento
+                try:
+                    await self._inject_transactions_into_graph(transactions[fresh].to_rows(), tenant, outcome.batch_id)
+                except Exception:
+                    seen.difference_update(reserved)
+                    raise
+                outcome.injected += len(reserved)
+
+            if outcome.injected:
+                await self._complete_import_batch(tenant, outcome.batch_id)
+            return outcome
 
         except ET.ParseError as e:
-            logger.exception(f"Erro de Parse XML fatal: {e}")
-            return SkillResult(
-                success=False, nodes_and_edges=[], message=f"Formato XML corrompido: {e}"
-            )
+            logger.exception(f"Erro de Parse XML fatal em {document}: {e}")
+            reason, outcome.error = "XML_PARSE_ERROR", f"Formato XML corrompido: {e}"
         except Exception as e:
-            logger.exception(f"Erro ao processar Camt053: {e}")
-            return SkillResult(success=False, nodes_and_edges=[], message=f"Erro estrutural: {e}")
+            if str(e) == "TRANSACTION_ROLLBACK":
+                reason, outcome.error = "TRANSACTION_ROLLBACK", "Injeção falhou: TRANSACTION_ROLLBACK"
+            else:
+                logger.exception(f"Erro ao processar camt {document}: {e}")
+                reason, outcome.error = "STRUCTURAL_ERROR", f"Erro estrutural: {e}"
 
-    def _inject_transactions_into_graph(self, transactions: list, tenant: str):
+        # Toda falha: quarentena do arquivo + lote PARTIAL identificável para rollback/retomada
+        if outcome.injected:
+            outcome.error += f" ({outcome.injected} transações já gravadas, lote {outcome.batch_id} PARTIAL)"
+        try:
+            file_hash = await run_in_custom_executor(cpu_pool, reader.hexdigest)
+        except Exception as e:
+            logger.exception(f"Hash de {document} ilegível; quarentena impossível (lote {outcome.batch_id}): {e}")
+            return outcome
+        await self._quarantine_document(
+            tenant, file_hash, reason, import_batch=outcome.batch_id if outcome.injected else None
+        )
+        return outcome
+
+    async def _inject_transactions_into_graph(self, transactions: list, tenant: str, batch_id: str):
         """
         Materializa as transações contábeis no Neo4j.
         Cria o nó (Transaction) e o atrela à (BankAccount), que por sua vez se atrela ao (Tenant).
-        Totalmente idempotente.
+        Totalmente idempotente. Nós criados (ou PARTIAL de um lote anterior) entram
+        no lote batch_id como PARTIAL.
         """
         safe_tenant = tenant.replace("`", "")
 
@@ -140,24 +394,38 @@ class Camt053Skill:
         // 2. A Conta Bancária
         MERGE (ba:BankAccount:`{safe_tenant}` {{iban: tx.acct_iban}})
         MERGE (t)-[:OWNS_ACCOUNT]->(ba)
+        WITH t, ba, tx
+
+        // 3. Nó anterior à chave natural (moeda 'CHF' chutada pelo parser antigo): adota e corrige a chave
+        OPTIONAL MATCH (legacy:Transaction:`{safe_tenant}` {{legacy_key: tx.legacy_key}})
+        WHERE legacy.tx_key <> tx.tx_key
+          AND NOT EXISTS {{ MATCH (:Transaction {{tx_key: tx.tx_key}}) }}
+        FOREACH (_ IN CASE WHEN legacy IS NULL THEN [] ELSE [1] END | SET legacy.tx_key = tx.tx_key)
 
-        // 3. A Transacao de forma Idempotente (Pelo tx_id bancario)
-        MERGE (tr:Transaction:`{safe_tenant}` {{tx_id: tx.tx_id}})
-        SET tr.amount = tx.amount,
+        // 4. A Transacao de forma Idempotente (Pela chave natural determinística)
+        MERGE (tr:Transaction:`{safe_tenant}` {{tx_key: tx.tx_key}})
+        ON CREATE SET tr.import_batch = $batch_id, tr.import_status = 'PARTIAL'
+        ON MATCH SET tr.import_batch = CASE WHEN tr.import_status = 'PARTIAL' THEN $batch_id ELSE tr.import_batch END
+        SET tr.tx_id = tx.tx_id,
+            tr.amount = tx.amount,
             tr.currency = tx.currency,
             tr.booking_date = tx.booking_date,
             tr.debtor_name = tx.debtor_name,
             tr.remittance_info = tx.remittance_info,
+            tr.payment_reference = tx.payment_reference,
+            tr.counterparty_iban = tx.counterparty_iban,
+            tr.counterparty_name = tx.counterparty_name,
             tr.ingested_at = datetime()
+        REMOVE tr.legacy_key
             
-        // 4. Aresta de Posse (A BankAccount possui esta Transação)
+        // 5. Aresta de Posse (A BankAccount possui esta Transação)
         MERGE (ba)-[:HAS_TRANSACTION]->(tr)
         """
 
         try:
-            with self.ontology_manager.driver.session() as session:
-                with session.begin_transaction() as tx:
-                    tx.run(query, tenant=tenant, transactions=transactions)
+            await self.ontology_manager.graph.write(
+                query, {"tenant": tenant, "transactions": transactions, "batch_id": batch_id}, tenant=tenant
+            )
             logger.info(
                 f"Injection Cypher concluida: {len(transactions)} transacoes bancarias enraizadas no Tenant '{tenant}'."
             )
@@ -165,17 +433,37 @@ class Camt053Skill:
             logger.exception(f"Erro transacional ao injetar no Neo4j: {e}")
             raise Exception("TRANSACTION_ROLLBACK")
 
-    def _quarantine_document(self, tenant: str, file_hash: str, reason: str):
-        """Registra explicitamente o motivo exato da falha no Neo4j, movendo o nó para quarentena."""
+    async def _complete_import_batch(self, tenant: str, batch_id: str):
+        """Documento inteiro gravado: o lote deixa de ser PARTIAL."""
+        safe_tenant = tenant.replace("`", "")
+        query = f"""
+        MATCH (tr:Transaction:`{safe_tenant}` {{import_batch: $batch_id}})
+        WHERE tr.import_status = 'PARTIAL'
+        SET tr.import_status = 'COMPLETE'
+        """
+        try:
+            await self.ontology_manager.graph.write(query, {"batch_id": batch_id}, tenant=tenant)
+        except Exception as e:
+            logger.exception(f"Erro ao concluir o lote {batch_id}: {e}")
+            raise Exception("TRANSACTION_ROLLBACK")
+
+    async def rollback_import_batch(self, tenant: str, batch_id: str) -> int:
+        """Desfaz um lote que falhou: remove as transações que ainda estão PARTIAL nele."""
         safe_tenant = tenant.replace("`", "")
-        cypher = f"""
-        MERGE (d:Document:`{safe_tenant}` {{file_hash: $file_hash}})
-        SET d.status = 'QUARANTINE',
-            d.quarantine_reason = $reason,
-            d.quarantined_at = datetime()
+        query = f"""
+        MATCH (tr:Transaction:`{safe_tenant}` {{import_batch: $batch_id}})
+        WHERE tr.import_status = 'PARTIAL'
+        DETACH DELETE tr
+        RETURN count(*) AS removed
         """
+        row = await self.ontology_manager.graph.write_one(query, {"batch_id": batch_id}, tenant=tenant)
+        removed = row["removed"] if row else 0
+        logger.warning(f"↩️ Lote camt {batch_id} desfeito: {removed} transações PARTIAL removidas.")
+        return removed
+
+    async def _quarantine_document(self, tenant: str, file_hash: str, reason: str, import_batch: str | None = None):
+        """Registra explicitamente o motivo exato da falha no Neo4j, movendo o nó para quarentena."""
         try:
-            with self.ontology_manager.driver.session() as session:
-                session.run(cypher, file_hash=file_hash, reason=reason)
+            await self.ontology_manager.quarantine_document(tenant, file_hash, reason, import_batch=import_batch)
         except Exception as query_exc:
             logger.exception(f"Falha gravíssima ao registrar quarentena do nó no Neo4j: {query_exc}")
@@ -8,13 +8,16 @@ import os
 from typing import Any
 
 from src.v3.core.menir_runner import SkillResult
-from src.v3.core.concurrency import run_in_custom_executor, cpu_pool, io_pool
+from src.v3.core.concurrency import run_in_custom_executor, cpu_pool
 from src.v3.core.compressor import PayloadCompressor
+from src.v3.core.existence_filter import VENDOR_IDE, VENDOR_NAME, get_existence_index
+from src.v3.tenant_middleware import EVENTUAL
 from google.genai import types as genai_types
 from src.v3.core.schemas import InvoiceData
 from src.v3.menir_intel import MenirIntel
 from src.v3.meta_cognition import MenirOntologyManager
 from src.v3.skills import qr_extractor
+from src.v3.skills.swiss_qr_parser import normalize_reference
 
 logger = logging.getLogger("InvoiceSkill")
 
@@ -44,11 +47,18 @@ class InvoiceSkill:
         RETURN v.zefix_match AS zefix_match, coalesce(v.zefix_status, 'UNKNOWN') AS zefix_status
         LIMIT 1
         """
-        def _check_db():
-            with self.ontology_manager.driver.session() as s:
-                return s.run(cache_query, ide=ide_number, name=name).single()
-                
-        cached = await run_in_custom_executor(io_pool, _check_db)
+        index = get_existence_index()
+        # Vendor nunca visto (nem por nome nem por IDE): Bloom dispensa o round trip ao cache;
+        # se outro worker gravou o Vendor, o pior caso é uma consulta extra ao Zefix
+        known = index.might_contain(safe_tenant, VENDOR_NAME, name) or (
+            ide_number is not None and index.might_contain(safe_tenant, VENDOR_IDE, ide_number)
+        )
+        cached = None
+        if known:
+            cached = await self.ontology_manager.graph.read_one(
+                # Cache de Zefix: réplica defasada só custa uma chamada extra à API
+                cache_query, {"ide": ide_number, "name": name}, tenant=tenant, consistency=EVENTUAL
+            )
         if cached:
             return cached["zefix_match"], cached["zefix_status"]
 
@@ -100,12 +110,14 @@ class InvoiceSkill:
             v.zefix_queried_at = datetime(),
             v.project = $safe_tenant
         """
-        def _save_vendor():
-            with self.ontology_manager.driver.session() as s:
-                with s.begin_transaction() as tx:
-                    tx.run(persist_query, name=name, ide=ide_number, zefix_match=zefix_match, zefix_status=zefix_status, safe_tenant=safe_tenant)
         try:
-            await run_in_custom_executor(io_pool, _save_vendor)
+            await self.ontology_manager.graph.write(
+                persist_query,
+                {"name": name, "ide": ide_number, "zefix_match": zefix_match, "zefix_status": zefix_status, "safe_tenant": safe_tenant},
+                tenant=tenant,
+            )
+            index.add(safe_tenant, VENDOR_NAME, name)
+            index.add(safe_tenant, VENDOR_IDE, ide_number)
         except Exception as e:
             logger.error(f"Failed to persist Vendor cache: {e}")
 
@@ -146,7 +158,7 @@ class InvoiceSkill:
             
             tenant = TenantContext.get() or "BECO"
             placeholder_date = date.today().isoformat()
-            active_rules = self.ontology_manager.get_tenant_active_context(tenant, placeholder_date)
+            active_rules = await self.ontology_manager.get_tenant_active_context(tenant, placeholder_date)
 
             EXTRACTION_PROMPT = """Você é um auditor financeiro suíço. Extraia os dados desta fatura.
 Retorne SOMENTE JSON válido, sem texto adicional, sem blocos markdown.
@@ -158,6 +170,7 @@ Schema obrigatório:
   "avs_number": "string ou null",
   "language": "fr, de, it, rm, en, pt, ou sq",
   "vendor_iban": "string ou null",
+  "payment_reference": "referência QR (27 dígitos) ou RF... ou null",
   "currency": "CHF ou EUR",
   "issue_date": "YYYY-MM-DD",
   "subtotal": 0.0,
@@ -218,6 +231,7 @@ OBSERVACAO: O campo extraction_confidence deve ser um numero decimal de 0.0 a 1.
                     "avs_number": None,
                     "language": "fr",
                     "vendor_iban": qr_dict.get("account", None),
+                    "payment_reference": normalize_reference(qr_dict.get("reference")),
                     "issue_date": date.today().isoformat(),
                     "currency": qr_dict.get("currency", "CHF"),
                     "subtotal": qr_dict.get("amount", 0.0),
@@ -248,7 +262,7 @@ OBSERVACAO: O campo extraction_confidence deve ser um numero decimal de 0.0 a 1.
 
                 from datetime import datetime
                 placeholder_date = datetime.now()
-                active_rules = self.ontology_manager.get_tenant_active_context(tenant, placeholder_date)
+                active_rules = await self.ontology_manager.get_tenant_active_context(tenant, placeholder_date)
 
                 invoice_dict = await self.intel.structured_inference(
                     prompt=prompt if locals().get("lane") == "SLOW_LANE" else prompt,
@@ -258,6 +272,7 @@ OBSERVACAO: O campo extraction_confidence deve ser um numero decimal de 0.0 a 1.
                 )
                 
                 invoice_dict["extraction_path"] = "GEMINI_FALLBACK"
+                invoice_dict["payment_reference"] = normalize_reference(invoice_dict.get("payment_reference"))
                 if "extraction_confidence" not in invoice_dict:
                     invoice_dict["extraction_confidence"] = 0.85
             
@@ -277,7 +292,7 @@ OBSERVACAO: O campo extraction_confidence deve ser um numero decimal de 0.0 a 1.
                 penalty = 0.10
                 logger.warning(f"Fornecedor {validated.vendor_name} não verificado devido a RATE_LIMITED (Zefix). Penalidade: {penalty}")
             elif not zefix_match:
-                self._quarantine_document(tenant, file_hash, "VendorNotFoundZefix")
+                await self._quarantine_document(tenant, file_hash, "VendorNotFoundZefix")
                 return SkillResult(
                     success=False,
                     nodes_and_edges=[],
@@ -288,14 +303,14 @@ OBSERVACAO: O campo extraction_confidence deve ser um numero decimal de 0.0 a 1.
             orchestrator = NodePersistenceOrchestrator()
             
             try:
-                with self.ontology_manager.driver.session() as session:
-                    with session.begin_transaction() as tx:
-                        await orchestrator.persist(validated, tx)
+                await self.ontology_manager.graph.transaction(
+                    lambda tx: orchestrator.persist(validated, tx), tenant=tenant
+                )
             except Exception as e:
                 logger.exception(f"Erro transacional ao persistir via orquestrador: {e}")
                 if str(e) == "TRANSACTION_ROLLBACK":
                     raise
-                self._quarantine_document(tenant, file_hash, "TRANSACTION_ROLLBACK")
+                await self._quarantine_document(tenant, file_hash, "TRANSACTION_ROLLBACK")
                 raise Exception("TRANSACTION_ROLLBACK") from e
 
             msg = f"Fatura processada: {validated.vendor_name} | {validated.total_amount:.2f} {validated.currency}"
@@ -311,10 +326,10 @@ OBSERVACAO: O campo extraction_confidence deve ser um numero decimal de 0.0 a 1.
         except json.JSONDecodeError as e:
             logger.exception(f"JSONDecodeError: {e}")
             reason = str(e)
-            self.ontology_manager.inject_entropy_anomaly(
+            await self.ontology_manager.inject_entropy_anomaly(
                 tenant, file_hash, "JSONDecodeError", reason, 1
             )
-            self._quarantine_document(tenant, file_hash, f"JSONDecodeError: {reason}")
+            await self._quarantine_document(tenant, file_hash, f"JSONDecodeError: {reason}")
             return SkillResult(
                 success=False, nodes_and_edges=[], message=f"LLM retornou JSON inválido: {e}"
             )
@@ -322,10 +337,10 @@ OBSERVACAO: O campo extraction_confidence deve ser um numero decimal de 0.0 a 1.
         except ValidationError as e:
             error_count = len(e.errors())
             logger.error(f"ValidationError: {error_count} erros de validação fiduciária")
-            self.ontology_manager.inject_entropy_anomaly(
+            await self.ontology_manager.inject_entropy_anomaly(
                 tenant, file_hash, "MathValidationError", "Campos fiduciários rejeitados (ofuscado por segurança)", error_count
             )
-            self._quarantine_document(tenant, file_hash, f"ValidationError: {error_count} falhas estruturais.")
+            await self._quarantine_document(tenant, file_hash, f"ValidationError: {error_count} falhas estruturais.")
             return SkillResult(
                 success=False,
                 nodes_and_edges=[],
@@ -335,20 +350,12 @@ OBSERVACAO: O campo extraction_confidence deve ser um numero decimal de 0.0 a 1.
         except Exception as e:
             logger.exception(f"Erro genérico no InvoiceSkill: {e}")
             if str(e) != "TRANSACTION_ROLLBACK":
-                self._quarantine_document(tenant, file_hash, f"Exception: {str(e)}")
+                await self._quarantine_document(tenant, file_hash, f"Exception: {str(e)}")
             return SkillResult(success=False, nodes_and_edges=[], message=f"Falha estrutural: {e}")
 
-    def _quarantine_document(self, tenant: str, file_hash: str, reason: str):
+    async def _quarantine_document(self, tenant: str, file_hash: str, reason: str):
         """Registra explicitamente o motivo exato da falha no Neo4j, movendo o nó para quarentena."""
-        safe_tenant = tenant.replace("`", "")
-        cypher = f"""
-        MERGE (d:Document:`{safe_tenant}` {{file_hash: $file_hash}})
-        SET d.status = 'QUARANTINE',
-            d.quarantine_reason = $reason,
-            d.quarantined_at = datetime()
-        """
         try:
-            with self.ontology_manager.driver.session() as session:
-                session.run(cypher, file_hash=file_hash, reason=reason)
+            await self.ontology_manager.quarantine_document(tenant, file_hash, reason)
         except Exception as query_exc:
             logger.exception(f"Falha gravíssima ao registrar quarentena do nó no Neo4j: {query_exc}")
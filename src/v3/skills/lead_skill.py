@@ -17,10 +17,10 @@ from datetime import datetime
 from pydantic import BaseModel, Field
 
 from src.v3.core.schemas.identity import TenantContext
-from src.v3.core.neo4j_pool import get_shared_driver
+from src.v3.core.graph_access import get_graph
 from src.v3.core.embedding_service import EmbeddingService
+from src.v3.core.near_duplicate import NearDuplicateFilter, normalize_text
 from src.v3.core.schemas.base import DocumentStatus
-from src.v3.core.concurrency import run_in_custom_executor, io_pool
 
 logger = logging.getLogger("menir.lead_skill")
 
@@ -72,10 +72,19 @@ class LeadSkill:
             )
 
         safe_tenant = tenant.replace("`", "").replace(";", "")
+
+        # Prefiltro MinHash: mesmo lead reenviado/levemente editado não gera novo nó.
+        # O nome precisa bater exato (normalizado): um índice por nome, MinHash só
+        # sobre o intent — "Ana Souza" e "Maria Souza" com o mesmo pedido são dois leads
+        dedup_namespace = f"lead:{normalize_text(lead_input.name)}"
+        duplicate = NearDuplicateFilter.check(tenant, dedup_namespace, lead_input.intent_signal)
+        if duplicate is not None:
+            return await self._link_duplicate(duplicate.key, duplicate.jaccard, safe_tenant, lead_input)
+
         lead_id = f"lead_{uuid.uuid4().hex[:12]}"
         trust_score = self.SOURCE_TRUST.get(lead_input.source, 0.50)
 
-        def _persist():
+        async def _persist():
             query = f"""
             MATCH (t:Tenant {{name: $tenant}})
             MERGE (l:Lead:`{safe_tenant}` {{id: $lead_id}})
@@ -100,23 +109,20 @@ class LeadSkill:
             )
             RETURN l.id AS id
             """
-            driver = get_shared_driver()
-            with driver.session() as session:
-                result = session.run(query, {
-                    "tenant":       tenant,
-                    "lead_id":      lead_id,
-                    "name":         lead_input.name,
-                    "source":       lead_input.source,
-                    "intent_signal": lead_input.intent_signal,
-                    "trust_score":  trust_score,
-                    "status":       "novo",
-                    "event_id":     lead_input.event_id,
-                    "referred_by":  lead_input.referred_by,
-                })
-                return result.single()
+            return await get_graph().write_one(query, {
+                "tenant":       tenant,
+                "lead_id":      lead_id,
+                "name":         lead_input.name,
+                "source":       lead_input.source,
+                "intent_signal": lead_input.intent_signal,
+                "trust_score":  trust_score,
+                "status":       "novo",
+                "event_id":     lead_input.event_id,
+                "referred_by":  lead_input.referred_by,
+            }, tenant=tenant)
 
         try:
-            record = await run_in_custom_executor(io_pool, _persist)
+            record = await _persist()
             if not record:
                 raise RuntimeError("MERGE retornou vazio — verificar constraints.")
 
@@ -131,6 +137,7 @@ class LeadSkill:
                 )
             )
 
+            NearDuplicateFilter.remember(tenant, dedup_namespace, lead_id, lead_input.intent_signal)
             logger.info(f"✅ Lead criado: {lead_id} (tenant: {tenant})")
             return LeadResult(
                 success=True,
@@ -146,6 +153,40 @@ class LeadSkill:
                 data={}
             )
 
+    async def _link_duplicate(
+        self, lead_id: str, jaccard: float, safe_tenant: str, lead_input: LeadInput
+    ) -> LeadResult:
+        """Vincula a duplicata ao Lead existente (contador, último contato, evento e indicação)."""
+        query = f"""
+        MATCH (l:Lead:`{safe_tenant}` {{id: $lead_id}})
+        SET l.duplicate_count = coalesce(l.duplicate_count, 0) + 1,
+            l.last_seen_at    = datetime()
+        WITH l
+        OPTIONAL MATCH (ev:Event {{id: $event_id}})
+        FOREACH (_ IN CASE WHEN ev IS NOT NULL THEN [1] ELSE [] END |
+            MERGE (ev)-[:GENERATED_LEAD]->(l)
+        )
+        WITH l
+        OPTIONAL MATCH (ref:Lead {{id: $referred_by}})
+        FOREACH (_ IN CASE WHEN ref IS NOT NULL AND ref <> l THEN [1] ELSE [] END |
+            MERGE (ref)-[:REFERRED]->(l)
+        )
+        """
+        try:
+            await get_graph().write(query, {
+                "lead_id":     lead_id,
+                "event_id":    lead_input.event_id,
+                "referred_by": lead_input.referred_by,
+            })
+        except Exception:
+            logger.exception(f"Falha ao vincular duplicata ao Lead {lead_id}")
+
+        return LeadResult(
+            success=True,
+            message=f"Lead já registrado ({lead_id}) — duplicata vinculada.",
+            data={"lead_id": lead_id, "duplicate": True, "jaccard": round(jaccard, 4)}
+        )
+
     async def find_similar_leads(
         self,
         query_text: str,
@@ -1,11 +1,15 @@
 import asyncio
 import logging
+import uuid
 from typing import Any
 
 from src.v3.menir_intel import MenirIntel
 from src.v3.core.persistence import NodePersistenceOrchestrator
 from src.v3.core.embedding_service import EmbeddingService
+from src.v3.core.near_duplicate import NearDuplicateFilter
 from src.v3.core.neo4j_pool import get_shared_driver
+from src.v3.core.graph_access import get_graph
+from src.v3.tenant_middleware import EVENTUAL
 from src.v3.core.schemas.identity import locked_tenant_context
 
 from src.v3.core.schemas.personal import (
@@ -23,6 +27,69 @@ logger.setLevel(logging.INFO)
 SIMILARITY_MERGE_THRESHOLD = 0.95
 SIMILARITY_HITL_THRESHOLD = 0.85
 
+
+def decide_disambiguation(
+    entity: Any,
+    best_match: dict | None,
+    best_other: dict | None,
+    current_tenant: str,
+    other_tenant: str,
+) -> dict:
+    """
+    Decisão de dois estágios (em memória) a partir do melhor vizinho de cada tenant:
+    MERGE / HITL_CURRENT no tenant atual, depois VIRTUAL_CROSS / HITL_CROSS
+    no outro tenant, senão CREATE.
+    """
+    if best_match and best_match['score'] >= SIMILARITY_MERGE_THRESHOLD:
+        logger.info(f"🔍 Similaridade {best_match['score']:.2f} (>{SIMILARITY_MERGE_THRESHOLD}) - Match exato encontrado em {current_tenant}: {best_match['name']}")
+        return {
+            "action": "MERGE",
+            "entity": entity,
+            "target_uid": best_match['id'],
+            "target_name": best_match['name']
+        }
+
+    if best_match and best_match['score'] >= SIMILARITY_HITL_THRESHOLD:
+        # Ambiguidade dentro do próprio tenant
+        return {
+            "action": "HITL_CURRENT",
+            "entity": entity,
+            "target_uid": best_match['id'],
+            "target_name": best_match['name'],
+            "score": best_match['score']
+        }
+
+    # Se não encontrou no current_tenant, ou similiaridade < HITL, checar Cross-Tenant (Rule 3)
+    if best_other and best_other['score'] >= SIMILARITY_MERGE_THRESHOLD:
+        logger.info(f"🔒 Limite de Tenant Atingido. Entidade '{entity.name_or_title}' existe no {other_tenant} (Score {best_other['score']:.2f}).")
+        return {
+            "action": "VIRTUAL_CROSS",
+            "entity": entity,
+            "target_uid": best_other['id'],
+            "target_name": best_other['name'],
+            "target_tenant": other_tenant
+        }
+
+    if best_other and best_other['score'] >= SIMILARITY_HITL_THRESHOLD:
+        return {
+            "action": "HITL_CROSS",
+            "entity": entity,
+            "target_uid": best_other['id'],
+            "target_name": best_other['name'],
+            "target_tenant": other_tenant,
+            "score": best_other['score']
+        }
+
+    # Se chegou aqui, é NOVO (Similaridade muito baixa)
+    max_score = max((best_match['score'] if best_match else 0.0), (best_other['score'] if best_other else 0.0))
+    logger.info(f"✨ Nova Entidade Inferida: {entity.entity_type}({entity.name_or_title}). Similaridade Máxima Encontrada: {max_score:.2f} (<{SIMILARITY_HITL_THRESHOLD}).")
+    return {
+        "action": "CREATE",
+        "entity": entity,
+        "trust_score": 0.9 # Seguro pois é inédito
+    }
+
+
 class MenirCapture:
     """
     Skill V2: Captura pessoal e ontologia com desambiguação vetorial de dois estágios (Mem0-like).
@@ -61,6 +128,20 @@ class MenirCapture:
         import os
         if current_tenant is None:
             current_tenant = os.getenv("MENIR_PERSONAL_TENANT_NAME", "PESSOAL")
+
+        # Etapa 0: Prefiltro MinHash — duplicatas não custam LLM nem embeddings
+        if not media_path:
+            duplicate = NearDuplicateFilter.check(current_tenant, "capture", text)
+            if duplicate is not None:
+                await self._link_duplicate_capture(duplicate.payload or [], current_tenant)
+                return {
+                    "success": True,
+                    "hitl": None,
+                    "follow_up_question": None,
+                    "duplicate_of": duplicate.payload or [],
+                    "jaccard": duplicate.jaccard,
+                }
+
         print(f"\\n🧠 Interpretando com MenirIntel no Tenant: {current_tenant}...")
         
         prompt = f"""
@@ -132,72 +213,26 @@ class MenirCapture:
         actions_to_take = [] # list of dicts with entity details
         
         # Etapa 1: Recall Vetorial (Fast Match)
-        for entity in payload.entities:
-            query_text = f"{entity.name_or_title} {entity.context}"
-            label_node = f"{entity.entity_type}Node"
-            
-            # Buscar no tenant atual
-            matches_current = await EmbeddingService.semantic_search(query_text, label_node, current_tenant, top_k=1)
-            best_match = matches_current[0] if matches_current else None
-            
-            if best_match and best_match['score'] >= SIMILARITY_MERGE_THRESHOLD:
-                print(f"🔍 Similaridade {best_match['score']:.2f} (>{SIMILARITY_MERGE_THRESHOLD}) - Match exato encontrado em {current_tenant}: {best_match['name']}")
-                actions_to_take.append({
-                    "action": "MERGE",
-                    "entity": entity,
-                    "target_uid": best_match['id'],
-                    "target_name": best_match['name']
-                })
-                continue
-                
-            if best_match and best_match['score'] >= SIMILARITY_HITL_THRESHOLD:
-                # Ambiguidade dentro do próprio tenant
-                hitl_candidates.append({
-                    "action": "HITL_CURRENT",
-                    "entity": entity,
-                    "target_uid": best_match['id'],
-                    "target_name": best_match['name'],
-                    "score": best_match['score']
-                })
-                continue
-                
-            # Se não encontrou no current_tenant, ou similiaridade < HITL, checar Cross-Tenant BECO (Rule 3)
-            # Para este MVP, verificamos "BECO" se estamos no "SANTOS".
-            other_tenant = "BECO" if current_tenant == "SANTOS" else "SANTOS"
-            matches_other = await EmbeddingService.semantic_search(query_text, label_node, other_tenant, top_k=1)
-            best_other = matches_other[0] if matches_other else None
-            
-            if best_other and best_other['score'] >= SIMILARITY_MERGE_THRESHOLD:
-                print(f"🔒 Limite de Tenant Atingido. Entidade '{entity.name_or_title}' existe no {other_tenant} (Score {best_other['score']:.2f}).")
-                actions_to_take.append({
-                    "action": "VIRTUAL_CROSS",
-                    "entity": entity,
-                    "target_uid": best_other['id'],
-                    "target_name": best_other['name'],
-                    "target_tenant": other_tenant
-                })
-                continue
-                
-            if best_other and best_other['score'] >= SIMILARITY_HITL_THRESHOLD:
-                hitl_candidates.append({
-                    "action": "HITL_CROSS",
-                    "entity": entity,
-                    "target_uid": best_other['id'],
-                    "target_name": best_other['name'],
-                    "target_tenant": other_tenant,
-                    "score": best_other['score']
-                })
-                continue
-                
-            # Se chegou aqui, é NOVO (Similaridade muito baixa)
-            max_score =  max((best_match['score'] if best_match else 0.0), (best_other['score'] if best_other else 0.0))
-            print(f"✨ Nova Entidade Inferida: {entity.entity_type}({entity.name_or_title}). Similaridade Máxima Encontrada: {max_score:.2f} (<{SIMILARITY_HITL_THRESHOLD}).")
-            actions_to_take.append({
-                "action": "CREATE",
-                "entity": entity,
-                "trust_score": 0.9 # Seguro pois é inédito
-            })
-            
+        # Para este MVP, o cross-tenant (Rule 3) verifica "BECO" se estamos no "SANTOS".
+        other_tenant = "BECO" if current_tenant == "SANTOS" else "SANTOS"
+        probes = [
+            (f"{entity.name_or_title} {entity.context}", f"{entity.entity_type}Node")
+            for entity in payload.entities
+        ]
+        # 1 embedding em lote + 1 query UNWIND para os dois tenants
+        best_by_tenant = await EmbeddingService.batch_semantic_search(
+            probes, [current_tenant, other_tenant]
+        )
+
+        for entity, matches in zip(payload.entities, best_by_tenant):
+            action = decide_disambiguation(
+                entity, matches[current_tenant], matches[other_tenant], current_tenant, other_tenant
+            )
+            if action["action"].startswith("HITL"):
+                hitl_candidates.append(action)
+            else:
+                actions_to_take.append(action)
+
         # Etapa 2: Resolução de HITL (Max 1 pergunta)
         pending_hitl_context = None
         if hitl_candidates:
@@ -216,7 +251,11 @@ class MenirCapture:
                 actions_to_take.append({"action": "CREATE", "entity": rem["entity"], "trust_score": 0.2})
                 
         # Persist ALL other actions asyncly
-        await self._persist_actions(actions_to_take, current_tenant)
+        persisted_uids = await self._persist_actions(actions_to_take, current_tenant)
+        if not media_path and persisted_uids:
+            NearDuplicateFilter.remember(
+                current_tenant, "capture", str(uuid.uuid4()), text, payload=persisted_uids
+            )
         
         # Generative Follow-up (Rule 2: Max 1 question per input)
         follow_up_question = None
@@ -233,25 +272,37 @@ class MenirCapture:
             "follow_up_question": follow_up_question
         }
 
+    async def _link_duplicate_capture(self, node_uids: list[str], tenant_id: str) -> None:
+        """
+        Reforça os nós gerados pela captura original em vez de recriá-los.
+        """
+        if not node_uids:
+            return
+        safe_tenant = tenant_id.replace("`", "")
+        query = f"""
+        MATCH (n:`{safe_tenant}`) WHERE n.uid IN $uids
+        SET n.capture_count = coalesce(n.capture_count, 1) + 1,
+            n.last_captured_at = datetime()
+        """
+        try:
+            await get_graph().write(query, {"uids": node_uids}, tenant=tenant_id)
+        except Exception as e:
+            logger.warning(f"Falha ao vincular captura duplicada a {node_uids}: {e}")
+
     async def _get_user_uid(self, tenant_id: str) -> str:
         """
         Busca o UID do usuário raiz (Criador) para o domínio informado.
         """
-        def _sync_fetch():
-            driver = get_shared_driver()
-            query = """
-            MATCH (p:Person)-[:SERVES_TENANT]->(t:Tenant {name: $tenant})
-            RETURN p.uuid as uid
-            UNION
-            MATCH (p:Person {uuid: 'root_luiz_001'})
-            RETURN p.uuid as uid
-            LIMIT 1
-            """
-            with driver.session() as session:
-                res = session.run(query, tenant=tenant_id).single()
-                return res["uid"] if res else "system"
-        
-        return await run_in_custom_executor(io_pool, _sync_fetch)
+        query = """
+        MATCH (p:Person)-[:SERVES_TENANT]->(t:Tenant {name: $tenant})
+        RETURN p.uuid as uid
+        UNION
+        MATCH (p:Person {uuid: 'root_luiz_001'})
+        RETURN p.uuid as uid
+        LIMIT 1
+        """
+        res = await get_graph().read_one(query, {"tenant": tenant_id}, tenant=tenant_id, consistency=EVENTUAL)
+        return res["uid"] if res else "system"
 
     async def resolve_hitl(self, hitl_context: dict, approved: bool, current_tenant: str):
         actions_to_take = []
@@ -275,61 +326,60 @@ class MenirCapture:
             
         await self._persist_actions(actions_to_take, current_tenant)
 
-    async def _persist_actions(self, actions_to_take: list, current_tenant: str):
+    async def _persist_actions(self, actions_to_take: list, current_tenant: str) -> list[str]:
         """
         Persistência orquestrada com I/O Não-Bloqueante (Rule 4).
+        Retorna os UIDs persistidos.
         """
-        from src.v3.core.concurrency import run_in_custom_executor, io_pool
         with locked_tenant_context(current_tenant):
-            driver = get_shared_driver()
-            session = await run_in_custom_executor(io_pool, driver.session)
+            nodes: list[tuple[Any, Any]] = []
+            for act in actions_to_take:
+                ent = act["entity"]
+                node_obj = None
+
+                if ent.entity_type == "Person":
+                    node_obj = PersonNode(uid="", project=current_tenant, name=act.get("target_name", ent.name_or_title), role_or_context=ent.context, trust_score=act.get("trust_score", 0.9))
+                elif ent.entity_type == "Project":
+                    node_obj = ProjectNode(uid="", project=current_tenant, name=act.get("target_name", ent.name_or_title), description=ent.context)
+                elif ent.entity_type == "LifeEvent":
+                    node_obj = LifeEventNode(uid="", project=current_tenant, title=act.get("target_name", ent.name_or_title))
+                elif ent.entity_type == "Insight":
+                    node_obj = InsightNode(uid="", project=current_tenant, content=act.get("target_name", ent.name_or_title), source_context=ent.context)
+                elif ent.entity_type == "Goal":
+                    node_obj = GoalNode(uid="", project=current_tenant, title=act.get("target_name", ent.name_or_title))
+                else:
+                    continue
+
+                if act["action"] == "MERGE":
+                    node_obj.uid = act["target_uid"]
+                    print(f"✅ UPDATE/MERGE ({ent.entity_type}: {ent.name_or_title}) -> [{current_tenant}]")
+                elif act["action"] == "VIRTUAL_CROSS":
+                    node_obj.is_virtual = True
+                    node_obj.referenced_tenant = act["target_tenant"]
+                    node_obj.referenced_uid = act["target_uid"]
+                    print(f"✅ VIRTUAL NODE ({ent.name_or_title}) -> [:REFERENCED_FROM] -> {act['target_tenant']}")
+                elif act["action"] == "CREATE":
+                    print(f"✅ CREATE ({ent.entity_type}: {ent.name_or_title}) -> [{current_tenant}]")
+                nodes.append((node_obj, ent))
+
+            # Uma transação gerenciada para todas as ações (commit/rollback/retry pelo driver);
+            # cada nó sai com BELONGS_TO_TENANT/DERIVED_FROM no mesmo statement
+            async def _work(tx):
+                return [await self.orchestrator.persist(node_obj, tx) for node_obj, _ in nodes]
+
             try:
-                tx = await run_in_custom_executor(io_pool, session.begin_transaction)
-                try:
-                    for act in actions_to_take:
-                        ent = act["entity"]
-                        node_obj = None
-                        
-                        if ent.entity_type == "Person":
-                            node_obj = PersonNode(uid="", project=current_tenant, name=act.get("target_name", ent.name_or_title), role_or_context=ent.context, trust_score=act.get("trust_score", 0.9))
-                        elif ent.entity_type == "Project":
-                            node_obj = ProjectNode(uid="", project=current_tenant, name=act.get("target_name", ent.name_or_title), description=ent.context)
-                        elif ent.entity_type == "LifeEvent":
-                            node_obj = LifeEventNode(uid="", project=current_tenant, title=act.get("target_name", ent.name_or_title))
-                        elif ent.entity_type == "Insight":
-                            node_obj = InsightNode(uid="", project=current_tenant, content=act.get("target_name", ent.name_or_title), source_context=ent.context)
-                        elif ent.entity_type == "Goal":
-                            node_obj = GoalNode(uid="", project=current_tenant, title=act.get("target_name", ent.name_or_title))
-                        else:
-                            continue
-                            
-                        if act["action"] == "MERGE":
-                            node_obj.uid = act["target_uid"]
-                            print(f"✅ UPDATE/MERGE ({ent.entity_type}: {ent.name_or_title}) -> [{current_tenant}]")
-                        elif act["action"] == "VIRTUAL_CROSS":
-                            node_obj.is_virtual = True
-                            node_obj.referenced_tenant = act["target_tenant"]
-                            node_obj.referenced_uid = act["target_uid"]
-                            print(f"✅ VIRTUAL NODE ({ent.name_or_title}) -> [:REFERENCED_FROM] -> {act['target_tenant']}")
-                        elif act["action"] == "CREATE":
-                            print(f"✅ CREATE ({ent.entity_type}: {ent.name_or_title}) -> [{current_tenant}]")
-                            
-                        # Await the persistence (Orchestrator already wraps Cypher in pools)
-                        await self.orchestrator.persist(node_obj, tx)
-                        
-                        # Generate Embedding for the newly created/merged node
-                        node_text_for_embed = f"{ent.name_or_title} {getattr(node_obj, 'role_or_context', '')} {getattr(node_obj, 'description', '')}"
-                        asyncio.create_task(
-                            EmbeddingService.embed_and_persist(node_obj.uid, node_text_for_embed, f"{ent.entity_type}Node", current_tenant)
-                        )
-                    
-                    await run_in_custom_executor(io_pool, tx.commit)
-                except Exception as e:
-                    await run_in_custom_executor(io_pool, tx.rollback)
-                    logger.error(f"Erro na transação de persistência: {e}")
-                    raise
-            finally:
-                await run_in_custom_executor(io_pool, session.close)
+                persisted_uids = await get_graph().transaction(_work, tenant=current_tenant)
+            except Exception as e:
+                logger.error(f"Erro na transação de persistência: {e}")
+                raise
+
+            # Embeddings só após o commit
+            for node_obj, ent in nodes:
+                node_text_for_embed = f"{ent.name_or_title} {getattr(node_obj, 'role_or_context', '')} {getattr(node_obj, 'description', '')}"
+                asyncio.create_task(
+                    EmbeddingService.embed_and_persist(node_obj.uid, node_text_for_embed, f"{ent.entity_type}Node", current_tenant)
+                )
+        return persisted_uids
 
 async def _cli_loop():
     import os
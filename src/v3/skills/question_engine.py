@@ -6,7 +6,8 @@ from typing import Optional, List, Any
 from src.v3.menir_intel import MenirIntel
 from src.v3.menir_bridge import MenirBridge, get_bridge
 from src.v3.core.schemas.identity import TenantContext
-from src.v3.core.concurrency import run_in_custom_executor, io_pool
+from src.v3.core.graph_access import get_graph
+from src.v3.tenant_middleware import CAUSAL
 
 logger = logging.getLogger("QuestionEngine")
 
@@ -63,102 +64,84 @@ async def _extract_entities(intel: MenirIntel, user_input: str) -> List[str]:
         return []
 
 async def _find_gaps(tenant: str, entities: List[str]) -> List[dict]:
-    bridge = get_bridge()
     if not entities:
         return []
 
     # Threshold de 30 dias para "stale"
     stale_date = (datetime.now() - timedelta(days=30)).isoformat()
 
-    def _sync_query():
-        gaps = []
-        query = f"""
-        MATCH (n)-[:BELONGS_TO_TENANT]->(t:Tenant {{name: $tenant}})
-        WHERE any(label IN labels(n) WHERE label IN ['Person', 'Project', 'Insight', 'Goal'])
-          AND (n.name IN $entities OR n.content IN $entities OR n.title IN $entities)
-        RETURN n, labels(n)[0] as label
-        """
-        
-        with bridge.driver.session() as session:
-            result = session.run(query, tenant=tenant, entities=entities)
-            for record in result:
-                node = record["n"]
-                label = record["label"]
-                
-                # Gap detection logic
-                node_gaps = []
-                
-                # 1. Campos nulos/vazios
-                if label == "Person" and not node.get("role_or_context"):
-                    node_gaps.append("missing role_or_context")
-                if label == "Project" and not node.get("description"):
-                    node_gaps.append("missing description")
-                
-                # 2. Dados desatualizados (>30 dias)
-                updated_at = node.get("updated_at") or node.get("created_at")
-                if updated_at:
-                    try:
-                        dt_val = str(updated_at)
-                        if dt_val < stale_date:
-                            node_gaps.append("stale information")
-                    except Exception:
-                        pass
-                else:
-                    node_gaps.append("stale information") # Se não tem data, assumimos gap
-
-                if node_gaps:
-                    gaps.append({
-                        "entity": node.get("name") or node.get("title") or node.get("content"),
-                        "label": label,
-                        "gaps": node_gaps
-                    })
-        return gaps
-    
-    return await run_in_custom_executor(io_pool, _sync_query)
+    gaps = []
+    query = f"""
+    MATCH (n)-[:BELONGS_TO_TENANT]->(t:Tenant {{name: $tenant}})
+    WHERE any(label IN labels(n) WHERE label IN ['Person', 'Project', 'Insight', 'Goal'])
+      AND (n.name IN $entities OR n.content IN $entities OR n.title IN $entities)
+    RETURN n, labels(n)[0] as label
+    """
+
+    for record in await get_graph().read(
+        query, {"tenant": tenant, "entities": entities}, tenant=tenant, consistency=CAUSAL
+    ):
+        node = record["n"]
+        label = record["label"]
+
+        # Gap detection logic
+        node_gaps = []
+
+        # 1. Campos nulos/vazios
+        if label == "Person" and not node.get("role_or_context"):
+            node_gaps.append("missing role_or_context")
+        if label == "Project" and not node.get("description"):
+            node_gaps.append("missing description")
+
+        # 2. Dados desatualizados (>30 dias)
+        updated_at = node.get("updated_at") or node.get("created_at")
+        if updated_at:
+            try:
+                dt_val = str(updated_at)
+                if dt_val < stale_date:
+                    node_gaps.append("stale information")
+            except Exception:
+                pass
+        else:
+            node_gaps.append("stale information") # Se não tem data, assumimos gap
+
+        if node_gaps:
+            gaps.append({
+                "entity": node.get("name") or node.get("title") or node.get("content"),
+                "label": label,
+                "gaps": node_gaps
+            })
+    return gaps
 
 async def _has_urgent_signals(tenant: str) -> bool:
-    bridge = get_bridge()
-    def _sync_query():
-        # Check rápido para ver se vale a pena continuar se não houver entidades
-        query = f"""
-        MATCH (s:Signal)-[:AFFECTS]->(hub:DecisionHub)-[:BELONGS_TO_TENANT]->(t:Tenant {{name: $tenant}})
-        WITH s, duration.inDays(datetime(s.created_at), datetime()).days AS days_passed
-        WITH s, (s.initial_score * exp(-s.decay_lambda * days_passed)) AS priority
-        WHERE priority > 0.6
-        RETURN count(s) > 0 as has_urgent
-        """
-        try:
-            with bridge.driver.session() as session:
-                res = session.run(query, tenant=tenant).single()
-                return res["has_urgent"] if res else False
-        except Exception:
-            return False
-            
-    return await run_in_custom_executor(io_pool, _sync_query)
+    # Check rápido para ver se vale a pena continuar se não houver entidades
+    query = f"""
+    MATCH (s:Signal)-[:AFFECTS]->(hub:DecisionHub)-[:BELONGS_TO_TENANT]->(t:Tenant {{name: $tenant}})
+    WITH s, duration.inDays(datetime(s.created_at), datetime()).days AS days_passed
+    WITH s, (s.initial_score * exp(-s.decay_lambda * days_passed)) AS priority
+    WHERE priority > 0.6
+    RETURN count(s) > 0 as has_urgent
+    """
+    try:
+        res = await get_graph().read_one(query, {"tenant": tenant}, tenant=tenant, consistency=CAUSAL)
+        return res["has_urgent"] if res else False
+    except Exception:
+        return False
 
 async def _get_urgent_signals(tenant: str) -> List[dict]:
-    bridge = get_bridge()
-    def _sync_query():
-        query = f"""
-        MATCH (s:Signal)-[:AFFECTS]->(hub:DecisionHub)-[:BELONGS_TO_TENANT]->(t:Tenant {{name: $tenant}})
-        WITH s, duration.inDays(datetime(s.created_at), datetime()).days AS days_passed
-        WITH s, (s.initial_score * exp(-s.decay_lambda * days_passed)) AS priority
-        WHERE priority > 0.6
-        RETURN s.signal_type as type, s.description as desc, priority
-        ORDER BY priority DESC
-        LIMIT 3
-        """
-        signals = []
-        try:
-            with bridge.driver.session() as session:
-                result = session.run(query, tenant=tenant)
-                for r in result:
-                    signals.append(dict(r))
-        except Exception:
-            pass
-        return signals
-
-    return await run_in_custom_executor(io_pool, _sync_query)
+    query = f"""
+    MATCH (s:Signal)-[:AFFECTS]->(hub:DecisionHub)-[:BELONGS_TO_TENANT]->(t:Tenant {{name: $tenant}})
+    WITH s, duration.inDays(datetime(s.created_at), datetime()).days AS days_passed
+    WITH s, (s.initial_score * exp(-s.decay_lambda * days_passed)) AS priority
+    WHERE priority > 0.6
+    RETURN s.signal_type as type, s.description as desc, priority
+    ORDER BY priority DESC
+    LIMIT 3
+    """
+    try:
+        return await get_graph().read(query, {"tenant": tenant}, tenant=tenant, consistency=CAUSAL)
+    except Exception:
+        return []
 
 async def _formulate_question(intel: MenirIntel, user_input: str, gaps: List[dict], signals: List[dict]) -> Optional[str]:
     context_str = f"INPUT USUÁRIO: {user_input}\n\n"
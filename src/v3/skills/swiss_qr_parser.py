@@ -3,8 +3,61 @@ Menir Core V5.1 - Swiss QR Parser (SIX v2.3 Standard)
 Zero dependencias (Neo4j, FastAPI, Gemini). Módulo Puro de Domínio Contábil.
 """
 
+import re
 from decimal import Decimal, InvalidOperation
 
+# Referências estruturadas do credor: QRR (27 dígitos) ou SCOR (ISO 11649, RFnn + até 21 alfanuméricos)
+_QRR = re.compile(r"^\d{27}$")
+_SCOR = re.compile(r"^RF\d{2}[A-Z0-9]{1,21}$")
+# Em texto livre a QRR costuma vir agrupada com espaços ("21 00000 00003 ..."); a SCOR, não
+_REFERENCE_IN_TEXT = re.compile(r"(?<![A-Z0-9])(RF\d{2}[A-Z0-9]{1,21}|\d(?: ?\d){26})(?![A-Z0-9])")
+
+
+# Tabela do módulo 10 recursivo (SIX, dígito verificador da QRR)
+_MOD10_TABLE = (0, 9, 4, 6, 8, 2, 7, 1, 3, 5)
+
+
+def _qrr_checksum_ok(key: str) -> bool:
+    carry = 0
+    for digit in key[:-1]:
+        carry = _MOD10_TABLE[(carry + int(digit)) % 10]
+    return (10 - carry) % 10 == int(key[-1])
+
+
+def _scor_checksum_ok(key: str) -> bool:
+    # ISO 11649: RFnn vai para o fim, letras viram 10..35, resto mod 97 == 1
+    rearranged = key[4:] + key[:4]
+    return int("".join(str(int(char, 36)) for char in rearranged)) % 97 == 1
+
+
+def normalize_reference(reference: str | None) -> str | None:
+    """
+    Chave de reconciliação da referência do credor: sem espaços, maiúscula.
+    A mesma forma é gravada na Invoice (QR) e na Transaction (camt), então o
+    join é uma igualdade exata. Referências que não são QRR/SCOR, ou cujo
+    dígito verificador (mod 10 recursivo / ISO 11649 mod 97) não confere, viram None.
+    """
+    if not reference:
+        return None
+    key = "".join(reference.split()).upper()
+    if _QRR.match(key):
+        return key if _qrr_checksum_ok(key) else None
+    if _SCOR.match(key):
+        return key if _scor_checksum_ok(key) else None
+    return None
+
+
+def find_reference(text: str | None) -> str | None:
+    """Primeira referência QRR/SCOR válida num texto livre (ex: RmtInf/Ustrd do extrato)."""
+    if not text:
+        return None
+    for match in _REFERENCE_IN_TEXT.finditer(text.upper()):
+        key = normalize_reference(match.group(1))
+        if key:
+            return key
+    return None
+
+
 class SwissQRParserError(Exception):
     pass
 
@@ -1,32 +1,120 @@
 """
 Menir V3 - Tenant-Aware Neo4j Driver Wrapper
-Ensures every session is scoped to the correct database.
+Ensures every session is scoped to the correct database and routed by access mode.
+
+Read/write routing (cluster com NEO4J_URI=neo4j://...):
+  WRITE           -> líder; toda escrita publica bookmarks no bookmark manager
+                     do processo
+  READ + CAUSAL   -> secundários, mas só executa depois que o secundário
+                     alcançou os bookmarks já publicados (read-your-writes)
+  READ + EVENTUAL -> secundários sem esperar bookmarks: listagens, relatórios,
+                     contadores de SSE, busca semântica, MCP
+
+Com bolt:// (instância única) o access mode é ignorado e tudo vai ao mesmo
+servidor — o código fica igual.
+
+Sharding por tenant (opcional):
+  MENIR_TENANT_DATABASES="BECO=beco,SANTOS=santos,PESSOAL=santos"
+  Cada tenant (ou grupo de tenants que aponta para o mesmo nome) vive no seu
+  próprio database: page cache e índices próprios. Tenant sem entrada fica no
+  database default (NEO4J_DB) separado por label — o modo padrão.
+  Para mover um tenant: `python -m scripts.migrate_tenant_database BECO beco`.
 """
 
 import logging
+import os
+from typing import Any
+
+from neo4j import READ_ACCESS, WRITE_ACCESS, AsyncGraphDatabase
+
+from src.v3.core.schemas.identity import TenantContext
 
 logger = logging.getLogger("TenantAwareDriver")
 
+READ = READ_ACCESS
+WRITE = WRITE_ACCESS
+CAUSAL = "causal"
+EVENTUAL = "eventual"
+
+_bookmark_manager: Any = None
+
+
+def tenant_routes() -> dict[str, str]:
+    """Mapa tenant -> database de MENIR_TENANT_DATABASES (vazio = modo por label)."""
+    mapping = {}
+    for pair in os.getenv("MENIR_TENANT_DATABASES", "").split(","):
+        name, sep, database = pair.partition("=")
+        if sep and name.strip() and database.strip():
+            mapping[name.strip()] = database.strip()
+    return mapping
+
+
+def tenant_database(tenant: str | None, default: str | None = None) -> str | None:
+    """
+    Database Neo4j do tenant. Sem entrada no mapa: `default` (database do
+    driver), senão NEO4J_DB, senão None = database default do servidor.
+    Único ponto de fallback: driver e GraphAccess resolvem igual.
+    """
+    mapping = tenant_routes()
+    if tenant and tenant in mapping:
+        return mapping[tenant]
+    return default or os.getenv("NEO4J_DB") or None
+
+
+def group_by_database(tenants: list[str]) -> dict[str | None, list[str]]:
+    """Agrupa tenants pelo database: uma consulta por grupo em vez de uma por tenant."""
+    groups: dict[str | None, list[str]] = {}
+    for tenant in tenants:
+        groups.setdefault(tenant_database(tenant), []).append(tenant)
+    return groups
+
+
+def bookmark_manager() -> Any:
+    """Bookmark manager do processo (bookmarks carregam o database): liga escritas às leituras causais."""
+    global _bookmark_manager
+    if _bookmark_manager is None:
+        _bookmark_manager = AsyncGraphDatabase.bookmark_manager()
+    return _bookmark_manager
+
+
+def session_options(access: str, consistency: str = CAUSAL) -> dict[str, Any]:
+    """kwargs de driver.session() para um call site anotado (access, consistency)."""
+    if access not in (READ, WRITE):
+        raise ValueError(f"Access mode inválido: {access}")
+    if consistency not in (CAUSAL, EVENTUAL):
+        raise ValueError(f"Consistência inválida: {consistency}")
+    if access == WRITE and consistency == EVENTUAL:
+        raise ValueError("Escritas sempre publicam bookmarks: use CAUSAL.")
+
+    options: dict[str, Any] = {"default_access_mode": access}
+    if consistency == CAUSAL:
+        options["bookmark_manager"] = bookmark_manager()
+    return options
+
 
 class TenantAwareDriver:
     """
     Thin wrapper around the Neo4j driver that enforces database scoping.
     Prevents accidental cross-tenant queries by always routing to the
-    configured database.
+    database of the active TenantContext (fallback: the configured database).
     """
 
-    def __init__(self, base_driver, db: str = "neo4j"):
+    def __init__(self, base_driver, db: str | None = "neo4j"):
         self._driver = base_driver
         self._db = db
 
-    def session(self, **kwargs):
-        kwargs.setdefault("database", self._db)
-        # For AsyncDriver, driver.session() returns a context manager that must be awaited or used in async with.
-        # But wait, the standard neo4j-python-driver for async actually returns a context manager.
-        # The issue in test was 'Session' object does not support async context manager.
-        # This usually means it's a synchronous session object.
+    def session(self, access: str = WRITE, consistency: str = CAUSAL, **kwargs):
+        kwargs.setdefault("database", tenant_database(TenantContext.get(), self._db))
+        kwargs.update(session_options(access, consistency))
+        # AsyncDriver: session() devolve um async context manager (async with)
         return self._driver.session(**kwargs)
 
+    def read_session(self, consistency: str = CAUSAL, **kwargs):
+        return self.session(READ, consistency, **kwargs)
+
+    def write_session(self, **kwargs):
+        return self.session(WRITE, CAUSAL, **kwargs)
+
     def close(self):
         self._driver.close()
 
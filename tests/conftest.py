@@ -1,5 +1,6 @@
 import pytest
 import asyncio
+from unittest.mock import AsyncMock, MagicMock
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -7,3 +8,63 @@ def event_loop():
     loop = asyncio.get_event_loop_policy().new_event_loop()
     yield loop
     loop.close()
+
+
+class FakeRecord(dict):
+    """Record do driver Neo4j: record["campo"] e record.data()."""
+
+    def data(self):
+        return dict(self)
+
+
+class FakeRecords:
+    """Result do driver Neo4j sobre linhas em memória: async for, single(), data(), consume()."""
+
+    def __init__(self, rows=()):
+        self._rows = [FakeRecord(row) for row in rows]
+
+    def __aiter__(self):
+        self._it = iter(self._rows)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def single(self):
+        return self._rows[0] if self._rows else None
+
+    async def data(self):
+        return [record.data() for record in self._rows]
+
+    async def consume(self):
+        return None
+
+
+@pytest.fixture
+def neo4j_records():
+    """Fábrica de results falsos: neo4j_records([{...}, ...])."""
+    return FakeRecords
+
+
+@pytest.fixture
+def neo4j_driver():
+    """
+    Fábrica de AsyncDriver falso: neo4j_driver(run=..., execute_write=...)
+    (side_effects de AsyncMock). driver.session(...) devolve sempre a mesma
+    session, usável com `async with`: driver.session.return_value.
+    """
+
+    def _make(run=None, execute_write=None):
+        session = MagicMock()
+        session.__aenter__ = AsyncMock(return_value=session)
+        session.__aexit__ = AsyncMock(return_value=False)
+        session.run = AsyncMock(side_effect=run)
+        session.execute_write = AsyncMock(side_effect=execute_write)
+        driver = MagicMock()
+        driver.session.return_value = session
+        return driver
+
+    return _make
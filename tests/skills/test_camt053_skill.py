@@ -0,0 +1,245 @@
+import gc
+import hashlib
+import asyncio
+import os
+import zipfile
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import psutil
+import pytest
+
+from src.v3.skills.camt053_skill import Camt053Skill, iter_statement_chunks
+
+HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.04"><BkToCstmrStmt>'
+    "<GrpHdr><MsgId>M1</MsgId></GrpHdr><Stmt><Id>S1</Id>"
+    "<Acct><Id><IBAN>CH3400788000050770303</IBAN></Id><Ccy>CHF</Ccy></Acct>"
+)
+FOOTER = "</Stmt></BkToCstmrStmt></Document>"
+
+
+def _entry(k: int, ccy: str = "CHF") -> str:
+    return (
+        f'<Ntry><Amt Ccy="{ccy}">{k % 997 + 0.5}</Amt><CdtDbtInd>DBIT</CdtDbtInd><Sts>BOOK</Sts>'
+        f"<BookgDt><Dt>2026-01-05</Dt></BookgDt><AcctSvcrRef>ZV{k:09d}</AcctSvcrRef>"
+        "<NtryDtls><TxDtls><RltdPties><Cdtr><Nm>Viking Schweiz GmbH</Nm></Cdtr>"
+        "<CdtrAcct><Id><IBAN>CH9300762011623852957</IBAN></Id></CdtrAcct></RltdPties>"
+        f"<RmtInf><Ustrd>Facture {k} Viking Schweiz GmbH fournitures de bureau</Ustrd></RmtInf>"
+        "</TxDtls></NtryDtls></Ntry>"
+    )
+
+
+def _write_statement(path, n: int, ccy: str = "CHF") -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+        for k in range(n):
+            f.write(_entry(k, ccy))
+        f.write(FOOTER)
+
+
+def _message(kind: str, container: str, statements: list[tuple[str, list[str]]]) -> str:
+    """Documento camt (053 BkToCstmrStmt, 052 BkToCstmrAcctRpt, 054 BkToCstmrDbtCdtNtfctn)."""
+    roots = {"053": "BkToCstmrStmt", "052": "BkToCstmrAcctRpt", "054": "BkToCstmrDbtCdtNtfctn"}
+    body = "".join(
+        f"<{container}><Id>{iban}</Id><Acct><Id><IBAN>{iban}</IBAN></Id></Acct>{''.join(entries)}</{container}>"
+        for iban, entries in statements
+    )
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.{kind}.001.04">'
+        f"<{roots[kind]}><GrpHdr><MsgId>M</MsgId></GrpHdr>{body}</{roots[kind]}></Document>"
+    )
+
+
+def _ingested(write) -> list[dict]:
+    """Chamadas de injeção (a conclusão do lote não carrega transações)."""
+    return [c.args[1] for c in write.call_args_list if "transactions" in c.args[1]]
+
+
+def _skill(write=None, chunk_size=None, parallelism=None):
+    graph = SimpleNamespace(write=write or AsyncMock(return_value=[]))
+    ontology = SimpleNamespace(graph=graph, quarantine_document=AsyncMock())
+    return Camt053Skill(ontology, chunk_size=chunk_size, parallelism=parallelism), ontology
+
+
+def test_chunks_carry_entry_currency_and_account(tmp_path):
+    path = tmp_path / "eur.xml"
+    _write_statement(path, 5, ccy="EUR")
+    with open(path, "rb") as f:
+        chunks = list(iter_statement_chunks(f, 2))
+
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    rows = [row for chunk in chunks for row in chunk.to_rows()]
+    assert {r["currency"] for r in rows} == {"EUR"}
+    assert {r["acct_iban"] for r in rows} == {"CH3400788000050770303"}
+    assert rows[0]["amount"] == -0.5 and rows[0]["tx_id"] == "ZV000000000"
+    assert rows[0]["counterparty_iban"] == "CH9300762011623852957"
+
+
+def test_reimport_and_overlap_produce_the_same_keys(tmp_path):
+    # Dois lançamentos idênticos sem referência bancária: chaves distintas, mas estáveis
+    coffee = (
+        '<Ntry><Amt Ccy="CHF">4.5</Amt><CdtDbtInd>DBIT</CdtDbtInd>'
+        "<BookgDt><Dt>2026-01-31</Dt></BookgDt><NtryDtls><TxDtls><RmtInf><Ustrd>Café</Ustrd></RmtInf>"
+        "</TxDtls></NtryDtls></Ntry>"
+    )
+    january = tmp_path / "jan.xml"
+    january.write_text(HEADER + _entry(1) + coffee + coffee + FOOTER, encoding="utf-8")
+    overlap = tmp_path / "overlap.xml"
+    overlap.write_text(HEADER + coffee + coffee + _entry(2) + FOOTER, encoding="utf-8")
+
+    def _keys(path):
+        return [key for chunk in iter_statement_chunks(str(path), 10) for key in chunk.data["tx_key"].tolist()]
+
+    first = _keys(january)
+    assert first == _keys(january) and len(set(first)) == 3
+    assert _keys(overlap)[:2] == first[1:]
+    santos = [key for chunk in iter_statement_chunks(str(january), 10, "SANTOS") for key in chunk.data["tx_key"].tolist()]
+    assert set(santos).isdisjoint(first)
+
+
+@pytest.mark.asyncio
+async def test_each_chunk_is_written_in_its_own_transaction(tmp_path):
+    path = tmp_path / "stmt.xml"
+    _write_statement(path, 7)
+    skill, ontology = _skill(chunk_size=3)
+
+    result = await skill.process_statement(str(path))
+    assert result.success and "7 transações" in result.message
+    calls = _ingested(ontology.graph.write)
+    assert [len(params["transactions"]) for params in calls] == [3, 3, 1]
+
+    # Um lote por documento: PARTIAL até a última escrita, que o marca COMPLETE
+    batch = calls[0]["batch_id"]
+    assert {params["batch_id"] for params in calls} == {batch}
+    complete = ontology.graph.write.call_args_list[-1]
+    assert "import_status = 'COMPLETE'" in complete.args[0] and complete.args[1] == {"batch_id": batch}
+
+
+@pytest.mark.asyncio
+async def test_rollback_quarantines_with_hash_of_the_whole_file(tmp_path):
+    path = tmp_path / "stmt.xml"
+    _write_statement(path, 10)
+    write = AsyncMock(side_effect=[[], RuntimeError("neo4j down")])
+    skill, ontology = _skill(write=write, chunk_size=4)
+
+    result = await skill.process_statement(str(path))
+    assert not result.success and "4 transações já gravadas" in result.message
+    batch = write.call_args_list[0].args[1]["batch_id"]
+    assert f"lote {batch} PARTIAL" in result.message
+    expected = hashlib.sha256(path.read_bytes()).hexdigest()
+    ontology.quarantine_document.assert_awaited_once_with("BECO", expected, "TRANSACTION_ROLLBACK", import_batch=batch)
+
+
+@pytest.mark.asyncio
+async def test_parse_error_after_written_chunks_quarantines_the_partial_batch(tmp_path):
+    path = tmp_path / "truncated.xml"
+    _write_statement(path, 6)
+    path.write_bytes(path.read_bytes()[:-40])  # extrato cortado no meio do último lançamento
+    skill, ontology = _skill(chunk_size=2)
+
+    result = await skill.process_statement(str(path))
+    assert not result.success and "Formato XML corrompido" in result.message
+    calls = _ingested(ontology.graph.write)
+    assert len(calls) == len(ontology.graph.write.call_args_list) > 0  # nunca marcado COMPLETE
+    expected = hashlib.sha256(path.read_bytes()).hexdigest()
+    ontology.quarantine_document.assert_awaited_once_with(
+        "BECO", expected, "XML_PARSE_ERROR", import_batch=calls[0]["batch_id"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_partial_batch_can_be_rolled_back():
+    skill, ontology = _skill()
+    ontology.graph.write_one = AsyncMock(return_value={"removed": 4})
+
+    assert await skill.rollback_import_batch("BECO", "b1") == 4
+    query, params = ontology.graph.write_one.call_args.args
+    assert "import_status = 'PARTIAL'" in query and "DETACH DELETE" in query and params == {"batch_id": "b1"}
+
+
+@pytest.mark.asyncio
+async def test_zip_of_052_053_054_ingests_each_entry_once_with_bounded_parallelism(tmp_path):
+    other = "CH9300762011623852957"
+    archive = tmp_path / "bcge_2026-01.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        # Extrato mensal com duas contas (multi-Stmt)
+        zf.writestr("053/stmt.xml", _message("053", "Stmt", [
+            ("CH3400788000050770303", [_entry(k) for k in range(4)]),
+            (other, [_entry(k) for k in range(2)]),
+        ]))
+        zf.writestr("053/stmt_2.xml", _message("053", "Stmt", [(other, [_entry(k) for k in (50, 51)])]))
+        # Avisos 054 já contidos no 053 e um intradiário 052 com lançamento novo
+        for k in range(3):
+            zf.writestr(f"054/ntf_{k}.xml", _message("054", "Ntfctn", [("CH3400788000050770303", [_entry(k)])]))
+        zf.writestr("052/rpt.xml", _message("052", "Rpt", [(other, [_entry(99)])]))
+        zf.writestr("LEIAME.txt", "não é camt")
+
+    in_flight, peak, written = 0, 0, []
+
+    async def _write(query, params, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        written.extend(params.get("transactions", []))
+        in_flight -= 1
+        return []
+
+    skill, _ = _skill(write=_write, chunk_size=2, parallelism=2)
+    result = await skill.process_statement(str(archive))
+
+    assert result.success, result.message
+    assert "6 documentos camt" in result.message and "9 transações injetadas" in result.message
+    keys = [tx["tx_key"] for tx in written]
+    assert len(keys) == len(set(keys)) == 9
+    assert {tx["acct_iban"] for tx in written} == {"CH3400788000050770303", other}
+    assert 1 < peak <= 2
+
+
+@pytest.mark.asyncio
+async def test_zip_keeps_the_053_copy_of_an_entry_and_quarantines_every_failed_member(tmp_path):
+    iban = "CH3400788000050770303"
+    notice = _entry(7).replace("fournitures de bureau", "aviso 054")
+    broken = _message("052", "Rpt", [(iban, [_entry(8)])])[:-30]
+    archive = tmp_path / "bcge.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        # Listados antes do extrato: sem a preferência, o aviso 054 gravaria o lançamento
+        zf.writestr("a_054.xml", _message("054", "Ntfctn", [(iban, [notice])]))
+        zf.writestr("b_052.xml", broken)
+        zf.writestr("c_053.xml", _message("053", "Stmt", [(iban, [_entry(7)])]))
+
+    skill, ontology = _skill(parallelism=4)
+    result = await skill.process_statement(str(archive))
+
+    rows = [tx for params in _ingested(ontology.graph.write) for tx in params["transactions"]]
+    assert len(rows) == 1 and rows[0]["remittance_info"].endswith("fournitures de bureau")
+    assert not result.success and "Em quarentena (1): b_052.xml" in result.message
+    expected = hashlib.sha256(broken.encode("utf-8")).hexdigest()
+    ontology.quarantine_document.assert_awaited_once_with("BECO", expected, "XML_PARSE_ERROR", import_batch=None)
+
+
+@pytest.mark.asyncio
+async def test_large_statement_stays_within_rss_budget(tmp_path):
+    # ~16 MB de XML; ET.parse materializaria a árvore inteira (~110 MB)
+    path = tmp_path / "year_end.xml"
+    n = 40_000
+    _write_statement(path, n)
+    budget_mb = 40
+
+    gc.collect()
+    process = psutil.Process(os.getpid())
+    baseline = process.memory_info().rss
+    peaks = []
+
+    async def _write(query, params, **kwargs):
+        if "transactions" in params:
+            peaks.append(process.memory_info().rss - baseline)
+        return []
+
+    skill, _ = _skill(write=_write, chunk_size=1000)
+    result = await skill.process_statement(str(path))
+
+    assert result.success and len(peaks) == n // 1000
+    assert max(peaks) < budget_mb * 1024 * 1024, f"pico de {max(peaks) / 2**20:.1f} MB acima do baseline"
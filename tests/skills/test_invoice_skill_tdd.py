@@ -15,15 +15,18 @@ def mock_intel():
 @pytest.fixture
 def mock_ontology_manager():
     manager = MagicMock()
-    manager.get_tenant_active_context.return_value = {"tva_rates": [8.1, 2.6, 0.0]}
-    
-    # Mock driver and session for transaction 
-    session_mock = MagicMock()
-    tx_mock = MagicMock()
-    session_mock.__enter__.return_value = session_mock
-    session_mock.begin_transaction.return_value.__enter__.return_value = tx_mock
-    manager.driver.session.return_value = session_mock
-    
+    manager.get_tenant_active_context = AsyncMock(return_value={"tva_rates": [8.1, 2.6, 0.0]})
+    manager.inject_entropy_anomaly = AsyncMock()
+    manager.quarantine_document = AsyncMock()
+
+    # Mock graph access: a transação gerenciada executa a unit of work com um tx fake
+    async def _run_work(work, **kwargs):
+        return await work(MagicMock())
+
+    manager.graph.transaction = AsyncMock(side_effect=_run_work)
+    manager.graph.write = AsyncMock(return_value=[])
+    manager.graph.read_one = AsyncMock(return_value=None)
+
     return manager
 
 @pytest.fixture
@@ -0,0 +1,94 @@
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.v3.core.embedding_service import EmbeddingService
+from src.v3.core.schemas.personal import CapturePayload
+from src.v3.skills.menir_capture import MenirCapture, decide_disambiguation
+
+
+def _entity(name="Ana", kind="Person", impact=5):
+    return CapturePayload(entity_type=kind, name_or_title=name, context="ctx", impact_score=impact)
+
+
+def _hit(score, uid="u1", name="Ana"):
+    return {"id": uid, "name": name, "status": None, "score": score}
+
+
+@pytest.mark.parametrize(
+    "current, other, expected",
+    [
+        (_hit(0.97), _hit(0.99), "MERGE"),
+        (_hit(0.90), _hit(0.99), "HITL_CURRENT"),
+        (_hit(0.50), _hit(0.96), "VIRTUAL_CROSS"),
+        (None, _hit(0.88), "HITL_CROSS"),
+        (_hit(0.40), None, "CREATE"),
+        (None, None, "CREATE"),
+    ],
+)
+def test_decision_thresholds(current, other, expected, capsys, caplog):
+    with caplog.at_level("INFO", logger="MenirCapture"):
+        action = decide_disambiguation(_entity(), current, other, "SANTOS", "BECO")
+    assert action["action"] == expected
+    # Diagnóstico vai para o logger, nunca para o stdout do worker
+    assert capsys.readouterr().out == ""
+    if expected in ("MERGE", "VIRTUAL_CROSS", "CREATE"):
+        assert caplog.records
+    if expected in ("VIRTUAL_CROSS", "HITL_CROSS"):
+        assert action["target_tenant"] == "BECO"
+
+
+@pytest.mark.asyncio
+async def test_batch_search_one_embedding_call_one_query(monkeypatch, neo4j_driver, neo4j_records):
+    monkeypatch.delenv("MENIR_EMBEDDING_QUANTIZATION", raising=False)
+    intel = MagicMock()
+    intel.generate_embeddings = AsyncMock(return_value=[[0.1, 0.2], [], [0.3, 0.4]])
+
+    records = [
+        {"idx": 0, "tenant": "SANTOS", "best": _hit(0.97)},
+        {"idx": 2, "tenant": "BECO", "best": _hit(0.9, uid="b2")},
+    ]
+
+    driver = neo4j_driver(run=lambda *a, **kw: neo4j_records(records))
+    session = driver.session.return_value
+
+    probes = [("Ana ctx", "PersonNode"), ("x", "GoalNode"), ("Menir", "ProjectNode")]
+    with patch.object(EmbeddingService, "_get_intel", return_value=intel), \
+         patch("src.v3.core.embedding_service.get_shared_driver", return_value=driver):
+        out = await EmbeddingService.batch_semantic_search(probes, ["SANTOS", "BECO"])
+
+    intel.generate_embeddings.assert_awaited_once_with(["Ana ctx", "x", "Menir"])
+    session.run.assert_awaited_once()
+    rows = session.run.call_args.kwargs["rows"]
+    assert [r["idx"] for r in rows] == [0, 2]  # probe sem embedding não vai ao KNN
+    assert rows[1]["index_name"] == "projectnode_intent_index"
+    assert out[0] == {"SANTOS": _hit(0.97), "BECO": None}
+    assert out[1] == {"SANTOS": None, "BECO": None}
+    assert out[2]["BECO"]["id"] == "b2"
+
+
+@pytest.mark.asyncio
+async def test_ingest_disambiguates_all_entities_in_one_batch():
+    entities = [
+        {"entity_type": "Person", "name_or_title": f"P{i}", "context": "c", "impact_score": i}
+        for i in range(8)
+    ]
+    intel = MagicMock()
+    intel.client.models.generate_content.return_value = MagicMock(text=json.dumps({"entities": entities}))
+
+    batch = [{"PESSOAL": _hit(0.99, uid=f"s{i}") if i % 2 else None, "SANTOS": None} for i in range(8)]
+    with patch.object(MenirCapture, "_ensure_vector_indexes"), \
+         patch.object(EmbeddingService, "batch_semantic_search", AsyncMock(return_value=batch)) as search, \
+         patch.object(EmbeddingService, "semantic_search", AsyncMock()) as single:
+        capture = MenirCapture(intel=intel, orchestrator=MagicMock())
+        capture._persist_actions = AsyncMock()
+        result = await capture.ingest("texto", current_tenant="PESSOAL")
+
+    assert result["success"]
+    search.assert_awaited_once()
+    assert search.call_args.args[1] == ["PESSOAL", "SANTOS"]
+    single.assert_not_awaited()
+    actions = capture._persist_actions.call_args.args[0]
+    assert [a["action"] for a in actions].count("MERGE") == 4
+    assert [a["action"] for a in actions].count("CREATE") == 4
@@ -1,6 +1,6 @@
 import pytest
 from decimal import Decimal
-from src.v3.skills.swiss_qr_parser import SwissQRParser, SwissQRParserError
+from src.v3.skills.swiss_qr_parser import SwissQRParser, SwissQRParserError, find_reference, normalize_reference
 
 # Real QR-IBAN from Swiss Style Guide (valid mod 97)
 VALID_QR_IBAN = "CH3600000000000000000"
@@ -106,3 +106,22 @@ def test_parse_invalid_iban_rejects_payload():
     with pytest.raises(SwissQRParserError) as exc:
         parser.parse(invalid_payload)
     assert "Falha na validacao MOD11" in str(exc.value)
+
+def test_reference_key_is_the_same_on_qr_and_bank_side():
+    # QR: referência impressa em grupos; camt: Strd/CdtrRefInf/Ref ou citada no Ustrd
+    qrr = "210000000003139471430009017"
+    assert normalize_reference("21 00000 00003 13947 14300 09017") == qrr
+    assert find_reference("Paiement facture 21 00000 00003 13947 14300 09017 merci") == qrr
+    assert normalize_reference(" rf18 5390 0754 7034") == find_reference("RF18539007547034 loyer") == "RF18539007547034"
+    assert normalize_reference("") is None
+    assert normalize_reference("FACTURE 42") is None
+    assert find_reference("Facture 42 du 01.02") is None
+
+
+def test_reference_with_a_wrong_check_digit_never_becomes_a_key():
+    # Um dígito trocado: mesmo formato, checksum (mod 10 recursivo / ISO 11649) não confere
+    assert normalize_reference("210000000003139471430009018") is None
+    assert normalize_reference("RF18539007547035") is None
+    # No texto livre, uma referência inválida não esconde a válida que vem depois
+    text = "Ref 210000000003139471430009018 corrigida RF18539007547034"
+    assert find_reference(text) == "RF18539007547034"
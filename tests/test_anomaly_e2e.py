@@ -30,7 +30,7 @@ async def main():
     print(f"\n[Test] Injected dummy document into Pipeline: {dummy_file}")
 
     manager = MenirOntologyManager(uri, (user, pwd))
-    manager.bootstrap_system_graph()
+    await manager.bootstrap_system_graph()
 
     intel = MenirIntel()
     runner = MenirAsyncRunner(intel, manager)
@@ -0,0 +1,102 @@
+from datetime import datetime
+
+import pytest
+
+from src.v3.core.billing import (
+    CYPHER_RULE_CHAINS,
+    SWISS_TZ,
+    BillingManager,
+    ForensicAuditPayload,
+    RuleIntervalIndex,
+)
+
+JAN, FEB, MAR = (int(datetime(2026, m, 1, tzinfo=SWISS_TZ).timestamp()) for m in (1, 2, 3))
+
+
+def _chain(*rates):
+    """Versões 1..n vigentes a partir de JAN, FEB, MAR..., gravadas em created_at 10, 20, 30..."""
+    starts = [JAN, FEB, MAR][: len(rates)]
+    return [
+        {"uid": f"r{k + 1}", "version": k + 1, "tariff_rate": rate, "valid_from": start, "created_at": 10 * (k + 1),
+         "valid_to": starts[k + 1] if k + 1 < len(rates) else None}
+        for k, (rate, start) in enumerate(zip(rates, starts))
+    ]
+
+
+class _FakeDriver:
+    """Grafo em memória: client_uid -> cadeia de BillingRule."""
+
+    def __init__(self, chains, records):
+        self.chains = chains
+        self.queries = []
+        self.records = records
+
+    def session(self, **kwargs):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute_read(self, work):
+        return await work(self)
+
+    async def run(self, query, client_uids):
+        self.queries.append(query)
+        rows = []
+        for uid in client_uids:
+            rules = self.chains.get(uid)
+            if rules:
+                version = max(r["version"] for r in rules)
+                rows.append({"uid": uid, "version": version, "rules": list(reversed(rules))})
+        return self.records(rows)
+
+
+def test_index_resolves_valid_time_and_transaction_time():
+    index = RuleIntervalIndex(3, reversed(_chain(100.0, 200.0, 300.0)))
+    assert index.resolve(JAN - 1) is None
+    assert index.resolve(JAN + 86400)["tariff_rate"] == 100.0
+    assert index.resolve(FEB)["tariff_rate"] == 200.0
+    assert index.resolve(MAR + 1)["tariff_rate"] == 300.0
+    # Em created_at=20 a versão 3 não existia: a 2 ainda valia sem fim
+    assert index.resolve(MAR + 1, known_at=25)["tariff_rate"] == 200.0
+    assert index.resolve(JAN, known_at=5) is None
+
+
+def test_same_effective_date_resolves_to_the_newest_version():
+    rules = _chain(100.0, 200.0)
+    rules[1]["valid_from"] = rules[0]["valid_to"] = JAN
+    assert RuleIntervalIndex(2, rules).resolve(JAN)["tariff_rate"] == 200.0
+
+
+@pytest.mark.asyncio
+async def test_resolve_many_loads_chains_once_and_reloads_only_mutated_clients(neo4j_records):
+    driver = _FakeDriver({"A": _chain(100.0, 200.0), "B": _chain(50.0)}, neo4j_records)
+    manager = BillingManager(driver)
+    at = datetime(2026, 2, 15, tzinfo=SWISS_TZ)
+
+    first = await manager.resolve_many(["A", "B", "GHOST"], at)
+    assert first["A"]["tariff_rate"] == 200.0 and first["B"]["tariff_rate"] == 50.0 and first["GHOST"] is None
+    assert driver.queries.count(CYPHER_RULE_CHAINS) == 1
+
+    audit = ForensicAuditPayload(client_uid="A", target_date="2026-01-15T12:00:00+01:00")
+    assert (await manager.resolve_active_rule_at(audit))["tariff_rate"] == 100.0
+    assert driver.queries.count(CYPHER_RULE_CHAINS) == 1
+
+    # Outro worker commitou a versão 2 de B: a versão ativa denuncia, só B é relido
+    driver.chains["B"] = _chain(50.0, 75.0)
+    driver.queries.clear()
+    again = await manager.resolve_many(["A", "B"], at)
+    assert again["B"]["tariff_rate"] == 75.0
+    assert driver.queries == [driver.queries[0], CYPHER_RULE_CHAINS]
+
+    manager.rule_cache.invalidate("A")
+    assert "A" not in manager.rule_cache._indexes
+
+
+@pytest.mark.asyncio
+async def test_resolve_many_rejects_naive_datetimes(neo4j_records):
+    with pytest.raises(ValueError):
+        await BillingManager(_FakeDriver({}, neo4j_records)).resolve_many(["A"], datetime(2026, 2, 15))
@@ -200,39 +200,40 @@ async def test_forensic_time_travel(client_uid, clear_billing_graph):
     assert rule["tariff_rate"] == 100.0
 
 @pytest.mark.asyncio
-async def test_python_local_starvation_shield(client_uid, clear_billing_graph):
-    """Teste 6: O Semáforo Fast-Fail Python que impede starvation do pool."""
-    from src.v3.core.billing import ConcurrentMutationError
+async def test_python_local_starvation_shield(client_uid, clear_billing_graph, tmp_path):
+    """Teste 6: Mutações concorrentes do mesmo tenant entram na fila (lease FIFO) em vez de falhar."""
+    from src.v3.core.tenant_lock import TenantLockManager
     driver = clear_billing_graph
     async with driver.session() as session:
         await session.execute_write(lambda tx: tx.run("CREATE (c:Client {uid: $uid})", uid=client_uid))
         
-    manager = BillingManager(driver)
+    manager = BillingManager(driver, lock_manager=TenantLockManager(tmp_path / "leases.sqlite3"))
     
-    # Payload 1: Valida.
+    # Payload 1: Gênese.
     p1 = RuleMutationPayload(client_uid=client_uid, new_tariff=100.0, effective_date="2026-01-01T00:00:00+01:00")
-    # Payload 2: Identica/Concorrente
+    # Payload 2: Concorrente, contando com a versão 1 já commitada
     p2 = RuleMutationPayload(client_uid=client_uid, new_tariff=200.0, effective_date="2026-02-01T00:00:00+01:00", expected_version=1)
     
-    # Criamos uma barreira artificial para travar a Coroutine 1 tempo suficiente para a Coroutine 2 bater na porta
     import asyncio
     
-    async def slow_mutate():
-        # Vamos emular que o mutate_contract segurou a lock enquanto bate no cypher
+    async def first_mutate():
         return await manager.mutate_contract(p1)
         
-    async def attacker_mutate():
-        # Atrasa 10ms só para garantir que a 1 pegue a trava primeiro
+    async def queued_mutate():
+        # Atrasa 10ms só para garantir que a 1 pegue a lease primeiro
         await asyncio.sleep(0.01)
         return await manager.mutate_contract(p2)
         
-    t1 = asyncio.create_task(slow_mutate())
-    t2 = asyncio.create_task(attacker_mutate())
+    results = await asyncio.gather(first_mutate(), queued_mutate(), return_exceptions=True)
     
-    results = await asyncio.gather(t1, t2, return_exceptions=True)
-    
-    # Um deles deve ter sucesso (t1) e o outro falhar com ConcurrentMutationError (t2)
-    exceptions = [r for r in results if isinstance(r, Exception)]
-    assert len(exceptions) == 1
-    assert isinstance(exceptions[0], ConcurrentMutationError)
-    assert "Repulsão ASGI Inter-Processo" in str(exceptions[0])
+    # A segunda esperou a primeira terminar: nenhuma falha, cadeia v2 -> v1
+    assert not [r for r in results if isinstance(r, Exception)]
+    async with driver.session() as session:
+        async def _verify(tx):
+            res = await tx.run(
+                "MATCH (c:Client {uid: $uid})-[:ACTIVE_RULE]->(br:BillingRule) RETURN br.version AS v, c.fencing_token AS t",
+                uid=client_uid,
+            )
+            return await res.single()
+        record = await session.execute_read(_verify)
+        assert record["v"] == 2 and record["t"] is not None
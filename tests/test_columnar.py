@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from src.v3.core.columnar import InvoiceBatch, StringDictionary, TransactionBatch, to_dates
+from src.v3.core.cresus_exporter import EXPORT_KEYS, CresusExporter
+from src.v3.core.reconciliation_sweep import OpenItems
+
+
+def _tx_rows(n):
+    return [
+        {
+            "id": f"t{k}", "tx_key": f"{k:040x}", "amount": -(k % 50) - 0.35, "booking_date": f"2026-01-{k % 28 + 1:02d}",
+            "currency": "CHF" if k % 3 else "EUR", "acct_iban": "CH3400788000050770303",
+            "counterparty_iban": None if k % 4 == 0 else "CH93 0076 2011 6238 5295 7", "counterparty_name": "Viking",
+        }
+        for k in range(n)
+    ]
+
+
+def test_rows_round_trip_with_cents_dates_and_dictionary_codes():
+    rows = _tx_rows(6)
+    batch = TransactionBatch.from_rows(rows)
+
+    assert batch.data["amount"].dtype == np.int64 and batch.data["amount"][1] == -135
+    assert batch.data["booking_date"].dtype == np.dtype("datetime64[D]")
+    assert len(batch.dictionaries["currency"]) == 2 and batch.data["counterparty_iban"][0] == -1
+
+    back = batch.to_rows()
+    assert [r["amount"] for r in back] == [r["amount"] for r in rows]
+    assert [r["currency"] for r in back] == [r["currency"] for r in rows]
+    assert back[0]["counterparty_iban"] is None and back[0]["remittance_info"] is None
+
+
+def test_slices_are_views_and_masks_keep_dictionaries():
+    batch = TransactionBatch.from_rows(_tx_rows(100))
+    window = batch[10:20]
+    assert np.shares_memory(window.data, batch.data) and window.dictionaries is batch.dictionaries
+    assert window.to_rows()[0]["id"] == "t10"
+
+    eur = batch[batch.data["currency"] == batch.dictionaries["currency"].code("EUR")]
+    assert len(eur) == 34 and {r["currency"] for r in eur.to_rows()} == {"EUR"}
+
+
+def test_dates_accept_epoch_days_iso_and_garbage():
+    dates = to_dates(["2026-01-05T10:00:00", "", None, "05.01.2026", 20458])
+    assert dates[0] == np.datetime64("2026-01-05") and dates[4] == np.datetime64("2026-01-05")
+    assert np.isnat(dates[1:4]).all()
+
+
+@pytest.mark.asyncio
+async def test_stream_builds_one_batch_and_open_items_match_row_path():
+    currency = StringDictionary()
+    rows = [
+        {"id": f"i{k}", "amount": 100.0 + k / 100, "day": 20_000 + k, "currency": ("CHF", "EUR", None)[k % 3],
+         "reference": None, "iban": "ch93 0076 2011", "party": "  Viking   Schweiz "}
+        for k in range(25)
+    ]
+
+    async def _stream():
+        for row in rows:
+            yield row
+
+    batch = await InvoiceBatch.from_stream(
+        _stream(), {"currency": currency}, chunk_size=10,
+        keys={"issue_date": "day", "payment_reference": "reference", "vendor_iban": "iban", "vendor_name": "party"},
+    )
+    assert len(batch) == 25 and batch.dictionaries["currency"] is currency
+
+    columnar, legacy = OpenItems.from_batch(batch), OpenItems.from_rows(rows, {})
+    assert columnar.ids == legacy.ids
+    assert np.array_equal(columnar.amount, legacy.amount) and np.array_equal(columnar.day, legacy.day)
+    assert np.array_equal(columnar.currency, legacy.currency)
+    assert columnar.iban == legacy.iban and columnar.party == legacy.party
+
+
+def test_exporter_formats_a_batch_like_the_row_path():
+    rows = [
+        {"issue_date": "2026-01-05", "total_amount": 10.0, "line_items_json": None,
+         "vendor_name": "Acme", "cresus_account_id": None, "edge_id": "e0"},
+        {"issue_date": "2026-02-10", "total_amount": 99.9,
+         "line_items_json": '[{"tva_rate_applied": 8.1, "gross_amount": 60}, {"tva_rate_applied": 2.6, "gross_amount": 39.9}]',
+         "vendor_name": "Lyreco Switzerland AG", "cresus_account_id": "4000", "edge_id": "e1"},
+    ]
+    batch = InvoiceBatch.from_rows(rows, keys={"amount": "total_amount"})
+    lines = CresusExporter(None, batch_size=1)._format_batch("BECO", batch).split("\r\n")
+
+    assert lines[0] == "05.01.2026\t1020\t3400\tAcme\tFacture Acme / 05.01.2026 [REVIEW_ACCOUNT]\t10.00\t\t\t\t1\t\t"
+    assert lines[1].endswith("\t60.00\t\t\t\t1\t\tI81") and lines[2].endswith("\t39.90\t\t\t\t1\t\tI26")
+    assert lines[1].startswith("10.02.2026\t1020\t4000\tLyreco Swi\t")
+
+
+def test_exporter_falls_back_to_the_raw_date_when_the_column_is_nat():
+    rows = [
+        {"issue_date": "05.01.2026", "total_amount": 10.0, "line_items_json": None,
+         "vendor_name": "Acme", "cresus_account_id": "4000", "edge_id": "e0"},
+        {"issue_date": "2026/02/10", "total_amount": 20.0, "line_items_json": None,
+         "vendor_name": "Acme", "cresus_account_id": "4000", "edge_id": "e1"},
+        {"issue_date": None, "total_amount": 30.0, "line_items_json": None,
+         "vendor_name": "Acme", "cresus_account_id": "4000", "edge_id": "e2"},
+    ]
+    batch = InvoiceBatch.from_rows(rows, keys=EXPORT_KEYS)
+    assert np.isnat(batch.data["issue_date"]).all()
+    lines = CresusExporter(None)._format_batch("BECO", batch).split("\r\n")
+
+    assert [line.split("\t")[0] for line in lines[:3]] == ["05.01.2026", "2026/02/10", ""]
@@ -0,0 +1,155 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.v3.core.embedding_backfill import BackfillCheckpoint, EmbeddingBackfillWorker
+
+
+class _FakeGraph:
+    """Simula o fetch keyset + UNWIND write sobre nós em memória."""
+
+    def __init__(self, texts, make_driver, records):
+        self.nodes = {f"4:db:{i:04d}": {"text": t, "embedding": None, "uid": f"u{i:04d}"} for i, t in enumerate(texts)}
+        self.write_batches = []
+        self.fail_after_writes = None
+        self._make_driver = make_driver
+        self._records = records
+
+    def driver(self):
+        return self._make_driver(run=self._run, execute_write=self._execute_write)
+
+    async def _run(self, query, cursor="", page_size=10, keys=None, **_):
+        if "AS unkeyed" in query:
+            return self._records([{"unkeyed": sum(n["embedding"] is None for n in self.nodes.values() if not n["uid"])}])
+        if "count(*)" in query:
+            pending = [n for n in self.nodes.values() if n["embedding"] is None and n["text"]]
+            return self._records([{"nodes": len(pending), "chars": sum(len(n["text"]) for n in pending)}])
+        page = [
+            {"eid": eid, "cursor": eid, "node_key": eid, "text": n["text"]}
+            for eid, n in sorted(self.nodes.items())
+            if n["embedding"] is None and (eid in keys if keys is not None else eid > cursor)
+        ][:page_size]
+        return self._records(page)
+
+    async def _execute_write(self, fn):
+        if self.fail_after_writes is not None and len(self.write_batches) >= self.fail_after_writes:
+            raise ConnectionError("neo4j caiu")
+        tx = MagicMock()
+        fn(tx)
+        rows = tx.run.call_args.kwargs["rows"]
+        self.write_batches.append(rows)
+        for row in rows:
+            self.nodes[row["eid"]]["embedding"] = row["embedding"]
+
+
+@pytest.fixture
+def fake_graph(neo4j_driver, neo4j_records):
+    return lambda texts: _FakeGraph(texts, neo4j_driver, neo4j_records)
+
+
+def _embedder(calls):
+    async def embed(texts):
+        calls.append(len(texts))
+        return [[float(len(t)), 1.0] if t != "boom" else [] for t in texts]
+    return embed
+
+
+def test_backfill_pages_batches_and_completes(tmp_path, monkeypatch, fake_graph):
+    monkeypatch.delenv("MENIR_EMBEDDING_QUANTIZATION", raising=False)
+    graph = fake_graph([f"texto {i}" for i in range(25)])
+    calls = []
+    worker = EmbeddingBackfillWorker(
+        "BECO", driver=graph.driver(), embed_batch=_embedder(calls),
+        page_size=10, embed_batch_size=4, checkpoint_dir=tmp_path,
+    )
+    ckpt = asyncio.run(worker.run("Lead"))
+
+    assert ckpt.done and ckpt.embedded == 25 and ckpt.failed == 0
+    assert all(n["embedding"] for n in graph.nodes.values())
+    # Uma escrita UNWIND por página, lotes de embedding <= embed_batch_size
+    assert [len(b) for b in graph.write_batches] == [10, 10, 5]
+    assert max(calls) == 4
+    assert BackfillCheckpoint.load(worker.checkpoint_path("Lead")).done
+
+
+def test_backfill_resumes_from_checkpoint_after_crash(tmp_path, monkeypatch, fake_graph):
+    monkeypatch.delenv("MENIR_EMBEDDING_QUANTIZATION", raising=False)
+    graph = fake_graph([f"t{i}" for i in range(30)])
+    graph.fail_after_writes = 2
+    worker = EmbeddingBackfillWorker(
+        "BECO", driver=graph.driver(), embed_batch=_embedder([]),
+        page_size=10, checkpoint_dir=tmp_path,
+    )
+    with pytest.raises(ConnectionError):
+        asyncio.run(worker.run("Chunk"))
+
+    saved = BackfillCheckpoint.load(worker.checkpoint_path("Chunk"))
+    assert saved.embedded == 20 and saved.cursor == "4:db:0019" and not saved.done
+
+    graph.fail_after_writes = None
+    calls = []
+    worker._embed_batch = _embedder(calls)
+    ckpt = asyncio.run(worker.run("Chunk"))
+    assert ckpt.done and ckpt.embedded == 30
+    assert sum(calls) == 10  # só a página pendente foi reembedada
+
+
+def test_backfill_records_failed_rows_and_retries_them(tmp_path, monkeypatch, fake_graph):
+    monkeypatch.delenv("MENIR_EMBEDDING_QUANTIZATION", raising=False)
+    graph = fake_graph(["a", "boom", "c", "   "])
+    worker = EmbeddingBackfillWorker(
+        "BECO", driver=graph.driver(), embed_batch=_embedder([]),
+        page_size=2, checkpoint_dir=tmp_path,
+    )
+    ckpt = asyncio.run(worker.run("Lead"))
+    # O cursor não trava na falha, mas ela fica no checkpoint (texto vazio não é falha)
+    assert ckpt.done and ckpt.embedded == 2 and ckpt.skipped == 1
+    assert ckpt.failures == ["4:db:0001"] and ckpt.failed == 1
+    assert BackfillCheckpoint.load(worker.checkpoint_path("Lead")).failures == ["4:db:0001"]
+
+    # API volta: o próximo run retenta só a falha, mesmo com o checkpoint concluído
+    calls = []
+    graph.nodes["4:db:0001"]["text"] = "recovered"
+    worker._embed_batch = _embedder(calls)
+    ckpt = asyncio.run(worker.run("Lead"))
+    assert ckpt.failures == [] and ckpt.embedded == 3 and calls == [1]
+    assert graph.nodes["4:db:0001"]["embedding"]
+
+
+def test_backfill_by_uid_reports_nodes_without_uid(tmp_path, monkeypatch, fake_graph):
+    monkeypatch.delenv("MENIR_EMBEDDING_QUANTIZATION", raising=False)
+    graph = fake_graph(["a", "b", "c"])
+    graph.nodes["4:db:0001"]["uid"] = None
+    driver = graph.driver()
+    worker = EmbeddingBackfillWorker(
+        "BECO", driver=driver, embed_batch=_embedder([]), key="uid", checkpoint_dir=tmp_path,
+    )
+    ckpt = asyncio.run(worker.run("Chunk"))
+
+    assert ckpt.unkeyed == 1
+    assert BackfillCheckpoint.load(worker.checkpoint_path("Chunk")).unkeyed == 1
+    fetch = driver.session.return_value.run.call_args_list[-1].args[0]
+    assert "n.uid IS NOT NULL AND n.uid > $cursor" in fetch
+
+
+def test_backfill_quantized_rows(tmp_path, monkeypatch, fake_graph):
+    monkeypatch.setenv("MENIR_EMBEDDING_QUANTIZATION", "int8")
+    graph = fake_graph(["alpha", "beta"])
+    worker = EmbeddingBackfillWorker(
+        "BECO", driver=graph.driver(), embed_batch=_embedder([]), checkpoint_dir=tmp_path,
+    )
+    asyncio.run(worker.run("Lead"))
+    row = graph.write_batches[0][0]
+    assert isinstance(row["codes"], bytes) and row["full_uid"].startswith("Lead:")
+
+
+def test_dry_run_estimate(tmp_path, monkeypatch, fake_graph):
+    monkeypatch.setenv("MENIR_GEMINI_RATE_LIMIT_RPM", "10")
+    graph = fake_graph(["x" * 400] * 250)
+    worker = EmbeddingBackfillWorker("BECO", driver=graph.driver(), checkpoint_dir=tmp_path)
+    est = asyncio.run(worker.estimate("Lead", price_per_mtok=0.15))
+    assert est.nodes == 250 and est.tokens == 25_000
+    assert est.requests == 3 and est.minutes == 0.3
+    assert est.cost_usd == pytest.approx(0.0038, abs=1e-4)
+    assert not graph.write_batches
@@ -0,0 +1,186 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.v3.core import existence_filter
+from src.v3.core.existence_filter import (
+    DOCUMENT_SHA256,
+    DOCUMENT_UID,
+    VENDOR_NAME,
+    BloomFilter,
+    ExistenceIndex,
+)
+from src.v3.core.persistence import NodePersistenceOrchestrator, OrphanNodeError
+from src.v3.core.schemas.identity import TenantContext
+from src.v3.core.schemas.operational import ClientNode
+from src.v3.menir_bridge import MenirBridge
+from src.v3.skills.invoice_skill import InvoiceSkill
+
+
+@pytest.fixture
+def index(monkeypatch):
+    fresh = ExistenceIndex(fp_rate=0.01, capacity=1000, lru_size=8)
+    monkeypatch.setattr(existence_filter, "_default", fresh)
+    return fresh
+
+
+@pytest.fixture
+def beco():
+    token = TenantContext.set("BECO")
+    yield
+    TenantContext.reset(token)
+
+
+def _seeded(index, namespace, keys, tenant="BECO"):
+    index.begin_seed(tenant, namespace)
+    index.finish_seed(tenant, namespace, keys)
+
+
+def test_bloom_has_no_false_negatives_and_honours_fp_rate():
+    bloom = BloomFilter(capacity=10_000, fp_rate=0.01)
+    members = [f"sha-{i}" for i in range(10_000)]
+    for key in members:
+        bloom.add(key)
+
+    assert all(key in bloom for key in members)
+    false_positives = sum(f"other-{i}" in bloom for i in range(20_000))
+    assert false_positives / 20_000 < 0.02
+    assert bloom.estimated_fp_rate() == pytest.approx(0.01, rel=0.2)
+
+
+def test_bloom_rejects_invalid_rate():
+    with pytest.raises(ValueError):
+        BloomFilter(capacity=10, fp_rate=1.5)
+
+
+def test_unseeded_filter_never_answers_negative(index):
+    assert index.might_contain("BECO", VENDOR_NAME, "x") is True
+
+
+@pytest.mark.asyncio
+async def test_negatives_always_go_to_the_graph_and_positives_hit_lru(index):
+    # Mesmo com o Bloom semeado sem a chave: exists() nunca responde negativo localmente
+    _seeded(index, DOCUMENT_SHA256, [])
+    fetch = AsyncMock(return_value=False)
+    assert await index.exists("BECO", DOCUMENT_SHA256, "unknown", fetch) is False
+    assert await index.exists("BECO", DOCUMENT_SHA256, "unknown", fetch) is False
+    assert fetch.await_count == 2
+
+    fetch = AsyncMock(return_value=True)
+    assert await index.exists("BECO", DOCUMENT_SHA256, "known", fetch) is True
+    assert await index.exists("BECO", DOCUMENT_SHA256, "known", fetch) is True
+    assert fetch.await_count == 1
+    # Tenants não compartilham LRU
+    assert await index.exists("SANTOS", DOCUMENT_SHA256, "known", fetch) is True
+    assert fetch.await_count == 2
+
+    line = next(r for r in index.report() if r["tenant"] == "BECO")
+    assert line["answered_locally"] == 1 and line["graph_queries"] == 3
+
+
+@pytest.mark.asyncio
+async def test_positive_expires_after_ttl_and_is_reconfirmed(index, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(existence_filter.time, "monotonic", lambda: clock[0])
+    index.ttl = 60
+    fetch = AsyncMock(return_value=True)
+    assert await index.exists("BECO", DOCUMENT_UID, "doc-1", fetch) is True
+
+    clock[0] += 30
+    assert await index.exists("BECO", DOCUMENT_UID, "doc-1", fetch) is True
+    assert fetch.await_count == 1
+
+    # Deletado por outro processo: depois do TTL o grafo responde de novo
+    clock[0] += 31
+    fetch.return_value = False
+    assert await index.exists("BECO", DOCUMENT_UID, "doc-1", fetch) is False
+    assert fetch.await_count == 2
+    assert index.report()[0]["expired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_seed_reads_graph_and_keeps_writes_made_meanwhile(index):
+    graph = MagicMock()
+
+    async def _read(query, params=None, **kwargs):
+        # Escrita concorrente chega enquanto o seed lê o grafo
+        index.add(kwargs["tenant"], VENDOR_NAME, "written-during-seed")
+        return [{"k": "Acme Sàrl"}]
+
+    graph.read = AsyncMock(side_effect=_read)
+    await index.seed(graph, tenants=["BECO"])
+
+    assert "Vendor`:`BECO`" in graph.read.call_args.args[0]
+    assert index.might_contain("BECO", VENDOR_NAME, "Acme Sàrl")
+    assert index.might_contain("BECO", VENDOR_NAME, "written-during-seed")
+    assert not index.might_contain("BECO", VENDOR_NAME, "Other AG")
+    # Document não tem Bloom: só o LRU de exists()
+    assert {line["label"] for line in index.report()} == {"Vendor"}
+
+
+@pytest.mark.asyncio
+async def test_failed_seed_keeps_graph_fallback(index):
+    graph = MagicMock()
+    graph.read = AsyncMock(side_effect=ConnectionError("down"))
+    await index.seed(graph, tenants=["BECO"], namespaces=[VENDOR_NAME])
+    assert index.might_contain("BECO", VENDOR_NAME, "anything") is True
+
+
+@pytest.mark.asyncio
+async def test_lru_is_bounded_and_forget_evicts(index):
+    fetch = AsyncMock(return_value=True)
+    for i in range(20):
+        await index.exists("BECO", DOCUMENT_UID, str(i), fetch)
+    assert len(index._lru) == index.lru_size
+
+    index.forget("BECO", DOCUMENT_UID, "19")
+    await index.exists("BECO", DOCUMENT_UID, "19", fetch)
+    assert fetch.await_count == 21
+
+
+@pytest.mark.asyncio
+async def test_persist_confirms_unknown_origin_in_graph(index, beco):
+    result = MagicMock()
+    result.single = AsyncMock(return_value=None)
+    tx = MagicMock()
+    tx.run = AsyncMock(return_value=result)
+    client = ClientNode(uid="c1", project="BECO", source_document_uid="ghost", client_type="PJ", name="Acme")
+
+    with pytest.raises(OrphanNodeError):
+        await NodePersistenceOrchestrator().persist(client, tx)
+    assert tx.run.await_args.kwargs["uid"] == "ghost"
+
+
+@pytest.mark.asyncio
+async def test_check_document_exists_confirms_negative_in_graph(index, beco):
+    record = {"exists": True}
+    result = MagicMock()
+    result.single = AsyncMock(return_value=record)
+    session = MagicMock()
+    session.run = AsyncMock(return_value=result)
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+    bridge = MenirBridge.__new__(MenirBridge)
+    bridge.driver = MagicMock()
+    bridge.driver.read_session.return_value = session
+
+    # Gravado por outro worker: só o grafo sabe; o positivo fica no LRU
+    assert await bridge.check_document_exists("f" * 64) is True
+    assert await bridge.check_document_exists("f" * 64) is True
+    session.run.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_unknown_vendor_skips_cache_lookup(index, monkeypatch):
+    monkeypatch.delenv("MENIR_ZEFIX_URL", raising=False)
+    _seeded(index, VENDOR_NAME, ["Known Sàrl"])
+    index.begin_seed("BECO", ("Vendor", "ide_number"))
+    index.finish_seed("BECO", ("Vendor", "ide_number"), [])
+    ontology = MagicMock()
+    ontology.graph.read_one = AsyncMock(return_value=None)
+
+    await InvoiceSkill(intel=None, ontology_manager=ontology)._resolve_vendor_zefix("CHE-1", "New GmbH", "BECO")
+    ontology.graph.read_one.assert_not_awaited()
+
+    await InvoiceSkill(intel=None, ontology_manager=ontology)._resolve_vendor_zefix(None, "Known Sàrl", "BECO")
+    ontology.graph.read_one.assert_awaited_once()
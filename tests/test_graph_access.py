@@ -0,0 +1,329 @@
+import asyncio
+import logging
+import time
+from contextlib import aclosing
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+
+from src.v3.core.cresus_exporter import CresusExporter
+from src.v3.core.dispatcher import DocumentDispatcher
+from src.v3.core.graph_access import GraphAccess, keyset_query, tenant_database
+from src.v3.core.persistence import NodePersistenceOrchestrator
+from src.v3.core.reconciliation import ReconciliationEngine
+from src.v3.core.schemas.base import Document
+from src.v3.core.schemas.identity import TenantContext
+from src.v3.core.write_behind import WriteBehindBuffer
+from src.v3.meta_cognition import MenirOntologyManager
+from src.v3.tenant_middleware import CAUSAL, EVENTUAL, READ, WRITE, TenantAwareDriver, bookmark_manager
+
+BLOCKING_BUDGET_MS = 50
+
+
+class _FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    async def data(self):
+        return self._rows
+
+    async def single(self):
+        return self._rows[0] if self._rows else None
+
+    async def consume(self):
+        return None
+
+    async def __aiter__(self):
+        for row in self._rows:
+            yield SimpleNamespace(data=lambda row=row: dict(row))
+
+
+class _FakeTx:
+    def __init__(self, log, rows):
+        self.log = log
+        self.rows = rows
+
+    async def run(self, query, parameters=None, **kwargs):
+        await asyncio.sleep(0.001)  # I/O de rede simulado: cede o loop
+        self.log.append((query, {**(parameters or {}), **kwargs}))
+        return _FakeResult(self.rows)
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeSession:
+    def __init__(self, driver, config):
+        self.driver = driver
+        self.config = config
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute_read(self, work):
+        self.driver.calls.append(("read", self.config, getattr(work, "timeout", None)))
+        return await work(_FakeTx(self.driver.queries, self.driver.rows))
+
+    async def execute_write(self, work):
+        self.driver.calls.append(("write", self.config, getattr(work, "timeout", None)))
+        return await work(_FakeTx(self.driver.queries, self.driver.rows))
+
+    async def begin_transaction(self, timeout=None):
+        self.driver.calls.append(("stream", self.config, timeout))
+        self.driver.open_tx = _FakeTx(self.driver.queries, self.driver.rows)
+        return self.driver.open_tx
+
+
+class _FakeDriver:
+    def __init__(self, rows=None):
+        self.rows = rows if rows is not None else []
+        self.calls: list[tuple] = []
+        self.queries: list[tuple] = []
+
+    def session(self, **config):
+        return _FakeSession(self, config)
+
+
+@pytest.fixture
+def beco():
+    token = TenantContext.set("BECO")
+    yield
+    TenantContext.reset(token)
+
+
+@pytest_asyncio.fixture()
+async def loop_blocking(caplog):
+    """Captura os avisos 'Executing <Handle> took X seconds' do loop em modo debug."""
+    loop = asyncio.get_running_loop()
+    previous = (loop.get_debug(), loop.slow_callback_duration)
+    loop.set_debug(True)
+    loop.slow_callback_duration = BLOCKING_BUDGET_MS / 1000
+    caplog.set_level(logging.WARNING, logger="asyncio")
+
+    def _slow_callbacks():
+        return [r.getMessage() for r in caplog.records if r.name == "asyncio" and "took" in r.getMessage()]
+
+    yield _slow_callbacks
+    loop.set_debug(previous[0])
+    loop.slow_callback_duration = previous[1]
+
+
+def test_tenant_database_routing(monkeypatch):
+    monkeypatch.setenv("MENIR_TENANT_DATABASES", "BECO=beco, SANTOS=santos,broken")
+    monkeypatch.delenv("NEO4J_DB", raising=False)
+    assert tenant_database("BECO") == "beco"
+    assert tenant_database("SANTOS") == "santos"
+    assert tenant_database("PESSOAL") is None
+
+    monkeypatch.setenv("NEO4J_DB", "neo4j")
+    assert tenant_database("PESSOAL") == "neo4j"
+
+
+@pytest.mark.asyncio
+async def test_read_uses_managed_transaction_with_timeout_and_tenant_database(monkeypatch, beco):
+    monkeypatch.setenv("MENIR_TENANT_DATABASES", "BECO=beco")
+    driver = _FakeDriver(rows=[{"n": 1}])
+    graph = GraphAccess(driver, timeout=5, max_retry_time=2)
+
+    assert await graph.read("RETURN 1 AS n", {"x": 1}) == [{"n": 1}]
+    kind, config, timeout = driver.calls[0]
+    assert kind == "read"
+    assert config == {
+        "database": "beco",
+        "max_transaction_retry_time": 2,
+        "default_access_mode": READ,
+        "bookmark_manager": bookmark_manager(),
+    }
+    assert timeout == 5
+    assert driver.queries[0] == ("RETURN 1 AS n", {"x": 1})
+
+
+@pytest.mark.asyncio
+async def test_write_explicit_tenant_and_timeout_override(monkeypatch, beco):
+    monkeypatch.setenv("MENIR_TENANT_DATABASES", "BECO=beco,SANTOS=santos")
+    driver = _FakeDriver(rows=[])
+    graph = GraphAccess(driver, timeout=5, max_retry_time=2)
+
+    assert await graph.write_one("CREATE (n)", tenant="SANTOS", timeout=1) is None
+    kind, config, timeout = driver.calls[0]
+    assert kind == "write"
+    assert config["database"] == "santos"
+    assert timeout == 1
+
+
+@pytest.mark.asyncio
+async def test_writes_publish_bookmarks_and_eventual_reads_skip_them(beco):
+    driver = _FakeDriver(rows=[])
+    graph = GraphAccess(driver)
+
+    await graph.write("CREATE (n)")
+    await graph.read("MATCH (n) RETURN n", consistency=CAUSAL)
+    await graph.read("MATCH (n) RETURN count(n)", consistency=EVENTUAL)
+
+    (_, write_cfg, _), (_, causal_cfg, _), (_, eventual_cfg, _) = driver.calls
+    assert write_cfg["default_access_mode"] == WRITE
+    # Mesmo bookmark manager: a leitura causal espera a escrita chegar à réplica
+    assert causal_cfg["bookmark_manager"] is write_cfg["bookmark_manager"]
+    assert eventual_cfg["default_access_mode"] == READ
+    assert "bookmark_manager" not in eventual_cfg
+
+
+def test_tenant_aware_driver_annotated_sessions():
+    base = _FakeDriver()
+    driver = TenantAwareDriver(base, db="beco")
+
+    assert driver.read_session(EVENTUAL).config == {"database": "beco", "default_access_mode": READ}
+    assert driver.write_session().config["bookmark_manager"] is bookmark_manager()
+    assert driver.read_session(CAUSAL, database="santos").config["database"] == "santos"
+    with pytest.raises(ValueError):
+        driver.session(WRITE, EVENTUAL)
+
+
+@pytest.mark.asyncio
+async def test_client_deadline_covers_transaction_and_retries():
+    class _HangingDriver(_FakeDriver):
+        def session(self, **config):
+            session = _FakeSession(self, config)
+
+            async def _hang(work):
+                await asyncio.sleep(10)
+
+            session.execute_read = _hang
+            return session
+
+    graph = GraphAccess(_HangingDriver(), timeout=0.05, max_retry_time=0.05)
+    with pytest.raises(TimeoutError):
+        await graph.read("RETURN 1")
+
+
+@pytest.mark.asyncio
+async def test_loop_blocking_detector_catches_sync_io(loop_blocking):
+    async def _blocking():
+        time.sleep(BLOCKING_BUDGET_MS * 2 / 1000)
+
+    await _blocking()
+    await asyncio.sleep(0)
+    assert loop_blocking(), "detector deveria acusar time.sleep no event loop"
+
+
+@pytest.mark.asyncio
+async def test_migrated_hot_paths_do_not_block_event_loop(loop_blocking, beco):
+    row = {
+        "missing": [], "d": True, "matched_count": 0, "pipeline": "ingest", "dependency": "gemini",
+        "id": "n1", "amount": 10.0, "day": 20000, "currency": "CHF", "i": "n1", "t": "n1",
+    }
+    driver = _FakeDriver(rows=[row])
+    ontology = SimpleNamespace(graph=GraphAccess(driver))
+
+    await ReconciliationEngine(ontology).run_matching_cycle()
+    assert [r async for r in CresusExporter(ontology)._stream_reconciled_graph("BECO")] == [row]
+    await CresusExporter(ontology)._mark_exported(["e1"], "BECO")
+
+    with patch("src.v3.meta_cognition.get_shared_driver", return_value=driver):
+        manager = MenirOntologyManager()
+        assert await manager.check_system_health() is False
+
+    manager.write_behind = WriteBehindBuffer(graph=ontology.graph, spill_path="")
+    await DocumentDispatcher(intel=None, ontology_manager=manager)._quarantine("BECO", "f" * 64, "Facture", "LOW_CONFIDENCE")
+    # Quarentena é gravada na hora, fora do write-behind
+    assert await manager.write_behind.flush() == 0
+    assert any("MERGE (d:Document:`BECO`" in q[0] for q in driver.queries)
+
+    orchestrator = NodePersistenceOrchestrator()
+    document = Document(uid="d1", project="BECO", sha256="a" * 64, name="f.pdf")
+    assert await ontology.graph.transaction(lambda tx: orchestrator.persist(document, tx)) == "d1"
+
+    await asyncio.sleep(0)
+    assert driver.calls, "nenhuma transação gerenciada foi aberta"
+    assert not loop_blocking(), f"event loop bloqueado > {BLOCKING_BUDGET_MS}ms: {loop_blocking()}"
+
+
+def test_keyset_query_expands_lexicographic_predicate():
+    query = keyset_query(
+        "MATCH (d:Document) WHERE d.status = $s AND {keyset} RETURN d.ingested_at AS at, d.uid AS uid",
+        [("at", "d.ingested_at"), ("uid", "d.uid")],
+    )
+    assert (
+        "d.ingested_at IS NOT NULL AND d.uid IS NOT NULL AND "
+        "($_after IS NULL OR (d.ingested_at > $_after[0]) OR (d.ingested_at = $_after[0] AND d.uid > $_after[1]))"
+    ) in query
+    assert query.endswith("ORDER BY at, uid\nLIMIT $_page_size")
+    with pytest.raises(ValueError):
+        keyset_query("MATCH (d) RETURN d.uid AS uid", [("uid", "d.uid")])
+
+
+@pytest.mark.asyncio
+async def test_paginate_reads_short_pages_and_resumes_from_cursor(beco):
+    pages = [[{"uid": "a"}, {"uid": "b"}], [{"uid": "c"}]]
+
+    class _PagedGraph(GraphAccess):
+        async def read(self, query, params=None, **options):
+            self.seen.append(params["_after"])
+            return pages[len(self.seen) - 1]
+
+    graph = _PagedGraph(_FakeDriver())
+    graph.seen = []
+    cursor = graph.paginate("MATCH (q) WHERE {keyset} RETURN q.uid AS uid", keyset=[("uid", "q.uid")], page_size=2)
+
+    assert [row["uid"] async for row in cursor] == ["a", "b", "c"]
+    assert graph.seen == [None, ["b"]]
+    assert cursor.after == ("c",) and cursor.pages == 2
+
+    graph.seen = []
+    pages = [[{"uid": "c"}]]
+    resumed = graph.paginate("MATCH (q) WHERE {keyset} RETURN q.uid AS uid", keyset=[("uid", "q.uid")], after=["b"])
+    assert [row["uid"] async for row in resumed] == ["c"]
+    assert graph.seen == [["b"]]
+
+
+@pytest.mark.asyncio
+async def test_stream_pulls_in_fetch_size_batches_and_closes_on_early_exit(beco):
+    driver = _FakeDriver(rows=[{"n": i} for i in range(5)])
+    graph = GraphAccess(driver, timeout=7)
+
+    async with aclosing(graph.stream("MATCH (n) RETURN n", fetch_size=2, consistency=EVENTUAL)) as rows:
+        async for row in rows:
+            if row["n"] == 1:
+                break
+
+    kind, config, timeout = driver.calls[0]
+    assert kind == "stream" and timeout == 7
+    assert config["fetch_size"] == 2 and config["default_access_mode"] == READ
+    assert driver.open_tx.closed
+
+
+@pytest.mark.asyncio
+async def test_cresus_export_streams_to_file_and_marks_only_after_success(tmp_path, beco):
+    rows = [
+        {"issue_date": "2026-01-05", "total_amount": 10.0, "line_items_json": None,
+         "vendor_name": "Acme", "cresus_account_id": "4000", "edge_id": f"e{i}"}
+        for i in range(3)
+    ]
+    driver = _FakeDriver(rows=rows)
+    exporter = CresusExporter(SimpleNamespace(graph=GraphAccess(driver)))
+
+    path = await exporter.export_reconciled("BECO", export_dir=str(tmp_path))
+    with open(path, encoding="utf-8", newline="") as f:
+        lines = f.read().split("\r\n")
+    assert len(lines) == 4 and lines[0].startswith("05.01.2026\t1020\t4000\tAcme")
+    assert driver.queries[-1][1]["edge_ids"] == ["e0", "e1", "e2"]
+
+    class _Broken(_FakeResult):
+        async def __aiter__(self):
+            yield SimpleNamespace(data=lambda: dict(rows[0]))
+            raise ConnectionError("stream cortado")
+
+    driver.queries.clear()
+    with patch.object(_FakeTx, "run", new=lambda self, q, p=None, **kw: _async_value(_Broken([]))):
+        assert await exporter.export_reconciled("BECO", export_dir=str(tmp_path / "broken")) is None
+    assert list((tmp_path / "broken").iterdir()) == []
+    assert driver.queries == []
+
+
+async def _async_value(value):
+    return value
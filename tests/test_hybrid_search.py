@@ -0,0 +1,159 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.v3.core.schemas.identity import TenantContext
+from src.v3 import menir_bridge
+from src.v3.menir_bridge import MenirBridge, escape_lucene, reciprocal_rank_fusion
+
+
+def _bridge():
+    # Sem driver: as pernas lexical/vector são substituídas por mocks
+    return MenirBridge.__new__(MenirBridge)
+
+
+def test_escape_lucene_keeps_identifiers_literal():
+    assert escape_lucene(" CHE-123.456.789 ") == "CHE\\-123.456.789"
+    assert escape_lucene('a+b "c" (d)') == 'a\\+b \\"c\\" \\(d\\)'
+
+
+def test_rrf_rewards_items_ranked_by_both_sides():
+    lexical = [{"uid": "iban", "text": "CH93", "score": 9.1}, {"uid": "both", "text": "x", "score": 4.0}]
+    vector = [{"uid": "sem", "text": "y", "score": 0.93}, {"uid": "both", "text": "x", "score": 0.91}]
+    fused = reciprocal_rank_fusion({"lexical": lexical, "vector": vector}, k=60)
+
+    assert fused[0]["uid"] == "both"
+    assert fused[0]["lexical_score"] == 4.0 and fused[0]["vector_score"] == 0.91
+    iban = next(h for h in fused if h["uid"] == "iban")
+    assert iban["vector_score"] is None and iban["lexical_rank"] == 1
+    assert iban["rrf_score"] == pytest.approx(1 / 61)
+
+
+def test_hybrid_search_runs_legs_concurrently():
+    bridge = _bridge()
+    started = []
+
+    async def lexical(q, limit):
+        started.append("lexical")
+        await asyncio.sleep(0.05)
+        assert "vector" in started  # a outra perna já começou
+        return [{"uid": "inv-42", "text": "Facture 42", "score": 7.0}]
+
+    async def vector(emb, limit, min_score):
+        started.append("vector")
+        await asyncio.sleep(0.05)
+        return [{"uid": "c1", "text": "chunk", "score": 0.88}, {"uid": "inv-42", "text": "Facture 42", "score": 0.8}]
+
+    bridge.lexical_search = lexical
+    bridge.vector_search = vector
+    hits = asyncio.run(bridge.hybrid_search("facture 42", embedding=[0.1] * 4, limit=2))
+    assert [h["uid"] for h in hits] == ["inv-42", "c1"]
+    assert hits[0]["lexical_score"] == 7.0 and hits[0]["vector_score"] == 0.8
+
+
+def test_hybrid_search_survives_one_failed_leg():
+    bridge = _bridge()
+    bridge.lexical_search = AsyncMock(return_value=[{"uid": "a", "text": "A", "score": 1.0}])
+    bridge.vector_search = AsyncMock(side_effect=RuntimeError("index offline"))
+    hits = asyncio.run(bridge.hybrid_search("a", embedding=[0.1], limit=5))
+    assert [h["uid"] for h in hits] == ["a"]
+
+
+def test_lexical_search_requires_tenant():
+    bridge = _bridge()
+    token = TenantContext.set(None)
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(bridge.lexical_search("x"))
+    finally:
+        TenantContext.reset(token)
+
+
+def _windowed_bridge(pages):
+    """Bridge cujo driver devolve uma linha {scanned, exhausted, hits} por janela de candidatos."""
+    bridge = _bridge()
+    session = MagicMock()
+    windows = []
+
+    async def _run(query, **params):
+        windows.append(params["candidates"])
+        result = MagicMock()
+        result.single = AsyncMock(return_value=pages.pop(0))
+        return result
+
+    session.run = AsyncMock(side_effect=_run)
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+    bridge.driver = MagicMock()
+    bridge.driver.read_session.return_value = session
+    return bridge, session, windows
+
+
+def _hits(n, tenant_prefix="b"):
+    return [{"uid": f"{tenant_prefix}{i}", "text": "t", "score": 1.0 / (i + 1)} for i in range(n)]
+
+
+def test_lexical_search_widens_the_window_until_the_tenant_fills_the_page():
+    # Tenant pequeno: a primeira janela (4 x limit) só tem 1 hit dele
+    bridge, session, windows = _windowed_bridge([
+        {"scanned": 20, "exhausted": False, "hits": _hits(1)},
+        {"scanned": 80, "exhausted": False, "hits": _hits(5)},
+    ])
+    token = TenantContext.set("BECO")
+    try:
+        hits = asyncio.run(bridge.lexical_search("facture", limit=5))
+    finally:
+        TenantContext.reset(token)
+
+    assert windows == [20, 80] and len(hits) == 5
+    query = session.run.call_args.args[0]
+    assert "{limit: $candidates}" in query and "'BECO' IN labels(h.node)" in query
+
+
+def test_search_window_stops_when_the_index_runs_out(monkeypatch):
+    monkeypatch.setattr(menir_bridge, "SEARCH_MAX_CANDIDATES", 100)
+    bridge, _, windows = _windowed_bridge([
+        {"scanned": 20, "exhausted": False, "hits": _hits(1)},
+        {"scanned": 37, "exhausted": False, "hits": _hits(2)},  # índice acabou antes da janela
+    ])
+    token = TenantContext.set("BECO")
+    try:
+        assert len(asyncio.run(bridge.lexical_search("x", limit=5))) == 2
+    finally:
+        TenantContext.reset(token)
+    assert windows == [20, 80]
+
+    bridge, _, windows = _windowed_bridge([
+        {"scanned": 20, "exhausted": False, "hits": []},
+        {"scanned": 80, "exhausted": False, "hits": []},
+        {"scanned": 100, "exhausted": False, "hits": _hits(1)},
+    ])
+    token = TenantContext.set("BECO")
+    try:
+        asyncio.run(bridge.lexical_search("x", limit=5))
+    finally:
+        TenantContext.reset(token)
+    assert windows == [20, 80, 100]  # teto SEARCH_MAX_CANDIDATES
+
+
+def test_vector_search_stops_widening_below_min_score(monkeypatch):
+    monkeypatch.setenv("MENIR_EMBEDDING_QUANTIZATION", "float")
+    bridge, session, windows = _windowed_bridge([{"scanned": 20, "exhausted": True, "hits": _hits(1)}])
+    token = TenantContext.set("BECO")
+    try:
+        hits = asyncio.run(bridge.vector_search([0.1] * 4, limit=5, min_score=0.7))
+    finally:
+        TenantContext.reset(token)
+    assert windows == [20] and hits == _hits(1)
+    assert session.run.call_args.kwargs["min_score"] == 0.7
+
+
+def test_webmcp_gateway_exposes_search_memory_to_tenants_only():
+    from src.v3.mcp_server import MenirMCPServer
+
+    gateway = MenirMCPServer(runner=None)
+    for tenant in ("BECO", "SANTOS"):
+        tools = {t["name"]: t for t in asyncio.run(gateway.get_allowed_tools(tenant))}
+        assert tools["search_memory"]["inputSchema"]["required"] == ["query"]
+    assert "search_memory" not in [t["name"] for t in asyncio.run(gateway.get_allowed_tools("GUEST"))]
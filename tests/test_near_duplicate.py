@@ -0,0 +1,138 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.v3.core.near_duplicate import (
+    MinHashLSHIndex,
+    NearDuplicateFilter,
+    _optimal_bands,
+    normalize_text,
+)
+
+NOTE = "Lembrete: ligar para o contador amanhã às 10h sobre a declaração de TVA do trimestre"
+
+
+@pytest.fixture(autouse=True)
+def _clean_filter():
+    NearDuplicateFilter.reset()
+    yield
+    NearDuplicateFilter.reset()
+
+
+def test_normalize_strips_case_accents_punctuation_and_forward_prefix():
+    assert normalize_text("Fwd:  Ligar  p/ o CONTADOR às 10h!") == "ligar p o contador as 10h"
+
+
+def test_exact_and_near_duplicates_are_detected():
+    index = MinHashLSHIndex(threshold=0.85)
+    index.add("c1", NOTE, payload=["uid-1"])
+
+    exact = index.query("FWD: " + NOTE.upper())
+    assert exact.exact and exact.key == "c1" and exact.payload == ["uid-1"]
+
+    near = index.query(NOTE.replace("10h", "11h"))
+    assert near is not None and not near.exact and near.jaccard >= 0.85
+
+    assert index.query("Comprar pão e leite no mercado") is None
+
+
+def test_bands_follow_threshold():
+    b_low, r_low = _optimal_bands(0.5, 128)
+    b_high, r_high = _optimal_bands(0.9, 128)
+    assert r_high > r_low and b_low * r_low <= 128
+
+
+def test_index_is_bounded_lru():
+    index = MinHashLSHIndex(threshold=0.85, max_entries=2)
+    index.add("a", "primeira nota bem diferente")
+    index.add("b", "segunda anotação sobre outro assunto")
+    index.add("c", "terceira mensagem sem relação alguma")
+    assert len(index) == 2
+    assert index.query("primeira nota bem diferente") is None
+
+
+def test_filter_metrics_and_tenant_isolation(monkeypatch):
+    monkeypatch.setenv("MENIR_DEDUP_JACCARD_THRESHOLD", "0.8")
+    NearDuplicateFilter.remember("SANTOS", "capture", "k1", NOTE, payload=["u1"])
+
+    assert NearDuplicateFilter.check("BECO", "capture", NOTE) is None
+    assert NearDuplicateFilter.check("SANTOS", "lead", NOTE) is None
+    assert NearDuplicateFilter.check("SANTOS", "capture", NOTE).exact
+    assert NearDuplicateFilter.check("SANTOS", "capture", NOTE + " urgente") is not None
+
+    m = NearDuplicateFilter.metrics()
+    assert m["jaccard_threshold"] == 0.8
+    assert (m["checks"], m["exact_hits"], m["near_hits"], m["misses"]) == (4, 1, 1, 2)
+    assert m["hits_by_tenant"] == {"SANTOS": 2}
+    assert m["indexed"]["SANTOS:capture"] == 1
+
+
+@pytest.mark.asyncio
+async def test_capture_duplicate_skips_llm():
+    from src.v3.skills.menir_capture import MenirCapture
+
+    intel = MagicMock()
+    with patch.object(MenirCapture, "_ensure_vector_indexes"):
+        capture = MenirCapture(intel=intel, orchestrator=MagicMock())
+    capture._link_duplicate_capture = AsyncMock()
+    NearDuplicateFilter.remember("SANTOS", "capture", "k1", NOTE, payload=["u1", "u2"])
+
+    res = await capture.ingest("Fwd: " + NOTE, current_tenant="SANTOS")
+
+    assert res["success"] and res["duplicate_of"] == ["u1", "u2"] and res["jaccard"] == 1.0
+    intel.client.models.generate_content.assert_not_called()
+    capture._link_duplicate_capture.assert_awaited_once_with(["u1", "u2"], "SANTOS")
+
+
+@pytest.mark.asyncio
+async def test_lead_duplicate_links_existing_lead():
+    from src.v3.core.schemas.identity import locked_tenant_context
+    from src.v3.skills.lead_skill import LeadInput, LeadSkill
+
+    NearDuplicateFilter.remember("BECO", "lead:maria silva", "lead_abc", "quer orçamento de contabilidade")
+    skill = LeadSkill()
+    skill._link_duplicate = AsyncMock(return_value="linked")
+    lead = LeadInput(name="Maria  Silva", source="instagram", intent_signal="Quer orçamento de contabilidade!")
+    with locked_tenant_context("BECO"):
+        assert await skill.create_lead(lead) == "linked"
+    skill._link_duplicate.assert_awaited_once()
+    assert skill._link_duplicate.call_args.args[0] == "lead_abc"
+    assert skill._link_duplicate.call_args.args[3] is lead
+
+
+@pytest.mark.asyncio
+async def test_lead_with_another_name_and_same_intent_is_a_new_lead():
+    from src.v3.core.schemas.identity import locked_tenant_context
+    from src.v3.skills.lead_skill import LeadInput, LeadSkill
+
+    intent = "quer orçamento para festa de casamento em junho"
+    NearDuplicateFilter.remember("BECO", "lead:maria souza", "lead_maria", intent)
+    skill = LeadSkill()
+    skill._link_duplicate = AsyncMock()
+    graph = MagicMock()
+    graph.write_one = AsyncMock(return_value={"id": "new"})
+    lead = LeadInput(name="Ana Souza", source="evento_thais", intent_signal=intent, event_id="ev1")
+    with locked_tenant_context("BECO"), \
+         patch("src.v3.skills.lead_skill.get_graph", return_value=graph), \
+         patch("src.v3.skills.lead_skill.EmbeddingService.embed_and_persist", AsyncMock()):
+        result = await skill.create_lead(lead)
+
+    skill._link_duplicate.assert_not_awaited()
+    assert result.success and result.data["lead_id"] != "lead_maria"
+    assert graph.write_one.await_args.args[1]["event_id"] == "ev1"
+
+
+@pytest.mark.asyncio
+async def test_linked_duplicate_keeps_event_and_referrer():
+    from src.v3.skills.lead_skill import LeadInput, LeadSkill
+
+    graph = MagicMock()
+    graph.write = AsyncMock(return_value=[])
+    lead = LeadInput(name="Maria Silva", source="indicacao", intent_signal="x", event_id="ev2", referred_by="lead_ref")
+    with patch("src.v3.skills.lead_skill.get_graph", return_value=graph):
+        result = await LeadSkill()._link_duplicate("lead_abc", 0.9, "BECO", lead)
+
+    query, params = graph.write.await_args.args
+    assert result.data["duplicate"] is True
+    assert "GENERATED_LEAD" in query and "REFERRED" in query
+    assert params == {"lead_id": "lead_abc", "event_id": "ev2", "referred_by": "lead_ref"}
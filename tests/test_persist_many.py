@@ -0,0 +1,107 @@
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.v3.core.persistence import NodePersistenceOrchestrator, OrphanNodeError
+from src.v3.core.schemas.base import Document
+from src.v3.core.schemas.financial import InvoiceData, InvoiceLineItem
+from src.v3.core.schemas.identity import TenantContext
+from src.v3.core.schemas.operational import ClientNode
+from src.v3.core.schemas.personal import PersonNode
+
+
+@pytest.fixture
+def tx():
+    tx = MagicMock()
+    tx.run.return_value.single.return_value = {"missing": []}
+    return tx
+
+
+@pytest.fixture(autouse=True)
+def _tenant():
+    token = TenantContext.set("BECO")
+    yield
+    TenantContext.reset(token)
+
+
+def _doc(uid="doc-1"):
+    return Document(uid=uid, project="BECO", sha256="a" * 64, name="f.pdf")
+
+
+def _client(i, origin="doc-1"):
+    return ClientNode(uid=f"c{i}", project="BECO", source_document_uid=origin, client_type="PJ", name=f"Client {i}")
+
+
+def _queries(tx):
+    return [c.args[0] for c in tx.run.call_args_list]
+
+
+@pytest.mark.asyncio
+async def test_one_unwind_per_type_plus_one_governance(tx):
+    nodes = [_client(1), _client(2), PersonNode(uid="p1", project="BECO", name="Ana"), _doc(), _client(3)]
+    uids = await NodePersistenceOrchestrator().persist_many(nodes, tx)
+
+    assert uids == ["c1", "c2", "p1", "doc-1", "c3"]
+    queries = _queries(tx)
+    # Document do lote satisfaz a origem: nenhuma verificação de existência
+    assert len(queries) == 4
+    assert ":Document:`BECO`" in queries[0]  # Documents primeiro (alvo de DERIVED_FROM)
+    client_call = next(c for c in tx.run.call_args_list if ":ClientNode:" in c.args[0])
+    assert [r["uid"] for r in client_call.kwargs["rows"]] == ["c1", "c2", "c3"]
+    governance = tx.run.call_args_list[-1]
+    assert "BELONGS_TO_TENANT" in governance.args[0] and "DERIVED_FROM" in governance.args[0]
+    origins = {r["uid"]: r["origin_uid"] for r in governance.kwargs["rows"]}
+    assert origins == {"c1": "doc-1", "c2": "doc-1", "p1": None, "doc-1": None, "c3": "doc-1"}
+    assert all(not q.strip().endswith("row") for q in queries)
+
+
+@pytest.mark.asyncio
+async def test_statements_are_chunked_by_batch_size(tx):
+    people = [PersonNode(uid=f"p{i}", project="BECO", name=f"P{i}") for i in range(5)]
+    await NodePersistenceOrchestrator(batch_size=2).persist_many(people, tx)
+    sizes = [len(c.kwargs["rows"]) for c in tx.run.call_args_list]
+    assert sizes == [2, 2, 1, 2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_missing_external_origin_is_orphan(tx):
+    tx.run.return_value.single.return_value = {"missing": ["doc-x"]}
+    with pytest.raises(OrphanNodeError):
+        await NodePersistenceOrchestrator().persist_many([_client(1, origin="doc-x")], tx)
+    assert len(tx.run.call_args_list) == 1  # nada é escrito
+
+
+@pytest.mark.asyncio
+async def test_virtual_persons_grouped_by_referenced_tenant(tx):
+    nodes = [
+        PersonNode(uid="v1", project="BECO", name="Ana", is_virtual=True, referenced_tenant="SANTOS", referenced_uid="s1"),
+        PersonNode(uid="p2", project="BECO", name="Rui"),
+    ]
+    await NodePersistenceOrchestrator().persist_many(nodes, tx)
+    virtual_q = next(q for q in _queries(tx) if "REFERENCED_FROM" in q)
+    assert "PersonNode:`SANTOS`" in virtual_q
+
+
+@pytest.mark.asyncio
+async def test_invoice_line_items_in_same_statement(tx):
+    invoice = InvoiceData(
+        uid="inv-1", project="BECO", source_document_uid="doc-1", vendor_name="Swisscom",
+        doc_type="Facture QR", language="fr", currency="CHF", issue_date="2024-09-01",
+        subtotal=100.0, total_amount=100.0, extraction_path="QR_DECODE",
+        extraction_confidence=Decimal("1.0"),
+        items=[InvoiceLineItem(description="Abo", gross_amount=100.0)],
+    )
+    await NodePersistenceOrchestrator().persist_many([_doc(), invoice], tx)
+    inv_call = next(c for c in tx.run.call_args_list if ":Invoice:" in c.args[0])
+    assert "FOREACH (item IN row.items" in inv_call.args[0]
+    assert inv_call.kwargs["rows"][0]["items"][0]["description"] == "Abo"
+    gov = tx.run.call_args_list[-1].kwargs["rows"]
+    assert next(r for r in gov if r["uid"] == "inv-1")["ext_conf"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_unknown_type_rejected(tx):
+    from src.v3.core.schemas.base import BaseNode
+    with pytest.raises(ValueError):
+        await NodePersistenceOrchestrator().persist_many([BaseNode(uid="x", project="BECO")], tx)
@@ -0,0 +1,171 @@
+import re
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.v3.core.persistence import NodePersistenceOrchestrator
+from src.v3.core.persistence_registry import _REGISTRY, register_node, resolve_spec
+from src.v3.core.schemas.base import BaseNode, Document, QuarantineItem
+from src.v3.core.schemas.financial import InvoiceData, InvoiceLineItem
+from src.v3.core.schemas.identity import TenantContext
+from src.v3.core.schemas.personal import PersonNode
+from src.v3.core.schemas.santos import DecisionHubEntry, SignalInput
+
+
+@pytest.fixture
+def tx():
+    tx = MagicMock()
+    tx.run.return_value.single.return_value = {"missing": [], "d": True}
+    return tx
+
+
+@pytest.fixture(autouse=True)
+def _tenant():
+    token = TenantContext.set("BECO")
+    yield
+    TenantContext.reset(token)
+
+
+@pytest.fixture
+def quarantine_registered():
+    register_node(QuarantineItem)
+    yield
+    _REGISTRY.pop(QuarantineItem, None)
+
+
+def _assignments(q: str) -> dict[str, str]:
+    """n.prop = expr do SET principal (forma simples ou UNWIND)."""
+    set_clause = q.split("SET", 1)[1].split("WITH", 1)[0]
+    return {m.group(1): m.group(2).strip() for m in re.finditer(r"n\.(\w+) = ([^,\n]+)", set_clause)}
+
+
+def _signal():
+    return SignalInput(
+        uid="sig-1", project="BECO", signal_type="fatigue", weight=Decimal("0.85"),
+        origin_tenant_hash="h", created_at=datetime(2025, 1, 1, 12, 0),
+    )
+
+
+@pytest.mark.asyncio
+async def test_document_mapping_matches_historic_graph(tx):
+    await NodePersistenceOrchestrator().persist(Document(uid="d1", project="BECO", sha256="a" * 64, name="f.pdf"), tx)
+    call = tx.run.call_args_list[0]
+    assert "MERGE (n:Document:`BECO` {uid: $uid})" in call.args[0]
+    assert _assignments(call.args[0]) == {
+        "file_hash": "$file_hash", "name": "$name", "source": "$source", "status": "$status", "project": "$project",
+    }
+    assert call.kwargs["file_hash"] == "a" * 64
+    assert call.kwargs["status"] == "pending"
+    assert call.kwargs["project"] == "BECO"
+
+
+@pytest.mark.asyncio
+async def test_signal_conversions_and_datetime(tx):
+    await NodePersistenceOrchestrator().persist(_signal(), tx)
+    call = tx.run.call_args_list[0]
+    assigned = _assignments(call.args[0])
+    assert assigned["created_at"] == "datetime($created_at)"
+    assert call.kwargs["weight"] == 0.85 and isinstance(call.kwargs["weight"], float)
+    assert call.kwargs["created_at"] == "2025-01-01T12:00:00"
+
+
+def test_single_and_batched_forms_share_the_mapping():
+    spec = resolve_spec(_signal())
+    single = _assignments(spec.statement("BECO", batched=False))
+    batched = _assignments(spec.statement("BECO", batched=True))
+    assert {k: v.replace("$", "row.") for k, v in single.items()} == batched
+    assert spec.statement("BECO", batched=True).startswith("UNWIND $rows AS row")
+
+
+def test_literal_props_take_no_parameter():
+    spec = resolve_spec(DecisionHubEntry(uid="hub", project="BECO"))
+    assert _assignments(spec.statement("BECO", batched=False)) == {"last_update": "datetime()"}
+    assert spec.params(DecisionHubEntry(uid="hub", project="BECO")) == {"uid": "hub"}
+
+
+def test_statements_are_compiled_once_per_tenant_and_form():
+    spec = resolve_spec(_signal())
+    assert spec.statement("BECO", batched=True) is spec.statement("BECO", batched=True)
+    assert "`SANTOS`" in spec.statement("SANTOS", batched=True)
+
+
+@pytest.mark.asyncio
+async def test_invoice_single_node_is_one_statement_with_items_and_vendor(tx):
+    invoice = InvoiceData(
+        uid="inv-1", project="BECO", source_document_uid="doc-1", vendor_name="Swisscom",
+        doc_type="Facture QR", language="fr", currency="CHF", issue_date="2024-09-01",
+        subtotal=100.0, total_amount=100.0, tip_or_unregulated_amount=5.0,
+        extraction_path="QR_DECODE", extraction_confidence=Decimal("1.0"),
+        items=[InvoiceLineItem(description="Abo", gross_amount=100.0)],
+    )
+    await NodePersistenceOrchestrator().persist(invoice, tx)
+    call = next(c for c in tx.run.call_args_list if ":Invoice:" in c.args[0])
+    q = call.args[0]
+    assert "FOREACH (item IN $items" in q and "invoice_uid: $uid" in q
+    assert q.rstrip().endswith("MERGE (v)-[:ISSUED_BY]->(n)")
+    assert call.kwargs["tips"] == 5.0
+    assert call.kwargs["items"][0]["description"] == "Abo"
+
+
+@pytest.mark.asyncio
+async def test_virtual_person_variant_targets_referenced_tenant(tx):
+    person = PersonNode(uid="v1", project="BECO", name="Ana", is_virtual=True, referenced_tenant="SANTOS", referenced_uid="s1")
+    await NodePersistenceOrchestrator().persist(person, tx)
+    q = tx.run.call_args_list[0].args[0]
+    assert "n.is_virtual = true" in q
+    assert "MERGE (ref:PersonNode:`SANTOS` {uid: $referenced_uid})" in q
+    assert "role_or_context" not in q
+
+
+@pytest.mark.asyncio
+async def test_plugged_type_persists_without_orchestrator_changes(tx, quarantine_registered):
+    item = QuarantineItem(
+        uid="q1", project="BECO", name="x.pdf", file_hash="f" * 64, reason="baixa confiança",
+        quarantined_at="2025-01-01T00:00:00", confidence=0.3,
+    )
+    orchestrator = NodePersistenceOrchestrator()
+    assert await orchestrator.persist(item, tx) == "q1"
+    q = tx.run.call_args_list[0].args[0]
+    assert "MERGE (n:QuarantineItem:`BECO` {uid: $uid})" in q
+    assert tx.run.call_args_list[0].kwargs["reason"] == "baixa confiança"
+
+    tx.run.reset_mock()
+    await orchestrator.persist_many([item, item.model_copy(update={"uid": "q2"})], tx)
+    rows = tx.run.call_args_list[0].kwargs["rows"]
+    assert [r["uid"] for r in rows] == ["q1", "q2"]
+
+
+@pytest.mark.asyncio
+async def test_unregistered_type_rejected_by_persist(tx):
+    with pytest.raises(ValueError, match="não sabe persistir"):
+        await NodePersistenceOrchestrator().persist(BaseNode(uid="x", project="BECO"), tx)
+    tx.run.assert_not_called()
+
+
+# SET de cada ramo do antigo isinstance-chain em _merge_node (grafo histórico)
+_LEGACY_SETS = {
+    "ClientNode": "name client_type ide_number address project",
+    "EmployeeNode": "full_name avs_number role hiring_date project",
+    "TaxDossierNode": "year tax_authority status project",
+    "InsuranceNode": "policy_number provider_name insurance_type project",
+    "SalarySlipNode": "period gross_salary net_salary avs_deduction lpp_deduction project",
+    "TVADeclarationNode": "period total_sales tva_collected tva_deductible amount_due project",
+    "Invoice": "vendor_name doc_type ide_number avs_number language vendor_iban payment_reference currency issue_date subtotal tips total_amount requires_justification project",
+    "PersonNode": "name role_or_context trust_score",
+    "ProjectNode": "name description status",
+    "LifeEventNode": "title date impact_level",
+    "Insight": "content tags initial_score decay_lambda created_at",
+    "Signal": "signal_type weight description origin_tenant_hash initial_score decay_lambda created_at",
+    "GoalNode": "title deadline status",
+}
+
+
+@pytest.mark.parametrize("label", sorted(_LEGACY_SETS))
+def test_native_mappings_match_legacy_properties(label):
+    spec = next(s for s in _REGISTRY.values() if s.label == label)
+    q = spec.statement("BECO", batched=False)
+    assert f"MERGE (n:{label}:`BECO` {{uid: $uid}})" in q
+    assert sorted(_assignments(q)) == sorted(_LEGACY_SETS[label].split())
+    assert spec.provenance == (label not in {"PersonNode", "ProjectNode", "LifeEventNode", "Insight", "Signal", "GoalNode"})
@@ -0,0 +1,138 @@
+import gc
+from unittest.mock import MagicMock, patch
+
+import pytest
+from neo4j import unit_of_work
+
+from src.v3.core import neo4j_pool
+from src.v3.core.graph_access import GraphAccess
+from src.v3.core.pool_metrics import Histogram, InstrumentedDriver, PoolMetrics
+
+
+class _FakeSession:
+    """AsyncSession mínima: execute_* reexecuta a função `retries` vezes, como o driver faz."""
+
+    def __init__(self, retries=0):
+        self.retries = retries
+        self.closed = False
+        self.seen_timeout = None
+
+    async def _connect(self, access_mode, **kwargs):
+        return None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        self.closed = True
+
+    async def _run(self, work):
+        self.seen_timeout = getattr(work, "timeout", None)
+        for _ in range(self.retries):
+            await self._connect("READ")
+            await work(MagicMock())
+        await self._connect("READ")
+        return await work(MagicMock())
+
+    async def execute_read(self, work, *args, **kwargs):
+        return await self._run(work)
+
+    async def execute_write(self, work, *args, **kwargs):
+        return await self._run(work)
+
+
+def _driver(retries=0):
+    base = MagicMock()
+    base.session.side_effect = lambda **kw: _FakeSession(retries)
+    metrics = PoolMetrics(leak_warn_s=60)
+    return InstrumentedDriver(base, metrics), metrics
+
+
+def test_histogram_quantiles_use_bucket_bounds():
+    hist = Histogram()
+    for ms in [0.5] * 90 + [40] * 9 + [70_000]:
+        hist.observe(ms)
+    snap = hist.snapshot()
+    assert snap["count"] == 100
+    assert snap["p50_ms"] == 1.0
+    assert snap["p95_ms"] == 50.0
+    assert snap["p99_ms"] == 50.0
+    assert hist.quantile(1.0) == snap["max_ms"] == 70_000
+    assert snap["buckets"] == {"le_1": 90, "le_50": 9, "le_inf": 1}
+
+
+@pytest.mark.asyncio
+async def test_session_lifetime_wait_and_retries_are_recorded_per_call_site():
+    driver, metrics = _driver(retries=2)
+
+    @unit_of_work(timeout=5)
+    async def _work(tx):
+        return "ok"
+
+    async with driver.session(database="neo4j") as session:
+        assert await session.execute_write(_work) == "ok"
+        assert session._session.seen_timeout == 5  # metadata de @unit_of_work preservada
+
+    snap = metrics.snapshot()
+    site = next(iter(snap["session_lifetime_by_call_site"]))
+    assert site.endswith(":test_session_lifetime_wait_and_retries_are_recorded_per_call_site")
+    assert snap["transactions"] == {site: 1}
+    assert snap["tx_retries"] == {site: 2}
+    assert snap["acquisition_wait"]["count"] == 3
+    assert snap["open_sessions"] == 0
+
+
+@pytest.mark.asyncio
+async def test_graph_access_sessions_are_attributed_to_the_caller():
+    driver, metrics = _driver()
+    graph = GraphAccess(driver=driver)
+
+    async def load_vendors():
+        return await graph.transaction(lambda tx: _noop(), write=False, database="neo4j")
+
+    await load_vendors()
+    assert list(metrics.snapshot()["session_lifetime_by_call_site"]) == [
+        f"{__name__}:load_vendors"
+    ]
+
+
+async def _noop():
+    return None
+
+
+def test_unclosed_sessions_are_reported_open_then_leaked(caplog):
+    driver, metrics = _driver()
+    metrics.leak_warn_s = -1
+
+    session = driver.session()
+    snap = metrics.snapshot()
+    assert snap["open_sessions"] == 1
+    assert "abertas há" in caplog.text
+
+    del session
+    gc.collect()
+    snap = metrics.snapshot()
+    assert snap["open_sessions"] == 0
+    assert sum(snap["leaked_sessions"].values()) == 1
+
+
+def test_pool_settings_come_from_env(monkeypatch):
+    monkeypatch.setattr(neo4j_pool.Neo4jPoolManager, "_instance", None)
+    monkeypatch.setenv("NEO4J_PASSWORD", "x")
+    monkeypatch.setenv("NEO4J_MAX_CONNECTION_POOL_SIZE", "120")
+    monkeypatch.setenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "5")
+    monkeypatch.setenv("NEO4J_MAX_CONNECTION_LIFETIME", "900")
+    monkeypatch.delenv("MENIR_NEO4J_METRICS", raising=False)
+
+    with patch.object(neo4j_pool.AsyncGraphDatabase, "driver") as factory:
+        driver = neo4j_pool.Neo4jPoolManager().get_driver()
+
+    kwargs = factory.call_args.kwargs
+    assert kwargs["max_connection_pool_size"] == 120
+    assert kwargs["connection_acquisition_timeout"] == 5.0
+    assert kwargs["max_connection_lifetime"] == 900.0
+    assert isinstance(driver, InstrumentedDriver)
+    assert driver.metrics.config["max_connection_pool_size"] == 120
@@ -0,0 +1,15 @@
+import inspect
+
+from src.v3.core.menir_runner import MenirAsyncRunner
+from src.v3.core.protocols import EventRunner, ReconciliationProtocol
+from src.v3.core.reconciliation import ReconciliationEngine
+
+
+def test_protocol_methods_match_the_async_implementations():
+    pairs = [
+        (ReconciliationProtocol, ReconciliationEngine, "run_matching_cycle"),
+        (EventRunner, MenirAsyncRunner, "_quarantine_document"),
+    ]
+    for protocol, impl, name in pairs:
+        assert inspect.iscoroutinefunction(getattr(protocol, name))
+        assert inspect.iscoroutinefunction(getattr(impl, name))
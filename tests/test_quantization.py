@@ -0,0 +1,184 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from src.v3.core import quantization
+from src.v3.core.quantization import (
+    QuantizedVectorIndex,
+    QuantizedVectorStore,
+    cosine_rerank,
+    embedding_memory_report,
+    quantization_enabled,
+    quantize_int8,
+)
+
+
+def _corpus(n=2000, dim=768, seed=3):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(32, dim)).astype(np.float32)
+    data = centers[rng.integers(0, 32, size=n)] + rng.normal(scale=0.6, size=(n, dim)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def test_quantize_roundtrip_error_bound():
+    vec = np.random.default_rng(0).normal(size=768).astype(np.float32)
+    qv = quantize_int8(vec)
+    assert isinstance(qv.data, bytes) and len(qv.data) == 768
+    restored = qv.dequantize()
+    # Erro máximo por componente = metade do passo de quantização
+    assert np.max(np.abs(restored - vec)) <= qv.scale / 2 + 1e-6
+
+
+def test_quantize_constant_vector():
+    qv = quantize_int8([0.25] * 8)
+    assert np.allclose(qv.dequantize(), 0.25)
+
+
+def test_quantize_rejects_empty():
+    with pytest.raises(ValueError):
+        quantize_int8([])
+
+
+def test_index_recall_at_10_with_rerank():
+    corpus = _corpus()
+    index = QuantizedVectorIndex(dim=768)
+    index.add_many([(str(i), *_unpack(quantize_int8(v))) for i, v in enumerate(corpus)])
+    assert len(index) == len(corpus)
+
+    rng = np.random.default_rng(5)
+    hits = 0
+    for pick in rng.integers(0, len(corpus), size=25):
+        q = corpus[pick]
+        expected = set(np.argsort(-(corpus @ q))[:10].tolist())
+        shortlist = index.search(q, 40)
+        ranked = cosine_rerank(q, {u: corpus[int(u)] for u, _ in shortlist}, 10)
+        hits += len(expected & {int(u) for u, _ in ranked})
+    assert hits / 250 >= 0.98
+
+
+def test_index_upsert_replaces_existing_uid():
+    index = QuantizedVectorIndex(dim=4)
+    index.add("a", quantize_int8([1.0, 0.0, 0.0, 0.0]))
+    index.add("a", quantize_int8([0.0, 1.0, 0.0, 0.0]))
+    assert len(index) == 1
+    assert index.search([0.0, 1.0, 0.0, 0.0], 1)[0][0] == "a"
+    assert index.search([0.0, 1.0, 0.0, 0.0], 1)[0][1] > 0.99
+
+
+def test_index_rejects_wrong_dimension():
+    index = QuantizedVectorIndex(dim=768)
+    with pytest.raises(ValueError):
+        index.add("x", quantize_int8([1.0, 2.0]))
+
+
+def test_memory_report_int8_is_smaller():
+    report = embedding_memory_report(50_000, 768)
+    assert report["int8_bytes"] < report["float_bytes"] / 7
+    assert report["saved_bytes"] == report["float_bytes"] - report["int8_bytes"]
+
+
+def test_quantization_flag(monkeypatch):
+    monkeypatch.delenv("MENIR_EMBEDDING_QUANTIZATION", raising=False)
+    assert not quantization_enabled()
+    monkeypatch.setenv("MENIR_EMBEDDING_QUANTIZATION", "INT8")
+    assert quantization_enabled()
+
+
+def test_store_search_reranks_with_full_precision(neo4j_driver, neo4j_records):
+    QuantizedVectorStore.invalidate()
+    vectors = {"n1": [1.0, 0.0, 0.0, 0.1], "n2": [0.9, 0.1, 0.0, 0.0], "n3": [0.0, 0.0, 1.0, 0.0]}
+    codes = [
+        {"uid": uid, "codes": quantize_int8(v).data, "scale": quantize_int8(v).scale, "offset": quantize_int8(v).offset}
+        for uid, v in vectors.items()
+    ]
+    full = [
+        {"id": uid, "name": uid.upper(), "status": "novo", "text": None, "embedding": v}
+        for uid, v in vectors.items()
+    ]
+
+    driver = neo4j_driver(run=[neo4j_records(codes), neo4j_records(full)])
+    session = driver.session.return_value
+
+    hits = asyncio.run(
+        QuantizedVectorStore.search([1.0, 0.0, 0.0, 0.0], "Lead", "BECO", top_k=2, driver=driver)
+    )
+    assert [h["id"] for h in hits] == ["n1", "n2"]
+    assert hits[0]["name"] == "N1"
+    assert "FullEmbedding" in session.run.call_args_list[1].args[0]
+    QuantizedVectorStore.invalidate()
+
+
+def test_index_upsert_of_a_zero_vector_keeps_scores_finite():
+    index = QuantizedVectorIndex(dim=4)
+    index.add("a", quantize_int8([1.0, 0.0, 0.0, 0.0]))
+    index.add_many([("a", bytes([128, 128, 128, 128]), 1.0, 0.0)])  # reconstrói o vetor zero
+    assert index.search([1.0, 0.0, 0.0, 0.0], 1) == [("a", 0.0)]
+
+
+def _code_rows(vectors):
+    return [
+        {"uid": uid, "codes": quantize_int8(v).data, "scale": quantize_int8(v).scale, "offset": quantize_int8(v).offset}
+        for uid, v in vectors.items()
+    ]
+
+
+def test_store_does_not_cache_an_empty_index(neo4j_driver, neo4j_records):
+    QuantizedVectorStore.invalidate()
+    driver = neo4j_driver(run=[neo4j_records([]), neo4j_records(_code_rows({"n1": [1.0, 0.0, 0.0, 0.0]}))])
+
+    empty = asyncio.run(QuantizedVectorStore._load_index("Lead", "BECO", driver))
+    assert len(empty) == 0 and ("BECO", "Lead") not in QuantizedVectorStore._indexes
+
+    loaded = asyncio.run(QuantizedVectorStore._load_index("Lead", "BECO", driver))
+    assert len(loaded) == 1 and loaded.dim == 4
+    QuantizedVectorStore.invalidate()
+
+
+def test_store_reloads_the_index_after_ttl(neo4j_driver, neo4j_records, monkeypatch):
+    QuantizedVectorStore.invalidate()
+    clock = [1000.0]
+    monkeypatch.setattr(quantization.time, "monotonic", lambda: clock[0])
+    monkeypatch.setenv("MENIR_QUANTIZED_INDEX_TTL", "60")
+    first = _code_rows({"n1": [1.0, 0.0, 0.0, 0.0]})
+    second = _code_rows({"n1": [1.0, 0.0, 0.0, 0.0], "n2": [0.0, 1.0, 0.0, 0.0]})
+    driver = neo4j_driver(run=[neo4j_records(first), neo4j_records(second)])
+
+    assert len(asyncio.run(QuantizedVectorStore._load_index("Lead", "BECO", driver))) == 1
+    clock[0] += 30
+    assert len(asyncio.run(QuantizedVectorStore._load_index("Lead", "BECO", driver))) == 1
+    clock[0] += 31
+    assert len(asyncio.run(QuantizedVectorStore._load_index("Lead", "BECO", driver))) == 2
+    assert driver.session.return_value.run.await_count == 2
+    QuantizedVectorStore.invalidate()
+
+
+def _unpack(qv):
+    return qv.data, qv.scale, qv.offset
+
+
+def test_migration_and_store_key_full_embeddings_the_same_way(neo4j_driver, neo4j_records):
+    from scripts.migrate_embeddings_int8 import migrate_label
+
+    vector = [0.1, 0.2, 0.3, 0.4]
+    written = []
+    driver = neo4j_driver(
+        run=[
+            neo4j_records([{"eid": "4:db:1", "key": "lead-1", "embedding": vector}]),
+            neo4j_records([]),
+            neo4j_records([{"pending": 0}]),
+        ],
+        execute_write=lambda fn: fn(MagicMock(run=lambda q, **kw: written.append(kw))),
+    )
+    session = driver.session.return_value
+
+    assert asyncio.run(migrate_label(driver, "BECO", "Lead", 10, keep_float=False)) == 1
+    assert "n.uid IS NOT NULL" in session.run.call_args_list[0].args[0]
+
+    store_driver = neo4j_driver()
+    store_session = store_driver.session.return_value
+    asyncio.run(QuantizedVectorStore.persist("Lead", "lead-1", vector, "BECO", driver=store_driver))
+
+    assert written[0]["rows"][0]["full_uid"] == store_session.run.call_args.kwargs["full_uid"] == "Lead:lead-1"
+    QuantizedVectorStore.invalidate()
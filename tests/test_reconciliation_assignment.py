@@ -0,0 +1,94 @@
+import itertools
+
+import numpy as np
+
+from src.v3.core import reconciliation_assignment
+from src.v3.core.reconciliation_assignment import assign, connected_components, linear_assignment
+from src.v3.core.reconciliation_sweep import TIER_1, OpenItems, match_tiers, sweep
+
+
+def _items(prefix, rows):
+    return OpenItems.from_rows(
+        [{"id": f"{prefix}{k}", "amount": a, "day": d, "currency": "CHF"} for k, (a, d) in enumerate(rows)],
+        {"CHF": 0},
+    )
+
+
+def _one_to_one(matches):
+    return len(set(matches.invoice.tolist())) == len(set(matches.transaction.tolist())) == len(matches)
+
+
+def test_linear_assignment_is_optimal_on_rectangular_matrices():
+    rng = np.random.default_rng(7)
+    for _ in range(100):
+        n, m = (int(x) for x in rng.integers(1, 6, 2))
+        cost = rng.random((n, m))
+        rows, cols = linear_assignment(cost)
+        if n <= m:
+            best = min(sum(cost[i, p[i]] for i in range(n)) for p in itertools.permutations(range(m), n))
+        else:
+            best = min(sum(cost[p[j], j] for j in range(m)) for p in itertools.permutations(range(n), m))
+        assert len(rows) == min(n, m) and len(set(rows.tolist())) == len(set(cols.tolist())) == len(rows)
+        assert np.isclose(cost[rows, cols].sum(), best)
+
+
+def test_monthly_fees_resolve_to_one_link_each_with_lower_confidence():
+    # Três mensalidades iguais do mesmo fornecedor, três pagamentos na mesma janela
+    invoices = _items("i", [(100.0, 0), (100.0, 10), (100.0, 20), (250.0, 0)])
+    transactions = _items("t", [(-100.0, 15), (-100.0, 25), (-100.0, 35), (-250.0, 2)])
+    candidates = sweep(invoices, transactions, TIER_1)
+    assert len(candidates) == 7 + 1  # os tiers Cypher gravariam as 7 arestas cruzadas
+
+    matches = assign(invoices, transactions, candidates)
+    assert len(matches) == 4 and _one_to_one(matches)
+    assert matches.clusters == 1
+    by_invoice = dict(zip(matches.invoice.tolist(), matches.score.tolist()))
+    # Par sem disputa mantém o score; pares do cluster descontam a alternativa
+    assert by_invoice[3] > 0.95
+    assert all(by_invoice[i] < 0.6 for i in (0, 1, 2))
+
+
+def test_large_components_are_cut_into_bounded_blocks(monkeypatch):
+    monkeypatch.setattr(reconciliation_assignment, "MAX_COMPONENT_SIDE", 3)
+    solved_shapes = []
+    original = reconciliation_assignment.linear_assignment
+
+    def _recording(cost):
+        solved_shapes.append(cost.shape)
+        return original(cost)
+
+    monkeypatch.setattr(reconciliation_assignment, "linear_assignment", _recording)
+    invoices = _items("i", [(100.0, d) for d in range(0, 40, 2)])
+    transactions = _items("t", [(-100.0, d + 1) for d in range(0, 40, 2)])
+
+    tier = match_tiers(invoices, transactions, (TIER_1,))[0]
+    assert _one_to_one(tier) and len(tier) == 20
+    assert solved_shapes and all(max(shape) <= 3 for shape in solved_shapes)
+
+
+def test_components_label_edges_sharing_any_node():
+    labels = connected_components(np.array([0, 1, 1, 3]), np.array([0, 0, 2, 5]), n_invoices=4)
+    assert labels[0] == labels[1] == labels[2] != labels[3]
+
+
+def test_process_pool_matches_the_thread_pool():
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    # Muitas componentes disputadas: várias tarefas vão para o executor
+    rows = [(100.0 + k, d) for k in range(40) for d in (0, 10, 20)]
+    invoices = _items("i", rows)
+    transactions = _items("t", [(-a, d + 5) for a, d in rows])
+    candidates = sweep(invoices, transactions, TIER_1)
+
+    threaded = assign(invoices, transactions, candidates)
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        processed = assign(invoices, transactions, candidates, pool)
+    assert np.array_equal(processed.invoice, threaded.invoice)
+    assert np.array_equal(processed.transaction, threaded.transaction)
+    assert np.allclose(processed.score, threaded.score)
+
+
+def test_assignment_pool_honours_thread_override(monkeypatch):
+    monkeypatch.setattr(reconciliation_assignment, "RECON_EXECUTOR", "thread")
+    assert reconciliation_assignment.assignment_pool() is reconciliation_assignment._executor()
@@ -0,0 +1,123 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from src.v3.core import reconciliation_subset
+from src.v3.core.reconciliation import ReconciliationEngine
+from src.v3.core.reconciliation_subset import MANY_TO_ONE, SPLIT, match_groups, subset_sum
+from src.v3.core.reconciliation_sweep import OpenItems
+from src.v3.core.schemas.identity import TenantContext
+
+
+def _items(prefix, rows):
+    """rows: (amount, day, iban, party)"""
+    return OpenItems.from_rows(
+        [
+            {"id": f"{prefix}{k}", "amount": a, "day": d, "currency": "CHF", "iban": iban, "party": party}
+            for k, (a, d, iban, party) in enumerate(rows)
+        ],
+        {"CHF": 0},
+    )
+
+
+def test_subset_sum_prefers_exact_then_smaller_sets():
+    amounts = np.array([120.0, 35.5, 80.0, 44.5, 300.0, 10.0, 70.0])
+    assert subset_sum(amounts, 200.0) == ((0, 2), 0.0)
+    # 5 parcelas de 50: acima do MAX_SET_SIZE padrão (4)
+    assert subset_sum(np.full(10, 50.0), 250.0) is None
+    assert subset_sum(np.full(10, 50.0), 250.0, max_size=5) is not None
+    assert subset_sum(np.array([99.0, 1.10]), 100.0) is None
+
+
+def test_one_transfer_for_three_invoices_and_one_invoice_in_instalments():
+    iban = "CH93 0076 2011 6238 5295 7"
+    invoices = _items("i", [
+        (120.00, 0, iban, "Viking Schweiz GmbH"),
+        (35.50, 3, iban, "Viking Schweiz GmbH"),
+        (44.50, 5, iban, "Viking Schweiz GmbH"),
+        (1000.00, 0, None, "Lyreco Switzerland AG"),
+        (35.50, 4, "CH4730000001874984396", "Outro"),  # mesmo valor, outro credor: fora do grupo
+    ])
+    transactions = _items("t", [
+        (-200.00, 20, "CH9300762011623852957", "VIKING SCHWEIZ GMBH"),
+        (-400.00, 10, None, "Lyreco  Switzerland AG"),
+        (-600.00, 40, None, "lyreco switzerland ag"),
+    ])
+    groups = match_groups(invoices, transactions)
+    by_kind = {g.kind: g for g in groups}
+    assert set(by_kind) == {MANY_TO_ONE, SPLIT}
+    assert sorted(by_kind[MANY_TO_ONE].invoices) == [0, 1, 2] and by_kind[MANY_TO_ONE].transactions == [0]
+    assert by_kind[SPLIT].invoices == [3] and sorted(by_kind[SPLIT].transactions) == [1, 2]
+    assert all(0 < g.score < 1 for g in groups)
+
+    rows = by_kind[MANY_TO_ONE].rows(invoices, transactions)
+    assert len(rows) == 3 and len({r["group"] for r in rows}) == 1 and rows[0]["size"] == 4
+
+
+def test_search_stays_bounded_with_thousands_of_open_items(monkeypatch):
+    monkeypatch.setattr(reconciliation_subset, "MAX_SEARCH_ITEMS", 16)
+    rng = np.random.default_rng(4)
+    n = 3000
+    parties = [f"CH{k:019d}" for k in rng.integers(0, 50, n)]
+    invoices = _items("i", [(float(a), int(d), p, None) for a, d, p in zip(
+        np.round(rng.uniform(10, 2000, n), 2), rng.integers(0, 365, n), parties)])
+    transactions = _items("t", [(-float(a), int(d) + 5, p, None) for a, d, p in zip(
+        np.round(rng.uniform(10, 2000, n), 2), rng.integers(0, 365, n), parties)])
+
+    started = time.perf_counter()
+    groups = match_groups(invoices, transactions)
+    assert time.perf_counter() - started < 30
+    used_inv = [i for g in groups for i in g.invoices]
+    used_tx = [t for g in groups for t in g.transactions]
+    assert len(used_inv) == len(set(used_inv)) and len(used_tx) == len(set(used_tx))
+    for g in groups:
+        assert 3 <= len(g.invoices) + len(g.transactions) <= reconciliation_subset.MAX_SET_SIZE + 1
+        assert len({invoices.iban[i] for i in g.invoices} | {transactions.iban[t] for t in g.transactions}) == 1
+
+
+@pytest.mark.asyncio
+async def test_cycle_writes_grouped_reconciled_by_edges():
+    rows = {
+        "Invoice": [{"id": "i1", "amount": 60.0, "day": 1, "currency": "CHF", "iban": "CH1", "party": "A"},
+                    {"id": "i2", "amount": 40.0, "day": 2, "currency": "CHF", "iban": "CH1", "party": "A"}],
+        "Transaction": [{"id": "t1", "amount": -100.0, "day": 9, "currency": "CHF", "iban": "CH1", "party": "A"}],
+    }
+    graph = MagicMock()
+
+    async def _stream(query, params=None, **kwargs):
+        if "payment_reference" in query:
+            return  # nenhum par de referência: tudo fica para o subset-sum
+        assert "RECONCILED_BY" in query
+        for row in rows["Invoice" if ":Invoice:" in query else "Transaction"]:
+            yield row
+
+    async def _consumed():
+        result = MagicMock()
+
+        async def _consume():
+            return None
+
+        result.consume = _consume
+        return result
+
+    tx = MagicMock()
+    tx.run.side_effect = lambda q, p: _consumed()
+    graph.stream = MagicMock(side_effect=_stream)
+
+    async def _transaction(work, **kwargs):
+        return await work(tx)
+
+    graph.transaction = MagicMock(side_effect=_transaction)
+    token = TenantContext.set("BECO")
+    try:
+        await ReconciliationEngine(SimpleNamespace(graph=graph)).run_matching_cycle()
+    finally:
+        TenantContext.reset(token)
+
+    ((query, params),) = [c.args for c in tx.run.call_args_list]
+    assert "MERGE (i)-[r:RECONCILED_BY]->(tr)" in query
+    assert {(r["i"], r["t"]) for r in params["rows"]} == {("i1", "t1"), ("i2", "t1")}
+    assert len({r["group"] for r in params["rows"]}) == 1 and params["rows"][0]["kind"] == MANY_TO_ONE
@@ -0,0 +1,222 @@
+import itertools
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from src.v3.core import reconciliation_sweep
+from src.v3.core.reconciliation import ReconciliationEngine
+from src.v3.core.reconciliation_sweep import TIER_0, TIER_1, TIER_2, TIERS, OpenItems, match_tiers
+from src.v3.core.schemas.identity import TenantContext
+
+
+def _items(prefix, rows, references=None):
+    codes = {"CHF": 0, "EUR": 1}
+    references = references or [None] * len(rows)
+    return OpenItems.from_rows(
+        [
+            {"id": f"{prefix}{k}", "amount": a, "day": d, "currency": c, "reference": ref}
+            for k, ((a, d, c), ref) in enumerate(zip(rows, references))
+        ],
+        codes,
+    )
+
+
+def _cypher_pairs(invoices, transactions, tier, closed_inv, closed_tx):
+    """Predicado dos tiers Cypher antigos sobre o produto cartesiano dos nós ainda abertos."""
+    pairs = set()
+    for i, t in itertools.product(range(len(invoices)), range(len(transactions))):
+        if i in closed_inv or t in closed_tx or invoices.currency[i] < 0:
+            continue
+        if tier.by_reference and (not invoices.reference[i] or invoices.reference[i] != transactions.reference[t]):
+            continue
+        delta = abs(invoices.amount[i] - abs(transactions.amount[t]))
+        days = transactions.day[t] - invoices.day[i]
+        if (
+            delta <= tier.abs_tolerance + tier.rel_tolerance * invoices.amount[i]
+            and tier.min_days <= days <= tier.max_days
+            and invoices.currency[i] == transactions.currency[t]
+        ):
+            pairs.add((i, t))
+    return pairs
+
+
+def _pairs(matches):
+    return set(zip(matches.invoice.tolist(), matches.transaction.tolist()))
+
+
+def test_boundaries_follow_tier_predicates():
+    invoices = _items("i", [
+        (100.00, 0, "CHF"),   # tier 1 no limite exato de 0.05 e 30 dias
+        (200.00, 0, "CHF"),   # 31 dias: fora do tier 1, dentro do tier 2
+        (300.00, 0, None),    # sem moeda: nunca casa
+        (-50.00, 0, "CHF"),   # total negativo: tolerância do tier 2 negativa
+    ])
+    transactions = _items("t", [
+        (-100.05, 30, "CHF"),
+        (205.00, 31, "CHF"),
+        (300.00, 0, None),
+        (100.00, -1, "CHF"),  # pago antes da emissão
+        (-50.00, 3, "EUR"),
+    ])
+    tier0, tier1, tier2 = match_tiers(invoices, transactions)
+    assert len(tier0) == 0
+    assert _pairs(tier1) == {(0, 0)}
+    assert _pairs(tier2) == {(1, 1)}
+    assert tier1.rows(invoices, transactions)[0]["delta"] == pytest.approx(0.05)
+
+
+def test_sweep_matches_cartesian_semantics_on_random_tenant(monkeypatch):
+    # Faixas pequenas forçam vários chunks de candidatos
+    monkeypatch.setattr(reconciliation_sweep, "MAX_CANDIDATES_PER_CHUNK", 7)
+    rng = np.random.default_rng(1)
+    inv = [(round(float(a), 2), int(d), c) for a, d, c in zip(
+        rng.choice([10.0, 10.04, 99.9, 100.0, 250.0, 251.0], 60), rng.integers(0, 60, 60), rng.choice(["CHF", "EUR"], 60))]
+    tx = [(round(float(a), 2), int(d), c) for a, d, c in zip(
+        rng.choice([-10.0, 10.02, 100.03, -104.0, 250.0, 262.0], 80), rng.integers(0, 100, 80), rng.choice(["CHF", "EUR"], 80))]
+    refs = [f"RF{k:02d}" if k < 5 else None for k in rng.integers(0, 8, 140)]
+    invoices, transactions = _items("i", inv, refs[:60]), _items("t", tx, refs[60:])
+
+    results = match_tiers(invoices, transactions)
+    closed_inv, closed_tx = set(), set()
+    for tier, assigned in zip(TIERS, results):
+        invoice_open = np.array([i not in closed_inv for i in range(len(inv))])
+        transaction_open = np.array([t not in closed_tx for t in range(len(tx))])
+        join = reconciliation_sweep.reference_join if tier.by_reference else reconciliation_sweep.sweep
+        candidates = _pairs(join(invoices, transactions, tier, invoice_open, transaction_open))
+        assert candidates == _cypher_pairs(invoices, transactions, tier, closed_inv, closed_tx)
+        assert len(candidates) <= assigned.candidates < len(inv) * len(tx)
+        # Assignment 1:1 dentro dos candidatos
+        assert _pairs(assigned) <= candidates
+        assert len(set(assigned.invoice.tolist())) == len(set(assigned.transaction.tolist())) == len(assigned)
+        closed_inv |= set(assigned.invoice.tolist())
+        closed_tx |= set(assigned.transaction.tolist())
+
+
+def test_reference_tier_runs_first_and_shrinks_the_fuzzy_stage():
+    qrr = "210000000003139471430009017"
+    invoices = _items("i", [
+        (100.00, 500, "CHF"),  # issue_date = data de ingestão do QR: pagamento "antes" da emissão
+        (100.00, 0, "CHF"),
+        (80.00, 0, "CHF"),     # mesma referência, valor diferente: pagamento parcial não fecha no tier 0
+    ], [qrr, None, "RF18539007547034"])
+    transactions = _items("t", [
+        (-100.00, 480, "CHF"),
+        (-100.02, 2, "CHF"),
+        (-40.00, 1, "CHF"),
+    ], [qrr, None, "RF18539007547034"])
+
+    tier0, tier1, tier2 = match_tiers(invoices, transactions)
+    assert tier0.tier is TIER_0 and _pairs(tier0) == {(0, 0)}
+    assert tier0.candidates == 2
+    # i0/t0 já fechados: o tier 1 não os vê, mesmo com valor idêntico a i1/t1
+    assert _pairs(tier1) == {(1, 1)}
+    assert len(tier2) == 0
+
+
+@pytest.mark.asyncio
+async def test_cycle_loads_once_and_writes_all_tiers_in_one_transaction():
+    rows = {
+        "Invoice": [{"id": "i1", "amount": 100.0, "day": 10, "currency": "CHF"},
+                    {"id": "i2", "amount": 500.0, "day": 10, "currency": "CHF"}],
+        "Transaction": [{"id": "t1", "amount": -100.0, "day": 12, "currency": "CHF"},
+                        {"id": "t2", "amount": 510.0, "day": 40, "currency": "CHF"}],
+    }
+    graph, tx = _cycle_graph(rows)
+    token = TenantContext.set("BECO")
+    try:
+        await ReconciliationEngine(SimpleNamespace(graph=graph)).run_matching_cycle()
+    finally:
+        TenantContext.reset(token)
+
+    # Faturas, transações e os pares do tier 0 (vazio aqui)
+    assert graph.stream.call_count == 3
+    graph.transaction.assert_called_once()
+    (q1, p1), (q2, p2) = [c.args for c in tx.run.call_args_list]
+    assert "MERGE (i)-[r:RECONCILED]->(tr)" in q1 and p1["confidence"] == TIER_1.confidence
+    assert [{k: row[k] for k in ("i", "t", "delta")} for row in p1["rows"]] == [{"i": "i1", "t": "t1", "delta": 0.0}]
+    assert 0 < p1["rows"][0]["score"] <= 1
+    assert f"[r:{TIER_2.rel_type}]" in q2 and p2["rows"][0]["t"] == "t2"
+
+
+@pytest.mark.asyncio
+async def test_tier_zero_candidates_come_from_the_payment_reference_index():
+    rows = {
+        "Invoice": [{"id": "i1", "amount": 100.0, "day": 200, "currency": "CHF"},
+                    {"id": "i2", "amount": 100.0, "day": 10, "currency": "CHF"}],
+        "Transaction": [{"id": "t1", "amount": -100.0, "day": 12, "currency": "CHF"}],
+        # Pares do seek por índice; "closed" já reconciliada: fora dos OpenItems
+        "pairs": [{"i": "i1", "t": "t1"}, {"i": "closed", "t": "t1"}],
+    }
+    graph, tx = _cycle_graph(rows)
+    token = TenantContext.set("BECO")
+    try:
+        await ReconciliationEngine(SimpleNamespace(graph=graph)).run_matching_cycle()
+    finally:
+        TenantContext.reset(token)
+
+    queries = [c.args[0] for c in graph.stream.call_args_list]
+    assert all("payment_reference" not in q for q in queries[:2])
+    # Só as faturas abertas alimentam o seek: nenhuma varredura de faturas fechadas
+    assert "UNWIND $invoice_ids" in queries[2] and graph.stream.call_args_list[2].args[1] == {"invoice_ids": ["i1", "i2"]}
+    assert "USING INDEX tr:Transaction(payment_reference)" in queries[2]
+    ((query, params),) = [c.args for c in tx.run.call_args_list]
+    # Sem o tier 0, i2 (mesmo valor, 2 dias) levaria t1 no tier 1
+    assert params["tier"] == TIER_0.name and [(r["i"], r["t"]) for r in params["rows"]] == [("i1", "t1")]
+
+
+def _cycle_graph(rows):
+    """Grafo falso do ciclo: stream por tipo de query, transação única de escrita."""
+    graph = MagicMock()
+
+    async def _stream(query, params=None, **kwargs):
+        if "payment_reference" in query:
+            kind = "pairs"
+        else:
+            kind = "Invoice" if ":Invoice:" in query else "Transaction"
+        for row in rows.get(kind, []):
+            yield row
+
+    tx = MagicMock()
+    tx.run.side_effect = lambda q, p: _consumable()
+    graph.stream = MagicMock(side_effect=_stream)
+
+    async def _transaction(work, **kwargs):
+        return await work(tx)
+
+    graph.transaction = MagicMock(side_effect=_transaction)
+    return graph, tx
+
+
+def _consumable():
+    result = MagicMock()
+
+    async def _consume():
+        return None
+
+    result.consume = _consume
+
+    async def _run():
+        return result
+
+    return _run()
+
+
+@pytest.mark.parametrize("kind, index, key", [
+    ("invoice", "USING INDEX i:Invoice(uid)", "i.uid"),
+    ("transaction", "USING INDEX tr:Transaction(tx_key)", "tr.tx_key"),
+])
+def test_quarantine_stream_pages_on_the_indexed_merge_key(kind, index, key):
+    graph = MagicMock()
+    token = TenantContext.set("BECO")
+    try:
+        ReconciliationEngine(SimpleNamespace(graph=graph)).stream_quarantine_nodes(kind, after="k-41")
+    finally:
+        TenantContext.reset(token)
+
+    query = graph.paginate.call_args.args[0]
+    assert index in query and f"{key} AS key" in query
+    assert "elementId" not in query and "noqa" not in query
+    assert graph.paginate.call_args.kwargs["keyset"] == [("key", key)]
+    assert graph.paginate.call_args.kwargs["after"] == ["k-41"]
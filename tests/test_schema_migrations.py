@@ -0,0 +1,159 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.v3.core.schema_migrations import (
+    FULLTEXT,
+    MIGRATIONS,
+    UNIQUE,
+    VECTOR,
+    apply_migrations,
+    declared_objects,
+    merge_keys_in_source,
+    uncovered_merge_keys,
+    verify_schema,
+)
+
+
+def _show_index_row(obj, state="ONLINE"):
+    """Linha de SHOW INDEXES como o Neo4j 5 reporta o objeto declarado."""
+    return {
+        "name": obj.name,
+        "type": "RANGE" if obj.kind == UNIQUE else obj.kind,
+        "entityType": "NODE",
+        "labelsOrTypes": list(obj.labels),
+        "properties": list(obj.properties),
+        "state": state,
+        "owningConstraint": obj.name if obj.kind == UNIQUE else None,
+    }
+
+
+def _graph(read_rows):
+    graph = MagicMock()
+    graph.read = AsyncMock(return_value=read_rows)
+    graph.write = AsyncMock(return_value=[])
+    return graph
+
+
+def test_every_merge_key_in_source_is_indexed():
+    """Gate de CI: um MERGE novo sem índice declarado quebra esta suíte."""
+    assert uncovered_merge_keys() == {}
+
+
+def test_scanner_reads_fstring_templates_and_ignores_tenant_labels():
+    source = '''
+    q = f"""
+    MERGE (d:Document:`{safe_tenant}` {{file_hash: $file_hash}})
+    MERGE (li:LineItem:`{tenant}` {{invoice_uid: {p}uid, description: item.description}})
+    MERGE (c:Client:BECO {name: $name})
+    MERGE (n:{labels} {{sha256: $sha256}})
+    MERGE (a)-[:LINKS]->(b)
+    """
+    '''
+    assert merge_keys_in_source(source) == {
+        ("Document", ("file_hash",)),
+        ("LineItem", ("description", "invoice_uid")),
+        ("Client", ("name",)),
+    }
+
+
+def test_new_unindexed_merge_key_is_flagged(tmp_path):
+    (tmp_path / "new_skill.py").write_text('Q = "MERGE (w:Widget {sku: $sku}) SET w.qty = 1"\n')
+    uncovered = uncovered_merge_keys(tmp_path)
+    assert ("Widget", ("sku",)) in uncovered
+    # Chaves compostas são cobertas por um índice em qualquer subconjunto delas
+    assert ("Tenant", ("name", "target_erp")) not in uncovered
+
+
+def test_migrations_are_append_only_and_names_unique():
+    versions = [m.version for m in MIGRATIONS]
+    assert versions == sorted(set(versions))
+    names = [obj.name for obj in declared_objects()]
+    assert len(names) == len(set(names))
+    for obj in declared_objects():
+        assert "IF NOT EXISTS" in obj.create_statement()
+
+
+def test_create_statements_per_kind():
+    by_name = {obj.name: obj for obj in declared_objects()}
+    assert by_name["tenant_name_unique"].create_statement() == (
+        "CREATE CONSTRAINT tenant_name_unique IF NOT EXISTS FOR (n:Tenant) REQUIRE (n.name) IS UNIQUE"
+    )
+    assert by_name["lineitem_invoice_uid_description_idx"].create_statement().endswith(
+        "FOR (n:LineItem) ON (n.invoice_uid, n.description)"
+    )
+    assert "FOR (n:Chunk|Document|Invoice" in by_name["menir_fulltext"].create_statement()
+    assert "`vector.dimensions`: 384" in by_name["menir_vectors"].create_statement()
+
+
+@pytest.mark.asyncio
+async def test_apply_runs_only_pending_versions_and_records_them():
+    graph = _graph([{"version": 1}])
+    applied = await apply_migrations(graph, database="beco")
+
+    assert applied == [m.version for m in MIGRATIONS if m.version > 1]
+    statements = [c.args[0] for c in graph.write.call_args_list]
+    pending = [obj for m in MIGRATIONS if m.version > 1 for obj in m.objects]
+    assert statements[: len(MIGRATIONS[1].objects)] == [obj.create_statement() for obj in MIGRATIONS[1].objects]
+    assert len(statements) == len(pending) + len(applied)
+    recorded = [c.args[1]["version"] for c in graph.write.call_args_list if "SchemaMigration" in c.args[0]]
+    assert recorded == applied
+    assert all(c.kwargs["database"] == "beco" for c in graph.write.call_args_list)
+
+
+@pytest.mark.asyncio
+async def test_apply_is_noop_when_up_to_date():
+    graph = _graph([{"version": m.version} for m in MIGRATIONS])
+    assert await apply_migrations(graph) == []
+    graph.write.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_verify_reports_missing_and_populating_indexes():
+    objects = declared_objects()
+    rows = [_show_index_row(obj) for obj in objects if obj.name != "transaction_tx_id_idx"]
+    populating = next(obj for obj in objects if obj.kind == VECTOR)
+    rows = [r if r["name"] != populating.name else _show_index_row(populating, "POPULATING") for r in rows]
+    # Constraint equivalente criada com outro nome (ex: bootstrap_santos.cypher) também vale
+    rows = [dict(r, name="santos_lead_id", owningConstraint="santos_lead_id") if r["name"] == "lead_id_unique" else r for r in rows]
+
+    report = await verify_schema(_graph(rows))
+    assert report.missing == ["transaction_tx_id_idx"]
+    assert report.not_online == [populating.name]
+    assert not report.ok
+
+
+@pytest.mark.asyncio
+async def test_verify_does_not_accept_plain_index_for_uniqueness():
+    objects = declared_objects()
+    rows = [_show_index_row(obj) for obj in objects]
+    rows = [dict(r, owningConstraint=None) if r["name"] == "tenant_name_unique" else r for r in rows]
+    fulltext = next(obj for obj in objects if obj.kind == FULLTEXT)
+
+    report = await verify_schema(_graph(rows))
+    assert report.missing == ["tenant_name_unique"]
+    assert fulltext.name not in report.missing
+
+
+@pytest.mark.asyncio
+async def test_data_step_runs_before_its_constraint_and_failure_blocks_it():
+    from src.v3.core.schema_migrations import Migration, _unique
+
+    calls = []
+    graph = _graph([])
+    graph.write = AsyncMock(side_effect=lambda q, *a, **k: calls.append(q) or [])
+
+    async def _dedup(g, database):
+        calls.append("data")
+
+    migration = Migration(99, "teste", (_unique("Transaction", "tx_key"),), data=_dedup)
+    await apply_migrations(graph, migrations=[migration])
+    assert calls[0] == "data" and "REQUIRE (n.tx_key) IS UNIQUE" in calls[1]
+
+    async def _broken(g, database):
+        raise RuntimeError("apoc indisponível")
+
+    calls.clear()
+    with pytest.raises(RuntimeError):
+        await apply_migrations(graph, migrations=[Migration(99, "teste", migration.objects, data=_broken)])
+    assert calls == []
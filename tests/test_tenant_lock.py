@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from src.v3.core.tenant_lock import LockTimeoutError, TenantLockManager
+
+
+@pytest.fixture
+def lock_db(tmp_path):
+    return tmp_path / "leases.sqlite3"
+
+
+@pytest.mark.asyncio
+async def test_contenders_queue_in_fifo_order_with_increasing_tokens(lock_db):
+    manager = TenantLockManager(lock_db, ttl=5, poll_interval=0.5)
+    order, tokens, inside = [], [], []
+
+    async def mutator(k):
+        await asyncio.sleep(k * 0.01)  # enfileira na ordem de k
+        async with await manager.acquire("BECO") as lease:
+            inside.append(k)
+            assert len(inside) == 1
+            order.append(k)
+            tokens.append(lease.token)
+            await asyncio.sleep(0.02)
+            inside.remove(k)
+
+    await asyncio.gather(*(mutator(k) for k in range(6)))
+    assert order == list(range(6))
+    assert tokens == sorted(set(tokens))
+
+
+@pytest.mark.asyncio
+async def test_other_process_waits_by_polling_and_tenants_are_independent(lock_db):
+    # Dois managers no mesmo arquivo = dois workers: sem evento em comum, só a fila SQLite
+    worker_a = TenantLockManager(lock_db, ttl=5, poll_interval=0.02)
+    worker_b = TenantLockManager(lock_db, ttl=5, poll_interval=0.02)
+
+    held = await worker_a.acquire("BECO")
+    async with await worker_b.acquire("SANTOS"):
+        pass
+    waiting = asyncio.create_task(worker_b.acquire("BECO"))
+    await asyncio.sleep(0.1)
+    assert not waiting.done()
+
+    await held.release()
+    lease = await asyncio.wait_for(waiting, 1)
+    assert lease.token > held.token
+    await lease.release()
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_taken_over_and_the_stale_holder_is_fenced(lock_db):
+    frozen = TenantLockManager(lock_db, ttl=0.1, poll_interval=0.02)
+    worker = TenantLockManager(lock_db, ttl=0.1, poll_interval=0.02)
+    stale = await frozen.acquire("BECO")  # sem `async with`: ninguém renova
+
+    await asyncio.sleep(0.15)
+    fresh = await worker.acquire("BECO", wait_timeout=1)
+    assert fresh.token > stale.token
+    assert await stale.renew() is False and stale.lost
+
+    # Release tardio do antigo titular não solta a lease do novo
+    await stale.release()
+    with pytest.raises(LockTimeoutError):
+        await frozen.acquire("BECO", wait_timeout=0.05)
+    assert await fresh.renew() is True
+    await fresh.release()
+
+
+@pytest.mark.asyncio
+async def test_renewal_keeps_a_long_critical_section_and_timeouts_leave_the_queue(lock_db):
+    holder = TenantLockManager(lock_db, ttl=0.15, poll_interval=0.02)
+    other = TenantLockManager(lock_db, ttl=0.15, poll_interval=0.02)
+    async with await holder.acquire("BECO") as lease:
+        local, remote = await asyncio.gather(
+            holder.acquire("BECO", wait_timeout=0.4),  # > TTL: só a renovação segura a lease
+            other.acquire("BECO", wait_timeout=0.4),
+            return_exceptions=True,
+        )
+        assert isinstance(local, LockTimeoutError) and isinstance(remote, LockTimeoutError)
+        assert not lease.lost
+
+    # Os waiters que desistiram saíram das filas: o próximo é atendido na hora
+    async with await other.acquire("BECO", wait_timeout=0.2):
+        pass
+    assert holder._gates == {} and other.purge() == 0
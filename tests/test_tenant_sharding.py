@@ -0,0 +1,173 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.v3.core import tenant_sharding
+from src.v3.core.embedding_service import EmbeddingService
+from src.v3.core.schemas.identity import TenantContext
+from src.v3.core.tenant_sharding import IMPORT_LABEL, TenantShardCopier
+from src.v3.tenant_middleware import TenantAwareDriver, group_by_database, tenant_database, tenant_routes
+
+
+@pytest.fixture
+def routes(monkeypatch):
+    monkeypatch.setenv("MENIR_TENANT_DATABASES", "BECO=beco, SANTOS=santos,PESSOAL=santos,broken")
+    monkeypatch.setenv("NEO4J_DB", "neo4j")
+
+
+def test_routing_map_and_groups(routes):
+    assert tenant_routes() == {"BECO": "beco", "SANTOS": "santos", "PESSOAL": "santos"}
+    assert tenant_database("BECO") == "beco"
+    assert tenant_database("OUTRO") == "neo4j"
+    assert group_by_database(["BECO", "SANTOS", "PESSOAL", "OUTRO"]) == {
+        "beco": ["BECO"],
+        "santos": ["SANTOS", "PESSOAL"],
+        "neo4j": ["OUTRO"],
+    }
+
+
+def test_empty_map_keeps_label_mode(monkeypatch):
+    monkeypatch.delenv("MENIR_TENANT_DATABASES", raising=False)
+    monkeypatch.setenv("NEO4J_DB", "neo4j")
+    assert group_by_database(["BECO", "SANTOS"]) == {"neo4j": ["BECO", "SANTOS"]}
+
+
+def test_driver_routes_session_by_tenant_context(routes):
+    base = MagicMock()
+    driver = TenantAwareDriver(base, db="neo4j")
+
+    token = TenantContext.set("OUTRO")
+    try:
+        driver.session()
+        assert base.session.call_args.kwargs["database"] == "neo4j"
+    finally:
+        TenantContext.reset(token)
+
+    token = TenantContext.set("BECO")
+    try:
+        driver.read_session()
+        assert base.session.call_args.kwargs["database"] == "beco"
+        driver.session(database="system")
+        assert base.session.call_args.kwargs["database"] == "system"
+    finally:
+        TenantContext.reset(token)
+
+
+def test_driver_and_graph_share_the_unmapped_tenant_fallback(routes):
+    base = MagicMock()
+    driver = TenantAwareDriver(base, db="beco")
+    token = TenantContext.set("OUTRO")
+    try:
+        driver.session()
+        assert base.session.call_args.kwargs["database"] == tenant_database("OUTRO", "beco") == "beco"
+        # Driver sem database próprio cai no mesmo NEO4J_DB que GraphAccess usa
+        TenantAwareDriver(base, db=None).session()
+        assert base.session.call_args.kwargs["database"] == tenant_database("OUTRO") == "neo4j"
+    finally:
+        TenantContext.reset(token)
+
+
+@pytest.mark.asyncio
+async def test_batch_search_runs_one_query_per_database(routes, neo4j_driver, neo4j_records):
+    intel = MagicMock()
+    intel.generate_embeddings = AsyncMock(return_value=[[0.1, 0.2]])
+    driver = neo4j_driver(run=lambda *a, **kw: neo4j_records([]))
+    session = driver.session.return_value
+
+    with patch.object(EmbeddingService, "_get_intel", return_value=intel), \
+         patch("src.v3.core.embedding_service.get_shared_driver", return_value=driver):
+        await EmbeddingService.batch_semantic_search([("Ana", "PersonNode")], ["BECO", "SANTOS", "PESSOAL"])
+
+    databases = [c.kwargs["database"] for c in driver.session.call_args_list]
+    assert databases == ["beco", "santos"]
+    assert [c.kwargs["tenants"] for c in session.run.call_args_list] == [["BECO"], ["SANTOS", "PESSOAL"]]
+
+
+def _graph(source_rows, counts, records):
+    graph = MagicMock()
+
+    graph.source_queries = []
+
+    async def _transaction(work, **kwargs):
+        assert kwargs["write"] is False and kwargs["database"] is None
+        tx = MagicMock()
+
+        def _run(query, params=None):
+            graph.source_queries.append((query, params))
+            return records(source_rows.pop(0))
+
+        tx.run = AsyncMock(side_effect=_run)
+        return await work(tx)
+
+    async def _read_one(query, params=None, database=None, **kwargs):
+        return counts[database]
+
+    graph.transaction = AsyncMock(side_effect=_transaction)
+    graph.read_one = AsyncMock(side_effect=_read_one)
+    graph.write = AsyncMock(return_value=[])
+    graph.write_one = AsyncMock(return_value={"done": 0})
+    return graph
+
+
+def _copy_source():
+    nodes = [{"id": f"n{i}", "labels": ["BECO", "Document"], "props": {"uid": f"d{i}"}} for i in range(5)]
+    boundary = [{"id": "t", "labels": ["Tenant"], "props": {"name": "BECO"}}]
+    rels = [{"id": f"r{i}", "type": "BELONGS_TO_TENANT", "src": f"n{i}", "dst": "t", "props": {}} for i in range(5)]
+    return [nodes, boundary, rels, []]
+
+
+@pytest.mark.asyncio
+async def test_copier_streams_in_batches_and_cleans_up_when_verified(neo4j_records):
+    graph = _graph(_copy_source(), {None: {"nodes": 5, "rels": 5}, "beco": {"nodes": 5, "rels": 5}}, neo4j_records)
+    copier = TenantShardCopier("BECO", "beco", graph=graph, batch_size=2)
+
+    with patch.object(tenant_sharding, "apply_migrations", AsyncMock()) as migrate:
+        report = await copier.run()
+
+    migrate.assert_awaited_once_with(graph, "beco")
+    assert report.verified and report.nodes == 6 and report.relationships == 5
+    assert graph.write.call_args_list[0].kwargs["database"] == "system"
+    merges = [c for c in graph.write.call_args_list if "UNWIND $rows" in c.args[0]]
+    # 5 nós em lotes de 2 + 1 vizinho + 5 relacionamentos em lotes de 2
+    assert [len(c.args[1]["rows"]) for c in merges] == [2, 2, 1, 1, 2, 2, 1]
+    assert all(c.kwargs["database"] == "beco" for c in merges)
+    assert "SET n:`BECO`:`Document`" in merges[0].args[0]
+    assert graph.write_one.await_count == 2
+    assert "DROP INDEX" in graph.write.call_args.args[0]
+
+
+@pytest.mark.asyncio
+async def test_copier_keeps_import_marks_when_counts_diverge(neo4j_records):
+    graph = _graph(_copy_source(), {None: {"nodes": 5, "rels": 5}, "beco": {"nodes": 4, "rels": 5}}, neo4j_records)
+    copier = TenantShardCopier("BECO", "beco", graph=graph)
+
+    with patch.object(tenant_sharding, "apply_migrations", AsyncMock()):
+        report = await copier.run(create_database=False)
+
+    assert not report.verified
+    graph.write_one.assert_not_called()
+    assert not any("system" == c.kwargs.get("database") for c in graph.write.call_args_list)
+    assert not any(IMPORT_LABEL in c.args[0] and "REMOVE" in c.args[0] for c in graph.write.call_args_list)
+
+
+@pytest.mark.asyncio
+async def test_copier_leaves_other_tenants_out_of_the_copy(neo4j_records, monkeypatch):
+    monkeypatch.setenv("MENIR_PERSONAL_TENANT_NAME", "PESSOAL")
+    graph = _graph(_copy_source(), {None: {"nodes": 5, "rels": 5}, "beco": {"nodes": 5, "rels": 5}}, neo4j_records)
+    copier = TenantShardCopier("BECO", "beco", graph=graph)
+
+    with patch.object(tenant_sharding, "apply_migrations", AsyncMock()):
+        await copier.run(create_database=False)
+
+    assert copier.other_tenants == ["PESSOAL", "SANTOS"]
+    # vizinhos e arestas de fronteira filtram outros tenants; a contagem acompanha
+    for query, params in graph.source_queries[1:]:
+        assert "none(l IN labels" in query and params == {"other_tenants": ["PESSOAL", "SANTOS"]}
+    for call in graph.read_one.await_args_list:
+        assert "$other_tenants" in call.args[0]
+        assert call.args[1] == {"other_tenants": ["PESSOAL", "SANTOS"]}
+
+
+def test_copier_refuses_same_source_and_target():
+    with pytest.raises(ValueError):
+        TenantShardCopier("BECO", "neo4j", source_database="neo4j", graph=MagicMock())
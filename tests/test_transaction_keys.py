@@ -0,0 +1,84 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.v3.core.schema_migrations import MIGRATIONS
+from src.v3.core.transaction_keys import KeySequencer, dedup_transactions, plan_dedup, transaction_key
+
+IBAN = "CH3400788000050770303"
+
+
+def _row(node_id, ingested_at, tx_id="ZV1", amount=-4.5, remittance="Café", tenant="BECO"):
+    return {
+        "id": node_id, "tenant": tenant, "iban": IBAN, "tx_id": tx_id, "booking_date": "2026-01-05",
+        "amount": amount, "currency": "CHF", "remittance_info": remittance, "ingested_at": ingested_at,
+    }
+
+
+def test_key_is_stable_and_sequence_separates_identical_entries():
+    assert transaction_key("BECO", "CH34 0078 8000 0507 7030 3", "2026-01-05", -4.5, "chf", " Café  Bar ") == (
+        transaction_key("BECO", IBAN, "2026-01-05", -4.50000001, "CHF", "Café Bar")
+    )
+    keys = KeySequencer("BECO")
+    first, second = (keys.key(IBAN, "2026-01-05", -4.5, "CHF", "Café") for _ in range(2))
+    assert first != second
+    assert first == KeySequencer("BECO").key(IBAN, "2026-01-05", -4.5, "CHF", "Café")
+    # Mesmo extrato em outro tenant: outra chave, a constraint global não colide
+    assert first != KeySequencer("SANTOS").key(IBAN, "2026-01-05", -4.5, "CHF", "Café")
+
+
+def test_plan_collapses_reimports_but_keeps_identical_entries_of_one_import():
+    rows = [
+        # 1ª importação: dois cafés idênticos (tx_id aleatório do fallback antigo)
+        _row("n1", "2026-01-10", tx_id="a1b2c3d4"),
+        _row("n2", "2026-01-10", tx_id="9f8e7d6c"),
+        _row("n3", "2026-01-10", tx_id="ZV42", amount=-120.9),
+        # 2ª importação do mesmo extrato (ZV42 já caía no mesmo nó pelo MERGE em tx_id)
+        _row("n4", "2026-02-01", tx_id="0a0b0c0d"),
+        _row("n5", "2026-02-01", tx_id="1a1b1c1d"),
+    ]
+    keys, merges = plan_dedup(rows)
+    assert set(keys) == {"n1", "n2", "n3"}
+    assert len({key for key, _ in keys.values()}) == 3
+    assert sorted(merges) == [["n1", "n4"], ["n2", "n5"]]
+
+
+def test_plan_never_merges_across_tenants_and_legacy_key_ignores_currency():
+    rows = [
+        _row("b1", "2026-01-10", tx_id="a1b2c3d4"),
+        _row("s1", "2026-01-10", tx_id="a1b2c3d4", tenant="SANTOS"),
+        _row("s2", "2026-02-01", tx_id="0a0b0c0d", tenant="SANTOS"),
+    ]
+    keys, merges = plan_dedup(rows)
+    assert merges == [["s1", "s2"]]
+    assert keys["b1"][0] != keys["s1"][0]
+
+    # Parser antigo: currency 'CHF' em conta EUR; a reimportação (EUR) casa pela legacy_key
+    reimport = KeySequencer("BECO")
+    assert reimport.legacy_key(IBAN, "2026-01-05", -4.5, "Café") == keys["b1"][1]
+    assert reimport.key(IBAN, "2026-01-05", -4.5, "EUR", "Café") != keys["b1"][0]
+
+
+@pytest.mark.asyncio
+async def test_dedup_merges_then_backfills_keys():
+    graph = MagicMock()
+
+    async def _stream(query, params=None, **kwargs):
+        for row in (_row("n1", "2026-01-10", tx_id="a1b2c3d4"), _row("n2", "2026-02-01", tx_id="0a0b0c0d")):
+            row.pop("tenant")
+            yield {**row, "labels": ["BECO"]}
+
+    graph.stream = MagicMock(side_effect=_stream)
+    graph.write = AsyncMock(return_value=[])
+
+    assert await dedup_transactions(graph, "beco") == 1
+    (merge_q, merge_p), (key_q, key_p) = [c.args for c in graph.write.call_args_list]
+    assert "apoc.refactor.mergeNodes" in merge_q and merge_p["groups"] == [["n1", "n2"]]
+    assert "labels(tr)" in graph.stream.call_args.args[0]
+    assert "SET tr.tx_key" in key_q and [r["id"] for r in key_p["rows"]] == ["n1"]
+    assert key_p["rows"][0]["key"] == KeySequencer("BECO").key(IBAN, "2026-01-05", -4.5, "CHF", "Café")
+
+
+def test_uniqueness_constraint_runs_after_dedup():
+    migration = next(m for m in MIGRATIONS if m.data is dedup_transactions)
+    assert [obj.name for obj in migration.objects] == ["transaction_tx_key_unique", "transaction_legacy_key_idx"]
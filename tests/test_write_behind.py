@@ -0,0 +1,230 @@
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.v3.core.persistence import NodePersistenceOrchestrator
+from src.v3.core.provenance import MenirProv
+from src.v3.core.schemas.base import Document
+from src.v3.core.schemas.identity import TenantContext
+from src.v3.core.write_behind import WriteBehindBuffer, flush_all, register_statement
+from src.v3.meta_cognition import MenirOntologyManager
+
+register_statement("test_touch", "UNWIND $rows AS row MERGE (n:`{tenant}` {uid: row.uid})")
+
+
+def _graph(fail_times=0):
+    graph = MagicMock()
+    calls = {"n": 0}
+
+    async def _write(query, params=None, **kwargs):
+        calls["n"] += 1
+        if calls["n"] <= fail_times:
+            raise ConnectionError("neo4j indisponível")
+        return []
+
+    graph.write = AsyncMock(side_effect=_write)
+    return graph
+
+
+def _rows(graph):
+    return [row for c in graph.write.call_args_list for row in c.args[1]["rows"]]
+
+
+def _buffer(graph, **kwargs):
+    kwargs.setdefault("flush_interval_ms", 60_000)
+    kwargs.setdefault("spill_path", "")
+    return WriteBehindBuffer(graph=graph, **kwargs)
+
+
+def test_statement_must_consume_rows():
+    with pytest.raises(ValueError):
+        register_statement("broken", "MERGE (n:X {uid: $uid})")
+
+
+@pytest.mark.asyncio
+async def test_rows_coalesce_into_unwind_batches():
+    graph = _graph()
+    buffer = _buffer(graph, max_rows=20)
+
+    for i in range(50):
+        await buffer.enqueue("test_touch", {"uid": f"u{i}"}, tenant="BECO")
+    await buffer.close()
+
+    assert graph.write.await_count == 3
+    assert [len(c.args[1]["rows"]) for c in graph.write.call_args_list] == [20, 20, 10]
+    assert [r["uid"] for r in _rows(graph)] == [f"u{i}" for i in range(50)]
+    query = graph.write.call_args.args[0]
+    assert "UNWIND $rows" in query and ":`BECO`" in query
+    assert graph.write.call_args.kwargs["tenant"] == "BECO"
+    assert buffer.stats == {"rows": 50, "transactions": 3, "dropped": 0}
+
+
+@pytest.mark.asyncio
+async def test_timer_flushes_partial_batch():
+    graph = _graph()
+    buffer = _buffer(graph, max_rows=100, flush_interval_ms=10)
+
+    await buffer.enqueue("test_touch", {"uid": "u1"}, tenant="BECO")
+    await buffer.enqueue("test_touch", {"uid": "u2"}, tenant="BECO")
+    graph.write.assert_not_called()
+
+    await asyncio.sleep(0.05)
+    assert graph.write.await_count == 1
+    assert buffer.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_tenants_never_share_a_transaction():
+    graph = _graph()
+    buffer = _buffer(graph)
+
+    await buffer.enqueue("test_touch", {"uid": "b1"}, tenant="BECO")
+    await buffer.enqueue("test_touch", {"uid": "s1"}, tenant="SANTOS")
+    await buffer.enqueue("test_touch", {"uid": "b2"}, tenant="BECO")
+    await buffer.flush()
+
+    by_tenant = {c.kwargs["tenant"]: c for c in graph.write.call_args_list}
+    assert [r["uid"] for r in by_tenant["BECO"].args[1]["rows"]] == ["b1", "b2"]
+    assert ":`SANTOS`" in by_tenant["SANTOS"].args[0]
+
+
+@pytest.mark.asyncio
+async def test_backpressure_flushes_before_exceeding_memory_bound():
+    graph = _graph()
+    buffer = _buffer(graph, max_rows=100, max_pending=5)
+
+    for i in range(12):
+        await buffer.enqueue("test_touch", {"uid": f"u{i}"}, tenant="BECO")
+        assert buffer.pending <= 5
+    await buffer.close()
+    assert len(_rows(graph)) == 12
+
+
+@pytest.mark.asyncio
+async def test_saturated_buffer_rejects_when_flush_fails():
+    graph = _graph(fail_times=100)
+    buffer = _buffer(graph, max_pending=2)
+
+    await buffer.enqueue_many("test_touch", [{"uid": "a"}, {"uid": "b"}], tenant="BECO")
+    with pytest.raises(ConnectionError):
+        await buffer.enqueue("test_touch", {"uid": "c"}, tenant="BECO")
+    # Nada perdido: as linhas falhas voltam para a fila
+    assert buffer.pending == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_requeues_rows_in_order():
+    graph = _graph(fail_times=1)
+    buffer = _buffer(graph)
+
+    await buffer.enqueue_many("test_touch", [{"uid": "a"}, {"uid": "b"}], tenant="BECO")
+    with pytest.raises(ConnectionError):
+        await buffer.flush()
+    assert buffer.pending == 2
+
+    await buffer.enqueue("test_touch", {"uid": "c"}, tenant="BECO")
+    assert await buffer.flush() == 3
+    assert [r["uid"] for r in graph.write.call_args.args[1]["rows"]] == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_spill_file_survives_crash_and_is_replayed(tmp_path):
+    spill = tmp_path / "write_behind.jsonl"
+    crashed = _buffer(_graph(), spill_path=str(spill))
+    await crashed.enqueue("test_touch", {"uid": "u1"}, tenant="BECO")
+    await crashed.enqueue("test_touch", {"uid": "u2"}, tenant="SANTOS")
+    # Crash: o processo morre sem flush; a linha truncada no fim é ignorada
+    with open(spill, "a", encoding="utf-8") as f:
+        f.write('{"s": "test_touch", "t": "BE')
+    assert len(spill.read_text().splitlines()) == 3
+
+    graph = _graph()
+    recovered = _buffer(graph, spill_path=str(spill))
+    assert await recovered.recover() == 2
+    assert sorted(r["uid"] for r in _rows(graph)) == ["u1", "u2"]
+    assert spill.read_text() == ""
+
+
+@pytest.mark.asyncio
+async def test_spill_is_written_before_enqueue_returns(tmp_path):
+    spill = tmp_path / "write_behind.jsonl"
+    buffer = _buffer(_graph(), spill_path=str(spill))
+
+    await buffer.enqueue("test_touch", {"uid": "u1"}, tenant="BECO")
+    assert json.loads(spill.read_text()) == {"s": "test_touch", "t": "BECO", "r": {"uid": "u1"}}
+
+    await buffer.flush()
+    assert spill.read_text() == ""
+
+
+@pytest.mark.asyncio
+async def test_flush_all_drains_live_buffers_on_shutdown():
+    graph = _graph()
+    buffer = _buffer(graph)
+    await buffer.enqueue("test_touch", {"uid": "u1"}, tenant="BECO")
+
+    await flush_all()
+    assert buffer.pending == 0
+    assert graph.write.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_anomalies_and_prov_events_share_the_buffer_but_quarantine_is_synchronous():
+    graph = _graph()
+    with patch("src.v3.meta_cognition.get_shared_driver", return_value=MagicMock()):
+        manager = MenirOntologyManager()
+    manager.write_behind = _buffer(graph)
+    manager.graph = MagicMock(write=AsyncMock(return_value=[]))
+
+    for i in range(5):
+        await manager.inject_entropy_anomaly("BECO", f"h{i}", "UNREADABLE_PDF", "PDF ilegível", 1)
+    await manager.quarantine_document("BECO", "h0", "TRANSACTION_ROLLBACK", import_batch="b1")
+    await MenirProv(manager).record_event("Synapse", "PAUSE_INGESTION", {"by": "ops"})
+    await MenirProv(manager).record_event("Synapse", "HEARTBEAT", {})
+    graph.write.assert_not_called()
+
+    # O flip de quarentena já está no grafo, fora do buffer
+    query, params = manager.graph.write.await_args.args
+    assert "MERGE (d:Document:`BECO`" in query
+    assert params["import_batch"] == "b1" and manager.graph.write.await_args.kwargs["tenant"] == "BECO"
+
+    await manager.write_behind.flush()
+    # Um UNWIND por statement: 5 anomalias, 1 evento (HEARTBEAT é descartado)
+    assert sorted(len(c.args[1]["rows"]) for c in graph.write.call_args_list) == [1, 5]
+
+
+@pytest.mark.asyncio
+async def test_flush_does_not_truncate_a_row_spilled_meanwhile(tmp_path):
+    spill = tmp_path / "write_behind.jsonl"
+    buffer = _buffer(_graph(), spill_path=str(spill))
+    await buffer.enqueue("test_touch", {"uid": "u1"}, tenant="BECO")
+
+    original = buffer._spill
+    buffer._spill = lambda lines: (original(lines), time.sleep(0.05))
+    enqueue = asyncio.create_task(buffer.enqueue("test_touch", {"uid": "u2"}, tenant="BECO"))
+    await asyncio.sleep(0.01)  # u2 já está no spill, ainda fora de _rows
+
+    await buffer.flush()
+    await enqueue
+    assert buffer.pending == 1
+    assert "u2" in [json.loads(line)["r"]["uid"] for line in spill.read_text().splitlines()]
+
+
+@pytest.mark.asyncio
+async def test_persist_links_tenant_in_the_node_statement():
+    tx = MagicMock()
+    tx.run = AsyncMock()
+    token = TenantContext.set("BECO")
+    try:
+        document = Document(uid="d1", project="BECO", sha256="a" * 64, name="f.pdf")
+        assert await NodePersistenceOrchestrator().persist(document, tx) == "d1"
+    finally:
+        TenantContext.reset(token)
+
+    assert tx.run.await_count == 1
+    call = tx.run.call_args
+    assert "MERGE (n:Document:`BECO`" in call.args[0] and "MERGE (n)-[r:BELONGS_TO_TENANT]->(t)" in call.args[0]
+    assert call.kwargs["gov_tenant"] == "BECO" and call.kwargs["gov_origin_uid"] is None
@@ -218,3 +218,26 @@ async def test_handle_tg_photo_no_bot(synapse):
     message.photo = [MagicMock(file_id="photo-123")]
     await synapse.handle_tg_photo(message)
     assert True
+
+
+@pytest.mark.asyncio
+async def test_stream_error_aborts_instead_of_sending_truncated_json(caplog):
+    import aiohttp
+    from aiohttp.test_utils import TestClient, TestServer
+    from src.v3.core.synapse import _stream_json_array
+
+    async def _rows():
+        yield {"uid": "q1"}
+        raise ConnectionError("neo4j caiu no meio da página")
+
+    async def handler(request):
+        return await _stream_json_array(request, _rows())
+
+    app = web.Application()
+    app.router.add_get("/list", handler)
+    async with TestClient(TestServer(app)) as client:
+        response = await client.get("/list")
+        assert response.status == 200
+        with pytest.raises(aiohttp.ClientPayloadError):
+            await response.read()
+    assert "conexão abortada" in caplog.text